@@ -1,10 +1,11 @@
 import logging
 import os
-import tempfile
-from datetime import datetime
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from io import BytesIO
 from pathlib import Path
 
-import pandas as pd
 import streamlit as st
 
 from utils import (
@@ -15,36 +16,68 @@ from utils import (
     parse_docx_with_images,
     translate_chunks_parallel,
 )
+from utils.cancellation import TranslationCancelled
 from utils.config import (
     DISCORD_ALERT_THRESHOLD,
+    FIGURE_OUTPUT_LEGEND,
+    FIGURE_OUTPUT_MODE,
+    FIGURE_OUTPUT_OVERLAY,
+    FIGURE_OUTPUT_TEXT,
     METRICS_ENABLED_ENV_VAR,
+    METRICS_TRACE_DIR_ENV_VAR,
+    PRIORITY_INTERACTIVE,
     TRANSLATION_MAX_WORKERS,
 )
+from utils.figure_cache import get_figure_cache
+from utils.figure_overlay import render_figures
 from utils.metrics import (
     PHASE_BUILDING_DOC,
     PHASE_TRANSLATING,
+    STATUS_CANCELLED,
     STATUS_ERROR,
     STATUS_OK,
+    STATUS_QUOTA_BLOCKED,
     MetricsCollector,
     NullMetricsCollector,
     NullSink,
+    TeeSink,
+    resolve_app_version,
     set_active_collector,
 )
-from utils.metrics_sheets import build_sheets_sink_from_secrets
+from utils.metrics_prometheus import get_prometheus_sink
+from utils.metrics_sheets import get_batched_sheets_sink
 from utils.notifications import notify_discord_failure
-from utils.translation import QuotaExhaustedError
+from utils.output_store import get_output_store
+from utils.revision import Alignment, translate_revision
+from utils.segments import SegmentWriter, TranslationMemory
+from utils.translation import (
+    BREAKER_HALF_OPEN,
+    BREAKER_OPEN,
+    QuotaCircuitOpenError,
+    QuotaExhaustedError,
+    get_quota_breaker,
+    prewarm_clients,
+)
 
 log = logging.getLogger(__name__)
 
 # 초기 상태
 if "translated" not in st.session_state:
     st.session_state.translated = False
-if "output_path" not in st.session_state:
-    st.session_state.output_path = None
+if "output_handle" not in st.session_state:
+    st.session_state.output_handle = None
+if "segments_handle" not in st.session_state:
+    st.session_state.segments_handle = None
+if "alignment_handle" not in st.session_state:
+    st.session_state.alignment_handle = None
+if "qa_issues" not in st.session_state:
+    st.session_state.qa_issues = []
 if "parsed_elements" not in st.session_state:
     st.session_state.parsed_elements = []
 if "chunked_elements" not in st.session_state:
     st.session_state.chunked_elements = []
+if "translation_running" not in st.session_state:
+    st.session_state.translation_running = False
 
 # 페이지 기본 정보
 st.set_page_config(page_title="한일 특허 번역기", page_icon="📄", layout="centered")
@@ -73,21 +106,53 @@ workers = _resolve_workers()
 # 파일 업로드
 uploaded_file = st.file_uploader("📤 번역할 .docx 파일을 업로드하세요", type=["docx"])
 
+# 수정본 재번역: 이전 번역의 정렬 파일 / 번역 메모리가 있으면 바뀐 문단만 다시 번역
+alignment_file = st.file_uploader(
+    "🔁 (선택) 이전 번역의 정렬 파일(.json) 또는 번역 메모리(.tmx) — "
+    "올리면 이미 번역된 문단은 재사용하고 나머지만 번역합니다",
+    type=["json", "tmx"],
+    key="alignment_file",
+)
+
+# 도면 출력 방식: 라벨 텍스트 목록 / 도면 위에 일본어 덮어쓰기 / 번호 + 범례
+_FIGURE_OUTPUT_LABELS = {
+    FIGURE_OUTPUT_TEXT: "라벨 텍스트만 (원문: 번역)",
+    FIGURE_OUTPUT_OVERLAY: "도면에 일본어 라벨 덮어쓰기",
+    FIGURE_OUTPUT_LEGEND: "도면 + 번호 범례",
+}
+figure_output = st.radio(
+    "🖼️ 도면 출력 방식",
+    list(_FIGURE_OUTPUT_LABELS),
+    index=list(_FIGURE_OUTPUT_LABELS).index(FIGURE_OUTPUT_MODE),
+    format_func=_FIGURE_OUTPUT_LABELS.get,
+    horizontal=True,
+    key="figure_output",
+)
+
 # 진행률 표시 위치 확보
 progress_placeholder = st.empty()
 
 # 파일 제거 or 변경 시 상태 초기화
 if uploaded_file is None:
     st.session_state.translated = False
-    st.session_state.output_path = None
+    st.session_state.output_handle = None
+    st.session_state.segments_handle = None
+    st.session_state.alignment_handle = None
+    st.session_state.qa_issues = []
     st.session_state.parsed_elements = []
     st.session_state.chunked_elements = []
     st.session_state.base_filename = ""
 else:
+    # API 클라이언트 미리 연결: 파일이 올라오면 백그라운드로 (SDK 도 이때 불러옴).
+    # 프로세스당 한 번 — 이후 rerun 에서는 아무 일도 안 함
+    prewarm_clients()
     new_filename = uploaded_file.name
     if st.session_state.get("last_uploaded_filename") != new_filename:
         st.session_state.translated = False
-        st.session_state.output_path = None
+        st.session_state.output_handle = None
+        st.session_state.segments_handle = None
+        st.session_state.alignment_handle = None
+        st.session_state.qa_issues = []
         st.session_state.parsed_elements = []
         st.session_state.chunked_elements = []
         st.session_state.last_uploaded_filename = new_filename
@@ -101,8 +166,15 @@ if uploaded_file and not st.session_state.translated:
     st.session_state.chunked_elements = chunks
 
 
-def build_doc_from_translated_chunks(doc, chunks):
-    """Write translated chunks (with chunk['translated'] set) into doc in order."""
+def build_doc_from_translated_chunks(doc, chunks, figure_images=None):
+    """Write translated chunks (with chunk['translated'] set) into doc in order.
+
+    ``figure_images`` (e.g. ``render_figures(...)``) yields one rendered
+    image or ``None`` per FIGURE chunk, in order; a figure without an image
+    is written as its "original: translated" label lines.
+    """
+    images = iter(figure_images if figure_images is not None else ())
+    lines = []
     paragraph_counter = 0
     for chunk in chunks:
         if chunk["type"] == "TEXT":
@@ -114,13 +186,27 @@ def build_doc_from_translated_chunks(doc, chunks):
                         else:
                             paragraph_number = f" 【{paragraph_counter:04d}】"
                             paragraph_counter += 1
-                            doc.add_paragraph_with_justify(" " + paragraph_number)
-                    doc.add_paragraph_with_justify(" " + para)
+                            lines.append(" " + paragraph_number)
+                    lines.append(" " + para)
                 else:
-                    doc.add_paragraph_with_justify("")
+                    lines.append("")
         elif chunk["type"] == "FIGURE":
+            image = next(images, None)
+            if image is not None:
+                doc.add_paragraphs_with_justify(lines)
+                lines = []
+                doc.add_figure(image)
+                continue
             for p in chunk["translated"]:
-                doc.add_paragraph_with_justify(f"{p.original}: {p.translated}")
+                lines.append(f"{p.original}: {p.translated}")
+    doc.add_paragraphs_with_justify(lines)
+
+
+def _dataframe(rows):
+    """pandas (~0.4 s to import) loads when a table is first shown, not on wake-up."""
+    import pandas as pd
+
+    return pd.DataFrame(rows)
 
 
 def _metrics_enabled() -> bool:
@@ -143,13 +229,24 @@ def _build_collector(uploaded_file, chunks, workers):
     but we still short-circuit to NullMetricsCollector when disabled so
     the sampler/flusher threads aren't spun up for nothing.
     """
-    if not _metrics_enabled():
+    prometheus = get_prometheus_sink()
+    sheets_enabled = _metrics_enabled()
+    if not sheets_enabled and prometheus is None:
         return NullMetricsCollector()
-    sink = build_sheets_sink_from_secrets()
-    if sink is None:
-        log.info("[metrics] sheets sink unavailable; using NullSink locally")
-        sink = NullSink()
-    collector = MetricsCollector(sink)
+    sink = None
+    if sheets_enabled:
+        sink = get_batched_sheets_sink()
+        if sink is None:
+            log.info("[metrics] sheets sink unavailable; using NullSink locally")
+            sink = NullSink()
+    if prometheus is not None:
+        sink = prometheus if sink is None else TeeSink(sink, prometheus)
+    run_id = str(uuid.uuid4())
+    trace_dir = os.environ.get(METRICS_TRACE_DIR_ENV_VAR)
+    trace_path = (
+        os.path.join(trace_dir, f"{run_id}.trace.json") if trace_dir else None
+    )
+    collector = MetricsCollector(sink, run_id=run_id, trace_path=trace_path)
 
     text_chunks = [c for c in chunks if c["type"] == "TEXT"]
     figure_chunks = [c for c in chunks if c["type"] == "FIGURE"]
@@ -207,6 +304,13 @@ def _describe_error(error: BaseException | None) -> str:
     return f"{type(error).__name__}: {error}"
 
 
+def _error_kind(error: BaseException | None) -> str:
+    """Coalescing key for Discord alerts: same kind → one summary per window."""
+    if isinstance(error, QuotaExhaustedError):
+        return f"quota:{error.scope}"
+    return type(error).__name__ if error is not None else "unknown"
+
+
 def _show_error_message(error: BaseException | None) -> None:
     """Render a friendly st.error instead of leaking a raw traceback."""
     if isinstance(error, QuotaExhaustedError) and error.scope == "per_day":
@@ -238,9 +342,47 @@ def _handle_failure(doc_name: str, error: BaseException | None, workers: int) ->
             reason=_describe_error(error),
             workers=workers,
             model=DEFAULT_GEMINI_MODEL_NAME,
+            kind=_error_kind(error),
         )
 
 
+def _format_duration(seconds: float) -> str:
+    seconds = int(round(seconds))
+    if seconds < 60:
+        return f"{seconds}초"
+    minutes, seconds = divmod(seconds, 60)
+    return f"{minutes}분 {seconds}초" if seconds else f"{minutes}분"
+
+
+def _quota_blocked_message(reopens_at: float) -> str:
+    # Korea has no DST, so a fixed offset is enough for the display.
+    kst = datetime.fromtimestamp(reopens_at, timezone(timedelta(hours=9)))
+    remaining = _format_duration(max(0.0, reopens_at - time.time()))
+    return (
+        "⛔ Gemini 일일 쿼터가 소진되어 지금은 번역을 시작할 수 없습니다. "
+        f"태평양시간(PT) 자정 — 한국시간 {kst:%m/%d %H:%M}, 약 {remaining} 후 — "
+        "에 다시 열립니다. 결제 크레딧 문제라면 충전 후에도 이 시각까지 기다려야 합니다."
+    )
+
+
+def _format_progress(snapshot) -> str:
+    """One-line Korean status for the progress bar from a ProgressSnapshot."""
+    parts = [f"🔄 번역 중... {snapshot.fraction:.0%}"]
+    parts.append(f"청크 {snapshot.chunks_done}/{snapshot.chunks_total}")
+    if snapshot.paragraphs_total:
+        parts.append(f"문단 {snapshot.paragraphs_done}/{snapshot.paragraphs_total}")
+    if snapshot.figures_total:
+        parts.append(f"그림 {snapshot.figures_done}/{snapshot.figures_total}")
+    parts.append(f"진행 중 {snapshot.in_flight}")
+    if snapshot.backing_off:
+        parts.append(f"한도 초과로 대기 {snapshot.backing_off}")
+    elif snapshot.retrying:
+        parts.append(f"재시도 {snapshot.retrying}")
+    if snapshot.eta_s is not None:
+        parts.append(f"남은 시간 약 {_format_duration(snapshot.eta_s)}")
+    return " · ".join(parts)
+
+
 # 번역 실행
 def run_translation(workers: int):
     chunks = st.session_state.chunked_elements
@@ -252,47 +394,141 @@ def run_translation(workers: int):
         or "(이름 없음)"
     )
 
-    def progress_cb(completed, total_n):
+    def status_cb(snapshot):
         progress_placeholder.progress(
-            completed / total_n,
-            text=f"🔄 번역 중... {completed} / {total_n} 청크 완료",
+            snapshot.fraction, text=_format_progress(snapshot)
         )
 
+    alignment = memory = None
+    if alignment_file is not None:
+        try:
+            if alignment_file.name.lower().endswith(".tmx"):
+                memory = TranslationMemory.from_tmx(BytesIO(alignment_file.getvalue()))
+            else:
+                alignment = Alignment.from_json(alignment_file.getvalue())
+        except ValueError as e:
+            log.warning("[run] unreadable alignment file: %s", e)
+            st.session_state.translation_running = False
+            st.error(
+                "❌ 정렬 파일을 읽을 수 없습니다. 이 앱에서 번역 후 내려받은 "
+                ".json / .tmx 파일인지 확인해 주세요."
+            )
+            return STATUS_ERROR
+
     collector = _build_collector(uploaded_file, chunks, workers)
-    set_active_collector(collector)
+    if "metrics_session_key" not in st.session_state:
+        st.session_state.metrics_session_key = str(uuid.uuid4())
+    set_active_collector(collector, key=st.session_state.metrics_session_key)
     collector.start(initial_phase=PHASE_TRANSLATING)
 
+    def segment_writer(buffer):
+        return SegmentWriter(
+            tmx=buffer,
+            doc_name=doc_name,
+            model_name=DEFAULT_GEMINI_MODEL_NAME,
+            tool_version=resolve_app_version(),
+        )
+
+    # Aligned segments stream into the TMX as chunks finish.
+    tmx_buffer = BytesIO()
+    segments = segment_writer(tmx_buffer)
+
     status = STATUS_ERROR
     error: BaseException | None = None
     try:
         progress_placeholder.progress(0, text=f"🔄 번역 중... 0 / {total} 청크 완료")
-        translated_chunks = translate_chunks_parallel(
-            chunks,
+        # A click on the cancel button (or any widget / new upload / closed
+        # tab) interrupts this script at the next status_cb with Streamlit's
+        # rerun/stop exception; translate_chunks_parallel then abandons its
+        # workers instead of waiting them out.
+        runner_kwargs = dict(
             model_name=DEFAULT_GEMINI_MODEL_NAME,
             max_workers=workers,
-            progress_callback=progress_cb,
+            status_callback=status_cb,
             metrics_collector=collector,
+            figure_cache=get_figure_cache(),
+            priority=PRIORITY_INTERACTIVE,
+            chunk_callback=segments.add_chunk,
+            figure_boxes=figure_output != FIGURE_OUTPUT_TEXT,
         )
+        if alignment is None and memory is None:
+            translated_chunks = translate_chunks_parallel(chunks, **runner_kwargs)
+        else:
+            # Unchanged paragraphs / figures keep their previous translation.
+            translated_chunks = translate_revision(
+                chunks, alignment, memory=memory, **runner_kwargs
+            )
+
+        # Numerals / reference signs / units / 【】 headings vs the source;
+        # flagged paragraphs are translated once more, the rest listed below.
+        runner_kwargs.pop("chunk_callback")
+        from utils.qa import run_qa  # numpy loads with the first QA, not on wake-up
+
+        translated_chunks, qa_report = run_qa(translated_chunks, **runner_kwargs)
+        st.session_state.qa_issues = qa_report.issues
+        if qa_report.n_requeued:
+            # The streamed TMX holds the replaced translations; write it anew.
+            segments.close()
+            tmx_buffer = BytesIO()
+            with segment_writer(tmx_buffer) as segments:
+                for i, chunk in enumerate(translated_chunks):
+                    segments.add_chunk(i, chunk)
         st.session_state.chunked_elements = translated_chunks
 
         collector.set_phase(PHASE_BUILDING_DOC)
-        build_doc_from_translated_chunks(doc, translated_chunks)
+        # Drawings render in a process pool, a few figures ahead of the builder.
+        figure_images = None
+        if figure_output != FIGURE_OUTPUT_TEXT:
+            figure_images = render_figures(translated_chunks, figure_output)
+        build_doc_from_translated_chunks(doc, translated_chunks, figure_images)
         collector.record(total_output_chars=_count_output_chars(translated_chunks))
 
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".docx") as tmp_file:
-            doc.save(tmp_file.name)
-            st.session_state.output_path = tmp_file.name
+        # Saved once into memory; reruns serve the stored bytes as they are.
+        # The name is fixed here too so the download stays the same file.
+        buffer = BytesIO()
+        doc.save(buffer)
+        download_filename = (
+            f"{st.session_state.base_filename}_translated_"
+            f"{datetime.now().strftime('%Y%m%d_%H%M%S')}.docx"
+        )
+        st.session_state.output_handle = get_output_store().put(
+            buffer.getvalue(), download_filename
+        )
+        segments.close()
+        st.session_state.segments_handle = get_output_store().put(
+            tmx_buffer.getvalue(), f"{Path(download_filename).stem}.tmx"
+        )
+        alignment_json = Alignment.from_chunks(
+            translated_chunks, DEFAULT_GEMINI_MODEL_NAME
+        ).to_json()
+        st.session_state.alignment_handle = get_output_store().put(
+            alignment_json, f"{Path(download_filename).stem}.alignment.json"
+        )
 
         st.session_state.translated = True
         status = STATUS_OK
+    except TranslationCancelled:
+        status = STATUS_CANCELLED
+    except QuotaCircuitOpenError as e:
+        # Refused by the shared quota breaker (a per_day 429 in this or
+        # another session) — not a new failure of this document.
+        status = STATUS_QUOTA_BLOCKED
+        error = e
     except Exception as e:
         # Swallow translation failures here (instead of re-raising into a raw
         # Streamlit traceback) so the user gets a friendly message and we can
         # track/alert on repeated failures. Truly fatal BaseExceptions
         # (KeyboardInterrupt/SystemExit) still propagate.
         error = e
+    except BaseException:
+        # Streamlit StopException / RerunException (not Exception
+        # subclasses): the user cancelled or moved on. Not a failure.
+        status = STATUS_CANCELLED
+        raise
     finally:
+        st.session_state.translation_running = False
         try:
+            collector.record(quota_breaker_state=get_quota_breaker().snapshot().state)
             collector.stop_and_finalize(status, error=error)
         except Exception:
             log.exception("[metrics] stop_and_finalize raised; ignoring")
@@ -300,30 +536,131 @@ def run_translation(workers: int):
     if status == STATUS_OK:
         # Clear the consecutive-failure streak for this document.
         st.session_state.setdefault("failure_counts", {}).pop(doc_name, None)
+    elif status == STATUS_CANCELLED:
+        progress_placeholder.empty()
+        st.info("⏹ 번역이 취소되었습니다.")
+    elif status == STATUS_QUOTA_BLOCKED:
+        progress_placeholder.empty()
+        st.error(_quota_blocked_message(error.reopens_at))
     else:
         _handle_failure(doc_name, error, workers)
+    return status
+
+
+def _start_translation():
+    st.session_state.translation_running = True
 
 
-# 번역 시작 버튼
+def _cancel_translation():
+    # The click itself already interrupted the running script; this only
+    # leaves a notice for the rerun it triggers.
+    st.session_state.translation_running = False
+    st.session_state.translation_cancelled = True
+
+
+# 번역 시작 / 취소 버튼
 if uploaded_file and not st.session_state.translated:
-    st.button("🚀 번역 시작", on_click=run_translation, args=(workers,))
+    if st.session_state.pop("translation_cancelled", False):
+        st.info("⏹ 번역이 취소되었습니다.")
+    breaker = get_quota_breaker().snapshot()
+    quota_blocked = breaker.state == BREAKER_OPEN
+    if quota_blocked and not st.session_state.translation_running:
+        st.error(_quota_blocked_message(breaker.reopens_at))
+    elif breaker.state == BREAKER_HALF_OPEN:
+        st.warning(
+            "⚠️ Gemini 분당 요청 한도에 걸려 요청을 하나씩 보내며 확인하는 중입니다. "
+            "번역이 평소보다 느릴 수 있습니다."
+        )
+    button_slot = st.empty()
+    if st.session_state.translation_running:
+        button_slot.button(
+            "⏹ 번역 취소", key="cancel_translation", on_click=_cancel_translation
+        )
+        if run_translation(workers) == STATUS_OK:
+            st.rerun()
+        # Failed run: the error is shown above; offer a fresh start.
+        button_slot.button(
+            "🚀 번역 시작",
+            key="start_translation",
+            on_click=_start_translation,
+            disabled=get_quota_breaker().snapshot().state == BREAKER_OPEN,
+        )
+    else:
+        button_slot.button(
+            "🚀 번역 시작",
+            key="start_translation",
+            on_click=_start_translation,
+            disabled=quota_blocked,
+        )
 
 # 번역 완료 후 결과
 if st.session_state.translated:
-    st.success("✅ 번역이 완료되었습니다!")
-
-    download_filename = f"{st.session_state.base_filename}_translated_{datetime.now().strftime('%Y%m%d_%H%M%S')}.docx"
-
-    with open(st.session_state.output_path, "rb") as f:
+    handle = st.session_state.output_handle
+    output = get_output_store().get(handle)
+    if output is None:
+        st.session_state.translated = False
+        st.warning("⌛ 번역 결과가 만료되었습니다. 다시 번역해 주세요.")
+    else:
+        st.success("✅ 번역이 완료되었습니다!")
         st.download_button(
             label="📥 번역된 .docx 다운로드",
-            data=f,
-            file_name=download_filename,
+            data=output,
+            file_name=handle.file_name,
             mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
         )
-
-    # 번역 결과 표시
-    with st.expander("📘 최종 번역 결과 (청크 단위)", expanded=False):
+        alignment_handle = st.session_state.alignment_handle
+        alignment_json = get_output_store().get(alignment_handle)
+        if alignment_json is not None:
+            st.download_button(
+                label="🧩 정렬 파일 다운로드 (다음 수정본 재번역용 .json)",
+                data=alignment_json,
+                file_name=alignment_handle.file_name,
+                mime="application/json",
+            )
+        segments_handle = st.session_state.segments_handle
+        tmx = get_output_store().get(segments_handle)
+        if tmx is not None:
+            st.download_button(
+                label="🗂️ 번역 메모리 다운로드 (.tmx, 문장 단위 원문·번역 쌍)",
+                data=tmx,
+                file_name=segments_handle.file_name,
+                mime="application/x-tmx+xml",
+            )
+
+    # 자동 검수 결과: 숫자·부호·단위·【】 표제가 원문과 다른 문단
+    qa_issues = st.session_state.qa_issues
+    if qa_issues:
+        st.warning(
+            f"⚠️ 자동 검수: {len({(i.chunk, i.paragraph) for i in qa_issues})}개 "
+            "문단에서 숫자·부호·단위·【】 표제가 원문과 다릅니다. 아래 목록을 확인해 주세요."
+        )
+        qa_expander = st.expander(
+            "🔎 자동 검수에 걸린 문단", key="qa_expander", on_change="rerun"
+        )
+        if qa_expander.open:
+            qa_expander.dataframe(
+                _dataframe(
+                    [
+                        {
+                            "chunk": i.chunk,
+                            "paragraph": i.paragraph,
+                            "check": i.check,
+                            "missing": " ".join(i.missing),
+                            "extra": " ".join(i.extra),
+                            "content": i.source,
+                            "translated": i.target,
+                        }
+                        for i in qa_issues
+                    ]
+                ),
+                width="stretch",
+            )
+
+    # 번역 결과 표시 (펼쳤을 때만 표를 만든다 — 닫혀 있으면 pandas 도 불러오지 않음)
+    preview_expander = st.expander(
+        "📘 최종 번역 결과 (청크 단위)", key="preview_expander", on_change="rerun"
+    )
+    if preview_expander.open:
         display_rows = []
         for c in st.session_state.chunked_elements:
             row = {"type": c["type"]}
@@ -334,4 +671,4 @@ if st.session_state.translated:
                 row["content"] = "(image)"
                 row["translated"] = str(c.get("translated", ""))
             display_rows.append(row)
-        st.dataframe(pd.DataFrame(display_rows), width="stretch")
+        preview_expander.dataframe(_dataframe(display_rows), width="stretch")
@@ -0,0 +1,92 @@
+"""
+Benchmark: per-paragraph python-docx output vs the bulk XML builder.
+Builds the same synthetic translated spec both ways, checks that
+word/document.xml is byte-identical, and prints build / save timings.
+No API key needed.
+
+Usage:
+  python scripts/benchmark_docx_builder.py
+  python scripts/benchmark_docx_builder.py --paragraphs 20000 --repeat 5
+"""
+
+import argparse
+import os
+import sys
+import time
+import zipfile
+from io import BytesIO
+
+# Project root on path for utils
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.docx_parser import add_paragraph_with_justify, create_japanese_patent_docx
+
+
+def _lines(n_paragraphs: int) -> list[str]:
+    """Numbered body paragraphs as build_doc_from_translated_chunks emits them."""
+    lines = [" 【発明の詳細な説明】"]
+    for i in range(n_paragraphs):
+        if i % 50 == 0:
+            lines.append(" 【技術分野】")
+        lines.append(f"  【{i + 1:04d}】")
+        body = " 本発明は、装置及び方法に関する。" * 4
+        lines.append(body + f"<{i}> & S{i}")
+        if i % 200 == 0:
+            lines.append("")
+    return lines
+
+
+def _slow(lines):
+    doc = create_japanese_patent_docx()
+    for line in lines:
+        add_paragraph_with_justify(doc, line)
+    return doc
+
+
+def _fast(lines):
+    doc = create_japanese_patent_docx()
+    doc.add_paragraphs_with_justify(lines)
+    return doc
+
+
+def _document_xml(doc) -> bytes:
+    buf = BytesIO()
+    doc.save(buf)
+    with zipfile.ZipFile(buf) as zf:
+        return zf.read("word/document.xml")
+
+
+def _best(fn, repeat):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--paragraphs", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    lines = _lines(args.paragraphs)
+    print(f"{len(lines)} output paragraphs, best of {args.repeat}")
+    xml = {}
+    for name, build in (("python-docx", _slow), ("bulk xml", _fast)):
+        build_s, doc = _best(lambda: build(lines), args.repeat)
+        save_s, xml[name] = _best(lambda: _document_xml(doc), args.repeat)
+        print(
+            f"  {name:12s} build {build_s * 1000:8.1f} ms"
+            f"   save {save_s * 1000:7.1f} ms"
+        )
+
+    same = xml["python-docx"] == xml["bulk xml"]
+    print(f"  word/document.xml identical: {same}")
+    return 0 if same else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,106 @@
+"""
+Benchmark: cold-start import time of the app (python -X importtime).
+Runs the module-level imports of app.py in a fresh interpreter --repeat
+times and prints the best total and the heaviest imports. Fails (exit 1)
+when the total exceeds --max-ms or when a module that is meant to load
+lazily (pandas, numpy, google-genai, httpx, pyarrow) is imported at startup.
+No API key needed. Side effects of the rest of the script body (threads it
+starts) are checked by tests/test_lazy_imports.py, which runs the whole app.
+
+Usage:
+  python scripts/benchmark_import_time.py
+  python scripts/benchmark_import_time.py --repeat 10 --top 20
+  python scripts/benchmark_import_time.py --max-ms 1500
+  python scripts/benchmark_import_time.py --script other_app.py --allow pandas
+"""
+
+import argparse
+import ast
+import os
+import re
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Loaded on first use (the preview table, the first translation and its QA,
+# a .parquet export), never on wake-up.
+LAZY_MODULES = ("pandas", "numpy", "google.genai", "httpx", "pyarrow")
+# Regression threshold for the total: ~0.7 s on a dev machine, streamlit
+# about half of it; with pandas and the SDK loaded eagerly it was ~1.1 s.
+DEFAULT_MAX_MS = 1000
+
+_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)")
+
+
+def startup_imports(script: str) -> str:
+    """Source of the module-level ``import`` statements of ``script``."""
+    with open(script, encoding="utf-8") as f:
+        tree = ast.parse(f.read(), script)
+    nodes = [n for n in tree.body if isinstance(n, (ast.Import, ast.ImportFrom))]
+    return "\n".join(ast.unparse(n) for n in nodes)
+
+
+def measure(source: str) -> list[tuple[str, int, int, str]]:
+    """``(module, self µs, cumulative µs, indent)`` per module ``source`` loads.
+
+    Top-level imports (the ones ``source`` triggered directly, and the
+    interpreter's own such as ``site``) have an empty indent.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", source],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=False,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    rows = []
+    for line in result.stderr.splitlines():
+        m = _LINE.match(line)
+        if m:
+            rows.append((m.group(4), int(m.group(1)), int(m.group(2)), m.group(3)))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--script", default=os.path.join(ROOT, "app.py"))
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--max-ms", type=float, default=DEFAULT_MAX_MS)
+    parser.add_argument(
+        "--allow",
+        action="append",
+        default=[],
+        metavar="MODULE",
+        help="Do not fail when this lazy module is imported at startup",
+    )
+    args = parser.parse_args()
+
+    source = startup_imports(args.script)
+    best_ms, best_rows = float("inf"), []
+    for _ in range(args.repeat):
+        rows = measure(source)
+        total_ms = sum(cum for _, _, cum, indent in rows if not indent) / 1000
+        if total_ms < best_ms:
+            best_ms, best_rows = total_ms, rows
+
+    print(f"{os.path.basename(args.script)} startup imports, best of {args.repeat}:")
+    print(f"  total {best_ms:.0f} ms (threshold {args.max_ms:.0f} ms)")
+    top_level = sorted(
+        (row for row in best_rows if not row[3]), key=lambda r: r[2], reverse=True
+    )
+    for name, _, cum, _ in top_level[: args.top]:
+        print(f"  {cum / 1000:8.1f} ms  {name}")
+
+    imported = {name for name, *_ in best_rows}
+    eager = [m for m in LAZY_MODULES if m in imported and m not in args.allow]
+    for module in eager:
+        print(f"  lazy module imported at startup: {module}")
+    return 1 if eager or best_ms > args.max_ms else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,76 @@
+"""
+Benchmark: post-translation QA (utils/qa.py) on a synthetic document.
+Builds a translated spec with one broken paragraph in every --broken-every,
+checks that exactly those are flagged, and prints the check time.
+No API key needed.
+
+Usage:
+  python scripts/benchmark_qa.py
+  python scripts/benchmark_qa.py --paragraphs 50000 --repeat 5
+"""
+
+import argparse
+import os
+import sys
+import time
+
+# Project root on path for utils
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.qa import check_translation
+
+
+def _chunks(n_paragraphs: int, broken_every: int, per_chunk: int = 40):
+    content, translated, broken = [], [], set()
+    for i in range(n_paragraphs):
+        if i % 50 == 0:
+            content.append("【기술분야】")
+            translated.append("【技術分野】")
+        content.append(
+            f"제어부({i})는 단계 S{i}에서 {i % 90 + 0.5} mm 만큼 이동하고, "
+            f"온도는 1,{i % 1000:03d} ℃ 이다. 도 {i % 9 + 1}a 참조."
+        )
+        ja = (
+            f"制御部（{i}）は、ステップS{i}において{i % 90 + 0.5}mmだけ移動し、"
+            f"温度は1{i % 1000:03d}℃である。図{i % 9 + 1}a参照。"
+        )
+        if i % broken_every == 0:
+            ja = ja.replace(f"S{i}", f"S{i + 1}")
+            broken.add(len(translated))
+        translated.append(ja)
+    chunks = [
+        {
+            "type": "TEXT",
+            "content": content[k : k + per_chunk],
+            "translated": translated[k : k + per_chunk],
+        }
+        for k in range(0, len(content), per_chunk)
+    ]
+    return chunks, {(p // per_chunk, p % per_chunk) for p in broken}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--paragraphs", type=int, default=10000)
+    parser.add_argument("--broken-every", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    chunks, broken = _chunks(args.paragraphs, args.broken_every)
+    best = float("inf")
+    for _ in range(args.repeat):
+        t0 = time.perf_counter()
+        report = check_translation(chunks)
+        best = min(best, time.perf_counter() - t0)
+
+    flagged = {(c, p) for c, ps in report.flagged().items() for p in ps}
+    print(
+        f"{report.n_paragraphs} paragraphs in {len(chunks)} chunks, "
+        f"best of {args.repeat}: {best * 1000:.1f} ms"
+    )
+    print(f"  flagged {len(flagged)} / expected {len(broken)}")
+    return 0 if flagged == broken else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
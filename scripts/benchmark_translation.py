@@ -1,11 +1,22 @@
 """
 Benchmark: sequential vs parallel translation on the same .docx.
-Requires GEMINI_API_KEY in environment (e.g. export GEMINI_API_KEY=... or set in shell).
+Requires GEMINI_API_KEY in environment (e.g. export GEMINI_API_KEY=... or set in shell),
+unless --mock routes requests to the offline backend in scripts/mock_gemini_backend.py.
 
 Usage:
   python scripts/benchmark_translation.py path/to/patent.docx
   python scripts/benchmark_translation.py path/to/patent.docx --sequential-only
   python scripts/benchmark_translation.py path/to/patent.docx --parallel-only
+  python scripts/benchmark_translation.py path/to/patent.docx --chunk-stats stats.csv
+  python scripts/benchmark_translation.py path/to/patent.docx --trace run.trace.json
+  python scripts/benchmark_translation.py path/to/patent.docx --mock --figure-batch both
+  python scripts/benchmark_translation.py path/to/patent.docx --figure-cache figs.sqlite3
+  python scripts/benchmark_translation.py path/to/patent.docx --mock --model-routing
+  python scripts/benchmark_translation.py path/to/patent.docx --chunker words
+  python scripts/benchmark_translation.py path/to/patent.docx --priority interactive
+  python scripts/benchmark_translation.py path/to/patent.docx --segments out/patent
+  python scripts/benchmark_translation.py path/to/patent.docx --mock --parallel-only
+  python scripts/benchmark_translation.py path/to/patent.docx --mock --parallel-only --prewarm
 """
 
 import argparse
@@ -16,19 +27,36 @@ import time
 # Project root on path for utils
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from utils.chunker import group_paragraphs_to_chunks
+from utils.chunker import estimate_tokens, group_paragraphs_to_chunks
 from utils.docx_parser import parse_docx_with_images
-from utils.config import TRANSLATION_MAX_WORKERS
+from utils.figure_cache import FigureCache
+from utils.segments import SegmentWriter
+from utils.config import (
+    CHUNKER_MODE,
+    GEMINI_PRICE_TABLE_USD_PER_1M,
+    PRIORITY_BATCH,
+    PRIORITY_INTERACTIVE,
+    TRANSLATION_MAX_WORKERS,
+)
+from utils.metrics import (
+    MetricsCollector,
+    NullSink,
+    estimate_cost_usd,
+    resolve_app_version,
+    summarize_spans,
+    write_chunk_stats_csv,
+)
+from utils.translation import prewarm_clients
 from utils.translation_runner import (
     translate_chunks_parallel,
     translate_chunks_sequential,
 )
 
 
-def _parse_and_chunk(docx_path: str):
+def _parse_and_chunk(docx_path: str, mode: str):
     with open(docx_path, "rb") as f:
         elements = parse_docx_with_images(f)
-    return group_paragraphs_to_chunks(elements)
+    return group_paragraphs_to_chunks(elements, mode=mode)
 
 
 def main():
@@ -36,11 +64,82 @@ def main():
     parser.add_argument("docx", help="Path to .docx file")
     parser.add_argument("--sequential-only", action="store_true", help="Run only sequential")
     parser.add_argument("--parallel-only", action="store_true", help="Run only parallel")
+    parser.add_argument(
+        "--chunk-stats",
+        metavar="CSV",
+        help="Write per-chunk tokens/latency of each run to this CSV (one file per mode)",
+    )
+    parser.add_argument(
+        "--trace",
+        metavar="JSON",
+        help="Write a Chrome-trace/Perfetto timeline of each run (one file per mode)",
+    )
+    parser.add_argument(
+        "--segments",
+        metavar="PREFIX",
+        help="Write aligned segments of each run to PREFIX_<mode>.tmx / .jsonl "
+        "(and .parquet when pyarrow is installed)",
+    )
+    parser.add_argument(
+        "--figure-batch",
+        choices=("off", "on", "both"),
+        default="off",
+        help="Pack small figures into shared requests; 'both' runs each mode twice",
+    )
+    parser.add_argument(
+        "--figure-cache",
+        metavar="SQLITE",
+        help="Use a persistent figure cache at this path (shared by all modes)",
+    )
+    parser.add_argument(
+        "--chunker",
+        choices=("words", "sections"),
+        default=CHUNKER_MODE,
+        help=f"Chunking mode (default {CHUNKER_MODE})",
+    )
+    parser.add_argument(
+        "--model-routing",
+        action="store_true",
+        help="Route each chunk to a model tier (GEMINI_MODEL_TIERS) by content",
+    )
+    parser.add_argument(
+        "--priority",
+        choices=(PRIORITY_BATCH, PRIORITY_INTERACTIVE),
+        default=PRIORITY_BATCH,
+        help=f"Scheduler class of the parallel runs (default {PRIORITY_BATCH})",
+    )
+    parser.add_argument(
+        "--prewarm",
+        action="store_true",
+        help="Build and connect the API clients before the first run, as the app "
+        "does on startup (compare the first-chunk latency with a run without)",
+    )
+    parser.add_argument(
+        "--mock",
+        action="store_true",
+        help="Use the offline mock backend instead of the Gemini API",
+    )
+    parser.add_argument(
+        "--mock-latency",
+        type=float,
+        default=0.8,
+        metavar="S",
+        help="Mock backend round-trip seconds per request (default 0.8)",
+    )
     args = parser.parse_args()
 
-    if not os.environ.get("GEMINI_API_KEY"):
+    mock_client = None
+    if args.mock:
+        from scripts.mock_gemini_backend import install_mock_backend
+
+        mock_client = install_mock_backend(round_trip_s=args.mock_latency)
+    elif not os.environ.get("GEMINI_API_KEY"):
         print("Error: Set GEMINI_API_KEY in the environment.", file=sys.stderr)
         sys.exit(1)
+    if args.prewarm:
+        t0 = time.perf_counter()
+        n_clients = prewarm_clients(TRANSLATION_MAX_WORKERS + 1, background=False)
+        print(f"Prewarmed {n_clients} clients in {time.perf_counter() - t0:.2f}s")
 
     docx_path = args.docx
     if not os.path.isfile(docx_path):
@@ -49,33 +148,141 @@ def main():
 
     run_seq = not args.parallel_only
     run_par = not args.sequential_only
-    chunk_count = len(_parse_and_chunk(docx_path))
-    print(f"Chunks: {chunk_count}")
+    preview = _parse_and_chunk(docx_path, args.chunker)
+    text_tokens = [
+        sum(estimate_tokens(p) for p in c["content"])
+        for c in preview
+        if c["type"] == "TEXT"
+    ]
+    print(f"Chunks ({args.chunker}): {len(preview)}")
+    if text_tokens:
+        print(
+            f"TEXT chunk est. tokens: min {min(text_tokens)}, "
+            f"avg {sum(text_tokens) / len(text_tokens):.0f}, max {max(text_tokens)}"
+        )
     print()
 
-    t_seq = None
-    t_par = None
-
+    batching_variants = {
+        "off": [("", False)],
+        "on": [("", True)],
+        "both": [("", False), ("_figbatch", True)],
+    }[args.figure_batch]
+    modes = []
     if run_seq:
-        chunks_seq = _parse_and_chunk(docx_path)
-        print("Running sequential translation...")
-        t0 = time.perf_counter()
-        translate_chunks_sequential(chunks_seq)
-        t_seq = time.perf_counter() - t0
-        print(f"  Sequential: {t_seq:.1f}s")
-
+        modes += [
+            (f"sequential{suffix}", translate_chunks_sequential, {}, batching)
+            for suffix, batching in batching_variants
+        ]
     if run_par:
-        chunks_par = _parse_and_chunk(docx_path)
-        print("Running parallel translation...")
+        modes += [
+            (
+                f"parallel{suffix}",
+                translate_chunks_parallel,
+                {"max_workers": TRANSLATION_MAX_WORKERS, "priority": args.priority},
+                batching,
+            )
+            for suffix, batching in batching_variants
+        ]
+
+    figure_cache = FigureCache(args.figure_cache) if args.figure_cache else None
+    timings = {}
+    collectors = {}
+    for mode, runner, kwargs, batching in modes:
+        chunks = _parse_and_chunk(docx_path, args.chunker)
+        print(f"Running {mode} translation...")
+        collectors[mode] = MetricsCollector(NullSink())
+        n_requests_before = mock_client.n_requests if mock_client else 0
+        segments = None
+        if args.segments:
+            segments = SegmentWriter(
+                tmx=f"{args.segments}_{mode}.tmx",
+                jsonl=f"{args.segments}_{mode}.jsonl",
+                parquet=f"{args.segments}_{mode}.parquet",
+                doc_name=os.path.basename(docx_path),
+                tool_version=resolve_app_version(),
+            )
+        first_chunk_at = []
+
+        def on_chunk(index, chunk):
+            # Chunks arrive in document order: the first call is what a user
+            # waits for before the preview starts filling in.
+            if not first_chunk_at:
+                first_chunk_at.append(time.perf_counter())
+            if segments is not None:
+                segments.add_chunk(index, chunk)
+
         t0 = time.perf_counter()
-        translate_chunks_parallel(
-            chunks_par,
-            max_workers=TRANSLATION_MAX_WORKERS,
+        runner(
+            chunks,
+            metrics_collector=collectors[mode],
+            figure_batching=batching,
+            figure_cache=figure_cache,
+            model_routing=args.model_routing,
+            chunk_callback=on_chunk,
+            **kwargs,
+        )
+        timings[mode] = time.perf_counter() - t0
+        if segments is not None:
+            segments.close()
+            print(
+                f"  {mode} segments: {segments.n_segments} → {args.segments}_{mode}.*"
+            )
+        line = f"  {mode}: {timings[mode]:.1f}s"
+        if first_chunk_at:
+            line += f", first chunk after {first_chunk_at[0] - t0:.2f}s"
+        if mock_client is not None:
+            line += f" ({mock_client.n_requests - n_requests_before} mock requests)"
+        print(line)
+
+    for mode, collector in collectors.items():
+        # Collectors are never start()ed — no sampler threads, no sink IO;
+        # track_chunk still fills in per-chunk stats.
+        stats = collector.chunk_stats()
+        usage = collector.usage_by_model()
+        prompt = sum(u[0] for u in usage.values())
+        cached = sum(u[1] for u in usage.values())
+        output = sum(u[2] for u in usage.values())
+        cost = estimate_cost_usd(usage, GEMINI_PRICE_TABLE_USD_PER_1M)
+        print(
+            f"  {mode} tokens: prompt {prompt} (cached {cached}), output {output}, "
+            f"est. cost {'n/a' if cost is None else f'${cost:.4f}'}"
         )
-        t_par = time.perf_counter() - t0
-        print(f"  Parallel:   {t_par:.1f}s")
+        if len(usage) > 1 or args.model_routing:
+            for model in sorted(usage):
+                n_chunks = sum(1 for s in stats if s.model_name == model)
+                latencies = [
+                    s.latency_s
+                    for s in stats
+                    if s.model_name == model and s.latency_s is not None
+                ]
+                avg = sum(latencies) / len(latencies) if latencies else 0.0
+                p, c, o = usage[model]
+                print(
+                    f"  {mode} {model}: {n_chunks} chunks, avg {avg:.1f}s, "
+                    f"prompt {p} (cached {c}), output {o}"
+                )
+            n_escalated = sum(s.n_escalations for s in stats)
+            print(f"  {mode} escalations: {n_escalated}")
+        if args.chunk_stats:
+            root, ext = os.path.splitext(args.chunk_stats)
+            path = f"{root}_{mode}{ext or '.csv'}"
+            with open(path, "w", newline="", encoding="utf-8") as f:
+                write_chunk_stats_csv(stats, f)
+            print(f"  {mode} chunk stats → {path}")
+        for name, st in summarize_spans(collector.spans()).items():
+            print(
+                f"  {mode} {name}: n={st['n']} total={st['total_s']:.1f}s "
+                f"p50={st['p50']:.2f}s p95={st['p95']:.2f}s p99={st['p99']:.2f}s"
+            )
+        if args.trace:
+            root, ext = os.path.splitext(args.trace)
+            path = f"{root}_{mode}{ext or '.json'}"
+            collector.write_trace(path)
+            print(f"  {mode} trace → {path}")
 
     print()
+    t_seq = timings.get("sequential")
+    t_par = timings.get("parallel")
     if t_seq is not None and t_par is not None:
         speedup = t_seq / t_par
         print(f"Summary: sequential {t_seq:.1f}s, parallel {t_par:.1f}s, speedup {speedup:.2f}x")
@@ -83,6 +290,13 @@ def main():
         print(f"Summary: sequential {t_seq:.1f}s")
     elif t_par is not None:
         print(f"Summary: parallel {t_par:.1f}s")
+    for mode in ("sequential", "parallel"):
+        t_batch = timings.get(f"{mode}_figbatch")
+        if t_batch is not None and mode in timings:
+            print(
+                f"Figure batching ({mode}): {timings[mode]:.1f}s -> {t_batch:.1f}s, "
+                f"speedup {timings[mode] / t_batch:.2f}x"
+            )
 
 
 if __name__ == "__main__":
@@ -0,0 +1,169 @@
+"""
+Offline stand-in for ``google.genai.Client`` used by the benchmark (--mock).
+
+Answers the three structured-output schemas the app requests (text
+paragraphs, one figure, a figure batch) with placeholder translations and
+sleeps a latency model of fixed round trip + per-image + per-character cost,
+so request-count changes (figure batching, splitting) show up in wall time
+without an API key or quota. ``generate_content_stream`` yields the same
+JSON in pieces spread over that latency (first piece after a
+time-to-first-token share), with usage on the last piece.
+
+Connections cost time too: :meth:`MockGeminiClient.connect` (what the
+client pool calls to build a client) sleeps ``setup_s``, and each such
+client pays ``handshake_s`` on its first request, so pre-warmed clients
+(``prewarm_clients``) show up in first-chunk latency.
+
+Usage (what the benchmark does):
+  from scripts.mock_gemini_backend import install_mock_backend
+  install_mock_backend(round_trip_s=0.8)
+"""
+
+import json
+import threading
+import time
+from types import SimpleNamespace
+
+from utils import translation
+from utils.client_pool import ClientPool
+from utils.translation import FigureTranslations, ImageTranslation
+
+# Gemini bills a small image (<=384px both sides) as 258 tokens; close enough
+# for relative comparisons.
+_TOKENS_PER_IMAGE = 258
+_ITEMS_PER_FIGURE = 3
+# Streamed responses: share of the latency before the first piece, and how
+# many pieces the JSON is cut into.
+_TTFT_SHARE = 0.3
+_STREAM_PIECES = 20
+# Latency multiplier by model-name substring (first match wins), so model
+# tiering shows up in wall time: lite answers faster, pro slower.
+_MODEL_SPEED = (("lite", 0.6), ("pro", 1.8))
+
+
+class _MockModels:
+    def __init__(self, client: "MockGeminiClient", handshake_s: float = 0.0) -> None:
+        self._client = client
+        self._handshake_s = handshake_s
+        self._connected = threading.Event()
+
+    def _connect(self) -> None:
+        if not self._connected.is_set():
+            time.sleep(self._handshake_s)
+            self._connected.set()
+
+    def get(self, model):
+        """Model metadata: the warm-up probe; no tokens, no request count."""
+        self._connect()
+        return SimpleNamespace(name=model)
+
+    def generate_content(self, model, contents, config):
+        self._connect()
+        parsed, usage, latency_s = self._client._answer(model, contents, config)
+        time.sleep(latency_s)
+        return SimpleNamespace(parsed=parsed, usage_metadata=usage)
+
+    def generate_content_stream(self, model, contents, config):
+        self._connect()
+        parsed, usage, latency_s = self._client._answer(model, contents, config)
+        text = json.dumps(
+            [p.model_dump() if hasattr(p, "model_dump") else p for p in parsed],
+            ensure_ascii=False,
+        )
+        n_pieces = max(1, min(_STREAM_PIECES, len(text)))
+        step = -(-len(text) // n_pieces)
+        time.sleep(latency_s * _TTFT_SHARE)
+        for start in range(0, len(text), step):
+            if start:
+                time.sleep(latency_s * (1 - _TTFT_SHARE) / n_pieces)
+            last = start + step >= len(text)
+            yield SimpleNamespace(
+                text=text[start : start + step],
+                usage_metadata=usage if last else None,
+            )
+
+
+class MockGeminiClient:
+    """Thread-safe fake exposing ``client.models.generate_content[_stream]``."""
+
+    def __init__(
+        self,
+        round_trip_s: float = 0.8,
+        per_image_s: float = 0.25,
+        per_kchar_s: float = 0.05,
+        setup_s: float = 0.05,
+        handshake_s: float = 0.3,
+    ) -> None:
+        self.round_trip_s = round_trip_s
+        self.per_image_s = per_image_s
+        self.per_kchar_s = per_kchar_s
+        self.setup_s = setup_s
+        self.handshake_s = handshake_s
+        self.models = _MockModels(self)
+        self._lock = threading.Lock()
+        self.n_requests = 0
+
+    def connect(self) -> SimpleNamespace:
+        """A per-thread "client": built in ``setup_s``, cold until first used."""
+        time.sleep(self.setup_s)
+        return SimpleNamespace(models=_MockModels(self, self.handshake_s))
+
+    def _answer(self, model, contents, config):
+        """(parsed, usage_metadata, latency seconds) for one request."""
+        texts = [c for c in contents if isinstance(c, str)]
+        images = [c for c in contents if not isinstance(c, str)]
+        n_chars = sum(len(t) for t in texts)
+        with self._lock:
+            self.n_requests += 1
+        latency_s = (
+            self.round_trip_s
+            + self.per_image_s * len(images)
+            + self.per_kchar_s * n_chars / 1000
+        )
+        latency_s *= next((k for name, k in _MODEL_SPEED if name in model), 1.0)
+
+        schema = config.get("response_schema")
+        if schema == list[str]:
+            paragraphs = json.loads(contents[1])
+            parsed = [f"[ja] {p}" if p else "" for p in paragraphs]
+            output_chars = sum(len(p) for p in parsed)
+        elif schema == list[FigureTranslations]:
+            parsed = [
+                FigureTranslations(figure_index=i, items=_figure_items(i))
+                for i in range(len(images))
+            ]
+            output_chars = 40 * _ITEMS_PER_FIGURE * len(images)
+        else:
+            parsed = _figure_items(0)
+            output_chars = 40 * _ITEMS_PER_FIGURE
+
+        usage = SimpleNamespace(
+            prompt_token_count=n_chars // 2 + _TOKENS_PER_IMAGE * len(images),
+            cached_content_token_count=0,
+            candidates_token_count=output_chars // 2,
+            thoughts_token_count=0,
+        )
+        return parsed, usage, latency_s
+
+
+def _figure_items(figure_index: int) -> list[ImageTranslation]:
+    return [
+        ImageTranslation(
+            original=f"라벨 {figure_index}-{k}",
+            translated=f"ラベル {figure_index}-{k}",
+            box_2d=[100 + 80 * k, 100, 150 + 80 * k, 400],
+        )
+        for k in range(_ITEMS_PER_FIGURE)
+    ]
+
+
+def install_mock_backend(**kwargs) -> MockGeminiClient:
+    """Route every ``utils.translation`` request to one shared mock client.
+
+    The client pool is replaced by one whose clients come from
+    :meth:`MockGeminiClient.connect`; request counts stay on the shared
+    client.
+    """
+    client = MockGeminiClient(**kwargs)
+    translation._client_pool = ClientPool(client.connect)
+    return client
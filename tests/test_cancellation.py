@@ -0,0 +1,179 @@
+import threading
+import time
+import unittest
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+from PIL import Image
+
+from tests.test_retry_and_quota import PER_MINUTE, make_429
+from utils import translation
+from utils.cancellation import CancellationToken, TranslationCancelled
+from utils.metrics import MetricsCollector, NullSink
+from utils.translation_runner import translate_chunks_parallel
+
+
+def _cancel_later(token: CancellationToken, delay_s: float) -> threading.Timer:
+    timer = threading.Timer(delay_s, token.cancel, args=("test",))
+    timer.start()
+    return timer
+
+
+class _SessionClosed(BaseException):
+    """Stands in for Streamlit's StopException / RerunException."""
+
+
+class TestCancellationToken(unittest.TestCase):
+    def test_sleep_wakes_on_cancel(self):
+        token = CancellationToken()
+        _cancel_later(token, 0.05)
+        t0 = time.monotonic()
+        with self.assertRaises(TranslationCancelled):
+            token.sleep(30)
+        self.assertLess(time.monotonic() - t0, 1.0)
+        self.assertEqual(token.reason, "test")
+
+    def test_first_reason_wins(self):
+        token = CancellationToken()
+        token.cancel("button")
+        token.cancel("rerun")
+        self.assertTrue(token.cancelled)
+        with self.assertRaisesRegex(TranslationCancelled, "button"):
+            token.raise_if_cancelled()
+
+
+class TestRetryCancellation(unittest.TestCase):
+    def test_backoff_sleep_interrupted(self):
+        token = CancellationToken()
+        func = MagicMock(side_effect=make_429(PER_MINUTE, retry_delay="60s"))
+        func.__name__ = "call_gemini_api"
+        _cancel_later(token, 0.05)
+        t0 = time.monotonic()
+        with self.assertRaises(TranslationCancelled):
+            translation.retry_with_delay(func, max_retries=5, cancel=token)
+        self.assertLess(time.monotonic() - t0, 1.0)
+        self.assertEqual(func.call_count, 1)
+
+    def test_cancelled_token_skips_request(self):
+        token = CancellationToken()
+        token.cancel()
+        func = MagicMock(return_value="ok")
+        func.__name__ = "call_gemini_api"
+        with self.assertRaises(TranslationCancelled):
+            translation.retry_with_delay(func, cancel=token)
+        func.assert_not_called()
+
+    def test_cancel_is_not_split(self):
+        token = CancellationToken()
+        token.cancel()
+        collector = MetricsCollector(NullSink())
+        with patch("utils.translation._get_client") as get_client:
+            with self.assertRaises(TranslationCancelled):
+                translation.translate_text_with_gemini(
+                    ["a", "b", "c", "d"], "m", metrics=collector, cancel=token
+                )
+        get_client.assert_not_called()
+        row = collector._snapshot_run_row("cancelled", None)
+        self.assertEqual(row.n_split_fallbacks, 0)
+
+    def test_stream_closed_on_cancel(self):
+        token = CancellationToken()
+
+        class _Stream:
+            closed = False
+
+            def __iter__(self):
+                yield SimpleNamespace(text='["a",', usage_metadata=None)
+                token.cancel()
+                yield SimpleNamespace(text='"b"]', usage_metadata=None)
+
+            def close(self):
+                self.closed = True
+
+        stream = _Stream()
+        client = MagicMock()
+        client.models.generate_content_stream.return_value = stream
+        with patch("utils.translation._get_client", return_value=client):
+            with self.assertRaises(TranslationCancelled):
+                translation.translate_text_with_gemini(
+                    ["가", "나"], "m", stream=True, cancel=token
+                )
+        self.assertTrue(stream.closed)
+        self.assertEqual(client.models.generate_content_stream.call_count, 1)
+
+    def test_figure_batch_does_not_fall_back_on_cancel(self):
+        token = CancellationToken()
+        token.cancel()
+        images = [Image.new("RGB", (32, 32)) for _ in range(3)]
+        with patch("utils.translation.translate_image_with_gemini") as single:
+            with self.assertRaises(TranslationCancelled):
+                translation.translate_images_batch_with_gemini(
+                    images, "m", cancel=token
+                )
+        single.assert_not_called()
+
+
+class TestRunnerCancellation(unittest.TestCase):
+    def _blocking_translate(self, started: threading.Event):
+        """Fake text call stuck in a 429 backoff until the run is cancelled."""
+
+        def fake(paragraphs, *args, cancel=None, **kwargs):
+            started.set()
+            cancel.sleep(60)
+            return [f"ja-{p}" for p in paragraphs]
+
+        return fake
+
+    def test_cancel_token_abandons_run_promptly(self):
+        chunks = [{"type": "TEXT", "content": [f"p{i}"]} for i in range(20)]
+        started = threading.Event()
+        token = CancellationToken()
+        with patch(
+            "utils.translation_runner.translate_text_with_gemini",
+            side_effect=self._blocking_translate(started),
+        ):
+            _cancel_later(token, 0.2)
+            t0 = time.monotonic()
+            with self.assertRaises(TranslationCancelled):
+                translate_chunks_parallel(chunks, max_workers=4, cancel_token=token)
+            elapsed = time.monotonic() - t0
+        self.assertTrue(started.is_set())
+        self.assertLess(elapsed, 1.5)
+
+    def test_streamlit_stop_cancels_workers_without_waiting(self):
+        chunks = [{"type": "TEXT", "content": [f"p{i}"]} for i in range(20)]
+        started = threading.Event()
+        token = CancellationToken()
+        calls = []
+
+        def status_cb(snapshot):
+            if started.is_set():
+                raise _SessionClosed()
+
+        def fake(paragraphs, *args, cancel=None, **kwargs):
+            calls.append(paragraphs)
+            return self._blocking_translate(started)(paragraphs, cancel=cancel)
+
+        with patch(
+            "utils.translation_runner.translate_text_with_gemini", side_effect=fake
+        ), patch("utils.translation_runner.PROGRESS_UI_MIN_INTERVAL_S", 0):
+            t0 = time.monotonic()
+            with self.assertRaises(_SessionClosed):
+                translate_chunks_parallel(
+                    chunks,
+                    max_workers=2,
+                    status_callback=status_cb,
+                    cancel_token=token,
+                )
+            elapsed = time.monotonic() - t0
+
+        self.assertLess(elapsed, 1.5)
+        self.assertTrue(token.cancelled)
+        self.assertEqual(token.reason, "_SessionClosed")
+        # Queued tasks were dropped, not run.
+        time.sleep(0.2)
+        self.assertLessEqual(len(calls), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,90 @@
+import unittest
+
+from utils.chunker import (
+    estimate_tokens,
+    group_paragraphs_to_chunks,
+    section_heading,
+)
+
+
+def _text(content):
+    return {"type": "TEXT", "content": content}
+
+
+def _flatten(chunks):
+    out = []
+    for chunk in chunks:
+        if chunk["type"] == "TEXT":
+            out.extend(_text(p) for p in chunk["content"])
+        else:
+            out.append(chunk)
+    return out
+
+
+def _document():
+    elements = [_text("【발명의 명칭】"), _text("장치"), _text("【기술분야】")]
+    elements += [_text("가" * 300) for _ in range(4)]
+    elements.append(_text("【발명을 실시하기 위한 구체적인 내용】"))
+    elements += [_text(f"{i} " + "나" * 600) for i in range(20)]
+    elements.append({"type": "FIGURE", "content": "fig-1"})
+    elements.append(_text("【청구범위】"))
+    for i in range(6):
+        elements += [_text(f"【청구항 {i + 1}】"), _text("다" * 400)]
+    return elements
+
+
+class TestSectionChunker(unittest.TestCase):
+    def test_section_heading_matcher(self):
+        self.assertEqual(section_heading("【청구항 12】"), "청구항")
+        self.assertEqual(section_heading("【발명의 효과】"), "발명의 효과")
+        self.assertIsNone(section_heading("【0001】"))
+        self.assertIsNone(section_heading("상기 【0001】 참조"))
+
+    def test_flattened_chunks_preserve_input_order(self):
+        elements = _document()
+        for mode in ("words", "sections"):
+            chunks = group_paragraphs_to_chunks(elements, mode=mode)
+            self.assertEqual(_flatten(chunks), elements, mode)
+
+    def test_small_sections_stay_whole_and_headings_lead(self):
+        chunks = group_paragraphs_to_chunks(
+            _document(), mode="sections", max_tokens=1500
+        )
+        for chunk in chunks:
+            if chunk["type"] != "TEXT":
+                continue
+            # Never ends on a heading whose body went to the next chunk.
+            self.assertIsNone(section_heading(chunk["content"][-1]))
+            tokens = sum(estimate_tokens(p) for p in chunk["content"])
+            self.assertLessEqual(tokens, 1500)
+        # Each claim (heading + body) stays together.
+        claims = chunks[-1]["content"]
+        self.assertEqual(claims[0], "【청구범위】")
+        headings = [section_heading(p) for p in claims[1::2]]
+        self.assertEqual(headings, ["청구항"] * 6)
+
+    def test_oversized_section_split_evenly(self):
+        chunks = group_paragraphs_to_chunks(
+            _document(), mode="sections", max_tokens=1500
+        )
+        figure_at = next(i for i, c in enumerate(chunks) if c["type"] == "FIGURE")
+        # chunks[0] holds the short leading sections; the rest before the
+        # figure are the 20-paragraph description cut into even parts.
+        sizes = [
+            sum(estimate_tokens(p) for p in c["content"])
+            for c in chunks[1:figure_at]
+        ]
+        self.assertGreaterEqual(len(sizes), 5)
+        self.assertLessEqual(max(sizes) - min(sizes), 300)
+
+    def test_paragraph_cap(self):
+        elements = [_text("【배경기술】")] + [_text("짧다") for _ in range(25)]
+        chunks = group_paragraphs_to_chunks(
+            elements, mode="sections", max_paragraphs=10
+        )
+        self.assertTrue(all(len(c["content"]) <= 10 for c in chunks))
+        self.assertEqual(_flatten(chunks), elements)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+import threading
+import unittest
+from itertools import count
+from unittest.mock import patch
+
+from utils import translation
+from utils.client_pool import ClientPool
+
+
+class TestClientPool(unittest.TestCase):
+    def test_acquire_hands_out_the_last_released_first(self):
+        pool = ClientPool(count().__next__)
+        a, b = pool.acquire(), pool.acquire()
+        self.assertEqual((a, b, pool.n_created), (0, 1, 2))
+        pool.release(a)
+        pool.release(b)
+        self.assertEqual(pool.acquire(), b)
+        self.assertEqual(pool.n_idle, 1)
+
+    def test_prewarm_builds_up_to_n_and_probes_them_concurrently(self):
+        pool = ClientPool(count().__next__)
+        pool.acquire()
+        barrier = threading.Barrier(3, timeout=5)
+        probed = []
+
+        def probe(client):
+            # Would time out if the probes ran one after another.
+            barrier.wait()
+            probed.append(client)
+
+        self.assertEqual(pool.prewarm(4, probe), 3)
+        self.assertEqual(sorted(probed), [1, 2, 3])
+        self.assertEqual((pool.n_created, pool.n_idle), (4, 3))
+        # Clients in use count towards n: a rerun builds nothing.
+        self.assertEqual(pool.prewarm(4, probe), 0)
+        self.assertIsNone(pool.start_prewarm(4, probe))
+
+    def test_failed_probe_keeps_the_client_and_failed_build_stops(self):
+        def probe(client):
+            raise ConnectionError("offline")
+
+        pool = ClientPool(count().__next__)
+        with self.assertLogs("utils.client_pool", "INFO"):
+            self.assertEqual(pool.prewarm(2, probe), 2)
+        self.assertEqual(pool.n_idle, 2)
+
+        keys = []
+
+        def factory():
+            if not keys:
+                raise RuntimeError("GEMINI_API_KEY not found")
+            return keys[0]
+
+        pool = ClientPool(factory)
+        with self.assertLogs("utils.client_pool", "DEBUG"):
+            thread = pool.start_prewarm(2)
+            thread.join(5)
+        self.assertEqual((pool.n_created, pool.n_idle), (0, 0))
+        # Reruns do not try again (one thread each) until a build works.
+        self.assertIsNone(pool.start_prewarm(2))
+        keys.append("client")
+        self.assertEqual(pool.acquire(), "client")
+        self.assertEqual(pool.prewarm(2), 1)
+
+    def test_each_thread_keeps_the_client_it_took_from_the_pool(self):
+        pool = ClientPool(count().__next__)
+        pool.prewarm(2)
+        seen = []
+
+        def worker():
+            seen.append((translation._get_client(), translation._get_client()))
+
+        with patch.object(translation, "_client_pool", pool):
+            for _ in range(2):
+                thread = threading.Thread(target=worker)
+                thread.start()
+                thread.join()
+        self.assertEqual(seen, [(1, 1), (0, 0)])
+        self.assertEqual(pool.n_created, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,54 @@
+import unittest
+
+from lxml import etree
+
+from utils.docx_parser import (
+    add_justified_paragraphs,
+    add_paragraph_with_justify,
+    create_japanese_patent_docx,
+)
+
+TEXTS = [
+    " 【発明の名称】",
+    "  【0001】",
+    "",
+    " 本発明は<装置> & \"方法\"に関する。",
+    "　全角スペースで始まる",
+    "末尾の空白 ",
+    "タブ\t区切り\r\n改行\n",
+    "\t",
+    "S100: 制御部",
+]
+
+
+def _body_xml(doc) -> bytes:
+    return etree.tostring(doc.element.body)
+
+
+class TestBulkDocxBuilder(unittest.TestCase):
+    def test_matches_python_docx_byte_for_byte(self):
+        slow = create_japanese_patent_docx()
+        for text in TEXTS:
+            add_paragraph_with_justify(slow, text)
+        fast = create_japanese_patent_docx()
+        fast.add_paragraphs_with_justify(TEXTS)
+        self.assertEqual(_body_xml(fast), _body_xml(slow))
+        texts = [p.text for p in fast.paragraphs]
+        self.assertEqual(texts, [p.text for p in slow.paragraphs])
+
+    def test_appends_after_existing_content_before_section_properties(self):
+        doc = create_japanese_patent_docx()
+        doc.add_paragraph_with_justify("先頭")
+        add_justified_paragraphs(doc, ["二", "三"])
+        add_justified_paragraphs(doc, [])
+        self.assertEqual([p.text for p in doc.paragraphs], ["先頭", "二", "三"])
+        self.assertEqual(doc.element.body[-1].tag, doc.element.body.sectPr.tag)
+
+    def test_invalid_xml_text_fails_like_python_docx(self):
+        doc = create_japanese_patent_docx()
+        with self.assertRaises(ValueError):
+            add_justified_paragraphs(doc, ["ok", "bad\x01char"])
+
+
+if __name__ == "__main__":
+    unittest.main()
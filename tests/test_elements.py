@@ -0,0 +1,101 @@
+import sys
+import unittest
+from io import BytesIO
+from unittest.mock import patch
+
+from docx import Document
+from PIL import Image
+
+from utils.chunker import group_paragraphs_to_chunks
+from utils.docx_parser import parse_docx_with_images
+from utils.elements import Chunk, Element
+from utils.translation_runner import translate_chunks_parallel
+
+
+def _docx(paragraphs_before, paragraphs_after):
+    image = BytesIO()
+    Image.new("RGB", (40, 30), "white").save(image, format="PNG")
+    doc = Document()
+    for text in paragraphs_before:
+        doc.add_paragraph(text)
+    doc.add_paragraph().add_run().add_picture(BytesIO(image.getvalue()))
+    for text in paragraphs_after:
+        doc.add_paragraph(text)
+    out = BytesIO()
+    doc.save(out)
+    out.seek(0)
+    return out
+
+
+class TestElements(unittest.TestCase):
+    def setUp(self):
+        self.before = ["【기술분야】", "반복 문단", "본 발명은 장치에 관한 것이다."]
+        self.after = ["【청구범위】", "반복 문단", "【청구항 1】", "장치."]
+        self.elements = parse_docx_with_images(_docx(self.before, self.after))
+
+    def test_parser_shares_one_table_and_keeps_figure_bytes(self):
+        self.assertTrue(all(isinstance(e, Element) for e in self.elements))
+        texts = [e for e in self.elements if e["type"] == "TEXT"]
+        self.assertEqual([e["content"] for e in texts], self.before + self.after)
+        self.assertEqual(len({id(e.table) for e in texts}), 1)
+        # Identical paragraphs are one string object in the table.
+        self.assertIs(texts[1]["content"], texts[4]["content"])
+
+        (figure,) = [e for e in self.elements if e["type"] == "FIGURE"]
+        self.assertIsInstance(figure.blob, bytes)
+        self.assertEqual(figure["content"].size, (40, 30))
+        self.assertFalse(hasattr(figure, "__dict__"))
+
+    def test_chunks_are_row_ranges_in_both_modes(self):
+        for mode in ("words", "sections"):
+            chunks = group_paragraphs_to_chunks(self.elements, mode=mode)
+            self.assertTrue(all(isinstance(c, Chunk) for c in chunks), mode)
+            self.assertEqual([c["type"] for c in chunks], ["TEXT", "FIGURE", "TEXT"])
+            self.assertEqual(chunks[0]["content"], self.before)
+            self.assertEqual(chunks[2]["content"], self.after)
+            self.assertEqual((chunks[2].start, chunks[2].stop), (3, 7))
+            self.assertIs(chunks[0].table, chunks[2].table)
+
+    def test_translated_behaves_like_an_optional_dict_key(self):
+        chunk = group_paragraphs_to_chunks(self.elements)[0]
+        self.assertNotIn("translated", chunk)
+        self.assertEqual(chunk.get("translated", []), [])
+        with self.assertRaises(KeyError):
+            chunk["translated"]
+        with self.assertRaises(KeyError):
+            chunk["content"] = []
+
+        copy = chunk.copy()
+        copy["translated"] = ["ja"]
+        self.assertEqual(copy["translated"], ["ja"])
+        self.assertNotIn("translated", chunk)
+        self.assertIs(copy.table, chunk.table)
+
+    def test_runner_fills_copies_of_chunks(self):
+        chunks = group_paragraphs_to_chunks(self.elements)
+
+        def fake_text(paragraphs, model_name, **kw):
+            return [f"ja-{p}" for p in paragraphs]
+
+        with patch(
+            "utils.translation_runner.translate_text_with_gemini", side_effect=fake_text
+        ), patch(
+            "utils.translation_runner.translate_image_with_gemini",
+            side_effect=lambda image, model_name, **kw: [],
+        ):
+            translated = translate_chunks_parallel(chunks, max_workers=2)
+
+        self.assertEqual(translated[2]["translated"][0], "ja-【청구범위】")
+        self.assertEqual(translated[1]["translated"], [])
+        self.assertTrue(all("translated" not in c for c in chunks))
+
+    def test_chunk_is_smaller_than_the_dict_it_replaces(self):
+        chunk = group_paragraphs_to_chunks(self.elements)[2]
+        as_dict = {"type": "TEXT", "content": chunk["content"]}
+        chunk_size = sys.getsizeof(chunk)
+        dict_size = sys.getsizeof(as_dict) + sys.getsizeof(as_dict["content"])
+        self.assertLess(chunk_size, dict_size)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,191 @@
+import io
+import os
+import tempfile
+import unittest
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+from PIL import Image, ImageDraw
+
+from utils import translation
+from utils.figure_cache import FigureCache, perceptual_hash
+from utils.metrics import MetricsCollector, NullSink
+
+
+def _flowchart(boxes, size=(400, 300)):
+    image = Image.new("RGB", size, "white")
+    draw = ImageDraw.Draw(image)
+    for x0, y0, x1, y1 in boxes:
+        draw.rectangle((x0, y0, x1, y1), outline="black", width=3)
+        draw.line((x1, (y0 + y1) // 2, x1 + 30, (y0 + y1) // 2), fill="black", width=2)
+    return image
+
+
+_BOXES_A = [(20, 20, 140, 80), (200, 20, 320, 80), (110, 170, 230, 250)]
+_BOXES_B = [(40, 120, 120, 280), (220, 150, 380, 200)]
+
+
+def _rescan(image):
+    """JPEG round-trip at a slightly different resolution, like a re-scan."""
+    buf = io.BytesIO()
+    image.resize((412, 309)).save(buf, "JPEG", quality=70)
+    buf.seek(0)
+    return Image.open(buf).convert("RGB")
+
+
+class TestFigureCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "figures.sqlite3")
+        self.cache = FigureCache(self.path)
+        self.items = [{"original": "시작", "translated": "開始"}]
+
+    def tearDown(self):
+        self.cache.close()
+        self.tmp.cleanup()
+
+    def test_near_identical_rescan_hits(self):
+        original = _flowchart(_BOXES_A)
+        self.cache.put(original, "m:v1", self.items)
+
+        distance = (
+            perceptual_hash(original) ^ perceptual_hash(_rescan(original))
+        ).bit_count()
+        self.assertLessEqual(distance, self.cache.max_distance)
+        self.assertEqual(self.cache.get(_rescan(original), "m:v1"), self.items)
+
+    def test_different_drawing_misses(self):
+        self.cache.put(_flowchart(_BOXES_A), "m:v1", self.items)
+        self.assertIsNone(self.cache.get(_flowchart(_BOXES_B), "m:v1"))
+
+    def test_namespace_and_aspect_separate_entries(self):
+        image = _flowchart(_BOXES_A)
+        self.cache.put(image, "m:v1", self.items)
+        self.assertIsNone(self.cache.get(image, "m:v2"))
+        self.assertIsNone(self.cache.get(image.resize((400, 150)), "m:v1"))
+
+    def test_zero_threshold_requires_exact_hash(self):
+        strict = FigureCache(self.path, max_distance=0)
+        try:
+            original = _flowchart(_BOXES_A)
+            strict.put(original, "m:v1", self.items)
+            self.assertEqual(strict.get(original.copy(), "m:v1"), self.items)
+            if perceptual_hash(original) != perceptual_hash(_rescan(original)):
+                self.assertIsNone(strict.get(_rescan(original), "m:v1"))
+        finally:
+            strict.close()
+
+    def test_persists_across_instances(self):
+        image = _flowchart(_BOXES_A)
+        self.cache.put(image, "m:v1", self.items)
+        self.cache.close()
+        self.cache = FigureCache(self.path)
+        self.assertEqual(len(self.cache), 1)
+        self.assertEqual(self.cache.get(image, "m:v1"), self.items)
+
+    def test_evicts_least_recently_used_past_byte_budget(self):
+        small = FigureCache(self.path, max_bytes=400, max_distance=0)
+        try:
+            images = [
+                _flowchart([(10 + 25 * i, 10, 60 + 25 * i, 60 + 20 * i)])
+                for i in range(6)
+            ]
+            payload = [{"original": "x" * 40, "translated": "y" * 40}]
+            for i, image in enumerate(images):
+                small.put(image, "m:v1", payload)
+                if i >= 1:
+                    small.get(images[0], "m:v1")  # keep the first one hot
+            self.assertLessEqual(small.total_bytes, 400)
+            self.assertLess(len(small), 6)
+            self.assertIsNotNone(small.get(images[0], "m:v1"))
+            self.assertIsNone(small.get(images[1], "m:v1"))
+        finally:
+            small.close()
+
+
+class TestTranslateImageWithCache(unittest.TestCase):
+    def test_second_lookup_skips_api_and_counts_hit(self):
+        image = _flowchart(_BOXES_A)
+        response = SimpleNamespace(
+            parsed=[translation.ImageTranslation(original="a", translated="ja-a")],
+            usage_metadata=None,
+        )
+        client = MagicMock()
+        client.models.generate_content.return_value = response
+        collector = MetricsCollector(NullSink())
+
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = FigureCache(os.path.join(tmp, "figures.sqlite3"))
+            with patch("utils.translation._get_client", return_value=client):
+                first = translation.translate_image_with_gemini(
+                    image, "m", metrics=collector, cache=cache
+                )
+                second = translation.translate_image_with_gemini(
+                    _rescan(image), "m", metrics=collector, cache=cache
+                )
+                other_model = translation.translate_image_with_gemini(
+                    image, "other", metrics=collector, cache=cache
+                )
+            cache.close()
+
+        self.assertEqual(first, second)
+        self.assertEqual(other_model, first)
+        self.assertEqual(client.models.generate_content.call_count, 2)
+        row = collector._snapshot_run_row("ok", None)
+        self.assertEqual(row.n_figure_cache_hits, 1)
+        self.assertEqual(row.n_image_api_calls, 2)
+
+    def test_a_miss_hashes_the_figure_once(self):
+        image = _flowchart(_BOXES_A)
+        response = SimpleNamespace(
+            parsed=[translation.ImageTranslation(original="a", translated="ja-a")],
+            usage_metadata=None,
+        )
+        client = MagicMock()
+        client.models.generate_content.return_value = response
+
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = FigureCache(os.path.join(tmp, "figures.sqlite3"))
+            with patch("utils.translation._get_client", return_value=client), patch(
+                "utils.figure_cache.perceptual_hash", wraps=perceptual_hash
+            ) as hashed:
+                translation.translate_image_with_gemini(image, "m", cache=cache)
+                translation.translate_images_batch_with_gemini(
+                    [image], "other", cache=cache
+                )
+            self.assertEqual(len(cache), 2)
+            cache.close()
+        self.assertEqual(hashed.call_count, 2)
+
+    def test_boxes_are_requested_and_cached_only_when_asked_for(self):
+        image = _flowchart(_BOXES_A)
+        response = SimpleNamespace(
+            parsed=[translation.ImageTranslation(original="a", translated="ja-a")],
+            usage_metadata=None,
+        )
+        client = MagicMock()
+        client.models.generate_content.return_value = response
+
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = FigureCache(os.path.join(tmp, "figures.sqlite3"))
+            with patch("utils.translation._get_client", return_value=client):
+                translation.translate_image_with_gemini(image, "m", cache=cache)
+                translation.translate_image_with_gemini(
+                    image, "m", cache=cache, boxes=True
+                )
+                translation.translate_image_with_gemini(
+                    image, "m", cache=cache, boxes=True
+                )
+            cache.close()
+
+        prompts = [
+            c.kwargs["contents"][0]
+            for c in client.models.generate_content.call_args_list
+        ]
+        self.assertEqual(len(prompts), 2)
+        self.assertNotIn("box_2d", prompts[0])
+        self.assertIn("box_2d", prompts[1])
+
+
+if __name__ == "__main__":
+    unittest.main()
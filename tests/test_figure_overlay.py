@@ -0,0 +1,92 @@
+import unittest
+from io import BytesIO
+
+from PIL import Image, ImageDraw
+
+from utils.config import FIGURE_OUTPUT_LEGEND, FIGURE_OUTPUT_OVERLAY
+from utils.docx_parser import create_japanese_patent_docx
+from utils.elements import Chunk
+from utils.figure_overlay import FigureRenderer, render_figure
+from utils.translation import ImageTranslation
+
+
+def _drawing(size=(800, 600)) -> bytes:
+    image = Image.new("RGB", size, "white")
+    ImageDraw.Draw(image).rectangle((100, 100, 300, 140), fill="black")
+    buf = BytesIO()
+    image.save(buf, format="PNG")
+    return buf.getvalue()
+
+
+def _open(png: bytes) -> Image.Image:
+    return Image.open(BytesIO(png)).convert("RGB")
+
+
+# box_2d of the black "label" above: x 100-300, y 100-140 of 800x600.
+LABEL = ("제어부", "制御部", [166, 125, 234, 375])
+
+
+class TestRenderFigure(unittest.TestCase):
+    def test_overlay_replaces_the_label_region(self):
+        out = _open(render_figure(_drawing(), [LABEL], FIGURE_OUTPUT_OVERLAY))
+        self.assertEqual(out.size, (800, 600))
+        # The black label is blanked: its corners are white now.
+        self.assertEqual(out.getpixel((102, 102)), (255, 255, 255))
+        self.assertEqual(out.getpixel((500, 300)), (255, 255, 255))
+
+    def test_legend_keeps_the_drawing_and_adds_a_panel(self):
+        out = _open(render_figure(_drawing(), [LABEL], FIGURE_OUTPUT_LEGEND))
+        self.assertEqual(out.width, 800)
+        self.assertGreater(out.height, 600)
+        self.assertEqual(out.getpixel((200, 120)), (0, 0, 0))
+
+    def test_boxless_labels_go_to_the_legend_and_numerals_are_skipped(self):
+        unchanged = [("100", "100", []), ("S110", "S110", [0, 0, 10, 10])]
+        out = _open(render_figure(_drawing(), unchanged, FIGURE_OUTPUT_OVERLAY))
+        self.assertEqual(out.size, (800, 600))
+        for box in ([], [500, 500, 400, 600], [1, 2, 3]):
+            labels = [("모터", "モーター", box)]
+            out = _open(render_figure(_drawing(), labels, FIGURE_OUTPUT_OVERLAY))
+            self.assertGreater(out.height, 600)
+
+    def test_large_figures_are_scaled_down(self):
+        out = _open(render_figure(_drawing((3000, 2000)), [LABEL], max_pixels=600_000))
+        self.assertLessEqual(out.width * out.height, 600_000)
+        self.assertAlmostEqual(out.width / out.height, 1.5, places=2)
+
+
+class TestFigureRenderer(unittest.TestCase):
+    def test_pool_yields_in_order_and_none_for_a_broken_figure(self):
+        renderer = FigureRenderer(max_workers=1, max_in_flight=2)
+        self.addCleanup(renderer.shutdown)
+        items = [ImageTranslation(original="제어부", translated="制御部", box_2d=LABEL[2])]
+        good = Chunk.figure(_drawing())
+        good["translated"] = items
+        broken = Chunk.figure(b"not an image")
+        broken["translated"] = items
+        as_dict = {"type": "FIGURE", "content": _open(_drawing()), "translated": []}
+        chunks = [{"type": "TEXT", "content": ["본문"]}, good, broken, as_dict]
+
+        results = list(renderer.render(chunks, FIGURE_OUTPUT_LEGEND))
+        self.assertEqual(len(results), 3)
+        self.assertGreater(_open(results[0]).height, 600)
+        self.assertIsNone(results[1])
+        self.assertEqual(_open(results[2]).size, (800, 600))
+
+
+class TestAddFigure(unittest.TestCase):
+    def test_picture_is_capped_at_the_text_width(self):
+        doc = create_japanese_patent_docx()
+        doc.add_paragraphs_with_justify(["前"])
+        doc.add_figure(_drawing((4000, 1000)))
+        doc.add_paragraphs_with_justify(["後"])
+        self.assertEqual([p.text for p in doc.paragraphs], ["前", "", "後"])
+        (shape,) = doc.inline_shapes
+        section = doc.sections[-1]
+        text_width = section.page_width - section.left_margin - section.right_margin
+        self.assertEqual(shape.width, text_width)
+        self.assertAlmostEqual(shape.width / shape.height, 4.0, places=2)
+
+
+if __name__ == "__main__":
+    unittest.main()
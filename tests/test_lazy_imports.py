@@ -0,0 +1,62 @@
+import subprocess
+import sys
+import unittest
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+class TestLazyImports(unittest.TestCase):
+    def test_pipeline_modules_do_not_load_heavy_dependencies(self):
+        # A fresh interpreter: this process has imported everything already.
+        code = (
+            "import sys\n"
+            "import utils, utils.translation, utils.translation_runner\n"
+            "import utils.metrics, utils.revision, utils.segments\n"
+            "from utils import DEFAULT_GEMINI_MODEL_NAME\n"
+            "print(' '.join(m for m in ('pandas', 'numpy', 'google.genai',"
+            " 'httpx', 'pyarrow', 'docx') if m in sys.modules))\n"
+        )
+        result = subprocess.run(
+            [sys.executable, "-c", code],
+            cwd=ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        self.assertEqual(result.stdout.strip(), "")
+
+    def test_app_wake_up_does_not_load_heavy_dependencies(self):
+        # Runs the whole script, not just its imports: module-level side
+        # effects (a background thread building API clients) count too.
+        code = (
+            "import sys, threading\n"
+            "from streamlit.testing.v1 import AppTest\n"
+            "at = AppTest.from_file('app.py', default_timeout=30).run()\n"
+            "assert not at.exception, at.exception\n"
+            "for t in threading.enumerate():\n"
+            "    if t.name.startswith('client-'):\n"
+            "        t.join(10)\n"
+            "print(' '.join(m for m in ('pandas', 'numpy', 'google.genai',"
+            " 'httpx', 'pyarrow') if m in sys.modules))\n"
+        )
+        result = subprocess.run(
+            [sys.executable, "-c", code],
+            cwd=ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        self.assertEqual(result.stdout.strip(), "")
+
+    def test_package_exports_resolve_on_access(self):
+        import utils
+
+        self.assertTrue(callable(utils.translate_chunks_parallel))
+        self.assertIn("parse_docx_with_images", dir(utils))
+        with self.assertRaises(AttributeError):
+            utils.no_such_name
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -211,7 +211,74 @@ class TestSinkFailureIsolation(unittest.TestCase):
         )
 
 
+class TestSharedSampler(unittest.TestCase):
+    def test_concurrent_runs_share_one_sampler_and_flush(self):
+        sink = FakeSink()
+        collectors = [
+            M.MetricsCollector(
+                sink,
+                sample_interval_s=0.03,
+                flush_interval_s=0.1,
+                flush_batch_size=1000,
+            )
+            for _ in range(5)
+        ]
+        for c in collectors:
+            c.start()
+        time.sleep(0.25)
+
+        samplers = [t for t in threading.enumerate() if t.name == "metrics-sampler"]
+        flushers = [t for t in threading.enumerate() if t.name == "metrics-flusher"]
+        self.assertEqual(len(samplers), 1)
+        self.assertEqual(len(flushers), 1)
+
+        for c in collectors:
+            c.stop_and_finalize(M.STATUS_OK)
+
+        rows = [r for batch in sink.samples_batches for r in batch]
+        self.assertEqual({r.run_id for r in rows}, {c.run_id for c in collectors})
+        self.assertTrue(any(r.n_active_runs == 5 for r in rows))
+        # Periodic flushes carry every run's rows in a single sink call.
+        self.assertTrue(
+            any(len({r.run_id for r in b}) == 5 for b in sink.samples_batches)
+        )
+
+        time.sleep(0.2)  # idle service threads exit once nobody is registered
+        self.assertEqual(M._SAMPLER_SERVICE.active_count(), 0)
+        self.assertFalse(
+            any(t.name == "metrics-sampler" for t in threading.enumerate())
+        )
+
+
 class TestPhaseDurations(unittest.TestCase):
+    def test_samples_carry_the_scheduler_memory_budget(self):
+        from utils.scheduler import TaskScheduler
+
+        mb = 1024 * 1024
+        gate = threading.Event()
+        scheduler = TaskScheduler(max_workers=2, memory_budget_mb=10)
+        self.addCleanup(scheduler.shutdown)
+        self.addCleanup(gate.set)
+        queue = scheduler.open_queue("doc")
+        queue.submit(gate.wait, 5, cost=3 * mb)
+        queue.submit(gate.wait, 5, cost=8 * mb)
+
+        sink = FakeSink()
+        c = M.MetricsCollector(sink, sample_interval_s=0.03, flush_interval_s=0.1)
+        self.addCleanup(
+            M.set_memory_stats_provider, M._SAMPLER_SERVICE.memory_stats
+        )
+        M.set_memory_stats_provider(scheduler.memory_stats)
+        c.start()
+        time.sleep(0.15)
+        c.stop_and_finalize(M.STATUS_OK)
+
+        rows = [r for batch in sink.samples_batches for r in batch]
+        self.assertTrue(rows)
+        self.assertTrue(
+            all((r.mem_reserved_mb, r.n_mem_waiting) == (3.0, 1) for r in rows)
+        )
+
     def test_phase_durations_sum_close_to_total(self):
         sink = FakeSink()
         c = M.MetricsCollector(sink)
@@ -282,6 +349,144 @@ class TestBoundedBuffer(unittest.TestCase):
         self.assertEqual(c._counters["n_dropped_samples"], 2)
 
 
+class TestUsageAndCost(unittest.TestCase):
+    def test_usage_rolls_up_per_type_and_prices_run(self):
+        sink = FakeSink()
+        table = {"m": {"input": 1.0, "cached_input": 0.5, "output": 4.0}}
+        c = M.MetricsCollector(sink, price_table=table)
+        c.start()
+        c.record_usage(M.CHUNK_TEXT, "m", prompt_tokens=1000, cached_tokens=200, output_tokens=500)
+        c.record_usage(M.CHUNK_TEXT, "m", prompt_tokens=1000, output_tokens=500)
+        c.record_usage(M.CHUNK_FIGURE, "m", prompt_tokens=300, output_tokens=50)
+        c.stop_and_finalize(M.STATUS_OK)
+
+        _, final = sink.runs_updated[0]
+        self.assertEqual(final.n_prompt_tokens, 2300)
+        self.assertEqual(final.n_cached_tokens, 200)
+        self.assertEqual(final.n_output_tokens, 1050)
+        self.assertEqual(final.n_text_prompt_tokens, 2000)
+        self.assertEqual(final.n_text_output_tokens, 1000)
+        self.assertEqual(final.n_image_prompt_tokens, 300)
+        self.assertEqual(final.n_image_output_tokens, 50)
+        # (2100 uncached * 1.0 + 200 cached * 0.5 + 1050 out * 4.0) / 1e6
+        self.assertAlmostEqual(final.estimated_cost_usd, 0.0064)
+
+    def test_unknown_model_leaves_cost_empty(self):
+        self.assertIsNone(M.estimate_cost_usd({"mystery": (10, 0, 10)}, {}))
+        # A model that consumed nothing doesn't poison the estimate.
+        self.assertEqual(M.estimate_cost_usd({"mystery": (0, 0, 0)}, {}), 0.0)
+
+    def test_track_chunk_attributes_calls_and_tokens(self):
+        c = M.MetricsCollector(M.NullSink())
+        with c.track_chunk(3, M.CHUNK_TEXT, n_items=7):
+            c.incr("n_text_api_calls")
+            c.incr("n_text_api_calls")
+            c.record_usage(M.CHUNK_TEXT, "m", prompt_tokens=10, output_tokens=20)
+        with self.assertRaises(ValueError):
+            with c.track_chunk(1, M.CHUNK_FIGURE, n_items=1):
+                raise ValueError("boom")
+        # Outside any chunk: run totals only.
+        c.record_usage(M.CHUNK_TEXT, "m", prompt_tokens=99)
+
+        stats = c.chunk_stats()
+        self.assertEqual([s.chunk_index for s in stats], [1, 3])
+        failed, ok = stats
+        self.assertEqual(failed.status, M.STATUS_ERROR)
+        self.assertEqual(ok.status, M.STATUS_OK)
+        self.assertEqual(ok.n_items, 7)
+        self.assertEqual(ok.n_api_calls, 2)
+        self.assertEqual((ok.prompt_tokens, ok.output_tokens), (10, 20))
+        self.assertIsNotNone(ok.latency_s)
+
+    def test_chunk_stats_exported_to_sink_and_csv(self):
+        import io
+
+        class ChunkSink(FakeSink):
+            def __init__(self):
+                super().__init__()
+                self.chunk_batches = []
+
+            def append_chunk_stats(self, rows):
+                self.chunk_batches.append(list(rows))
+
+        sink = ChunkSink()
+        c = M.MetricsCollector(sink)
+        c.start()
+        with c.track_chunk(0, M.CHUNK_TEXT, n_items=2):
+            c.record_usage(M.CHUNK_TEXT, "m", prompt_tokens=5)
+        c.stop_and_finalize(M.STATUS_OK)
+        self.assertEqual(len(sink.chunk_batches), 1)
+        self.assertEqual(sink.chunk_batches[0][0].prompt_tokens, 5)
+
+        buf = io.StringIO()
+        M.write_chunk_stats_csv(c.chunk_stats(), buf)
+        header, row = buf.getvalue().strip().splitlines()
+        self.assertTrue(header.startswith("run_id,chunk_index,chunk_type"))
+        self.assertIn(",TEXT,2,", row)
+
+
+class TestSpans(unittest.TestCase):
+    def test_span_records_outcome_attrs_and_chunk(self):
+        c = M.MetricsCollector(M.NullSink())
+        with c.track_chunk(4, M.CHUNK_TEXT):
+            with c.span("api_attempt", attempt=1) as attrs:
+                attrs["extra"] = "x"
+        with self.assertRaises(KeyError):
+            with c.span("api_attempt", attempt=2):
+                raise KeyError("k")
+
+        first, second = c.spans()
+        self.assertEqual(first.outcome, "ok")
+        self.assertEqual(first.attrs, {"attempt": 1, "extra": "x", "chunk": 4})
+        self.assertEqual(second.outcome, "KeyError")
+        self.assertNotIn("chunk", second.attrs)
+        self.assertGreaterEqual(second.start_s, first.start_s)
+
+    def test_ring_buffer_keeps_newest(self):
+        c = M.MetricsCollector(M.NullSink(), max_spans=3)
+        for i in range(5):
+            with c.span("s", i=i):
+                pass
+        self.assertEqual([sp.attrs["i"] for sp in c.spans()], [2, 3, 4])
+
+    def test_summary_percentiles(self):
+        spans = [
+            M.SpanRecord("a", 0.0, float(d), "ok", 1, "t") for d in range(1, 101)
+        ]
+        summary = M.summarize_spans(spans)["a"]
+        self.assertEqual(summary["n"], 100)
+        self.assertEqual(summary["total_s"], 5050)
+        self.assertAlmostEqual(summary["p50"], 50.5)
+        self.assertAlmostEqual(summary["p95"], 95.05)
+        self.assertAlmostEqual(summary["p99"], 99.01)
+        self.assertEqual(summary["max"], 100)
+
+    def test_finalize_writes_summary_and_trace(self):
+        import json
+        import os
+        import tempfile
+
+        sink = FakeSink()
+        with tempfile.TemporaryDirectory() as d:
+            path = os.path.join(d, "run.trace.json")
+            c = M.MetricsCollector(sink, trace_path=path)
+            c.start()
+            with c.span("backoff_sleep", attempt=1):
+                time.sleep(0.01)
+            c.stop_and_finalize(M.STATUS_OK)
+            with open(path, encoding="utf-8") as f:
+                trace = json.load(f)
+
+        _, final = sink.runs_updated[0]
+        summary = json.loads(final.span_summary)
+        self.assertEqual(summary["backoff_sleep"]["n"], 1)
+        self.assertGreater(summary["backoff_sleep"]["total_s"], 0.0)
+        (event,) = [e for e in trace["traceEvents"] if e["ph"] == "X"]
+        self.assertEqual(event["name"], "backoff_sleep")
+        self.assertEqual(event["args"], {"attempt": 1, "outcome": "ok"})
+        self.assertGreater(event["dur"], 0)
+
+
 class TestActiveCollectorSwap(unittest.TestCase):
     def test_set_active_collector_stops_previous(self):
         sink_a = FakeSink()
@@ -306,7 +511,63 @@ class TestActiveCollectorSwap(unittest.TestCase):
         try:
             b.stop_and_finalize(M.STATUS_OK)
         finally:
-            M._active_collector = None
+            M._active_collectors.clear()
+        self.assertEqual(M._active_collectors, {})
+
+    def test_overlapping_runs_of_two_sessions_do_not_finalize_each_other(self):
+        sink = FakeSink()
+        a = M.MetricsCollector(sink, sample_interval_s=0.03, flush_interval_s=0.1)
+        b = M.MetricsCollector(sink, sample_interval_s=0.03, flush_interval_s=0.1)
+        self.addCleanup(M._active_collectors.clear)
+        a.start()
+        M.set_active_collector(a, key="session-a")
+        b.start()
+        M.set_active_collector(b, key="session-b")
+        time.sleep(0.15)
+
+        # Both still sampled, tagged with two active runs.
+        self.assertEqual(sink.runs_updated, [])
+        self.assertEqual(M._SAMPLER_SERVICE.active_count(), 2)
+        self.assertIs(M.get_active_collector("session-a"), a)
+
+        b.stop_and_finalize(M.STATUS_OK)
+        a.stop_and_finalize(M.STATUS_OK)
+        a.stop_and_finalize(M.STATUS_ERROR, RuntimeError("late"))
+        statuses = {handle: row.status for handle, row in sink.runs_updated}
+        self.assertEqual(len(sink.runs_updated), 2)
+        self.assertEqual(set(statuses.values()), {M.STATUS_OK})
+        rows = [r for batch in sink.samples_batches for r in batch]
+        self.assertTrue(any(r.n_active_runs == 2 for r in rows))
+        self.assertEqual(M._active_collectors, {})
+
+    def test_finished_null_runs_leave_the_registry(self):
+        self.addCleanup(M._active_collectors.clear)
+        for i in range(3):
+            c = M.NullMetricsCollector()
+            M.set_active_collector(c, key=f"s{i}")
+            c.start()
+            c.stop_and_finalize(M.STATUS_OK)
+        self.assertEqual(M._active_collectors, {})
+
+    def test_stop_and_finalize_is_idempotent(self):
+        class ChunkSink(FakeSink):
+            def __init__(self):
+                super().__init__()
+                self.chunk_batches = []
+
+            def append_chunk_stats(self, rows):
+                self.chunk_batches.append(list(rows))
+
+        sink = ChunkSink()
+        c = M.MetricsCollector(sink)
+        c.start()
+        with c.track_chunk(0, M.CHUNK_TEXT, 1):
+            pass
+        c.stop_and_finalize(M.STATUS_OK)
+        c.stop_and_finalize(M.STATUS_ERROR, RuntimeError("again"))
+        self.assertEqual(len(sink.runs_updated), 1)
+        self.assertEqual(sink.runs_updated[0][1].status, M.STATUS_OK)
+        self.assertEqual(len(sink.chunk_batches), 1)
 
 
 class TestAppVersion(unittest.TestCase):
@@ -0,0 +1,92 @@
+"""Unit tests for utils.metrics_prometheus — aggregation, exposition, endpoint."""
+
+from __future__ import annotations
+
+import unittest
+import urllib.error
+import urllib.request
+
+from utils import metrics as M
+from utils.metrics_prometheus import PrometheusSink, start_metrics_server
+
+
+def _value(text: str, series: str) -> float:
+    for line in text.splitlines():
+        if line.startswith(series + " "):
+            return float(line.rsplit(" ", 1)[1])
+    raise AssertionError(f"series not found: {series}")
+
+
+class TestPrometheusSink(unittest.TestCase):
+    def test_aggregates_concurrent_runs(self):
+        sink = PrometheusSink(latency_buckets_s=(1, 10))
+        a = M.MetricsCollector(sink)
+        b = M.MetricsCollector(sink)
+        a.start()
+        b.start()
+        a.incr("n_chunks_submitted", 3)
+        b.incr("n_chunks_submitted", 2)
+        a.incr("n_429_errors")
+        b.incr("n_429_errors")
+
+        with a.span("text_chunk", idx=0):
+            with a.span("api_attempt", attempt=1):
+                text = sink.render()
+                self.assertEqual(_value(text, "translator_active_runs"), 2)
+                self.assertEqual(_value(text, "translator_queue_depth"), 4)
+                self.assertEqual(_value(text, "translator_chunks_in_flight"), 1)
+                self.assertEqual(_value(text, "translator_requests_in_flight"), 1)
+
+        text = sink.render()
+        self.assertEqual(_value(text, "translator_requests_in_flight"), 0)
+        self.assertEqual(_value(text, "translator_429_errors_total"), 2)
+        bucket = 'translator_chunk_latency_seconds_bucket{chunk_type="text",le="1.0"}'
+        self.assertEqual(_value(text, bucket), 1)
+        self.assertEqual(
+            _value(text, 'translator_chunk_latency_seconds_count{chunk_type="text"}'), 1
+        )
+
+        # A failed run that never picked up its remaining chunks must not
+        # leave them in the queue gauge.
+        a.stop_and_finalize(M.STATUS_ERROR, RuntimeError("x"))
+        text = sink.render()
+        self.assertEqual(_value(text, "translator_active_runs"), 1)
+        self.assertEqual(_value(text, "translator_queue_depth"), 2)
+        self.assertEqual(_value(text, 'translator_runs_total{status="error"}'), 1)
+        b.stop_and_finalize(M.STATUS_OK)
+
+    def test_tee_sink_feeds_primary_and_live_secondary(self):
+        from tests.test_metrics import FakeSink
+
+        primary = FakeSink()
+        prom = PrometheusSink()
+        c = M.MetricsCollector(M.TeeSink(primary, prom))
+        c.start()
+        c.incr("n_text_api_calls", 2)
+        c.stop_and_finalize(M.STATUS_OK)
+
+        self.assertEqual(len(primary.runs_appended), 1)
+        self.assertEqual(len(primary.runs_updated), 1)
+        self.assertEqual(primary.runs_updated[0][0], 1)  # primary's own handle
+        self.assertEqual(_value(prom.render(), "translator_text_api_calls_total"), 2)
+
+    def test_http_endpoint_serves_metrics(self):
+        sink = PrometheusSink()
+        server = start_metrics_server(sink, 0)
+        try:
+            port = server.server_address[1]
+            url = f"http://127.0.0.1:{port}"
+            with urllib.request.urlopen(f"{url}/metrics", timeout=5) as r:
+                self.assertEqual(r.status, 200)
+                self.assertIn("text/plain", r.headers["Content-Type"])
+                body = r.read().decode()
+            self.assertIn("# TYPE translator_queue_depth gauge", body)
+            with self.assertRaises(urllib.error.HTTPError):
+                urllib.request.urlopen(f"{url}/other", timeout=5)
+        finally:
+            server.shutdown()
+            server.server_close()
+
+
+if __name__ == "__main__":
+    unittest.main()
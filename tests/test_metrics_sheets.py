@@ -0,0 +1,175 @@
+"""Tests for the batched Sheets writer against an in-memory fake gspread."""
+
+from __future__ import annotations
+
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+from utils import metrics as M
+from utils.metrics_sheets import BatchedSheetsSink
+
+
+class FakeWorksheet:
+    def __init__(self, title: str) -> None:
+        self.title = title
+        self.rows: list[list] = []
+        self.calls: list[str] = []
+        self.fail = False
+        self.delay_s = 0.0
+
+    def _call(self, name: str) -> None:
+        self.calls.append(name)
+        if self.delay_s:
+            time.sleep(self.delay_s)
+        if self.fail:
+            raise RuntimeError(f"synthetic {self.title}.{name} failure")
+
+    def row_values(self, n: int) -> list:
+        return self.rows[n - 1] if len(self.rows) >= n else []
+
+    def append_row(self, values, **kwargs):
+        return self.append_rows([values], **kwargs)
+
+    def append_rows(self, values, **kwargs):
+        self._call("append_rows")
+        first = len(self.rows) + 1
+        self.rows.extend(list(v) for v in values)
+        last = len(self.rows)
+        return {"updates": {"updatedRange": f"{self.title}!A{first}:Z{last}"}}
+
+    def batch_update(self, data, **kwargs):
+        self._call("batch_update")
+        for item in data:
+            row_idx = int(item["range"].split(":")[0][1:])
+            self.rows[row_idx - 1] = list(item["values"][0])
+        return {}
+
+
+class FakeSpreadsheet:
+    def __init__(self) -> None:
+        self.sheets: dict[str, FakeWorksheet] = {}
+
+    def worksheet(self, title: str) -> FakeWorksheet:
+        if title not in self.sheets:
+            raise KeyError(title)
+        return self.sheets[title]
+
+    def add_worksheet(self, title: str, rows: int, cols: int) -> FakeWorksheet:
+        self.sheets[title] = FakeWorksheet(title)
+        return self.sheets[title]
+
+
+def _run(run_id: str, status: str = M.STATUS_RUNNING) -> M.RunRow:
+    return M.RunRow(run_id=run_id, started_at="t0", status=status)
+
+
+def _sample(run_id: str, i: int) -> M.SampleRow:
+    return M.SampleRow(run_id, f"t{i}", float(i), 1.0, 0.0, 1, "translating")
+
+
+class TestBatchedSheetsSink(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.spool = os.path.join(self.tmp.name, "spool.jsonl")
+        self.ss = FakeSpreadsheet()
+        self.sink = BatchedSheetsSink(
+            self.ss, spool_path=self.spool, start_thread=False, degraded_backoff_s=60
+        )
+        self.runs = self.ss.sheets["runs"]
+        self.samples = self.ss.sheets["samples"]
+        self.runs.calls.clear()
+        self.samples.calls.clear()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_coalesces_many_runs_into_few_calls(self):
+        for i in range(5):
+            handle = self.sink.append_run(_run(f"r{i}"))
+            self.sink.append_samples([_sample(f"r{i}", 0), _sample(f"r{i}", 1)])
+        # r4 finishes inside the same window → its insert carries the final row.
+        self.sink.update_run(handle, _run("r4", M.STATUS_OK))
+        self.sink.flush()
+
+        self.assertEqual(self.runs.calls, ["append_rows"])
+        self.assertEqual(self.samples.calls, ["append_rows"])
+        self.assertEqual(len(self.runs.rows), 1 + 5)  # header + one row per run
+        self.assertEqual(self.runs.rows[5][0], "r4")
+        self.assertIn(M.STATUS_OK, self.runs.rows[5])
+        self.assertEqual(len(self.samples.rows), 1 + 10)
+
+    def test_updates_use_local_row_index_in_one_batch_update(self):
+        self.sink.append_run(_run("a"))
+        self.sink.append_run(_run("b"))
+        self.sink.flush()
+        self.sink.update_run("a", _run("a", M.STATUS_OK))
+        self.sink.update_run("b", _run("b", M.STATUS_RUNNING))
+        self.sink.update_run("b", _run("b", M.STATUS_ERROR))  # latest wins
+        self.runs.calls.clear()
+        self.sink.flush()
+
+        self.assertEqual(self.runs.calls, ["batch_update"])
+        self.assertIn(M.STATUS_OK, self.runs.rows[1])
+        self.assertIn(M.STATUS_ERROR, self.runs.rows[2])
+        self.assertEqual(len(self.runs.rows), 3)
+
+    def test_failure_spools_then_replays(self):
+        self.sink.append_run(_run("a"))
+        self.sink.flush()
+        self.runs.fail = True
+        self.sink.update_run("a", _run("a", M.STATUS_OK))
+        self.sink.append_run(_run("b"))
+        self.sink.append_samples([_sample("a", 0)])
+        self.sink.flush()
+        self.assertTrue(os.path.exists(self.spool))
+        self.assertEqual(len(self.samples.rows), 1)  # header only
+
+        # While degraded nothing touches the API; new rows join the spool.
+        self.runs.fail = False
+        self.runs.calls.clear()
+        self.sink.append_samples([_sample("b", 0)])
+        self.sink.flush()
+        self.assertEqual(self.runs.calls, [])
+
+        self.sink._degraded_until = 0.0
+        self.sink.flush()
+        self.assertFalse(os.path.exists(self.spool))
+        # The spooled update kept its row number and landed in place.
+        self.assertIn(M.STATUS_OK, self.runs.rows[1])
+        self.assertEqual([r[0] for r in self.runs.rows[1:]], ["a", "b"])
+        self.assertEqual(len(self.samples.rows), 1 + 2)
+
+    def test_slow_call_switches_to_spool(self):
+        self.sink._slow_call_s = 0.01
+        self.runs.delay_s = 0.05
+        self.sink.append_run(_run("a"))
+        self.sink.append_samples([_sample("a", 0)])
+        self.sink.flush()
+        # The slow insert landed; the samples after it were spooled.
+        self.assertEqual(len(self.runs.rows), 2)
+        self.assertEqual(self.samples.calls, [])
+        self.assertTrue(os.path.exists(self.spool))
+
+    def test_collectors_share_sink_without_io_lock(self):
+        collectors = [M.MetricsCollector(self.sink) for _ in range(4)]
+        threads = []
+        for c in collectors:
+            c.start()
+            threads.append(
+                threading.Thread(target=c.stop_and_finalize, args=(M.STATUS_OK,))
+            )
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.sink.flush()
+        statuses = {row[0]: row for row in self.runs.rows[1:]}
+        self.assertEqual(set(statuses), {c.run_id for c in collectors})
+        self.assertTrue(all(M.STATUS_OK in row for row in statuses.values()))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,155 @@
+import io
+import unittest
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+from PIL import Image, ImageDraw
+
+from utils import translation
+from utils.metrics import MetricsCollector, NullSink
+from utils.model_routing import (
+    TIER_LIGHT,
+    TIER_STANDARD,
+    classify_chunk,
+    figure_edge_density,
+    model_chain,
+    route_chunks,
+    section_heading,
+)
+from utils.translation_runner import translate_chunks_parallel
+
+TIERS = ("lite", "flash", "pro")
+
+
+def _text(*paragraphs):
+    return {"type": "TEXT", "content": list(paragraphs)}
+
+
+def _figure(n_label_lines: int):
+    image = Image.new("RGB", (800, 600), "white")
+    draw = ImageDraw.Draw(image)
+    draw.rectangle((50, 50, 230, 130), outline="black", width=3)
+    draw.rectangle((300, 50, 480, 130), outline="black", width=3)
+    for i in range(n_label_lines):
+        draw.text((20, 160 + i * 14), "S100 label text " * 7, fill="black")
+    return {"type": "FIGURE", "content": image}
+
+
+class TestRouting(unittest.TestCase):
+    def test_section_heading(self):
+        self.assertEqual(section_heading("【청구항 12】"), "청구항")
+        self.assertEqual(section_heading(" 【기술분야】 "), "기술분야")
+        self.assertIsNone(section_heading("본 발명은 【0001】에 관한 것이다."))
+
+    def test_short_chunk_is_light(self):
+        chunk = _text("【발명의 설명】", "짧은 문단")
+        self.assertEqual(classify_chunk(chunk), TIER_LIGHT)
+
+    def test_claims_carry_across_chunks_but_dense_text_does_not(self):
+        claim = "제1항에 있어서, 상기 부재는 " + "가" * 300
+        description = "상기 실시예에서 " + "나" * 500
+        chunks = [
+            _text("【청구범위】", "【청구항 1】", claim, "【청구항 2】", claim),
+            _text(claim, claim, claim),  # continues the claims
+            _text("【발명을 실시하기 위한 구체적인 내용】", description, description),
+            _text("【부호의 설명】", "가" * 900, "나" * 700),  # light section, dense
+        ]
+        self.assertEqual(
+            route_chunks(chunks),
+            [TIER_LIGHT, TIER_LIGHT, TIER_STANDARD, TIER_STANDARD],
+        )
+
+    def test_figures_by_label_density(self):
+        self.assertEqual(classify_chunk(_figure(0)), TIER_LIGHT)
+        self.assertEqual(classify_chunk(_figure(30)), TIER_STANDARD)
+
+    def test_large_figure_is_scanned_on_a_reduced_copy(self):
+        image = _figure(30)["content"].resize((4000, 3000))
+        buf = io.BytesIO()
+        image.save(buf, "JPEG")
+        drafted = Image.open(io.BytesIO(buf.getvalue()))
+        density = figure_edge_density(image)
+
+        self.assertAlmostEqual(figure_edge_density(drafted), density, delta=0.02)
+        self.assertLess(drafted.size, image.size)  # decoded at reduced scale
+        self.assertEqual(image.size, (4000, 3000))  # a loaded image is kept
+
+    def test_model_chain(self):
+        self.assertEqual(model_chain(TIER_LIGHT, TIERS), TIERS)
+        self.assertEqual(model_chain(TIER_STANDARD, TIERS), ("flash", "pro"))
+        self.assertEqual(model_chain(9, TIERS), ("pro",))
+
+
+class TestEscalation(unittest.TestCase):
+    def test_text_escalates_before_splitting_and_is_recorded(self):
+        paragraphs = ["a", "b", "c"]
+        usage = SimpleNamespace(prompt_token_count=10, candidates_token_count=5)
+
+        def generate_content(model, contents, config):
+            if model == "lite":
+                return SimpleNamespace(parsed=["only one"], usage_metadata=usage)
+            return SimpleNamespace(
+                parsed=[f"ja-{p}" for p in paragraphs], usage_metadata=usage
+            )
+
+        client = MagicMock()
+        client.models.generate_content.side_effect = generate_content
+        collector = MetricsCollector(NullSink())
+        with patch("utils.translation._get_client", return_value=client), patch(
+            "utils.translation.MODEL_ROUTING_RETRIES_PER_TIER", 2
+        ), collector.track_chunk(0, "TEXT", 3):
+            result = translation.translate_text_with_gemini(
+                paragraphs, "lite", metrics=collector, escalate_to=("flash", "pro")
+            )
+
+        self.assertEqual(result, ["ja-a", "ja-b", "ja-c"])
+        calls = client.models.generate_content.call_args_list
+        models = [c.kwargs["model"] for c in calls]
+        self.assertEqual(models, ["lite", "lite", "flash"])
+        row = collector._snapshot_run_row("ok")
+        self.assertEqual(row.n_model_escalations, 1)
+        self.assertEqual(row.n_split_fallbacks, 0)
+        (stat,) = collector.chunk_stats()
+        self.assertEqual((stat.model_name, stat.n_escalations), ("flash", 1))
+        self.assertEqual(set(collector.usage_by_model()), {"lite", "flash"})
+
+    def test_unparseable_figure_escalates(self):
+        items = [translation.ImageTranslation(original="가", translated="カ")]
+
+        def generate_content(model, contents, config):
+            parsed = None if model == "lite" else items
+            return SimpleNamespace(parsed=parsed, usage_metadata=None)
+
+        client = MagicMock()
+        client.models.generate_content.side_effect = generate_content
+        with patch("utils.translation._get_client", return_value=client):
+            result = translation.translate_image_with_gemini(
+                Image.new("RGB", (8, 8)), "lite", escalate_to=("flash",)
+            )
+        self.assertEqual(result, items)
+        self.assertEqual(client.models.generate_content.call_count, 3)
+
+
+class TestRunnerRouting(unittest.TestCase):
+    def test_runner_starts_each_chunk_at_its_tier(self):
+        chunks = [
+            _text("【청구항 1】", "짧은 청구항"),
+            _text("【기술분야】", "다" * 500, "라" * 500),
+        ]
+        calls = {}
+
+        def fake_text(paragraphs, model_name, escalate_to=(), **kw):
+            calls[paragraphs[0]] = (model_name, escalate_to)
+            return [f"ja-{p}" for p in paragraphs]
+
+        with patch(
+            "utils.translation_runner.translate_text_with_gemini", side_effect=fake_text
+        ), patch("utils.model_routing.GEMINI_MODEL_TIERS", TIERS):
+            translate_chunks_parallel(chunks, max_workers=2, model_routing=True)
+
+        self.assertEqual(calls["【청구항 1】"], ("lite", ("flash", "pro")))
+        self.assertEqual(calls["【기술분야】"], ("flash", ("pro",)))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,135 @@
+import json
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from utils.notifications import DiscordDispatcher, FailureAlert
+
+
+class _StubWebhook(BaseHTTPRequestHandler):
+    """Records posts; replies with the next queued (status, body, headers)."""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        server = self.server
+        time.sleep(server.delay_s)
+        with server.lock:
+            server.posts.append(
+                (time.monotonic(), self.client_address[1], json.loads(body))
+            )
+            status, reply, headers = (
+                server.replies.pop(0) if server.replies else (204, b"", {})
+            )
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(reply)))
+        self.end_headers()
+        self.wfile.write(reply)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestDiscordDispatcher(unittest.TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _StubWebhook)
+        self.server.lock = threading.Lock()
+        self.server.posts = []
+        self.server.replies = []
+        self.server.delay_s = 0.0
+        threading.Thread(
+            target=self.server.serve_forever, args=(0.05,), daemon=True
+        ).start()
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/hook"
+        self.dispatchers = []
+
+    def tearDown(self):
+        for dispatcher in self.dispatchers:
+            dispatcher.close()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _dispatcher(self, **kwargs):
+        dispatcher = DiscordDispatcher(**kwargs)
+        self.dispatchers.append(dispatcher)
+        return dispatcher
+
+    def _alert(self, doc, kind="quota:per_day"):
+        return FailureAlert(
+            url=self.url,
+            kind=kind,
+            doc_name=doc,
+            reason="Gemini 일일 쿼터/크레딧 소진",
+            content=f"🔴 {doc}",
+        )
+
+    def _wait_for_posts(self, n, timeout=3.0):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            with self.server.lock:
+                if len(self.server.posts) >= n:
+                    return list(self.server.posts)
+            time.sleep(0.01)
+        self.fail(f"expected {n} posts, got {len(self.server.posts)}")
+
+    def test_submit_does_not_wait_for_a_slow_webhook(self):
+        self.server.delay_s = 0.3
+        dispatcher = self._dispatcher(window_s=0)
+        t0 = time.monotonic()
+        for i in range(3):
+            self.assertTrue(dispatcher.submit(self._alert(f"doc{i}", kind=str(i))))
+        self.assertLess(time.monotonic() - t0, 0.1)
+        self._wait_for_posts(3)
+
+    def test_identical_kinds_coalesce_into_one_summary(self):
+        dispatcher = self._dispatcher(window_s=0.3)
+        for i in range(5):
+            dispatcher.submit(self._alert(f"doc{i}"))
+        dispatcher.submit(self._alert("other", kind="quota:per_minute"))
+        posts = self._wait_for_posts(3)
+        time.sleep(0.2)
+        self.assertEqual(len(self.server.posts), 3)
+
+        contents = [p[2]["content"] for p in posts]
+        self.assertEqual(contents[:2], ["🔴 doc0", "🔴 other"])
+        self.assertIn("**4건**", contents[2])
+        self.assertIn("`doc4`", contents[2])
+        # One pooled keep-alive connection for every post.
+        self.assertEqual(len({p[1] for p in posts}), 1)
+
+    def test_429_waits_retry_after(self):
+        self.server.replies = [(429, b'{"retry_after": 0.3}', {})]
+        dispatcher = self._dispatcher(window_s=0)
+        dispatcher.submit(self._alert("doc"))
+        first, second = self._wait_for_posts(2)
+        self.assertGreaterEqual(second[0] - first[0], 0.3)
+        self.assertEqual(second[2]["content"], "🔴 doc")
+
+    def test_drained_bucket_delays_next_post(self):
+        bucket = {"X-RateLimit-Remaining": "0", "X-RateLimit-Reset-After": "0.3"}
+        self.server.replies = [(204, b"", bucket)]
+        dispatcher = self._dispatcher(window_s=0)
+        dispatcher.submit(self._alert("a", kind="a"))
+        dispatcher.submit(self._alert("b", kind="b"))
+        first, second = self._wait_for_posts(2)
+        self.assertGreaterEqual(second[0] - first[0], 0.3)
+
+    def test_full_queue_drops_and_close_flushes(self):
+        dispatcher = self._dispatcher(max_queue=2, window_s=60, start_thread=False)
+        self.assertTrue(dispatcher.submit(self._alert("a")))
+        self.assertTrue(dispatcher.submit(self._alert("b")))
+        self.assertFalse(dispatcher.submit(self._alert("c")))
+        self.assertEqual(dispatcher.n_dropped, 1)
+
+        dispatcher.close()
+        contents = [p[2]["content"] for p in self._wait_for_posts(2)]
+        self.assertEqual(contents[0], "🔴 a")
+        self.assertIn("**1건**", contents[1])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,56 @@
+import gc
+import unittest
+
+from utils.output_store import OutputStore
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestOutputStore(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.store = OutputStore(max_bytes=100, max_age_s=60, clock=self.clock)
+
+    def test_serves_the_stored_bytes_object(self):
+        data = b"PK" * 10
+        handle = self.store.put(data, "out.docx")
+        self.assertIs(self.store.get(handle), data)
+        self.assertEqual((handle.file_name, handle.size), ("out.docx", 20))
+        self.assertIsNone(self.store.get(None))
+
+    def test_expires_by_age(self):
+        old = self.store.put(b"a" * 10, "old.docx")
+        self.clock.now = 30
+        new = self.store.put(b"b" * 10, "new.docx")
+        self.clock.now = 61
+        self.assertIsNone(self.store.get(old))
+        self.assertEqual(self.store.get(new), b"b" * 10)
+        self.assertEqual(self.store.stats(), (1, 10))
+
+    def test_evicts_oldest_over_budget_but_keeps_newest(self):
+        first = self.store.put(b"a" * 60, "1.docx")
+        second = self.store.put(b"b" * 30, "2.docx")
+        third = self.store.put(b"c" * 30, "3.docx")
+        self.assertIsNone(self.store.get(first))
+        self.assertIsNotNone(self.store.get(second))
+        self.assertIsNotNone(self.store.get(third))
+        huge = self.store.put(b"d" * 500, "huge.docx")
+        self.assertEqual(self.store.get(huge), b"d" * 500)
+        self.assertEqual(self.store.stats(), (1, 500))
+
+    def test_dropped_when_the_session_lets_go_of_the_handle(self):
+        session_state = {"output_handle": self.store.put(b"x" * 10, "a.docx")}
+        self.assertEqual(self.store.stats(), (1, 10))
+        session_state["output_handle"] = None
+        gc.collect()
+        self.assertEqual(self.store.stats(), (0, 0))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,101 @@
+import unittest
+from unittest.mock import patch
+
+from PIL import Image
+
+from utils.progress import ProgressTracker, figure_units
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def _chunks():
+    return [
+        {"type": "TEXT", "content": ["a", "b", "c", "d"]},
+        {"type": "FIGURE", "content": Image.new("RGB", (1024, 1024))},
+        {"type": "TEXT", "content": ["e", "f"]},
+    ]
+
+
+class TestProgressTracker(unittest.TestCase):
+    def test_figures_weighted_by_decoded_size_with_floor(self):
+        big = Image.new("RGB", (1024, 1024))  # 3 MiB decoded
+        tiny = Image.new("L", (10, 10))
+        self.assertEqual(figure_units(big), 24.0)
+        with patch("utils.progress.PROGRESS_FIGURE_MIN_UNITS", 10):
+            self.assertEqual(figure_units(tiny), 10.0)
+
+    def test_streamed_paragraphs_count_once_and_weight_progress(self):
+        tracker = ProgressTracker(_chunks(), clock=_Clock())
+        self.assertEqual(tracker.total_units, 4 + 24 + 2)
+
+        tracker.paragraph_done(0, 0)
+        tracker.paragraph_done(0, 0)  # re-reported after a retry
+        tracker.paragraph_done(0, 1)
+        snap = tracker.snapshot()
+        self.assertEqual(snap.paragraphs_done, 2)
+        self.assertAlmostEqual(snap.fraction, 2 / 30)
+
+        tracker.chunk_done(_chunks()[0], 0)  # credits the 2 not streamed
+        tracker.chunk_done(_chunks()[1], 1)
+        snap = tracker.snapshot()
+        self.assertEqual((snap.paragraphs_done, snap.figures_done), (4, 1))
+        self.assertEqual(snap.chunks_done, 2)
+        self.assertAlmostEqual(snap.fraction, 28 / 30)
+
+    def test_in_flight_retry_and_backoff_state(self):
+        clock = _Clock()
+        tracker = ProgressTracker(_chunks(), clock=clock)
+        tracker.task_started(0)
+        tracker.task_started(1)
+        tracker.retry(0, 0.0)
+        tracker.retry(1, 5.0)
+        snap = tracker.snapshot()
+        self.assertEqual((snap.in_flight, snap.retrying, snap.backing_off), (2, 2, 1))
+
+        clock.now += 6
+        self.assertEqual(tracker.snapshot().backing_off, 0)
+        tracker.task_finished(0)
+        tracker.task_finished(1)
+        snap = tracker.snapshot()
+        self.assertEqual((snap.in_flight, snap.retrying), (0, 0))
+
+    def test_eta_from_observed_throughput(self):
+        clock = _Clock()
+        tracker = ProgressTracker(_chunks(), clock=clock)
+        self.assertIsNone(tracker.snapshot().eta_s)
+        clock.now += 10
+        tracker.chunk_done(_chunks()[0], 0)  # 4 of 30 units in 10s
+        tracker.chunk_done(_chunks()[2], 2)  # 6 of 30 units in 10s
+        self.assertAlmostEqual(tracker.snapshot().eta_s, 40.0)
+        tracker.chunk_done(_chunks()[1], 1)
+        self.assertIsNone(tracker.snapshot().eta_s)
+
+
+class TestRunnerStatusThrottle(unittest.TestCase):
+    def test_status_callback_throttled_with_final_snapshot(self):
+        from utils.translation_runner import translate_chunks_parallel
+
+        chunks = [{"type": "TEXT", "content": [f"p{i}"]} for i in range(60)]
+        snapshots = []
+        with patch(
+            "utils.translation_runner.translate_text_with_gemini",
+            side_effect=lambda paragraphs, *a, **kw: [f"ja-{p}" for p in paragraphs],
+        ), patch("utils.translation_runner.PROGRESS_UI_MIN_INTERVAL_S", 60):
+            translate_chunks_parallel(
+                chunks, max_workers=4, status_callback=snapshots.append
+            )
+
+        # 60 completions, but only the first poll and the final one report.
+        self.assertLessEqual(len(snapshots), 2)
+        self.assertEqual(snapshots[-1].chunks_done, 60)
+        self.assertEqual(snapshots[-1].fraction, 1.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,105 @@
+import unittest
+from unittest.mock import patch
+
+from utils.metrics import MetricsCollector, NullSink
+from utils.qa import check_translation, run_qa
+
+SOURCE = [
+    "【기술분야】",
+    "제어부(100)는 단계 S110에서 2.5 mm 만큼 이동한다.",
+    "온도는 1,200 ℃ 이고 도 3a 를 참조한다.",
+    "【0004】 본 발명은 장치에 관한 것이다.",
+]
+GOOD = [
+    "【技術分野】",
+    "制御部（１００）は、ステップＳ１１０において2.5mmだけ移動する。",
+    "温度は1200°Cであり、図3aを参照する。",
+    "【0004】本発明は、装置に関する。",
+]
+
+
+def _chunks(translated):
+    return [
+        {"type": "TEXT", "content": SOURCE[:2], "translated": translated[:2]},
+        {"type": "FIGURE", "content": None, "translated": []},
+        {"type": "TEXT", "content": SOURCE[2:], "translated": translated[2:]},
+    ]
+
+
+class TestCheckTranslation(unittest.TestCase):
+    def test_faithful_translation_passes(self):
+        # Full-width digits, ℃ and dropped thousands separators are equal.
+        report = check_translation(_chunks(GOOD))
+        self.assertEqual(report.n_paragraphs, 4)
+        self.assertEqual(report.issues, [])
+
+    def test_each_check_reports_missing_and_extra_tokens(self):
+        bad = list(GOOD)
+        bad[0] = "技術分野"
+        bad[1] = "制御部（１００）は、ステップS120において25mmだけ移動する。"
+        bad[3] = "【0005】本発明は、装置に関する。"
+        report = check_translation(_chunks(bad))
+
+        found = {
+            (i.chunk, i.paragraph, i.check): (i.missing, i.extra)
+            for i in report.issues
+        }
+        self.assertEqual(
+            found,
+            {
+                (0, 0, "heading"): (("【",), ()),
+                (0, 1, "numeral"): (("2.5",), ("25",)),
+                (0, 1, "reference_sign"): (("S110",), ("S120",)),
+                # Reported once, as a heading — not again as a numeral.
+                (2, 1, "heading"): (("【0004】",), ("【0005】",)),
+            },
+        )
+        self.assertEqual(report.flagged(), {0: [0, 1], 2: [1]})
+        self.assertEqual(report.n_flagged, 3)
+
+    def test_repeated_tokens_are_counted(self):
+        chunks = [
+            {"type": "TEXT", "content": ["10 mm 및 10 mm"], "translated": ["10mm"]}
+        ]
+        (issue,) = [i for i in check_translation(chunks).issues if i.check == "unit"]
+        self.assertEqual(issue.missing, ("mm",))
+
+
+class TestRunQA(unittest.TestCase):
+    def test_only_flagged_paragraphs_are_translated_again(self):
+        source = [f"부재 {i}0 의 설명" for i in range(12)]
+        translated = [f"部材{i}0の説明" for i in range(12)]
+        translated[7] = "部材の説明"
+        chunks = [{"type": "TEXT", "content": source, "translated": translated}]
+        calls = []
+
+        def fake(paragraphs, *args, **kwargs):
+            calls.append(list(paragraphs))
+            return [
+                p.replace("부재 ", "部材").replace(" 의 설명", "の説明")
+                for p in paragraphs
+            ]
+
+        collector = MetricsCollector(NullSink())
+        with patch("utils.translation_runner.translate_text_with_gemini", fake):
+            result, report = run_qa(
+                chunks, requeue=True, metrics_collector=collector, context=1
+            )
+        self.assertEqual(calls, [source[6:9]])
+        self.assertEqual(result[0]["translated"][7], "部材70の説明")
+        self.assertEqual(result[0]["translated"][6], translated[6])
+        self.assertEqual((report.issues, report.n_requeued), ([], 1))
+        row = collector._snapshot_run_row("ok")
+        self.assertEqual((row.n_qa_requeued, row.n_qa_flagged), (1, 0))
+
+    def test_without_requeue_the_issues_are_only_reported(self):
+        chunks = [{"type": "TEXT", "content": ["도 1"], "translated": ["図2"]}]
+        with patch("utils.translation_runner.translate_text_with_gemini") as api:
+            result, report = run_qa(chunks, requeue=False)
+        api.assert_not_called()
+        self.assertIs(result, chunks)
+        self.assertEqual(report.n_flagged, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,16 +1,27 @@
+import threading
+import time
 import unittest
+from datetime import datetime, timezone
 from unittest.mock import patch
 
 from google.genai.errors import ClientError
 
 from utils import translation
+from utils.metrics import MetricsCollector, NullSink
 from utils.translation import (
+    BREAKER_CLOSED,
+    BREAKER_HALF_OPEN,
+    BREAKER_OPEN,
     ParagraphMismatchError,
+    QuotaCircuitBreaker,
+    QuotaCircuitOpenError,
     QuotaExhaustedError,
     RetriesExhaustedError,
     _classify_quota_scope,
     extract_retry_delay_seconds,
+    next_quota_reset,
 )
+from utils.translation_runner import translate_chunks_parallel
 
 PER_MINUTE = "generativelanguage.googleapis.com/generate_requests_per_minute_per_project"
 PER_DAY = "generativelanguage.googleapis.com/generate_requests_per_day_per_project"
@@ -96,6 +107,12 @@ class TestQuotaScopeClassification(unittest.TestCase):
 
 
 class TestRetryWithDelay(unittest.TestCase):
+    def setUp(self):
+        # Keep the process-wide quota breaker out of these retry tests.
+        patcher = patch("utils.translation._quota_breaker", QuotaCircuitBreaker())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
     def test_per_day_fails_fast_without_sleeping(self):
         calls = {"n": 0}
 
@@ -126,6 +143,27 @@ class TestRetryWithDelay(unittest.TestCase):
         self.assertEqual(ctx.exception.scope, "per_minute")
         self.assertEqual(sleep.call_count, 2)  # sleeps between attempts, not after last
 
+    def test_attempts_and_backoff_recorded_as_spans(self):
+        from utils.metrics import MetricsCollector, NullSink
+
+        collector = MetricsCollector(NullSink())
+
+        def call():
+            raise make_429(PER_MINUTE, retry_delay="0s")
+
+        with patch("utils.translation.time.sleep"):
+            with self.assertRaises(QuotaExhaustedError):
+                translation.retry_with_delay(call, max_retries=2, metrics=collector)
+
+        self.assertEqual(
+            [(sp.name, sp.attrs.get("attempt"), sp.outcome) for sp in collector.spans()],
+            [
+                ("api_attempt", 1, "ClientError"),
+                ("backoff_sleep", 1, "ok"),
+                ("api_attempt", 2, "ClientError"),
+            ],
+        )
+
     def test_mismatch_exhaustion_raises_retries_exhausted(self):
         def call():
             raise ParagraphMismatchError("nope")
@@ -146,6 +184,129 @@ class TestRetryWithDelay(unittest.TestCase):
         self.assertEqual(result, ["ok"])
         self.assertEqual(calls["n"], 2)
 
+    def test_on_retry_reports_failed_attempt_and_backoff(self):
+        calls = {"n": 0}
+        retries = []
+
+        def call():
+            calls["n"] += 1
+            if calls["n"] == 1:
+                raise ParagraphMismatchError("retry me")
+            if calls["n"] == 2:
+                raise make_429(PER_MINUTE, retry_delay="4s")
+            return ["ok"]
+
+        with patch("utils.translation.time.sleep"), patch(
+            "utils.translation.random.uniform", return_value=0.5
+        ):
+            translation.retry_with_delay(
+                call,
+                max_retries=3,
+                on_retry=lambda attempt, sleep_s: retries.append((attempt, sleep_s)),
+            )
+
+        self.assertEqual(retries, [(1, 0.0), (2, 4.5)])
+
+
+def _ts(iso: str) -> float:
+    return datetime.fromisoformat(iso).replace(tzinfo=timezone.utc).timestamp()
+
+
+class TestQuotaCircuitBreaker(unittest.TestCase):
+    def setUp(self):
+        self.now = _ts("2026-07-01T12:00:00")
+        self.breaker = QuotaCircuitBreaker(
+            burst_count=3, burst_window_s=60, clock=lambda: self.now
+        )
+        patcher = patch("utils.translation._quota_breaker", self.breaker)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_next_reset_is_midnight_pacific(self):
+        # PDT (UTC-7) in July, PST (UTC-8) in January.
+        self.assertEqual(
+            next_quota_reset(_ts("2026-07-01T12:00:00")), _ts("2026-07-02T07:00:00")
+        )
+        self.assertEqual(
+            next_quota_reset(_ts("2026-01-15T06:00:00")), _ts("2026-01-15T08:00:00")
+        )
+
+    def test_per_day_opens_for_every_run_until_reset(self):
+        def wall():
+            raise make_429(PER_DAY)
+
+        with self.assertRaises(QuotaExhaustedError):
+            translation.retry_with_delay(wall)
+        state = self.breaker.snapshot()
+        self.assertEqual(state.state, BREAKER_OPEN)
+        self.assertEqual(state.reopens_at, _ts("2026-07-02T07:00:00"))
+
+        # Another caller is refused without the API being called...
+        collector = MetricsCollector(NullSink())
+        calls = []
+        with self.assertRaises(QuotaCircuitOpenError) as ctx:
+            translation.retry_with_delay(lambda: calls.append(1), metrics=collector)
+        self.assertEqual(calls, [])
+        self.assertEqual(ctx.exception.scope, "per_day")
+        # ...and so is a whole new run, before any chunk is sent.
+        with patch(
+            "utils.translation_runner.translate_text_with_gemini"
+        ) as translate, self.assertRaises(QuotaCircuitOpenError):
+            translate_chunks_parallel(
+                [{"type": "TEXT", "content": ["a"]}], metrics_collector=collector
+            )
+        translate.assert_not_called()
+        self.assertEqual(collector._snapshot_run_row("x").n_breaker_rejections, 2)
+
+        self.now = _ts("2026-07-02T07:00:01")
+        self.assertEqual(self.breaker.snapshot().state, BREAKER_CLOSED)
+        self.assertEqual(translation.retry_with_delay(lambda: "ok"), "ok")
+
+    def test_per_minute_burst_goes_half_open_until_a_success(self):
+        for _ in range(2):
+            self.breaker.record_quota_error("per_minute")
+        self.assertEqual(self.breaker.snapshot().state, BREAKER_CLOSED)
+        self.breaker.record_quota_error("per_minute")
+        self.assertEqual(self.breaker.snapshot().state, BREAKER_HALF_OPEN)
+
+        self.assertEqual(translation.retry_with_delay(lambda: "ok"), "ok")
+        self.assertEqual(self.breaker.snapshot().state, BREAKER_CLOSED)
+
+    def test_half_open_burst_expires_without_new_429s(self):
+        for _ in range(3):
+            self.breaker.record_quota_error("per_minute")
+        self.now += 61
+        self.assertEqual(self.breaker.snapshot().state, BREAKER_CLOSED)
+
+    def test_half_open_lets_one_probe_through_at_a_time(self):
+        for _ in range(3):
+            self.breaker.record_quota_error("per_minute")
+        probe_started, release_probe = threading.Event(), threading.Event()
+        order = []
+
+        def probe():
+            with self.breaker.attempt():
+                order.append("probe")
+                probe_started.set()
+                release_probe.wait(2)
+
+        def follower():
+            probe_started.wait(2)
+            with self.breaker.attempt():
+                order.append("follower")
+
+        threads = [threading.Thread(target=probe), threading.Thread(target=follower)]
+        for t in threads:
+            t.start()
+        probe_started.wait(2)
+        time.sleep(0.1)
+        self.assertEqual(order, ["probe"])  # follower is held back
+        release_probe.set()
+        for t in threads:
+            t.join(2)
+        self.assertEqual(order, ["probe", "follower"])
+        self.assertEqual(self.breaker.snapshot().state, BREAKER_CLOSED)
+
 
 class TestNoSplitOnQuota(unittest.TestCase):
     def test_quota_error_propagates_without_splitting(self):
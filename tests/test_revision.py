@@ -0,0 +1,125 @@
+import unittest
+from io import BytesIO
+from unittest.mock import patch
+
+from PIL import Image
+
+from utils.chunker import group_paragraphs_to_chunks
+from utils.elements import Element, ParagraphTable
+from utils.metrics import MetricsCollector, NullSink
+from utils.revision import Alignment, plan_revision, translate_revision
+from utils.translation import ImageTranslation
+
+
+def _png(color) -> bytes:
+    buf = BytesIO()
+    Image.new("RGB", (8, 8), color).save(buf, format="PNG")
+    return buf.getvalue()
+
+
+def _chunks(paragraphs, figure=None):
+    table = ParagraphTable()
+    elements = [Element.text(table, table.add(p)) for p in paragraphs]
+    if figure is not None:
+        elements.append(Element.figure(figure))
+    return group_paragraphs_to_chunks(elements, mode="sections")
+
+
+def _fake_text(paragraphs, *args, **kwargs):
+    return [f"ja({p})" if p.strip() else "" for p in paragraphs]
+
+
+def _fake_figure(image, *args, **kwargs):
+    return [ImageTranslation(original="부호", translated="符号(new)")]
+
+
+OLD = [f"문단 {i}" for i in range(20)]
+
+
+def _previous_alignment(figure=None):
+    chunks = _chunks(OLD, figure)
+    for chunk in chunks:
+        if chunk["type"] == "TEXT":
+            chunk["translated"] = [f"old({p})" for p in chunk["content"]]
+        else:
+            chunk["translated"] = [ImageTranslation(original="부호", translated="符号")]
+    return Alignment.from_chunks(chunks, "gemini-x")
+
+
+class TestRevision(unittest.TestCase):
+    def _translate(self, chunks, alignment, **kwargs):
+        calls = []
+
+        def fake_text(paragraphs, *args, **kw):
+            calls.append(list(paragraphs))
+            return _fake_text(paragraphs)
+
+        with patch(
+            "utils.translation_runner.translate_text_with_gemini", fake_text
+        ), patch("utils.translation_runner.translate_image_with_gemini", _fake_figure):
+            result = translate_revision(chunks, alignment, **kwargs)
+        return result, calls
+
+    def test_unchanged_document_sends_nothing(self):
+        alignment = _previous_alignment()
+        result, calls = self._translate(_chunks(OLD), alignment, context=2)
+        self.assertEqual(calls, [])
+        translated = [t for c in result for t in c["translated"]]
+        self.assertEqual(translated, [f"old({p})" for p in OLD])
+
+    def test_only_edited_paragraphs_are_retranslated_with_context(self):
+        new = list(OLD)
+        new[5] = "문단 5 (수정)"
+        new.insert(12, "새 문단")
+        del new[18]  # old "문단 17"
+        collector = MetricsCollector(NullSink())
+        result, calls = self._translate(
+            _chunks(new), _previous_alignment(), context=1, metrics_collector=collector
+        )
+
+        # Each edit goes out once, with one neighbour on each side.
+        self.assertEqual(
+            calls,
+            [["문단 4", "문단 5 (수정)", "문단 6"], ["문단 11", "새 문단", "문단 12"]],
+        )
+        translated = [t for c in result for t in c["translated"]]
+        self.assertEqual(len(translated), len(new))
+        self.assertEqual(translated[5], "ja(문단 5 (수정))")
+        self.assertEqual(translated[12], "ja(새 문단)")
+        # Neighbours keep the previous translation, not the context output.
+        self.assertEqual(translated[4], "old(문단 4)")
+        self.assertEqual(translated[13], "old(문단 12)")
+        self.assertEqual(translated[-1], "old(문단 19)")
+        row = collector._snapshot_run_row("ok")
+        self.assertEqual(row.n_reused_paragraphs, len(new) - 2)
+
+    def test_whitespace_only_edits_are_not_changes(self):
+        new = list(OLD)
+        new[3] = "  문단   3 "
+        plan = plan_revision(_chunks(new), _previous_alignment())
+        self.assertEqual(plan.requests, [])
+        self.assertEqual(plan.n_changed_paragraphs, 0)
+
+    def test_figures_reused_only_when_the_image_is_unchanged(self):
+        alignment = _previous_alignment(figure=_png("white"))
+        result, _ = self._translate(_chunks(OLD, _png("white")), alignment)
+        self.assertEqual(result[-1]["translated"][0].translated, "符号")
+
+        result, _ = self._translate(_chunks(OLD, _png("black")), alignment)
+        self.assertEqual(result[-1]["translated"][0].translated, "符号(new)")
+
+    def test_alignment_json_round_trip_and_rejects_other_files(self):
+        alignment = _previous_alignment(figure=_png("white"))
+        self.assertEqual(Alignment.from_json(alignment.to_json()), alignment)
+        # Figures from before box_2d was stored load with an empty box.
+        legacy = alignment.to_json().replace(b',[]]', b']')
+        self.assertEqual(
+            list(Alignment.from_json(legacy).figures.values()), [[("부호", "符号", [])]]
+        )
+        for data in (b"not json", b"[]", b'{"format": "other"}', "\ud800"):
+            with self.assertRaises(ValueError):
+                Alignment.from_json(data)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,240 @@
+import threading
+import time
+import unittest
+from concurrent.futures import CancelledError, wait
+from unittest.mock import patch
+
+from utils.config import PRIORITY_BATCH, PRIORITY_INTERACTIVE
+from utils import scheduler as scheduler_module
+from utils.metrics import _SAMPLER_SERVICE, MetricsCollector
+from utils.metrics_prometheus import PrometheusSink
+from utils.scheduler import TaskScheduler
+from utils.translation_runner import translate_chunks_parallel
+
+
+class TestTaskScheduler(unittest.TestCase):
+    def setUp(self):
+        self.order = []
+        self.gate = threading.Event()
+
+    def _scheduler(self, **kwargs):
+        scheduler = TaskScheduler(**kwargs)
+        self.addCleanup(scheduler.shutdown)
+        self.addCleanup(self.gate.set)
+        return scheduler
+
+    def _record(self, tag):
+        self.order.append(tag)
+        return tag
+
+    def _blocked_single_worker(self, queue):
+        """Occupy the only worker until ``self.gate`` is set."""
+        started = threading.Event()
+
+        def block():
+            started.set()
+            self.gate.wait(5)
+
+        future = queue.submit(block)
+        self.assertTrue(started.wait(2))
+        return future
+
+    def test_interactive_gets_weighted_share_over_a_batch_backlog(self):
+        scheduler = self._scheduler(max_workers=1, reserved_workers=0)
+        batch = scheduler.open_queue("batch", PRIORITY_BATCH)
+        interactive = scheduler.open_queue("upload", PRIORITY_INTERACTIVE)
+        self._blocked_single_worker(batch)
+        futures = [batch.submit(self._record, "B") for _ in range(10)]
+        futures += [interactive.submit(self._record, "I") for _ in range(4)]
+        self.gate.set()
+        wait(futures, timeout=5)
+
+        # Weights 4:1 — the upload is done after ~5 dispatches, but the
+        # batch still got a turn while both were waiting.
+        last_interactive = max(i for i, tag in enumerate(self.order) if tag == "I")
+        self.assertLessEqual(last_interactive, 5)
+        self.assertIn("B", self.order[:last_interactive])
+        self.assertEqual(self.order.count("B"), 10)
+
+    def test_documents_of_one_class_share_equally(self):
+        scheduler = self._scheduler(max_workers=1, reserved_workers=0)
+        first = scheduler.open_queue("big", PRIORITY_BATCH)
+        second = scheduler.open_queue("small", PRIORITY_BATCH)
+        self._blocked_single_worker(first)
+        futures = [first.submit(self._record, "A") for _ in range(8)]
+        futures += [second.submit(self._record, "S") for _ in range(3)]
+        self.gate.set()
+        wait(futures, timeout=5)
+        self.assertEqual(self.order[:6], ["A", "S"] * 3)
+
+    def test_reserved_workers_serve_interactive_behind_a_full_batch(self):
+        scheduler = self._scheduler(max_workers=3, reserved_workers=1)
+        batch = scheduler.open_queue("batch", PRIORITY_BATCH)
+        running = []
+        for _ in range(4):
+            batch.submit(lambda: (running.append(1), self.gate.wait(5)))
+        time.sleep(0.1)
+        self.assertEqual(len(running), 2)
+
+        upload = scheduler.open_queue("upload", PRIORITY_INTERACTIVE)
+        self.assertEqual(upload.submit(lambda: "ok").result(timeout=1), "ok")
+        self.assertEqual(scheduler.stats()[PRIORITY_BATCH], (2, 2))
+
+    def test_max_in_flight_caps_one_queue(self):
+        scheduler = self._scheduler(max_workers=4)
+        queue = scheduler.open_queue("doc", max_in_flight=2)
+        for _ in range(5):
+            queue.submit(self.gate.wait, 5)
+        time.sleep(0.1)
+        self.assertEqual(scheduler.stats()[PRIORITY_INTERACTIVE], (3, 2))
+
+    def test_memory_budget_holds_tasks_that_do_not_fit(self):
+        mb = 1024 * 1024
+        scheduler = self._scheduler(max_workers=4, memory_budget_mb=10)
+        queue = scheduler.open_queue("doc")
+        queue.submit(self.gate.wait, 5, cost=6 * mb)
+        big = queue.submit(self._record, "big", cost=6 * mb)
+        # Smaller work behind the figure that does not fit waits with it.
+        small = scheduler.open_queue("other").submit(
+            self._record, "text", cost=1 * mb
+        )
+        time.sleep(0.1)
+        self.assertFalse(big.done() or small.done())
+        self.assertEqual(scheduler.memory_stats(), (6 * mb, 1))
+
+        self.gate.set()
+        wait([big, small], timeout=2)
+        self.assertEqual(self.order, ["big", "text"])
+        self.assertEqual(scheduler.memory_stats(), (0, 0))
+
+    def test_large_task_is_not_starved_by_a_steady_small_load(self):
+        mb = 1024 * 1024
+        scheduler = self._scheduler(max_workers=4, memory_budget_mb=8)
+        chat = scheduler.open_queue("chat", max_in_flight=3)
+        # Three 2 MB tasks always running: 6 MB, and each one that finishes
+        # has a successor queued — a 6 MB figure never fits next to them.
+
+        def text():
+            time.sleep(0.01)
+            self._record("text")
+
+        texts = [chat.submit(text, cost=2 * mb) for _ in range(200)]
+        time.sleep(0.05)
+        n_done = len(self.order)
+        figure = scheduler.open_queue("doc").submit(
+            self._record, "figure", cost=6 * mb
+        )
+        self.assertEqual(figure.result(timeout=2), "figure")
+        # It went once the tasks running at submit time were done.
+        self.assertLessEqual(self.order.index("figure"), n_done + 6)
+        wait(texts, timeout=10)
+        self.assertEqual(self.order.count("text"), 200)
+
+    def test_task_over_the_budget_runs_alone(self):
+        mb = 1024 * 1024
+        scheduler = self._scheduler(max_workers=4, memory_budget_mb=4)
+        queue = scheduler.open_queue("doc")
+        huge = queue.submit(self.gate.wait, 5, cost=20 * mb)
+        text = queue.submit(self._record, "text", cost=1 * mb)
+        time.sleep(0.1)
+        self.assertFalse(text.done())
+        self.gate.set()
+        self.assertTrue(huge.result(timeout=2))
+        self.assertEqual(text.result(timeout=2), "text")
+
+    def test_freed_memory_wakes_every_waiting_worker(self):
+        mb = 1024 * 1024
+        scheduler = self._scheduler(max_workers=4, memory_budget_mb=8)
+        queue = scheduler.open_queue("doc")
+        running = threading.Semaphore(0)
+        release = threading.Event()
+
+        def hold():
+            running.release()
+            release.wait(5)
+
+        blocker = queue.submit(self.gate.wait, 5, cost=8 * mb)
+        time.sleep(0.1)
+        futures = [queue.submit(hold, cost=2 * mb) for _ in range(3)]
+        time.sleep(0.1)
+        self.gate.set()
+        # All three fit once the blocker is done, and run side by side.
+        for _ in range(3):
+            self.assertTrue(running.acquire(timeout=2))
+        release.set()
+        wait([blocker, *futures], timeout=2)
+
+    def test_close_cancels_queued_tasks_and_keeps_running_ones(self):
+        scheduler = self._scheduler(max_workers=1)
+        queue = scheduler.open_queue("doc")
+        running = self._blocked_single_worker(queue)
+        queued = [queue.submit(self._record, i) for i in range(3)]
+
+        self.assertEqual(queue.close(), 3)
+        self.assertTrue(all(f.cancelled() for f in queued))
+        with self.assertRaises(RuntimeError):
+            queue.submit(self._record, 9)
+        self.gate.set()
+        running.result(timeout=2)
+        with self.assertRaises(CancelledError):
+            queued[0].result()
+        self.assertEqual(self.order, [])
+
+    def test_task_exception_reaches_the_future(self):
+        scheduler = self._scheduler(max_workers=1)
+        queue = scheduler.open_queue("doc")
+        future = queue.submit(int, "not a number")
+        with self.assertRaises(ValueError):
+            future.result(timeout=2)
+        self.assertEqual(queue.submit(int, "7").result(timeout=2), 7)
+
+    def test_unknown_priority_is_rejected(self):
+        with self.assertRaises(ValueError):
+            self._scheduler().open_queue("doc", "urgent")
+
+    def test_process_scheduler_feeds_the_metrics_samples(self):
+        self.addCleanup(
+            setattr, _SAMPLER_SERVICE, "memory_stats", _SAMPLER_SERVICE.memory_stats
+        )
+        with patch.object(scheduler_module, "_scheduler", None):
+            scheduler = scheduler_module.get_scheduler()
+            self.addCleanup(scheduler.shutdown)
+        self.assertEqual(_SAMPLER_SERVICE.memory_stats, scheduler.memory_stats)
+
+
+class TestRunnerQueueWait(unittest.TestCase):
+    def test_queue_wait_recorded_per_class(self):
+        chunks = [{"type": "TEXT", "content": [f"p{i}"]} for i in range(4)]
+        scheduler = TaskScheduler(max_workers=1, reserved_workers=0)
+        self.addCleanup(scheduler.shutdown)
+        prom = PrometheusSink()
+        collector = MetricsCollector(prom)
+
+        def fake(paragraphs, *args, **kwargs):
+            time.sleep(0.02)
+            return [f"ja-{p}" for p in paragraphs]
+
+        with patch("utils.translation_runner.translate_text_with_gemini", fake):
+            result = translate_chunks_parallel(
+                chunks,
+                max_workers=4,
+                metrics_collector=collector,
+                priority=PRIORITY_BATCH,
+                scheduler=scheduler,
+            )
+
+        self.assertEqual([c["translated"] for c in result][3], ["ja-p3"])
+        waits = [s for s in collector.spans() if s.name == "queue_wait"]
+        self.assertEqual(len(waits), 4)
+        self.assertEqual({s.attrs["priority"] for s in waits}, {PRIORITY_BATCH})
+        # One worker: the last task waited for the three before it.
+        self.assertGreaterEqual(max(s.duration_s for s in waits), 0.05)
+        row = collector._snapshot_run_row("ok", None)
+        self.assertEqual(row.priority_class, PRIORITY_BATCH)
+        self.assertIn(
+            'translator_queue_wait_seconds_count{priority="batch"} 4', prom.render()
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,128 @@
+import importlib.util
+import json
+import os
+import tempfile
+import unittest
+from io import BytesIO
+from unittest.mock import patch
+from xml.etree import ElementTree
+
+from utils.revision import plan_revision
+from utils.segments import SegmentWriter, TranslationMemory, iter_segments
+from utils.translation import ImageTranslation
+from utils.translation_runner import translate_chunks_parallel
+
+CHUNKS = [
+    {
+        "type": "TEXT",
+        "content": [
+            "【기술분야】",
+            "본 발명은 장치에 관한 것이다. 특히 제어부에 관한 것이다.",
+            "",
+            "도 1. 은 <구성> & 흐름을 나타낸다",
+        ],
+        "translated": [
+            "【技術分野】",
+            "本発明は、装置に関する。特に制御部に関する。",
+            "",
+            "図1は<構成>&流れを示す",
+        ],
+    },
+    {
+        "type": "FIGURE",
+        "content": None,
+        "translated": [ImageTranslation(original="제어부", translated="制御部")],
+    },
+]
+
+
+class TestSegments(unittest.TestCase):
+    def test_sentences_split_only_when_both_sides_agree(self):
+        segments = list(iter_segments(0, CHUNKS[0]))
+        self.assertEqual(
+            [(s.tuid, s.source) for s in segments],
+            [
+                ("0-0", "【기술분야】"),
+                ("0-1-0", "본 발명은 장치에 관한 것이다."),
+                ("0-1-1", "특히 제어부에 관한 것이다."),
+                ("0-3", "도 1. 은 <구성> & 흐름을 나타낸다"),
+            ],
+        )
+        self.assertEqual(segments[2].target, "特に制御部に関する。")
+        figure = list(iter_segments(1, CHUNKS[1]))
+        self.assertEqual((figure[0].kind, figure[0].target), ("figure", "制御部"))
+
+    def test_tmx_and_jsonl_stream_in_completion_order(self):
+        tmx, jsonl = BytesIO(), BytesIO()
+        with SegmentWriter(tmx=tmx, jsonl=jsonl, doc_name="a.docx") as writer:
+            writer.add_chunk(1, CHUNKS[1])
+            # Written as it arrives, before close().
+            self.assertIn(b'tuid="1-f0"', tmx.getvalue())
+            writer.add_chunk(0, CHUNKS[0])
+        self.assertEqual(writer.n_segments, 5)
+
+        root = ElementTree.fromstring(tmx.getvalue())
+        self.assertEqual(root.get("version"), "1.4")
+        tus = root.findall("body/tu")
+        self.assertEqual(len(tus), 5)
+        self.assertEqual(tus[-1].findall("tuv/seg")[1].text, "図1は<構成>&流れを示す")
+        rows = [json.loads(line) for line in jsonl.getvalue().splitlines()]
+        self.assertEqual(rows[1]["tuid"], "0-0")
+        self.assertEqual(rows[1]["doc_name"], "a.docx")
+
+    @unittest.skipUnless(importlib.util.find_spec("pyarrow"), "pyarrow not installed")
+    def test_parquet_columns(self):
+        import pyarrow.parquet as pq
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "segments.parquet")
+            with SegmentWriter(parquet=path) as writer:
+                for i, chunk in enumerate(CHUNKS):
+                    writer.add_chunk(i, chunk)
+            table = pq.read_table(path)
+        self.assertEqual(table.num_rows, 5)
+        self.assertIn("source", table.column_names)
+
+    def test_memory_from_tmx_and_jsonl(self):
+        tmx, jsonl = BytesIO(), BytesIO()
+        with SegmentWriter(tmx=tmx, jsonl=jsonl) as writer:
+            writer.add_chunk(0, CHUNKS[0])
+        for memory in (
+            TranslationMemory.from_tmx(BytesIO(tmx.getvalue())),
+            TranslationMemory.from_jsonl(BytesIO(jsonl.getvalue())),
+        ):
+            self.assertEqual(len(memory), 4)
+            # Paragraph answered from its two sentence segments.
+            self.assertEqual(
+                memory.lookup("본 발명은  장치에 관한 것이다. 특히 제어부에 관한 것이다."),
+                "本発明は、装置に関する。特に制御部に関する。",
+            )
+            self.assertIsNone(memory.lookup("새 문단"))
+        with self.assertRaises(ValueError):
+            TranslationMemory.from_tmx(BytesIO(b"<tmx><body>"))
+
+    def test_runner_feeds_writer_and_memory_skips_known_paragraphs(self):
+        source = [{"type": "TEXT", "content": c["content"]} for c in CHUNKS[:1]]
+        source.append({"type": "TEXT", "content": ["새 문단이다."]})
+        tmx = BytesIO()
+
+        def fake(paragraphs, *args, **kwargs):
+            return [f"ja({p})" for p in paragraphs]
+
+        with patch("utils.translation_runner.translate_text_with_gemini", fake):
+            with SegmentWriter(tmx=tmx) as writer:
+                translate_chunks_parallel(source, chunk_callback=writer.add_chunk)
+        self.assertEqual(writer.n_segments, 4)
+
+        memory = TranslationMemory()
+        for chunk in CHUNKS[:1]:
+            for s in iter_segments(0, chunk):
+                memory.add(s.source, s.target)
+        plan = plan_revision(source, None, context=0, memory=memory)
+        self.assertEqual([r["content"] for r in plan.requests], [["새 문단이다."]])
+        self.assertEqual(plan.translated[0][1], CHUNKS[0]["translated"][1])
+        self.assertEqual(plan.n_reused_paragraphs, 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -20,7 +20,12 @@ class TestTranslateTextFlow(unittest.TestCase):
 
         self.assertEqual(result, ["ja-a", "ja-b", "ja-c"])
         mock_batch.assert_called_once_with(
-            paragraphs, model_name="m", max_retries=5, metrics=ANY
+            paragraphs,
+            model_name="m",
+            max_retries=5,
+            metrics=ANY,
+            on_retry=None,
+            cancel=None,
         )
 
     def test_uses_3_retries_for_large_batch(self):
@@ -35,13 +40,18 @@ class TestTranslateTextFlow(unittest.TestCase):
 
         self.assertEqual(result, translated)
         mock_batch.assert_called_once_with(
-            paragraphs, model_name="m", max_retries=3, metrics=ANY
+            paragraphs,
+            model_name="m",
+            max_retries=3,
+            metrics=ANY,
+            on_retry=None,
+            cancel=None,
         )
 
     def test_splits_and_merges_when_batch_retries_exhausted(self):
         paragraphs = [f"p{i}" for i in range(6)]
 
-        def fake_batch(sub_paragraphs, model_name, max_retries, metrics):
+        def fake_batch(sub_paragraphs, model_name, max_retries, metrics, on_retry, cancel):
             # Force split on the original batch, then succeed on child batches.
             if len(sub_paragraphs) == 6:
                 raise RuntimeError("Failed to execute call_gemini_api after retries")
@@ -65,7 +75,7 @@ class TestTranslateTextFlow(unittest.TestCase):
         paragraphs = [f"p{i}" for i in range(6)]
         collector = MetricsCollector(NullSink())
 
-        def fake_batch(sub_paragraphs, model_name, max_retries, metrics):
+        def fake_batch(sub_paragraphs, model_name, max_retries, metrics, on_retry, cancel):
             assert metrics is collector
             if len(sub_paragraphs) == 6:
                 raise RuntimeError("Failed to execute call_gemini_api after retries")
@@ -92,5 +102,371 @@ class TestTranslateTextFlow(unittest.TestCase):
                 translation.translate_text_with_gemini(["only-one"], model_name="m")
 
 
+class TestUsageRecording(unittest.TestCase):
+    def test_usage_metadata_recorded_even_on_mismatch(self):
+        from types import SimpleNamespace
+        from unittest.mock import MagicMock
+
+        from utils.metrics import MetricsCollector, NullSink
+
+        usage = SimpleNamespace(
+            prompt_token_count=100,
+            cached_content_token_count=None,
+            candidates_token_count=40,
+            thoughts_token_count=10,
+        )
+        responses = [
+            SimpleNamespace(parsed=["only-one"], usage_metadata=usage),
+            SimpleNamespace(parsed=["ja-a", "ja-b"], usage_metadata=usage),
+        ]
+        client = MagicMock()
+        client.models.generate_content.side_effect = responses
+        collector = MetricsCollector(NullSink())
+
+        with patch("utils.translation._get_client", return_value=client):
+            with collector.track_chunk(0, "TEXT", n_items=2):
+                result = translation.translate_text_with_gemini(
+                    ["a", "b"], model_name="m", metrics=collector
+                )
+
+        self.assertEqual(result, ["ja-a", "ja-b"])
+        (stat,) = collector.chunk_stats()
+        self.assertEqual(stat.n_api_calls, 2)
+        self.assertEqual(stat.prompt_tokens, 200)
+        self.assertEqual(stat.output_tokens, 100)  # thinking folded into output
+
+
+def _figure_items(tag):
+    return [translation.ImageTranslation(original=tag, translated=f"ja-{tag}")]
+
+
+class TestFigureBatching(unittest.TestCase):
+    def test_batch_response_split_back_by_figure_index(self):
+        from types import SimpleNamespace
+        from unittest.mock import MagicMock
+
+        parsed = [
+            translation.FigureTranslations(figure_index=1, items=_figure_items("b")),
+            translation.FigureTranslations(figure_index=0, items=_figure_items("a")),
+        ]
+        client = MagicMock()
+        client.models.generate_content.return_value = SimpleNamespace(
+            parsed=parsed, usage_metadata=None
+        )
+
+        with patch("utils.translation._get_client", return_value=client):
+            result = translation.translate_images_batch_with_gemini(
+                ["img-a", "img-b"], model_name="m"
+            )
+
+        self.assertEqual([r[0].original for r in result], ["a", "b"])
+        client.models.generate_content.assert_called_once()
+        contents = client.models.generate_content.call_args.kwargs["contents"]
+        self.assertEqual(
+            contents[1:], ["figure_index=0", "img-a", "figure_index=1", "img-b"]
+        )
+
+    def test_falls_back_to_per_figure_on_index_mismatch(self):
+        from types import SimpleNamespace
+        from unittest.mock import MagicMock
+
+        from utils.metrics import MetricsCollector, NullSink
+
+        partial = [translation.FigureTranslations(figure_index=0, items=[])]
+        client = MagicMock()
+        client.models.generate_content.return_value = SimpleNamespace(
+            parsed=partial, usage_metadata=None
+        )
+        collector = MetricsCollector(NullSink())
+
+        with patch("utils.translation._get_client", return_value=client), patch(
+            "utils.translation.translate_image_with_gemini",
+            side_effect=lambda image, model_name, metrics, **kw: _figure_items(image),
+        ) as single:
+            result = translation.translate_images_batch_with_gemini(
+                ["x", "y"], model_name="m", metrics=collector
+            )
+
+        self.assertEqual([r[0].original for r in result], ["x", "y"])
+        self.assertEqual(single.call_count, 2)
+        row = collector._snapshot_run_row("ok", None)
+        self.assertEqual(row.n_figure_batches, 1)
+        self.assertEqual(row.n_figure_batch_fallbacks, 1)
+        self.assertEqual(row.n_mismatch_errors, 2)
+
+    def test_quota_wall_does_not_fall_back(self):
+        with patch(
+            "utils.translation._translate_image_batch_with_retry",
+            side_effect=translation.QuotaExhaustedError("per_day"),
+        ), patch("utils.translation.translate_image_with_gemini") as single:
+            with self.assertRaises(translation.QuotaExhaustedError):
+                translation.translate_images_batch_with_gemini(["x", "y"])
+        single.assert_not_called()
+
+
+class TestPlanTranslationTasks(unittest.TestCase):
+    def _chunks(self):
+        from PIL import Image
+
+        small = Image.new("RGB", (100, 100))
+        large = Image.new("RGB", (2000, 2000))
+        return [
+            {"type": "FIGURE", "content": small},
+            {"type": "TEXT", "content": ["p"]},
+            {"type": "FIGURE", "content": small},
+            {"type": "FIGURE", "content": large},
+            {"type": "FIGURE", "content": small},
+        ]
+
+    def test_disabled_keeps_one_task_per_chunk(self):
+        from utils.translation_runner import plan_translation_tasks
+
+        tasks = plan_translation_tasks(self._chunks(), figure_batching=False)
+        self.assertEqual(tasks, [[0], [1], [2], [3], [4]])
+
+    def test_small_figures_packed_large_alone(self):
+        from utils.translation_runner import plan_translation_tasks
+
+        tasks = plan_translation_tasks(self._chunks(), figure_batching=True)
+        self.assertEqual(tasks, [[0, 2, 4], [1], [3]])
+
+    def test_group_respects_figure_cap(self):
+        from utils.translation_runner import plan_translation_tasks
+
+        chunks = [self._chunks()[0]] * 5
+        with patch("utils.translation_runner.FIGURE_BATCH_MAX_FIGURES", 2):
+            tasks = plan_translation_tasks(chunks, figure_batching=True)
+        self.assertEqual(tasks, [[0, 1], [2, 3], [4]])
+
+    def test_parallel_runner_assigns_batch_results_in_order(self):
+        from utils.translation_runner import translate_chunks_parallel
+
+        chunks = self._chunks()
+        with patch(
+            "utils.translation_runner.translate_images_batch_with_gemini",
+            side_effect=lambda images, model_name, **kw: [
+                _figure_items(f"{i}") for i in range(len(images))
+            ],
+        ) as batch, patch(
+            "utils.translation_runner.translate_image_with_gemini",
+            return_value=_figure_items("large"),
+        ), patch(
+            "utils.translation_runner.translate_text_with_gemini",
+            return_value=["ja-p"],
+        ):
+            out = translate_chunks_parallel(chunks, max_workers=2, figure_batching=True)
+
+        batch.assert_called_once()
+        self.assertEqual(
+            [c["translated"][0].original for c in out if c["type"] == "FIGURE"],
+            ["0", "1", "large", "2"],
+        )
+        self.assertEqual(out[1]["translated"], ["ja-p"])
+
+
+class TestTaskMemoryCost(unittest.TestCase):
+    def test_figures_cost_pixels_plus_payload_text_a_flat_amount(self):
+        from io import BytesIO
+
+        from PIL import Image
+
+        from utils.elements import Chunk
+        from utils.translation_runner import task_memory_cost
+
+        buf = BytesIO()
+        Image.new("RGB", (400, 300)).save(buf, format="PNG")
+        blob = buf.getvalue()
+        chunks = [
+            Chunk.figure(blob),
+            {"type": "FIGURE", "content": Image.new("L", (100, 100))},
+            {"type": "TEXT", "content": ["p"]},
+        ]
+        decoded = 400 * 300 * 3
+        self.assertEqual(
+            task_memory_cost(chunks, [0]), decoded + -(-len(blob) // 3) * 4
+        )
+        self.assertEqual(task_memory_cost(chunks, [1]), 2 * 100 * 100)
+        with patch("utils.translation_runner.MEMORY_BUDGET_TEXT_TASK_MB", 0.5):
+            self.assertEqual(
+                task_memory_cost(chunks, [1, 2]), 20000 + 512 * 1024
+            )
+
+
+def _stream_pieces(text, size=7, usage=None, consumed=None):
+    """Yield ``text`` in fixed-size pieces like generate_content_stream."""
+    from types import SimpleNamespace
+
+    for start in range(0, len(text), size):
+        if consumed is not None:
+            consumed.append(start)
+        last = start + size >= len(text)
+        yield SimpleNamespace(
+            text=text[start : start + size], usage_metadata=usage if last else None
+        )
+
+
+class TestStreamingJsonArray(unittest.TestCase):
+    def test_elements_survive_arbitrary_piece_boundaries(self):
+        import json
+
+        values = ['a"b\\', '\\"', "x\ny", "", "日本語", "q\\\\"]
+        text = json.dumps(values, ensure_ascii=False, indent=1)
+        for size in range(1, 9):
+            parser = translation._StreamingJsonArray()
+            out = []
+            for start in range(0, len(text), size):
+                out += parser.feed(text[start : start + size])
+            self.assertEqual(out, values)
+            self.assertTrue(parser.closed)
+
+    def test_non_string_element_rejected(self):
+        parser = translation._StreamingJsonArray()
+        with self.assertRaises(ValueError):
+            parser.feed('["a", 1]')
+
+
+class TestStreamingTextTranslation(unittest.TestCase):
+    def _client(self, *texts, usage=None, consumed=None):
+        from unittest.mock import MagicMock
+
+        client = MagicMock()
+        client.models.generate_content_stream.side_effect = [
+            _stream_pieces(t, usage=usage, consumed=consumed) for t in texts
+        ]
+        return client
+
+    def test_reports_each_paragraph_and_records_usage(self):
+        from types import SimpleNamespace
+
+        from utils.metrics import MetricsCollector, NullSink
+
+        usage = SimpleNamespace(
+            prompt_token_count=30,
+            cached_content_token_count=0,
+            candidates_token_count=12,
+            thoughts_token_count=0,
+        )
+        client = self._client('["ja-a", "ja-b", "ja-c"]', usage=usage)
+        collector = MetricsCollector(NullSink())
+        seen = []
+
+        with patch("utils.translation._get_client", return_value=client):
+            with collector.track_chunk(0, "TEXT", n_items=3):
+                result = translation.translate_text_with_gemini(
+                    ["a", "b", "c"],
+                    model_name="m",
+                    metrics=collector,
+                    stream=True,
+                    on_paragraph=seen.append,
+                )
+
+        self.assertEqual(result, ["ja-a", "ja-b", "ja-c"])
+        self.assertEqual(seen, [0, 1, 2])
+        (stat,) = collector.chunk_stats()
+        self.assertEqual((stat.prompt_tokens, stat.output_tokens), (30, 12))
+
+    def test_runaway_paragraph_aborted_before_it_finishes(self):
+        from utils.metrics import MetricsCollector, NullSink
+
+        looping = '["ja-a", "' + "반복" * 1000 + '"]'
+        consumed = []
+        client = self._client(looping, '["ja-a", "ja-b"]', consumed=consumed)
+        collector = MetricsCollector(NullSink())
+
+        with patch("utils.translation._get_client", return_value=client), patch(
+            "utils.translation.time.sleep"
+        ):
+            result = translation.translate_text_with_gemini(
+                ["a", "b"], model_name="m", metrics=collector, stream=True
+            )
+
+        self.assertEqual(result, ["ja-a", "ja-b"])
+        # Aborted after ~200 chars of a ~2000 char paragraph.
+        self.assertLess(len(consumed), len(looping) // 7 // 2)
+        row = collector._snapshot_run_row("ok", None)
+        self.assertEqual(row.n_runaway_aborts, 1)
+        self.assertEqual(row.n_mismatch_errors, 1)
+        self.assertEqual(row.n_text_api_calls, 2)
+
+    def test_extra_element_aborts_and_short_array_is_mismatch(self):
+        from utils.metrics import MetricsCollector, NullSink
+
+        client = self._client(
+            '["ja-a", "ja-b", "ja-extra"]', '["ja-a"]', '["ja-a", "ja-b"]'
+        )
+        collector = MetricsCollector(NullSink())
+
+        with patch("utils.translation._get_client", return_value=client):
+            result = translation.translate_text_with_gemini(
+                ["a", "b"], model_name="m", metrics=collector, stream=True
+            )
+
+        self.assertEqual(result, ["ja-a", "ja-b"])
+        row = collector._snapshot_run_row("ok", None)
+        self.assertEqual(row.n_runaway_aborts, 1)
+        self.assertEqual(row.n_mismatch_errors, 2)
+
+    def test_split_fallback_offsets_paragraph_indices(self):
+        seen = []
+
+        def fake_stream(
+            sub, model_name, max_retries, metrics, on_paragraph, on_retry, cancel
+        ):
+            if len(sub) == 4:
+                raise RuntimeError("exhausted")
+            for i in range(len(sub)):
+                on_paragraph(i)
+            return [f"ja-{p}" for p in sub]
+
+        with patch(
+            "utils.translation._translate_text_stream_with_retry",
+            side_effect=fake_stream,
+        ):
+            translation.translate_text_with_gemini(
+                ["a", "b", "c", "d"], stream=True, on_paragraph=seen.append
+            )
+
+        self.assertEqual(seen, [0, 1, 2, 3])
+
+    def test_parallel_runner_reports_distinct_paragraphs(self):
+        from utils.translation_runner import translate_chunks_parallel
+
+        def fake_text(
+            paragraphs,
+            model_name,
+            metrics,
+            stream,
+            on_paragraph,
+            on_retry,
+            cancel,
+            escalate_to,
+        ):
+            for i in range(len(paragraphs)):
+                on_paragraph(i)
+                on_paragraph(i)  # retries re-report the same index
+            return [f"ja-{p}" for p in paragraphs]
+
+        chunks = [
+            {"type": "TEXT", "content": ["a", "b"]},
+            {"type": "TEXT", "content": ["c", "d", "e"]},
+        ]
+        snapshots = []
+        with patch(
+            "utils.translation_runner.translate_text_with_gemini",
+            side_effect=fake_text,
+        ):
+            translate_chunks_parallel(
+                chunks,
+                max_workers=2,
+                stream_text=True,
+                status_callback=snapshots.append,
+            )
+
+        final = snapshots[-1]
+        self.assertEqual((final.paragraphs_done, final.paragraphs_total), (5, 5))
+        self.assertEqual(final.fraction, 1.0)
+        self.assertEqual(final.in_flight, 0)
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -1,7 +1,20 @@
-from .chunker import group_paragraphs_to_chunks
-from .config import DEFAULT_GEMINI_MODEL_DISPLAY_NAME, DEFAULT_GEMINI_MODEL_NAME
-from .docx_parser import create_japanese_patent_docx, parse_docx_with_images
-from .translation_runner import translate_chunks_parallel
+"""Translation pipeline of the app.
+
+The names below are resolved on first access (PEP 562), so importing a
+light submodule such as ``utils.config`` does not pull in python-docx or the
+whole translation stack.
+"""
+
+from importlib import import_module
+
+_EXPORTS = {
+    "create_japanese_patent_docx": ".docx_parser",
+    "DEFAULT_GEMINI_MODEL_DISPLAY_NAME": ".config",
+    "DEFAULT_GEMINI_MODEL_NAME": ".config",
+    "group_paragraphs_to_chunks": ".chunker",
+    "parse_docx_with_images": ".docx_parser",
+    "translate_chunks_parallel": ".translation_runner",
+}
 
 __all__ = [
     "create_japanese_patent_docx",
@@ -11,3 +24,16 @@ __all__ = [
     "parse_docx_with_images",
     "translate_chunks_parallel",
 ]
+
+
+def __getattr__(name: str):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
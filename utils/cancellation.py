@@ -0,0 +1,52 @@
+"""Cooperative cancellation for one translation run.
+
+A :class:`CancellationToken` is created per run and threaded from the
+runner down to ``retry_with_delay``. Workers check it between requests,
+between streamed pieces and before every attempt; backoff sleeps wait on
+it instead of ``time.sleep`` so a cancel wakes them at once. A blocking
+(non-streamed) request already on the wire cannot be interrupted — its
+worker notices the token when the call returns and drops the result.
+"""
+
+from __future__ import annotations
+
+import threading
+
+
+class TranslationCancelled(Exception):
+    """The run was cancelled (cancel button, new upload, session closed).
+
+    Deliberately *not* a ``RuntimeError``: the text split fallback and the
+    figure batch fallback must not turn a cancel into more requests.
+    """
+
+    def __init__(self, reason: str = "cancelled"):
+        self.reason = reason
+        super().__init__(f"Translation cancelled: {reason}")
+
+
+class CancellationToken:
+    """Thread-safe, one-way cancel flag shared by every task of a run."""
+
+    def __init__(self) -> None:
+        self._event = threading.Event()
+        self.reason: str | None = None
+
+    def cancel(self, reason: str = "cancelled") -> None:
+        """Set the flag; the first reason wins. Idempotent."""
+        if not self._event.is_set():
+            self.reason = reason
+            self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def raise_if_cancelled(self) -> None:
+        if self._event.is_set():
+            raise TranslationCancelled(self.reason or "cancelled")
+
+    def sleep(self, seconds: float) -> None:
+        """Sleep up to ``seconds``; raise :class:`TranslationCancelled` on cancel."""
+        if self._event.wait(max(0.0, seconds)):
+            raise TranslationCancelled(self.reason or "cancelled")
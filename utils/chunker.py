@@ -1,18 +1,187 @@
-def group_paragraphs_to_chunks(elements, max_words=2000):
+import math
+import re
+
+from utils.config import (
+    CHUNK_CHARS_PER_TOKEN,
+    CHUNK_MAX_PARAGRAPHS,
+    CHUNK_MAX_TOKENS,
+    CHUNKER_MODE,
+)
+from utils.elements import Chunk, Element
+
+# A whole paragraph of the form 【title】 or 【title 12】 (claims). Paragraph
+# numbers such as 【0001】 have no title and do not start a section.
+_SECTION_HEADING = re.compile(r"^\s*【\s*([^】\d\s][^】]*?)[\s\d]*】\s*$")
+
+
+def section_heading(paragraph: str) -> str | None:
+    """``"청구항"`` for ``"【청구항 3】"``; ``None`` if not a section heading."""
+    match = _SECTION_HEADING.match(paragraph)
+    return match.group(1).strip() if match else None
+
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text) / CHUNK_CHARS_PER_TOKEN)
+
+
+def group_paragraphs_to_chunks(
+    elements, max_words=2000, mode=None, max_tokens=None, max_paragraphs=None
+):
+    """Group parsed elements into TEXT chunks (runs of paragraphs) and FIGURE chunks.
+
+    Parsed :class:`~utils.elements.Element` input gives
+    :class:`~utils.elements.Chunk` output sharing the paragraph table;
+    plain dicts give ``{"type", "content"}`` dicts.
+
+    ``mode`` is ``"sections"`` or ``"words"`` (default ``CHUNKER_MODE``);
+    ``max_words`` applies to ``"words"``, ``max_tokens`` / ``max_paragraphs``
+    (default ``CHUNK_MAX_TOKENS`` / ``CHUNK_MAX_PARAGRAPHS``) to
+    ``"sections"``. Either way the chunks, flattened, are the input in order.
+    """
+    mode = mode or CHUNKER_MODE
+    if mode == "words":
+        return _group_by_words(elements, max_words)
+    if mode != "sections":
+        raise ValueError(f"unknown chunker mode: {mode!r}")
+    max_tokens = max_tokens or CHUNK_MAX_TOKENS
+    max_paragraphs = max_paragraphs or CHUNK_MAX_PARAGRAPHS
+    chunks, run = [], []
+    for elem in elements:
+        if elem["type"] == "TEXT":
+            run.append(elem)
+        elif elem["type"] == "FIGURE":
+            chunks.extend(_pack_run(run, max_tokens, max_paragraphs))
+            run = []
+            chunks.append(_figure_chunk(elem))
+    chunks.extend(_pack_run(run, max_tokens, max_paragraphs))
+    return chunks
+
+
+def _text_chunk(run):
+    """One TEXT chunk for consecutive TEXT elements.
+
+    Parsed :class:`Element` rows are contiguous in their table, so the chunk
+    is just the row range; plain dict elements get a paragraph list.
+    """
+    first = run[0]
+    if isinstance(first, Element):
+        stop = first.index + len(run)
+        if run[-1].table is not first.table or run[-1].index != stop - 1:
+            raise ValueError("TEXT elements must be consecutive table rows")
+        return Chunk.text(first.table, first.index, stop)
+    return {"type": "TEXT", "content": [elem["content"] for elem in run]}
+
+
+def _figure_chunk(elem):
+    return Chunk.figure(elem.blob) if isinstance(elem, Element) else elem
+
+
+def _pack_run(run, max_tokens, max_paragraphs):
+    chunks, start = [], 0
+    for group in _pack_sections(
+        [elem["content"] for elem in run], max_tokens, max_paragraphs
+    ):
+        chunks.append(_text_chunk(run[start : start + len(group)]))
+        start += len(group)
+    return chunks
+
+
+def _group_by_words(elements, max_words):
     chunks, buffer, word_count = [], [], 0
     for elem in elements:
         if elem["type"] == "TEXT":
             words = len(elem["content"].split())
             if word_count + words > max_words and buffer:
-                chunks.append({"type": "TEXT", "content": list(buffer)})
+                chunks.append(_text_chunk(buffer))
                 buffer, word_count = [], 0
-            buffer.append(elem["content"])
+            buffer.append(elem)
             word_count += words
         elif elem["type"] == "FIGURE":
             if buffer:
-                chunks.append({"type": "TEXT", "content": list(buffer)})
+                chunks.append(_text_chunk(buffer))
                 buffer, word_count = [], 0
-            chunks.append(elem)
+            chunks.append(_figure_chunk(elem))
     if buffer:
-        chunks.append({"type": "TEXT", "content": list(buffer)})
+        chunks.append(_text_chunk(buffer))
     return chunks
+
+
+def _segment(paragraphs: list[str]) -> list[list[str]]:
+    """Split at section headings; a heading with no body joins the next one."""
+    sections: list[list[str]] = []
+    current: list[str] = []
+    has_body = False
+    for paragraph in paragraphs:
+        is_heading = section_heading(paragraph) is not None
+        if is_heading and has_body:
+            sections.append(current)
+            current, has_body = [], False
+        current.append(paragraph)
+        has_body = has_body or not is_heading
+    if current:
+        sections.append(current)
+    return sections
+
+
+def _pack_sections(paragraphs, max_tokens, max_paragraphs):
+    """Pack one figure-free run of paragraphs into groups, in order.
+
+    The run needs at least ``ceil(total / max_tokens)`` chunks, so each chunk
+    is closed once it reaches the even share ``total / n`` (or would
+    overflow a budget), which keeps chunk sizes close to each other instead
+    of leaving a small remainder at the end.
+    """
+    if not paragraphs:
+        return []
+    pieces = []
+    for section in _segment(paragraphs):
+        pieces.extend(_split_oversized(section, max_tokens, max_paragraphs))
+
+    costs = [sum(estimate_tokens(p) for p in piece) for piece in pieces]
+    total_tokens = sum(costs)
+    n_chunks = max(
+        math.ceil(total_tokens / max_tokens),
+        math.ceil(len(paragraphs) / max_paragraphs),
+    )
+    target = total_tokens / max(1, n_chunks)
+
+    groups, buffer, tokens = [], [], 0
+    for piece, cost in zip(pieces, costs):
+        if buffer and (
+            tokens >= target
+            or tokens + cost > max_tokens
+            or len(buffer) + len(piece) > max_paragraphs
+        ):
+            groups.append(buffer)
+            buffer, tokens = [], 0
+        buffer = buffer + piece
+        tokens += cost
+    if buffer:
+        groups.append(buffer)
+    return groups
+
+
+def _split_oversized(section, max_tokens, max_paragraphs):
+    """``[section]`` if it fits one chunk, else evenly sized paragraph runs."""
+    costs = [estimate_tokens(p) for p in section]
+    total = sum(costs)
+    if total <= max_tokens and len(section) <= max_paragraphs:
+        return [section]
+    n_parts = max(
+        math.ceil(total / max_tokens), math.ceil(len(section) / max_paragraphs)
+    )
+    target = total / n_parts
+    parts, current, tokens = [], [], 0
+    for paragraph, cost in zip(section, costs):
+        if current and (
+            tokens + cost > max_tokens
+            or len(current) >= max_paragraphs
+            or tokens + cost / 2 > target
+        ):
+            parts.append(current)
+            current, tokens = [], 0
+        current.append(paragraph)
+        tokens += cost
+    if current:
+        parts.append(current)
+    return parts
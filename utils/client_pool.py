@@ -0,0 +1,131 @@
+"""Process-wide pool of pre-built API clients.
+
+Each worker thread keeps the Gemini client it first used (``_get_client``
+in utils/translation.py), and since the scheduler's worker threads outlive
+runs, so does the client and its keep-alive connections. What was left was
+the first request of every new thread: building a ``genai.Client`` (SSL
+context, httpx client) and a TLS handshake, ~0.1-0.5 s in front of the
+first chunks of the first run after a (re)start — exactly when a user is
+watching.
+
+:class:`ClientPool` builds clients ahead of time and hands them out warmest
+first. :meth:`ClientPool.prewarm` builds up to ``n`` idle clients and runs a
+``probe`` request on each in parallel to open its connection; the app calls
+it in the background once a file is uploaded (``CLIENT_POOL_PREWARM_CLIENTS``)
+— ahead of the first run, but not on the cold start. Clients handed out
+count towards ``n`` — they stay with their thread — so calling it again on
+every Streamlit rerun builds nothing new. Neither does it once a
+build has failed (no API key, typically): prewarming waits until a client is
+built successfully elsewhere, i.e. by the first run once the key is set.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+from collections import deque
+from typing import Any, Callable
+
+log = logging.getLogger(__name__)
+
+
+class ClientPool:
+    """Idle clients made by ``factory``, handed out last-in first-out."""
+
+    def __init__(self, factory: Callable[[], Any]) -> None:
+        self._factory = factory
+        self._lock = threading.Lock()
+        # Serialises prewarm calls, so two of them do not both top up.
+        self._prewarm_lock = threading.Lock()
+        self._idle: deque = deque()
+        self.n_created = 0
+        # The last build raised; no prewarming until one succeeds again.
+        self.build_failed = False
+
+    @property
+    def n_idle(self) -> int:
+        with self._lock:
+            return len(self._idle)
+
+    def _create(self):
+        try:
+            client = self._factory()
+        except Exception:
+            self.build_failed = True
+            raise
+        with self._lock:
+            self.n_created += 1
+            self.build_failed = False
+        return client
+
+    def acquire(self):
+        """An idle client (most recently warmed first), or a new one."""
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()
+        return self._create()
+
+    def release(self, client) -> None:
+        with self._lock:
+            self._idle.append(client)
+
+    def n_missing(self, n: int) -> int:
+        with self._lock:
+            return max(0, n - self.n_created)
+
+    def prewarm(self, n: int, probe: Callable[[Any], None] | None = None) -> int:
+        """Build clients until ``n`` exist, each probed once; returns how many.
+
+        Clients are built one by one (construction is mostly CPU) and probed
+        concurrently (the probe waits on the network). A client whose probe
+        fails is still kept — it is built, only its connection is cold.
+        """
+        with self._prewarm_lock:
+            if self.build_failed:
+                return 0
+            return self._prewarm(self.n_missing(n), probe)
+
+    def _prewarm(self, missing: int, probe) -> int:
+        clients = []
+        try:
+            for _ in range(missing):
+                clients.append(self._create())
+        except Exception as e:
+            # No API key yet, typically; the first run reports it properly.
+            log.debug("[clients] prewarm stopped: %s", e)
+        if probe is not None:
+            threads = [
+                threading.Thread(
+                    target=self._probe, args=(probe, c), daemon=True, name="client-warm"
+                )
+                for c in clients
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        for client in clients:
+            self.release(client)
+        return len(clients)
+
+    @staticmethod
+    def _probe(probe: Callable[[Any], None], client) -> None:
+        try:
+            probe(client)
+        except Exception as e:
+            log.info("[clients] warm-up request failed: %s", e)
+
+    def start_prewarm(
+        self, n: int, probe: Callable[[Any], None] | None = None
+    ) -> threading.Thread | None:
+        """:meth:`prewarm` on a daemon thread (app startup must not wait).
+
+        ``None`` when ``n`` clients exist already or the last build failed.
+        """
+        if self.build_failed or not self.n_missing(n):
+            return None
+        thread = threading.Thread(
+            target=self.prewarm, args=(n, probe), daemon=True, name="client-prewarm"
+        )
+        thread.start()
+        return thread
@@ -7,14 +7,226 @@ DEFAULT_GEMINI_MODEL_DISPLAY_NAME = "Gemini 2.5 Flash"
 # chunks). Tier 1 rate limits are far away (tiny per-doc token volume); the real
 # ceiling is RAM from in-flight FIGURE images, which tracks image *size* not
 # count (a 26-figure doc peaked ~430MB at 8 workers while a 15-figure doc hit
-# only ~335MB at 16). 24 is a conservative step under the ?workers clamp of 32,
-# leaving headroom below Streamlit Community's ~1GB. Override per-run: ?workers=N.
+# only ~335MB at 16); the memory budget below bounds that part, so the worker
+# count only has to suit text-heavy docs. 24 is a conservative step under the
+# ?workers clamp of 32. Override per-run: ?workers=N.
 TRANSLATION_MAX_WORKERS = 24
 
+# Process-wide task scheduler (utils/scheduler.py) shared by every run, so
+# concurrent sessions and overnight batches draw from one pool instead of one
+# executor each. SCHEDULER_MAX_WORKERS caps requests across all runs (a run's
+# own ``max_workers`` still caps it alone). Free workers go to priority classes
+# in proportion to SCHEDULER_CLASS_WEIGHTS and to documents of one class in
+# equal shares. SCHEDULER_INTERACTIVE_RESERVED_WORKERS are never handed to
+# batch work, so an upload gets a worker at once even behind a full batch.
+PRIORITY_INTERACTIVE = "interactive"
+PRIORITY_BATCH = "batch"
+SCHEDULER_MAX_WORKERS = 32
+SCHEDULER_CLASS_WEIGHTS = {PRIORITY_INTERACTIVE: 4, PRIORITY_BATCH: 1}
+SCHEDULER_INTERACTIVE_RESERVED_WORKERS = 4
+SCHEDULER_DEFAULT_PRIORITY = PRIORITY_INTERACTIVE
+
+# Memory budget of the scheduler: a task is started only when its estimated
+# footprint fits in what running tasks have left of MEMORY_BUDGET_MB. A FIGURE
+# task costs its decoded pixels (w*h*bands) plus the request payload (the
+# encoded image, base64) per figure; a TEXT task MEMORY_BUDGET_TEXT_TASK_MB. A
+# task that does not fit waits without holding a worker, and no other task
+# starts until it does, so small tasks cannot starve it; one larger than the
+# whole budget runs once nothing else holds any. ~384MB of in-flight figures
+# on top of the app's own ~250MB stays clear of Streamlit Community's ~1GB.
+# None turns the governor off (reservations are still reported in the
+# samples).
+MEMORY_BUDGET_MB = 384
+MEMORY_BUDGET_TEXT_TASK_MB = 1
+
+# Gemini clients (utils/client_pool.py). Every scheduler worker thread keeps
+# one client, and with it its keep-alive connections, for the life of the
+# process. The app pre-builds CLIENT_POOL_PREWARM_CLIENTS of them once a file
+# is uploaded (not on wake-up, which would load the SDK) and opens a
+# connection on each, so the first chunks of the first run skip client
+# construction and the TLS handshake. Idle connections are kept for
+# CLIENT_POOL_KEEPALIVE_S (up to CLIENT_POOL_KEEPALIVE_CONNECTIONS per client)
+# instead of httpx's 5 s, so they also survive the gap between runs.
+CLIENT_POOL_PREWARM_CLIENTS = 8
+CLIENT_POOL_KEEPALIVE_S = 300.0
+CLIENT_POOL_KEEPALIVE_CONNECTIONS = 4
+
+# Batched figure requests: pack several small FIGURE chunks into one Gemini
+# call (response keyed by figure index) instead of one round trip each. Off by
+# default; the runner's ``figure_batching`` argument overrides per call. A
+# figure over FIGURE_BATCH_SMALL_MAX_PIXELS always goes alone. Per request the
+# pixel sum and the decoded size (w*h*bands, an upper bound on what the SDK
+# uploads) stay within budget so the payload is well under the ~20MB inline
+# limit. A batch that still fails after FIGURE_BATCH_MAX_RETRIES falls back to
+# per-figure requests.
+FIGURE_BATCH_ENABLED = False
+FIGURE_BATCH_SMALL_MAX_PIXELS = 800 * 800
+FIGURE_BATCH_MAX_PIXELS = 3_000_000
+FIGURE_BATCH_MAX_BYTES = 12 * 1024 * 1024
+FIGURE_BATCH_MAX_FIGURES = 8
+FIGURE_BATCH_MAX_RETRIES = 2
+
+# Streamed text translation (generate_content_stream): the JSON array is parsed
+# as it arrives, so paragraphs report progress one by one and a runaway
+# response is aborted mid-generation instead of after it. A paragraph (or the
+# unfinished one still streaming) longer than ratio * source chars + slack, or
+# any element past the expected count, aborts the attempt as a mismatch.
+# Japanese output runs ~1-1.5x the Korean char count, so 3x is a loop, not
+# a verbose translation.
+TEXT_STREAMING_ENABLED = True
+TEXT_STREAM_MAX_CHAR_RATIO = 3.0
+TEXT_STREAM_CHAR_SLACK = 200
+# How often the parallel runner wakes to forward progress to the UI thread
+# when no chunk has completed.
+PROGRESS_POLL_INTERVAL_S = 0.5
+
+# Weighted progress (utils/progress.py). Units are "paragraph equivalents": a
+# TEXT paragraph is 1; a figure is its decoded size / PROGRESS_FIGURE_BYTES_PER_UNIT,
+# but at least PROGRESS_FIGURE_MIN_UNITS since even a tiny figure is a full
+# ~5s OCR request (a paragraph in a big chunk is ~0.3s). Status callbacks fire
+# at most every PROGRESS_UI_MIN_INTERVAL_S (plus once at the end) so a burst of
+# completions can't flood Streamlit with progress() calls. ETA stays hidden
+# until PROGRESS_ETA_MIN_ELAPSED_S of observed throughput.
+PROGRESS_FIGURE_BYTES_PER_UNIT = 128 * 1024
+PROGRESS_FIGURE_MIN_UNITS = 10
+PROGRESS_UI_MIN_INTERVAL_S = 0.5
+PROGRESS_ETA_MIN_ELAPSED_S = 3.0
+
+# Persistent figure-translation cache (utils/figure_cache.py): SQLite file at
+# env FIGURE_CACHE_PATH (default in the temp dir); env FIGURE_CACHE_ENABLED=0
+# turns it off. Keyed by a hash_size x hash_size dHash of the normalized image
+# plus model and prompt version, so editing a prompt invalidates old entries.
+# A lookup hits when the Hamming distance is within FIGURE_CACHE_MAX_DISTANCE
+# bits (of hash_size**2) and the aspect ratio agrees — re-scans of the same
+# drawing land a few bits apart. Least-recently-used entries are evicted once
+# the stored payloads exceed FIGURE_CACHE_MAX_BYTES.
+FIGURE_CACHE_ENABLED_ENV_VAR = "FIGURE_CACHE_ENABLED"
+FIGURE_CACHE_PATH_ENV_VAR = "FIGURE_CACHE_PATH"
+FIGURE_CACHE_HASH_SIZE = 16
+FIGURE_CACHE_MAX_DISTANCE = 12
+FIGURE_CACHE_ASPECT_TOLERANCE = 0.05
+FIGURE_CACHE_MAX_BYTES = 32 * 1024 * 1024
+
+# Figures in the output .docx (utils/figure_overlay.py). "text" writes each
+# figure's labels as "original: translated" lines (no drawing); "overlay"
+# re-embeds the drawing with the Japanese labels painted over the boxes the
+# model reported (box_2d, 0-1000 coordinates); "legend" keeps the drawing as is,
+# numbers the labels and lists the translations in a panel below it. Labels
+# without a usable box always go to the legend. Rendering runs in a spawned
+# process pool of FIGURE_RENDER_WORKERS, each child replaced after
+# FIGURE_RENDER_TASKS_PER_CHILD figures; at most FIGURE_RENDER_MAX_IN_FLIGHT
+# figures are submitted at a time and each is first scaled down to
+# FIGURE_RENDER_MAX_PIXELS, so the build holds a few decoded figures at most.
+# Japanese glyphs need a CJK font: env FIGURE_FONT_PATH, else the first of
+# FIGURE_FONT_CANDIDATES that exists (Pillow's default font has no kana).
+FIGURE_OUTPUT_TEXT = "text"
+FIGURE_OUTPUT_OVERLAY = "overlay"
+FIGURE_OUTPUT_LEGEND = "legend"
+FIGURE_OUTPUT_MODE = FIGURE_OUTPUT_TEXT
+FIGURE_RENDER_WORKERS = 2
+FIGURE_RENDER_TASKS_PER_CHILD = 20
+FIGURE_RENDER_MAX_IN_FLIGHT = 4
+FIGURE_RENDER_MAX_PIXELS = 4_000_000
+FIGURE_RENDER_TIMEOUT_S = 60.0
+FIGURE_RENDER_MIN_FONT_PX = 10
+FIGURE_FONT_PATH_ENV_VAR = "FIGURE_FONT_PATH"
+FIGURE_FONT_CANDIDATES = (
+    "/usr/share/fonts/opentype/noto/NotoSansCJK-Regular.ttc",
+    "/usr/share/fonts/noto-cjk/NotoSansCJK-Regular.ttc",
+    "/usr/share/fonts/truetype/fonts-japanese-gothic.ttf",
+    "/usr/share/fonts/opentype/ipafont-gothic/ipag.ttf",
+    "/System/Library/Fonts/ヒラギノ角ゴシック W3.ttc",
+    "C:\\Windows\\Fonts\\msgothic.ttc",
+)
+
+# Translated .docx outputs (utils/output_store.py) are kept in memory and
+# served from there on every rerun instead of being written to temp files.
+# The process-wide store drops an output when its session ends, once it is
+# older than OUTPUT_STORE_MAX_AGE_S, or — oldest first — when all outputs
+# together exceed OUTPUT_STORE_MAX_BYTES; that session is then asked to
+# translate again.
+OUTPUT_STORE_MAX_AGE_S = 6 * 60 * 60
+OUTPUT_STORE_MAX_BYTES = 256 * 1024 * 1024
+
+# Incremental retranslation of a revised draft (utils/revision.py). The
+# previous run's alignment (source paragraph → translation, figure hash →
+# items) is diffed against the new document; changed paragraphs go to the model
+# together with up to REVISION_CONTEXT_PARAGRAPHS unchanged neighbours on each
+# side, whose fresh translations are only context and are thrown away.
+REVISION_CONTEXT_PARAGRAPHS = 2
+
+# Post-translation QA (utils/qa.py). Numerals, reference signs, units and 【】
+# headings of every source / target paragraph are compared after the run;
+# with QA_REQUEUE_ENABLED the flagged paragraphs (with the revision context
+# neighbours) are translated once more, and whatever still fails is listed
+# for the reviewer.
+QA_REQUEUE_ENABLED = True
+
+# Chunking (utils/chunker.py). "sections" segments TEXT at 【…】 headings
+# (paragraph numbers like 【0001】 are not headings) and packs whole sections
+# into chunks of at most CHUNK_MAX_TOKENS estimated tokens / CHUNK_MAX_PARAGRAPHS
+# paragraphs, aiming for evenly sized chunks; only an oversized section is cut,
+# at paragraph boundaries. Tokens are estimated as chars / CHUNK_CHARS_PER_TOKEN
+# (Korean runs ~2 chars per Gemini token). "words" is the original running
+# word-count cut (2000 words per chunk).
+CHUNKER_MODE = "sections"
+CHUNK_MAX_TOKENS = 4000
+CHUNK_MAX_PARAGRAPHS = 60
+CHUNK_CHARS_PER_TOKEN = 2.0
+
+# Model tiering (utils/model_routing.py): tiers ordered cheapest → strongest.
+# Off by default (everything uses the runner's model_name); the runner's
+# ``model_routing`` argument overrides per call. Light content goes to tier 0:
+# TEXT chunks under MODEL_ROUTING_LIGHT_MAX_CHARS, or in a light section
+# (heading prefixes below, e.g. 【청구항 3】) unless their paragraphs average
+# over MODEL_ROUTING_DENSE_PARAGRAPH_CHARS; figures whose edge density (a
+# cheap proxy for how much text is drawn in) is under
+# MODEL_ROUTING_FIGURE_LIGHT_EDGE_DENSITY. Everything else starts at tier 1.
+# A request that still fails validation after MODEL_ROUTING_RETRIES_PER_TIER
+# attempts escalates to the next tier; the split fallback only runs on the
+# strongest one.
+MODEL_ROUTING_ENABLED = False
+GEMINI_MODEL_TIERS = ("gemini-2.5-flash-lite", "gemini-2.5-flash", "gemini-2.5-pro")
+MODEL_ROUTING_LIGHT_SECTIONS = (
+    "청구",  # 청구범위 / 청구항 N
+    "발명의 명칭",
+    "도면의 간단한 설명",
+    "부호의 설명",
+    "요약",
+    "대표도",
+)
+MODEL_ROUTING_LIGHT_MAX_CHARS = 800
+MODEL_ROUTING_DENSE_PARAGRAPH_CHARS = 600
+MODEL_ROUTING_FIGURE_LIGHT_EDGE_DENSITY = 0.08
+MODEL_ROUTING_RETRIES_PER_TIER = 2
+
+# Process-wide quota circuit breaker (utils/translation.py), shared by every
+# run and session. A per_day 429 opens it until the next midnight in
+# QUOTA_RESET_TIMEZONE (when Gemini daily quotas reset); while open, new runs
+# and further attempts fail fast with QuotaCircuitOpenError, before any API
+# call. QUOTA_BREAKER_BURST_COUNT per_minute 429s within
+# QUOTA_BREAKER_BURST_WINDOW_S put it half-open: one request at a time goes
+# out as a probe until one succeeds, or no 429 is seen for the window.
+QUOTA_RESET_TIMEZONE = "America/Los_Angeles"
+QUOTA_BREAKER_BURST_COUNT = 3
+QUOTA_BREAKER_BURST_WINDOW_S = 60.0
+
 # Discord failure alerts. Webhook URL via st.secrets["discord_webhook_url"] or
 # env DISCORD_WEBHOOK_URL (handled in utils/notifications.py). An alert fires
 # once the SAME document fails this many times in a row within a session.
 DISCORD_ALERT_THRESHOLD = 2
+# Alerts are handed to one background dispatcher (bounded queue of
+# DISCORD_QUEUE_MAX, one pooled HTTP session) so the script thread never waits
+# on the webhook. The first alert of a failure kind is sent at once; further
+# alerts of the same kind within DISCORD_COALESCE_WINDOW_S are folded into one
+# summary at the end of the window. 429s are retried after Discord's
+# retry_after (capped at DISCORD_MAX_RETRY_AFTER_S), up to
+# DISCORD_MAX_SEND_ATTEMPTS per message.
+DISCORD_QUEUE_MAX = 100
+DISCORD_COALESCE_WINDOW_S = 300.0
+DISCORD_HTTP_TIMEOUT_S = 5.0
+DISCORD_MAX_SEND_ATTEMPTS = 3
+DISCORD_MAX_RETRY_AFTER_S = 60.0
 
 # Metrics → Google Sheets sink. Off by default; flip via env METRICS_ENABLED=1
 # or st.secrets["metrics_enabled"] (handled in utils/metrics.py).
@@ -26,6 +238,47 @@ METRICS_MAX_BUFFER_ROWS = 2000
 METRICS_SINK_IO_LOCK_TIMEOUT_S = 3.0
 METRICS_THREAD_JOIN_TIMEOUT_S = 1.0
 METRICS_ERROR_SHORT_MAX_LEN = 500
+# Batched Sheets writer (BatchedSheetsSink): one process-wide flush window for
+# all runs. A call slower than METRICS_SHEETS_SLOW_CALL_S (or failing) switches
+# to spool-only for the backoff; the spool (env METRICS_SPOOL_PATH, default in
+# the temp dir) is replayed on the next healthy window. Past the byte cap only
+# run rows are spooled, samples/chunk rows are shed.
+METRICS_SHEETS_BATCH_INTERVAL_S = 10.0
+METRICS_SHEETS_SLOW_CALL_S = 10.0
+METRICS_SHEETS_DEGRADED_BACKOFF_S = 120.0
+METRICS_SPOOL_PATH_ENV_VAR = "METRICS_SPOOL_PATH"
+METRICS_SPOOL_MAX_BYTES = 50 * 1024 * 1024
+# Per-chunk stat rows kept per run (tokens + latency, see ChunkStat). A 300-chunk
+# batch is far below this; the cap only bounds a runaway split storm.
+METRICS_MAX_CHUNK_STATS = 5000
+# Span ring buffer (chunk / API attempt / backoff sleep timings). ~3 spans per
+# attempt; older spans fall off first. Percentiles cover what's retained.
+METRICS_MAX_SPANS = 10000
+# Optional Chrome-trace / Perfetto JSON of each run's span timeline: set env
+# METRICS_TRACE_DIR to a writable directory (one <run_id>.trace.json per run).
+METRICS_TRACE_DIR_ENV_VAR = "METRICS_TRACE_DIR"
+
+# Prometheus /metrics endpoint (utils/metrics_prometheus.py). Off unless env
+# METRICS_PROMETHEUS_PORT is set; independent of METRICS_ENABLED, so it can run
+# without Sheets. Binds loopback unless METRICS_PROMETHEUS_HOST says otherwise.
+METRICS_PROMETHEUS_PORT_ENV_VAR = "METRICS_PROMETHEUS_PORT"
+METRICS_PROMETHEUS_HOST_ENV_VAR = "METRICS_PROMETHEUS_HOST"
+METRICS_PROMETHEUS_HOST = "127.0.0.1"
+# Chunk latency includes retries/backoff (MAX_BACKOFF_S = 60), hence the tail.
+METRICS_PROMETHEUS_LATENCY_BUCKETS_S = (1, 2.5, 5, 10, 20, 30, 60, 120, 300)
+# Scheduler queue wait per priority class: ~0 while workers are free, whole
+# chunk latencies once a class is saturated.
+METRICS_PROMETHEUS_QUEUE_WAIT_BUCKETS_S = (0.01, 0.1, 0.5, 1, 5, 10, 30, 60, 300)
+
+# Estimated cost per run, USD per 1M tokens keyed by model name. ``cached_input``
+# is the context-caching read rate; thinking tokens bill as output. A model that
+# is missing here leaves ``estimated_cost_usd`` empty instead of guessing.
+# Override per collector via MetricsCollector(price_table=...).
+GEMINI_PRICE_TABLE_USD_PER_1M = {
+    "gemini-2.5-flash": {"input": 0.30, "cached_input": 0.03, "output": 2.50},
+    "gemini-2.5-flash-lite": {"input": 0.10, "cached_input": 0.01, "output": 0.40},
+    "gemini-2.5-pro": {"input": 1.25, "cached_input": 0.125, "output": 10.00},
+}
 
 # Prompts for translation
 TEXT_TRANSLATION_PROMPT = (
@@ -58,3 +311,30 @@ IMAGE_TRANSLATION_PROMPT = (
     "Return the result as a JSON array with the exact keys:\n"
     '[{"original": "...", "translated": "..."}]\n'
 )
+
+IMAGE_BATCH_TRANSLATION_PROMPT = (
+    "You are a patent document processing assistant. "
+    "You will receive several patent drawing images, each preceded by a label "
+    'of the form "figure_index=N". '
+    "For EACH image, extract ALL visible Korean or English text and translate each "
+    "extracted text into Japanese using formal technical terminology. "
+    "Follow these rules strictly:\n"
+    "1. Do NOT omit any text, including labels, symbols, or reference numerals.\n"
+    "2. Do NOT interpret or explain.\n"
+    "3. Do NOT reorganize, and do NOT move text between images.\n"
+    "4. Keep each item independent.\n"
+    "5. Return exactly one entry per image, even if the image has no text "
+    "(use an empty items array).\n"
+    "Return the result as a JSON array with the exact keys:\n"
+    '[{"figure_index": N, "items": [{"original": "...", "translated": "..."}]}]\n'
+)
+
+# Appended to either figure prompt only when the figure output mode draws
+# onto the figure (overlay / legend): the boxes cost output tokens on every
+# figure call and are useless for "text" output. Requests with and without it
+# are cached under separate figure-cache namespaces.
+IMAGE_BOX_PROMPT = (
+    'Also give each item "box_2d", the bounding box of the original text in its '
+    "image as [ymin, xmin, ymax, xmax] normalized to 0-1000, e.g. "
+    '{"original": "...", "translated": "...", "box_2d": [0, 0, 0, 0]}\n'
+)
@@ -1,15 +1,28 @@
+import re
 from io import BytesIO
+from xml.sax.saxutils import escape
 
 from docx import Document
 from docx.enum.text import WD_PARAGRAPH_ALIGNMENT
-from docx.oxml.ns import qn
+from docx.oxml import parse_xml
+from docx.oxml.ns import nsdecls, qn
 from docx.shared import Pt
-from PIL import Image
+from lxml import etree
+
+from utils.elements import Element, ParagraphTable
 
 
 def parse_docx_with_images(docx_file):
+    """Return the document as a list of :class:`~utils.elements.Element`.
+
+    Paragraph text goes into one shared ``ParagraphTable`` (repeated
+    paragraphs are stored once) and figures keep the image part's bytes;
+    nothing is decoded here.
+    """
     doc = Document(docx_file)
     elements = []
+    table = ParagraphTable()
+    interned: dict[str, str] = {}
 
     rels = doc.part._rels
     image_map = {}
@@ -17,14 +30,13 @@ def parse_docx_with_images(docx_file):
     for rel in rels:
         rel_obj = rels[rel]
         if "image" in rel_obj.reltype:
-            image_bytes = rel_obj.target_part.blob
-            image = Image.open(BytesIO(image_bytes))
-            image_map[rel_obj.rId] = image
+            image_map[rel_obj.rId] = rel_obj.target_part.blob
 
     for para in doc.paragraphs:
         text = para.text.strip()
         if text:
-            elements.append({"type": "TEXT", "content": text})
+            text = interned.setdefault(text, text)
+            elements.append(Element.text(table, table.add(text)))
         for run in para.runs:
             drawing = run._element.find(
                 ".//w:drawing",
@@ -44,12 +56,16 @@ def parse_docx_with_images(docx_file):
                         "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}embed"
                     )
                     if embed_id in image_map:
-                        elements.append(
-                            {"type": "FIGURE", "content": image_map[embed_id]}
-                        )
+                        elements.append(Element.figure(image_map[embed_id]))
     return elements
 
 
+def add_paragraph_with_justify(doc, text=""):
+    paragraph = doc.add_paragraph(text)
+    paragraph.alignment = WD_PARAGRAPH_ALIGNMENT.JUSTIFY
+    return paragraph
+
+
 def create_japanese_patent_docx():
     doc = Document()
     style = doc.styles["Normal"]
@@ -58,15 +74,74 @@ def create_japanese_patent_docx():
     font.size = Pt(10.5)
     style._element.rPr.rFonts.set(qn("w:eastAsia"), "MS Gothic")
 
-    # Helper function to add justified paragraphs
-    def add_paragraph_with_justify(doc, text=""):
-        paragraph = doc.add_paragraph(text)
-        paragraph.alignment = WD_PARAGRAPH_ALIGNMENT.JUSTIFY
-        return paragraph
-
-    # Attach the helper function to the document object for convenience
+    # Attach the helper functions to the document object for convenience
     doc.add_paragraph_with_justify = lambda text="": add_paragraph_with_justify(
         doc, text
     )
+    doc.add_paragraphs_with_justify = lambda texts: add_justified_paragraphs(
+        doc, texts
+    )
+    doc.add_figure = lambda image: add_figure(doc, image)
 
     return doc
+
+
+def add_figure(doc, image: bytes):
+    """Append ``image`` (encoded bytes) centred, at most the text width."""
+    section = doc.sections[-1]
+    text_width = section.page_width - section.left_margin - section.right_margin
+    paragraph = doc.add_paragraph()
+    paragraph.alignment = WD_PARAGRAPH_ALIGNMENT.CENTER
+    picture = paragraph.add_run().add_picture(BytesIO(image))
+    if picture.width > text_width:
+        picture.height = int(picture.height * text_width / picture.width)
+        picture.width = text_width
+    return paragraph
+
+
+# Pre-rendered form of ``doc.add_paragraph(text)`` + JUSTIFY alignment. Runs
+# carry no rPr: the MS Gothic font comes from the Normal style, exactly as
+# with python-docx.
+_P_OPEN = '<w:p><w:pPr><w:jc w:val="both"/></w:pPr>'
+_P_EMPTY = _P_OPEN + "</w:p>"
+_RUN_BREAKS = re.compile(r"([\t\r\n])")
+_BREAK_XML = {"\t": "<w:tab/>", "\r": "<w:br/>", "\n": "<w:br/>"}
+
+
+def _justified_paragraph_xml(text: str) -> str:
+    """Same markup python-docx writes for a justified one-run paragraph."""
+    if not text:
+        return _P_EMPTY
+    parts = [_P_OPEN, "<w:r>"]
+    for piece in _RUN_BREAKS.split(text):
+        if piece in _BREAK_XML:
+            parts.append(_BREAK_XML[piece])
+        elif piece:
+            space = ' xml:space="preserve"' if piece.strip() != piece else ""
+            parts.append(f"<w:t{space}>{escape(piece)}</w:t>")
+    parts.append("</w:r></w:p>")
+    return "".join(parts)
+
+
+def add_justified_paragraphs(doc, texts):
+    """Append justified paragraphs for ``texts`` to ``doc`` in one operation.
+
+    Produces the same XML as calling ``add_paragraph_with_justify`` per text,
+    without building a python-docx ``Paragraph`` for each. If the batch is
+    not valid XML (e.g. control characters in model output), the texts go
+    through the slow path one by one so the error surfaces as it always has.
+    """
+    texts = list(texts)
+    if not texts:
+        return
+    body_xml = "".join(_justified_paragraph_xml(t) for t in texts)
+    try:
+        fragment = parse_xml(f"<w:body {nsdecls('w')}>{body_xml}</w:body>")
+    except etree.XMLSyntaxError:
+        for text in texts:
+            add_paragraph_with_justify(doc, text)
+        return
+    body = doc.element.body
+    sect_pr = body.sectPr
+    at = body.index(sect_pr) if sect_pr is not None else len(body)
+    body[at:at] = list(fragment)
@@ -0,0 +1,156 @@
+"""Compact records for parsed elements and translation chunks.
+
+A parsed document keeps every paragraph once, in a :class:`ParagraphTable`
+(identical paragraphs share one ``str``). An :class:`Element` is a slot
+record pointing at one table row or at a figure's encoded bytes; a TEXT
+:class:`Chunk` is a ``[start, stop)`` range of rows. Figures keep the bytes
+found in the .docx and are opened lazily — ``Image.open`` only parses the
+header, so sizing and planning never decode pixels, and decoded pixels are
+dropped as soon as the caller lets go of the image instead of living in
+``st.session_state`` for the rest of the session.
+
+Both records answer ``record["type"]`` / ``record["content"]`` /
+``record.get("translated")`` like the plain dicts used before (and still
+accepted everywhere), so the runner, the document builder and the preview
+table work with either.
+"""
+
+from __future__ import annotations
+
+from io import BytesIO
+
+from PIL import Image
+
+TEXT = "TEXT"
+FIGURE = "FIGURE"
+
+_UNSET = object()
+
+
+class ParagraphTable:
+    """Append-only list of paragraph strings shared by a document's records."""
+
+    __slots__ = ("_rows",)
+
+    def __init__(self) -> None:
+        self._rows: list[str] = []
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __getitem__(self, index: int) -> str:
+        return self._rows[index]
+
+    def add(self, text: str) -> int:
+        self._rows.append(text)
+        return len(self._rows) - 1
+
+    def rows(self, start: int, stop: int) -> list[str]:
+        return self._rows[start:stop]
+
+
+def open_figure(blob: bytes) -> Image.Image:
+    return Image.open(BytesIO(blob))
+
+
+class _Record:
+    """Read-only dict view over ``type`` / ``content`` (+ ``translated``)."""
+
+    __slots__ = ()
+    _KEYS: tuple[str, ...] = ("type", "content")
+
+    def __getitem__(self, key: str):
+        value = getattr(self, key, _UNSET) if key in self._KEYS else _UNSET
+        if value is _UNSET or (value is None and key == "translated"):
+            raise KeyError(key)
+        return value
+
+    def get(self, key: str, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __contains__(self, key: str) -> bool:
+        return self.get(key) is not None
+
+
+class Element(_Record):
+    """One parsed paragraph (table row) or one figure (encoded bytes)."""
+
+    __slots__ = ("type", "table", "index", "blob")
+
+    def __init__(self, type_, table=None, index=-1, blob=None) -> None:
+        self.type = type_
+        self.table = table
+        self.index = index
+        self.blob = blob
+
+    @classmethod
+    def text(cls, table: ParagraphTable, index: int) -> "Element":
+        return cls(TEXT, table=table, index=index)
+
+    @classmethod
+    def figure(cls, blob: bytes) -> "Element":
+        return cls(FIGURE, blob=blob)
+
+    @property
+    def content(self):
+        if self.type == TEXT:
+            return self.table[self.index]
+        return open_figure(self.blob)
+
+    def __repr__(self) -> str:
+        where = f"row {self.index}" if self.type == TEXT else f"{len(self.blob)} B"
+        return f"Element({self.type}, {where})"
+
+
+class Chunk(_Record):
+    """A unit of translation: a range of table rows, or one figure.
+
+    ``chunk["translated"] = ...`` is the one writable key; ``copy()`` is a
+    shallow copy (same table / bytes) for a worker to fill in.
+    """
+
+    __slots__ = ("type", "table", "start", "stop", "blob", "translated")
+    _KEYS = ("type", "content", "translated")
+
+    def __init__(
+        self, type_, table=None, start=0, stop=0, blob=None, translated=None
+    ) -> None:
+        self.type = type_
+        self.table = table
+        self.start = start
+        self.stop = stop
+        self.blob = blob
+        self.translated = translated
+
+    @classmethod
+    def text(cls, table: ParagraphTable, start: int, stop: int) -> "Chunk":
+        return cls(TEXT, table=table, start=start, stop=stop)
+
+    @classmethod
+    def figure(cls, blob: bytes) -> "Chunk":
+        return cls(FIGURE, blob=blob)
+
+    @property
+    def content(self):
+        """TEXT: fresh ``list[str]`` of the rows; FIGURE: a lazily opened image."""
+        if self.type == TEXT:
+            return self.table.rows(self.start, self.stop)
+        return open_figure(self.blob)
+
+    def __setitem__(self, key: str, value) -> None:
+        if key != "translated":
+            raise KeyError(f"{key!r} is read-only on a Chunk")
+        self.translated = value
+
+    def copy(self) -> "Chunk":
+        return Chunk(
+            self.type, self.table, self.start, self.stop, self.blob, self.translated
+        )
+
+    def __repr__(self) -> str:
+        if self.type == TEXT:
+            return f"Chunk(TEXT, rows {self.start}:{self.stop})"
+        return f"Chunk(FIGURE, {len(self.blob)} B)"
@@ -0,0 +1,270 @@
+"""Persistent cache of figure OCR+translation results.
+
+The same drawings (logos, standard flowchart symbols, figures reused between
+a parent and a continuation application) come back run after run. Each one
+is hashed with a difference hash (dHash) of the normalized image: alpha
+flattened on white, grayscale, auto-contrast, shrunk to a small grid. A
+lookup scans the entries of the same *namespace* (model + prompt version)
+and returns the closest one within a Hamming-distance threshold whose aspect
+ratio also matches, so a re-scan of the same sheet still hits.
+
+Storage is one SQLite file (stdlib, safe across Streamlit reruns). Hashes
+are mirrored in memory for the near-match scan. Payload bytes are bounded:
+past ``max_bytes`` the least-recently-used entries are evicted. Any storage
+error degrades to a miss — the cache never fails a translation.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+from PIL import Image, ImageOps
+
+from utils.config import (
+    FIGURE_CACHE_ASPECT_TOLERANCE,
+    FIGURE_CACHE_ENABLED_ENV_VAR,
+    FIGURE_CACHE_HASH_SIZE,
+    FIGURE_CACHE_MAX_BYTES,
+    FIGURE_CACHE_MAX_DISTANCE,
+    FIGURE_CACHE_PATH_ENV_VAR,
+)
+
+log = logging.getLogger(__name__)
+
+# Evict down to this fraction of max_bytes so a full cache does not evict on
+# every single put.
+_EVICT_TARGET_RATIO = 0.9
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS figures (
+    id INTEGER PRIMARY KEY,
+    namespace TEXT NOT NULL,
+    phash TEXT NOT NULL,
+    aspect REAL NOT NULL,
+    payload TEXT NOT NULL,
+    size_bytes INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    last_used_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS figures_last_used ON figures (last_used_at);
+"""
+
+
+def perceptual_hash(image: Image.Image, hash_size: int = FIGURE_CACHE_HASH_SIZE) -> int:
+    """``hash_size**2``-bit dHash: each bit is "left pixel brighter than right"."""
+    if image.mode in ("RGBA", "LA", "PA") or (
+        image.mode == "P" and "transparency" in image.info
+    ):
+        rgba = image.convert("RGBA")
+        background = Image.new("RGBA", rgba.size, (255, 255, 255, 255))
+        background.alpha_composite(rgba)
+        image = background
+    gray = ImageOps.autocontrast(image.convert("L"))
+    small = gray.resize((hash_size + 1, hash_size), Image.Resampling.LANCZOS)
+    px = small.tobytes()
+    bits = 0
+    for row in range(hash_size):
+        base = row * (hash_size + 1)
+        for col in range(hash_size):
+            bits = (bits << 1) | (px[base + col] > px[base + col + 1])
+    return bits
+
+
+def _aspect(image: Image.Image) -> float:
+    width, height = image.size
+    return width / height if height else 0.0
+
+
+# (dHash, aspect ratio) of one image: what lookups and stores compare.
+FigureKey = tuple[int, float]
+
+
+class FigureCache:
+    """Near-duplicate figure → ``[{"original", "translated"}, ...]`` store."""
+
+    def __init__(
+        self,
+        path: str,
+        *,
+        max_bytes: int = FIGURE_CACHE_MAX_BYTES,
+        max_distance: int = FIGURE_CACHE_MAX_DISTANCE,
+        aspect_tolerance: float = FIGURE_CACHE_ASPECT_TOLERANCE,
+        hash_size: int = FIGURE_CACHE_HASH_SIZE,
+    ) -> None:
+        self.path = path
+        self.max_bytes = max_bytes
+        self.max_distance = max_distance
+        self.aspect_tolerance = aspect_tolerance
+        self.hash_size = hash_size
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=5)
+        self._conn.executescript(_SCHEMA)
+        # namespace → {row id: (hash, aspect)}; the near-match scan never
+        # touches disk.
+        self._index: dict[str, dict[int, tuple[int, float]]] = {}
+        self._total_bytes = 0
+        for row_id, namespace, phash, aspect, size in self._conn.execute(
+            "SELECT id, namespace, phash, aspect, size_bytes FROM figures"
+        ):
+            self._index.setdefault(namespace, {})[row_id] = (int(phash, 16), aspect)
+            self._total_bytes += size
+
+    def __len__(self) -> int:
+        with self._lock:
+            return sum(len(entries) for entries in self._index.values())
+
+    @property
+    def total_bytes(self) -> int:
+        return self._total_bytes
+
+    def key(self, image: Image.Image) -> FigureKey | None:
+        """Hash ``image`` once for a :meth:`get` and the :meth:`put` after a miss.
+
+        ``None`` if the image cannot be hashed (``get`` / ``put`` then try
+        again on their own and degrade as usual).
+        """
+        try:
+            return self._key(image)
+        except Exception:
+            log.warning("[figure-cache] hashing failed", exc_info=True)
+            return None
+
+    def get(
+        self, image: Image.Image, namespace: str, key: FigureKey | None = None
+    ) -> list[dict] | None:
+        """Closest cached payload within the thresholds, or ``None``."""
+        try:
+            phash, aspect = key or self._key(image)
+            with self._lock:
+                row_id = self._nearest(namespace, phash, aspect)
+                if row_id is None:
+                    return None
+                (payload,) = self._conn.execute(
+                    "SELECT payload FROM figures WHERE id = ?", (row_id,)
+                ).fetchone()
+                self._conn.execute(
+                    "UPDATE figures SET last_used_at = ? WHERE id = ?",
+                    (time.time(), row_id),
+                )
+                self._conn.commit()
+            return json.loads(payload)
+        except Exception:
+            log.warning("[figure-cache] lookup failed; treating as miss", exc_info=True)
+            return None
+
+    def put(
+        self,
+        image: Image.Image,
+        namespace: str,
+        items: list[dict],
+        key: FigureKey | None = None,
+    ) -> None:
+        """Store ``items`` for ``image``; replaces a near-identical entry."""
+        try:
+            phash, aspect = key or self._key(image)
+            payload = json.dumps(items, ensure_ascii=False, separators=(",", ":"))
+            size = len(payload.encode("utf-8"))
+            if size > self.max_bytes:
+                return
+            now = time.time()
+            with self._lock:
+                existing = self._nearest(namespace, phash, aspect)
+                if existing is not None:
+                    self._delete(namespace, existing)
+                cur = self._conn.execute(
+                    "INSERT INTO figures (namespace, phash, aspect, payload, "
+                    "size_bytes, created_at, last_used_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (namespace, format(phash, "x"), aspect, payload, size, now, now),
+                )
+                self._index.setdefault(namespace, {})[cur.lastrowid] = (phash, aspect)
+                self._total_bytes += size
+                if self._total_bytes > self.max_bytes:
+                    self._evict(int(self.max_bytes * _EVICT_TARGET_RATIO))
+                self._conn.commit()
+        except Exception:
+            log.warning("[figure-cache] store failed; entry dropped", exc_info=True)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def _key(self, image: Image.Image) -> FigureKey:
+        return perceptual_hash(image, self.hash_size), _aspect(image)
+
+    # -- internals (caller holds self._lock) --
+
+    def _nearest(self, namespace: str, phash: int, aspect: float) -> int | None:
+        best_id = None
+        best_distance = self.max_distance + 1
+        for row_id, (other, other_aspect) in self._index.get(namespace, {}).items():
+            if abs(other_aspect - aspect) > self.aspect_tolerance * max(aspect, 1e-9):
+                continue
+            distance = (other ^ phash).bit_count()
+            if distance < best_distance:
+                best_id, best_distance = row_id, distance
+                if distance == 0:
+                    break
+        return best_id
+
+    def _delete(self, namespace: str, row_id: int) -> None:
+        row = self._conn.execute(
+            "SELECT size_bytes FROM figures WHERE id = ?", (row_id,)
+        ).fetchone()
+        self._conn.execute("DELETE FROM figures WHERE id = ?", (row_id,))
+        self._index.get(namespace, {}).pop(row_id, None)
+        if row is not None:
+            self._total_bytes -= row[0]
+
+    def _evict(self, target_bytes: int) -> None:
+        rows = self._conn.execute(
+            "SELECT id, namespace, size_bytes FROM figures ORDER BY last_used_at"
+        ).fetchall()
+        n_evicted = 0
+        for row_id, namespace, size in rows:
+            if self._total_bytes <= target_bytes:
+                break
+            self._conn.execute("DELETE FROM figures WHERE id = ?", (row_id,))
+            self._index.get(namespace, {}).pop(row_id, None)
+            self._total_bytes -= size
+            n_evicted += 1
+        log.info(
+            "[figure-cache] evicted %d entries (%d bytes left)",
+            n_evicted,
+            self._total_bytes,
+        )
+
+
+_cache_lock = threading.Lock()
+_cache: FigureCache | None = None
+
+
+def get_figure_cache() -> FigureCache | None:
+    """Process-wide :class:`FigureCache`, opened on first call.
+
+    Path from env ``FIGURE_CACHE_PATH`` (default: a file in the temp dir).
+    ``None`` when disabled via ``FIGURE_CACHE_ENABLED=0`` or when the file
+    cannot be opened — the next call tries again.
+    """
+    global _cache
+    env = os.environ.get(FIGURE_CACHE_ENABLED_ENV_VAR, "").strip().lower()
+    if env in ("0", "false", "no", "off"):
+        return None
+    with _cache_lock:
+        if _cache is not None:
+            return _cache
+        path = os.environ.get(FIGURE_CACHE_PATH_ENV_VAR) or os.path.join(
+            tempfile.gettempdir(), "ko-jp-patent-translator-figures.sqlite3"
+        )
+        try:
+            _cache = FigureCache(path)
+        except Exception:
+            log.exception("[figure-cache] failed to open %s", path)
+            return None
+        return _cache
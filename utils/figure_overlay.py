@@ -0,0 +1,289 @@
+"""Figures in the output .docx with their labels translated.
+
+``build_doc_from_translated_chunks`` used to write a figure only as its
+"original: translated" label lines. With ``FIGURE_OUTPUT_OVERLAY`` /
+``FIGURE_OUTPUT_LEGEND`` the drawing itself goes into the .docx:
+
+* overlay — each label with a ``box_2d`` is blanked out and the Japanese
+  text drawn into the box, shrunk to fit its width (down to
+  ``FIGURE_RENDER_MIN_FONT_PX``, then the box is widened);
+* legend — the drawing is left as drawn, a numbered marker is put at each
+  box and a panel below the drawing lists "N  translation".
+
+Labels without a usable box, in either mode, are listed in the legend panel.
+Labels whose translation equals the original (reference numerals, "S110")
+are left alone.
+
+Decoding, drawing and PNG encoding are CPU-bound and each figure briefly
+holds its pixels several times over, so :class:`FigureRenderer` runs
+:func:`render_figure` in a spawned process pool (fork is unsafe with the
+app's threads) whose children are recycled after
+``FIGURE_RENDER_TASKS_PER_CHILD`` figures. :meth:`FigureRenderer.render`
+submits at most ``FIGURE_RENDER_MAX_IN_FLIGHT`` figures ahead of the one the
+document builder is waiting for, so the parent holds only that many encoded
+figures and results. A figure that fails to render (or a crashed child)
+yields ``None`` and the builder falls back to the label lines.
+"""
+
+from __future__ import annotations
+
+import atexit
+import logging
+import math
+import os
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache
+from io import BytesIO
+from multiprocessing import get_context
+from typing import Iterator
+
+from PIL import Image, ImageDraw, ImageFont
+
+from utils.config import (
+    FIGURE_FONT_CANDIDATES,
+    FIGURE_FONT_PATH_ENV_VAR,
+    FIGURE_OUTPUT_OVERLAY,
+    FIGURE_RENDER_MAX_IN_FLIGHT,
+    FIGURE_RENDER_MAX_PIXELS,
+    FIGURE_RENDER_MIN_FONT_PX,
+    FIGURE_RENDER_TASKS_PER_CHILD,
+    FIGURE_RENDER_TIMEOUT_S,
+    FIGURE_RENDER_WORKERS,
+)
+
+log = logging.getLogger(__name__)
+
+# (original, translated, box_2d) — plain tuples so they pickle cheaply.
+Label = tuple[str, str, list[int]]
+
+
+@lru_cache(maxsize=1)
+def _font_path() -> str | None:
+    path = os.environ.get(FIGURE_FONT_PATH_ENV_VAR, "").strip()
+    if path:
+        return path
+    for candidate in FIGURE_FONT_CANDIDATES:
+        if os.path.exists(candidate):
+            return candidate
+    return None
+
+
+@lru_cache(maxsize=64)
+def _font(size: int):
+    path = _font_path()
+    if path is not None:
+        try:
+            return ImageFont.truetype(path, size)
+        except OSError:
+            log.warning("[figures] cannot load font %s; using Pillow's default", path)
+    return ImageFont.load_default(size)
+
+
+def _pixel_box(box, width: int, height: int) -> tuple[int, int, int, int] | None:
+    """``box_2d`` (0-1000, y first) → pixel ``(x0, y0, x1, y1)``, or None."""
+    if len(box) != 4:
+        return None
+    ymin, xmin, ymax, xmax = (min(max(v, 0), 1000) for v in box)
+    if ymax <= ymin or xmax <= xmin:
+        return None
+    return (
+        xmin * width // 1000,
+        ymin * height // 1000,
+        math.ceil(xmax * width / 1000),
+        math.ceil(ymax * height / 1000),
+    )
+
+
+def _open_scaled(blob: bytes, max_pixels: int) -> Image.Image:
+    """Decode to RGB, at most ``max_pixels`` (JPEG decodes reduced already)."""
+    with Image.open(BytesIO(blob)) as src:
+        scale = min(1.0, math.sqrt(max_pixels / max(src.width * src.height, 1)))
+        size = (max(1, int(src.width * scale)), max(1, int(src.height * scale)))
+        if scale < 1:
+            src.draft("RGB", size)
+        image = src.convert("RGB")
+    if image.size != size:
+        image = image.resize(size, Image.Resampling.LANCZOS)
+    return image
+
+
+def _draw_label(draw: ImageDraw.ImageDraw, rect, text: str) -> None:
+    x0, y0, x1, y1 = rect
+    size = max(FIGURE_RENDER_MIN_FONT_PX, int((y1 - y0) * 0.85))
+    length = draw.textlength(text, font=_font(size))
+    if length > x1 - x0:
+        size = max(FIGURE_RENDER_MIN_FONT_PX, int(size * (x1 - x0) / length))
+        length = draw.textlength(text, font=_font(size))
+    cx, cy = (x0 + x1) / 2, (y0 + y1) / 2
+    half = max(length, x1 - x0) / 2 + 1
+    draw.rectangle((cx - half, y0, cx + half, y1), fill="white")
+    draw.text((cx, cy), text, fill="black", font=_font(size), anchor="mm")
+
+
+def _draw_marker(draw: ImageDraw.ImageDraw, rect, number: int, size: int) -> None:
+    x0, y0 = rect[0], rect[1]
+    r = size * 0.7
+    draw.ellipse((x0 - r, y0 - r, x0 + r, y0 + r), fill="white", outline="black")
+    draw.text((x0, y0), str(number), fill="black", font=_font(size), anchor="mm")
+
+
+def _with_legend(image: Image.Image, lines: list[str], size: int) -> Image.Image:
+    pad, line_height = size, int(size * 1.5)
+    panel = Image.new(
+        "RGB",
+        (image.width, image.height + 2 * pad + line_height * len(lines)),
+        "white",
+    )
+    panel.paste(image, (0, 0))
+    draw = ImageDraw.Draw(panel)
+    draw.line((0, image.height, image.width, image.height), fill="black")
+    for k, line in enumerate(lines):
+        y = image.height + pad + k * line_height
+        draw.text((pad, y), line, fill="black", font=_font(size))
+    return panel
+
+
+def render_figure(
+    blob: bytes,
+    labels: list[Label],
+    mode: str = FIGURE_OUTPUT_OVERLAY,
+    max_pixels: int = FIGURE_RENDER_MAX_PIXELS,
+) -> bytes:
+    """PNG of the figure ``blob`` with ``labels`` drawn in ``mode``."""
+    image = _open_scaled(blob, max_pixels)
+    draw = ImageDraw.Draw(image)
+    marker_size = max(FIGURE_RENDER_MIN_FONT_PX + 2, image.width // 60)
+    legend: list[str] = []
+    for original, translated, box in labels:
+        translated = translated.strip()
+        if not translated or translated == original.strip():
+            continue
+        rect = _pixel_box(box, image.width, image.height)
+        if rect is not None and mode == FIGURE_OUTPUT_OVERLAY:
+            _draw_label(draw, rect, translated)
+            continue
+        legend.append(f"{len(legend) + 1}  {translated}")
+        if rect is not None:
+            _draw_marker(draw, rect, len(legend), marker_size)
+    if legend:
+        image = _with_legend(image, legend, marker_size)
+    out = BytesIO()
+    image.save(out, format="PNG")
+    return out.getvalue()
+
+
+def _figure_blob(chunk) -> bytes:
+    blob = getattr(chunk, "blob", None)
+    if blob is None:
+        buf = BytesIO()
+        chunk["content"].save(buf, format="PNG")
+        blob = buf.getvalue()
+    return blob
+
+
+def _labels(chunk) -> list[Label]:
+    return [
+        (item.original, item.translated, list(item.box_2d))
+        for item in chunk.get("translated") or []
+    ]
+
+
+class FigureRenderer:
+    """Process pool for :func:`render_figure`, created on first use."""
+
+    def __init__(
+        self,
+        max_workers: int = FIGURE_RENDER_WORKERS,
+        max_in_flight: int = FIGURE_RENDER_MAX_IN_FLIGHT,
+        timeout_s: float = FIGURE_RENDER_TIMEOUT_S,
+    ) -> None:
+        self._max_workers = max_workers
+        self._max_in_flight = max(1, max_in_flight)
+        self._timeout_s = timeout_s
+        self._lock = threading.Lock()
+        self._pool: ProcessPoolExecutor | None = None
+
+    def _executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self._max_workers,
+                    mp_context=get_context("spawn"),
+                    max_tasks_per_child=FIGURE_RENDER_TASKS_PER_CHILD,
+                )
+            return self._pool
+
+    def _discard(self, pool: ProcessPoolExecutor) -> None:
+        """Drop a broken pool; the next figure starts a fresh one."""
+        with self._lock:
+            if self._pool is pool:
+                self._pool = None
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    def render(self, chunks, mode: str) -> Iterator[bytes | None]:
+        """PNG (or ``None`` on failure) per FIGURE chunk, in document order."""
+        figures = (c for c in chunks if c["type"] == "FIGURE")
+        pending: deque = deque()
+        try:
+            while True:
+                while len(pending) < self._max_in_flight:
+                    chunk = next(figures, None)
+                    if chunk is None:
+                        break
+                    pool = self._executor()
+                    try:
+                        future = pool.submit(
+                            render_figure, _figure_blob(chunk), _labels(chunk), mode
+                        )
+                    except BrokenProcessPool:
+                        self._discard(pool)
+                        future = None
+                    pending.append((pool, future))
+                if not pending:
+                    return
+                pool, future = pending.popleft()
+                yield self._result(pool, future)
+        finally:
+            for _, future in pending:
+                if future is not None:
+                    future.cancel()
+
+    def _result(self, pool, future) -> bytes | None:
+        if future is None:
+            return None
+        try:
+            return future.result(timeout=self._timeout_s)
+        except BrokenProcessPool:
+            log.warning("[figures] render worker died; restarting the pool")
+            self._discard(pool)
+        except Exception:
+            log.exception("[figures] figure render failed; writing labels as text")
+        return None
+
+    def shutdown(self) -> None:
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+
+_renderer: FigureRenderer | None = None
+_renderer_lock = threading.Lock()
+
+
+def get_figure_renderer() -> FigureRenderer:
+    """The process-wide renderer (its pool starts on the first figure)."""
+    global _renderer
+    with _renderer_lock:
+        if _renderer is None:
+            _renderer = FigureRenderer()
+            atexit.register(_renderer.shutdown)
+        return _renderer
+
+
+def render_figures(chunks, mode: str, renderer: FigureRenderer | None = None):
+    """Shortcut for ``get_figure_renderer().render(chunks, mode)``."""
+    return (renderer or get_figure_renderer()).render(chunks, mode)
@@ -2,38 +2,62 @@
 
 See ``docs/PLAN_metrics_to_sheets.md`` for the design. Highlights:
 
-- ``MetricsCollector`` runs two background daemons (sampler + flusher) and
-  keeps an in-memory bounded sample buffer + counter dict.
+- ``MetricsCollector`` keeps an in-memory bounded sample buffer + counter
+  dict. Sampling and flushing are done by ONE process-wide service
+  (``_SamplerService``: a sampler + a flusher daemon) that started
+  collectors register with — one psutil read per tick fanned out to every
+  active run, one ``append_samples`` per sink per flush, so overhead stays
+  flat as concurrent Streamlit sessions grow.
 - ``NullMetricsCollector`` mirrors the same interface as no-ops so call
   sites never need ``if metrics is not None`` guards.
 - Sinks (``MetricsSink``) abstract the storage target — ``NullSink`` /
   ``StdoutSink`` ship here; ``SheetsSink`` is added in a follow-up commit.
+- Token usage from every ``generate_content`` response is accumulated per
+  (chunk type, model) via ``record_usage`` and priced at finalize from
+  ``GEMINI_PRICE_TABLE_USD_PER_1M``. ``track_chunk`` attributes usage and
+  latency to the chunk being translated on the calling thread.
+- ``span(name, **attrs)`` times a block (chunk, API attempt, backoff sleep)
+  into a bounded ring buffer; finalize folds it into per-name
+  p50/p95/p99 (``RunRow.span_summary``) and optionally writes a
+  Chrome-trace / Perfetto JSON timeline to ``trace_path``.
+- Sinks that also implement the live hooks (``LiveMetricsSink``, e.g. the
+  Prometheus sink) get every counter bump and span start/end in-process as
+  it happens; ``TeeSink`` fans one collector out to several sinks.
 - Lock acquisition order is fixed:
   ``_counter_lock`` → ``_buffer_lock`` → sink-internal ``_sink_io_lock``.
+  ``_span_lock`` is a leaf: nothing else is acquired while holding it.
 - The sampler never touches IO; the flusher swaps the buffer under the
   buffer lock and pushes to the sink with the lock released.
 """
 
 from __future__ import annotations
 
+import csv
+import json
 import logging
 import os
 import subprocess
 import threading
 import time
 import uuid
-from dataclasses import dataclass, field
+from collections import deque
+from contextlib import contextmanager, nullcontext
+from dataclasses import asdict, dataclass, field, fields
 from datetime import datetime, timezone
-from typing import Any, Protocol
+from functools import lru_cache
+from typing import Any, Callable, Protocol
 
+from utils.cancellation import TranslationCancelled
 from utils.config import (
+    GEMINI_PRICE_TABLE_USD_PER_1M,
     METRICS_ERROR_SHORT_MAX_LEN,
     METRICS_FLUSH_BATCH_SIZE,
     METRICS_FLUSH_INTERVAL_S,
     METRICS_MAX_BUFFER_ROWS,
+    METRICS_MAX_CHUNK_STATS,
+    METRICS_MAX_SPANS,
     METRICS_SAMPLE_INTERVAL_S,
     METRICS_SINK_IO_LOCK_TIMEOUT_S,
-    METRICS_THREAD_JOIN_TIMEOUT_S,
 )
 
 log = logging.getLogger(__name__)
@@ -51,6 +75,18 @@ COUNTER_KEYS = (
     "n_split_fallbacks",
     "n_failed_chunks",
     "n_dropped_samples",
+    "n_figure_batches",
+    "n_figure_batch_fallbacks",
+    "n_figure_cache_hits",
+    "n_runaway_aborts",
+    "n_model_escalations",
+    "n_breaker_rejections",
+    "n_reused_paragraphs",
+    "n_reused_figures",
+    "n_qa_requeued",
+    "n_qa_flagged",
+    # Not a RunRow column — feeds the live sinks' queue-depth gauge.
+    "n_chunks_submitted",
 )
 
 PHASE_TRANSLATING = "translating"
@@ -59,6 +95,17 @@ PHASE_BUILDING_DOC = "building_doc"
 STATUS_RUNNING = "running"
 STATUS_OK = "ok"
 STATUS_ERROR = "error"
+# Run abandoned by the user (cancel button, new upload, closed session).
+STATUS_CANCELLED = "cancelled"
+# Run refused up front: the process-wide quota breaker was open.
+STATUS_QUOTA_BLOCKED = "quota_blocked"
+
+# Chunk types as they appear in chunk["type"]; usage is bucketed by these.
+CHUNK_TEXT = "TEXT"
+CHUNK_FIGURE = "FIGURE"
+
+# Counters that also count toward the current chunk's ``n_api_calls``.
+_API_CALL_KEYS = ("n_text_api_calls", "n_image_api_calls")
 
 
 # ---------- sink protocol ----------
@@ -73,6 +120,13 @@ class SampleRow:
     process_cpu_pct: float
     process_threads: int
     phase: str
+    # Runs sharing this process when the reading was taken — the same RSS /
+    # CPU value is fanned out to each of them.
+    n_active_runs: int = 1
+    # Scheduler memory budget (process-wide, like the RSS): MB reserved by
+    # running tasks, and queued tasks that do not fit what is left.
+    mem_reserved_mb: float = 0.0
+    n_mem_waiting: int = 0
 
 
 @dataclass
@@ -114,6 +168,67 @@ class RunRow:
     app_version: str = ""
     n_dropped_samples: int = 0
     was_append_only: bool = False
+    n_prompt_tokens: int = 0
+    n_cached_tokens: int = 0
+    n_output_tokens: int = 0
+    n_text_prompt_tokens: int = 0
+    n_text_output_tokens: int = 0
+    n_image_prompt_tokens: int = 0
+    n_image_output_tokens: int = 0
+    estimated_cost_usd: float | None = None
+    span_summary: str = ""
+    n_figure_batches: int = 0
+    n_figure_batch_fallbacks: int = 0
+    n_figure_cache_hits: int = 0
+    n_runaway_aborts: int = 0
+    n_model_escalations: int = 0
+    n_breaker_rejections: int = 0
+    quota_breaker_state: str = ""
+    priority_class: str = ""
+    n_reused_paragraphs: int = 0
+    n_reused_figures: int = 0
+    n_qa_requeued: int = 0
+    n_qa_flagged: int = 0
+
+
+@dataclass
+class ChunkStat:
+    """Per-chunk tokens + latency, filled in by ``MetricsCollector.track_chunk``.
+
+    ``prompt_tokens`` includes ``cached_tokens`` (same convention as the
+    Gemini usage metadata); ``output_tokens`` includes thinking tokens.
+    Split fallbacks and model escalations stay inside one chunk, so their
+    calls add up here; ``model_name`` is the model of the last response.
+    """
+
+    run_id: str
+    chunk_index: int
+    chunk_type: str
+    n_items: int = 0
+    latency_s: float | None = None
+    n_api_calls: int = 0
+    prompt_tokens: int = 0
+    cached_tokens: int = 0
+    output_tokens: int = 0
+    status: str = STATUS_RUNNING
+    model_name: str = ""
+    n_escalations: int = 0
+
+
+@dataclass(frozen=True)
+class SpanRecord:
+    """One timed block. ``start_s`` is relative to the collector's t0.
+
+    ``outcome`` is ``"ok"`` or the exception class name that left the block.
+    """
+
+    name: str
+    start_s: float
+    duration_s: float
+    outcome: str
+    thread_id: int
+    thread_name: str
+    attrs: dict[str, Any] = field(default_factory=dict)
 
 
 class MetricsSink(Protocol):
@@ -131,6 +246,32 @@ class MetricsSink(Protocol):
 
     def append_samples(self, rows: list[SampleRow]) -> None: ...
 
+    # Optional: ``append_chunk_stats(rows: list[ChunkStat]) -> None``. Called
+    # once at finalize when the sink defines it; sinks without it skip the
+    # per-chunk export.
+
+
+class LiveMetricsSink(Protocol):
+    """Optional hooks for sinks that aggregate live, in-process state.
+
+    Called synchronously on worker threads, so implementations must be
+    cheap, in-memory only and never raise (the collector still guards).
+    """
+
+    def on_run_start(self, run_id: str) -> None: ...
+
+    def on_run_end(self, run_id: str, status: str) -> None: ...
+
+    def on_counter(self, run_id: str, key: str, n: int) -> None: ...
+
+    def on_span_start(self, run_id: str, name: str) -> None: ...
+
+    def on_span_end(self, run_id: str, record: SpanRecord) -> None: ...
+
+
+def _is_live_sink(sink: Any) -> bool:
+    return callable(getattr(sink, "on_span_end", None))
+
 
 class NullSink:
     def append_run(self, row: RunRow) -> Any:
@@ -158,6 +299,90 @@ class StdoutSink:
         for r in rows:
             log.info("[metrics] SAMPLE %s", r)
 
+    def append_chunk_stats(self, rows: list[ChunkStat]) -> None:
+        for r in rows:
+            log.info("[metrics] CHUNK %s", r)
+
+
+class TeeSink:
+    """Fan one collector out to a primary sink plus secondaries.
+
+    The primary owns the run handle and ``io_lock`` (so finalize's lock
+    discipline is unchanged); secondaries are best-effort and each
+    failure is logged and swallowed. Live hooks go to every sink that
+    implements them.
+    """
+
+    def __init__(self, primary: MetricsSink, *secondaries: Any) -> None:
+        self._primary = primary
+        self._secondaries = secondaries
+        self._sinks = (primary, *secondaries)
+        self._live = [s for s in self._sinks if _is_live_sink(s)]
+        # run_id → secondaries' own append_run handles, in order.
+        self._secondary_handles: dict[str, list[Any]] = {}
+        io_lock = getattr(primary, "io_lock", None)
+        if io_lock is not None:
+            self.io_lock = io_lock
+
+    def _each_secondary(self, method: str, *args: Any) -> list[Any]:
+        results: list[Any] = []
+        for sink in self._secondaries:
+            fn = getattr(sink, method, None)
+            result = None
+            if fn is not None:
+                try:
+                    result = fn(*args)
+                except Exception:
+                    log.exception("[metrics] secondary sink %s failed", method)
+            results.append(result)
+        return results
+
+    def append_run(self, row: RunRow) -> Any:
+        self._secondary_handles[row.run_id] = self._each_secondary("append_run", row)
+        return self._primary.append_run(row)
+
+    def update_run(self, handle: Any, row: RunRow) -> bool:
+        handles = self._secondary_handles.pop(row.run_id, None)
+        for i, sink in enumerate(self._secondaries):
+            fn = getattr(sink, "update_run", None)
+            if fn is None:
+                continue
+            try:
+                fn(handles[i] if handles else None, row)
+            except Exception:
+                log.exception("[metrics] secondary sink update_run failed")
+        return self._primary.update_run(handle, row)
+
+    def append_samples(self, rows: list[SampleRow]) -> None:
+        self._each_secondary("append_samples", rows)
+        self._primary.append_samples(rows)
+
+    def append_chunk_stats(self, rows: list[ChunkStat]) -> None:
+        self._each_secondary("append_chunk_stats", rows)
+        fn = getattr(self._primary, "append_chunk_stats", None)
+        if fn is not None:
+            fn(rows)
+
+    def on_run_start(self, run_id: str) -> None:
+        for sink in self._live:
+            sink.on_run_start(run_id)
+
+    def on_run_end(self, run_id: str, status: str) -> None:
+        for sink in self._live:
+            sink.on_run_end(run_id, status)
+
+    def on_counter(self, run_id: str, key: str, n: int) -> None:
+        for sink in self._live:
+            sink.on_counter(run_id, key, n)
+
+    def on_span_start(self, run_id: str, name: str) -> None:
+        for sink in self._live:
+            sink.on_span_start(run_id, name)
+
+    def on_span_end(self, run_id: str, record: SpanRecord) -> None:
+        for sink in self._live:
+            sink.on_span_end(run_id, record)
+
 
 # ---------- helpers ----------
 
@@ -182,6 +407,12 @@ def resolve_app_version() -> str:
     env = os.environ.get("APP_VERSION")
     if env:
         return env
+    return _git_version()
+
+
+@lru_cache(maxsize=1)
+def _git_version() -> str:
+    # HEAD does not move under a running process; one git call per process.
     try:
         result = subprocess.run(
             ["git", "rev-parse", "--short", "HEAD"],
@@ -198,6 +429,123 @@ def resolve_app_version() -> str:
     return "unknown"
 
 
+def estimate_cost_usd(
+    usage_by_model: dict[str, tuple[int, int, int]],
+    price_table: dict[str, dict[str, float]],
+) -> float | None:
+    """Price ``{model: (prompt, cached, output)}`` token totals in USD.
+
+    Cached tokens are a subset of prompt tokens and bill at the
+    ``cached_input`` rate instead of ``input``. Returns ``None`` when any
+    model that actually consumed tokens is missing from ``price_table`` —
+    a partial sum would silently under-report.
+    """
+    total = 0.0
+    for model, (prompt, cached, output) in usage_by_model.items():
+        if not (prompt or cached or output):
+            continue
+        prices = price_table.get(model)
+        if prices is None:
+            return None
+        uncached = max(0, prompt - cached)
+        total += (
+            uncached * prices.get("input", 0.0)
+            + cached * prices.get("cached_input", prices.get("input", 0.0))
+            + output * prices.get("output", 0.0)
+        ) / 1_000_000
+    return round(total, 6)
+
+
+def write_chunk_stats_csv(stats: list[ChunkStat], fp) -> None:
+    """Write chunk stats as CSV (header + one row per chunk) to a text file."""
+    writer = csv.writer(fp)
+    columns = [f.name for f in fields(ChunkStat)]
+    writer.writerow(columns)
+    for s in stats:
+        d = asdict(s)
+        writer.writerow(["" if d[c] is None else d[c] for c in columns])
+
+
+def _percentile(sorted_vals: list[float], q: float) -> float:
+    """Linear-interpolated percentile (numpy's default) of a sorted list."""
+    if len(sorted_vals) == 1:
+        return sorted_vals[0]
+    pos = (len(sorted_vals) - 1) * q / 100.0
+    lo = int(pos)
+    hi = min(lo + 1, len(sorted_vals) - 1)
+    return sorted_vals[lo] + (sorted_vals[hi] - sorted_vals[lo]) * (pos - lo)
+
+
+def summarize_spans(spans: list[SpanRecord]) -> dict[str, dict[str, float]]:
+    """Per span name: count, total, p50/p95/p99 and max duration (seconds).
+
+    ``total_s`` is what answers "how much went to backoff sleeps vs.
+    API calls"; the percentiles show which attempts/chunks were slow.
+    """
+    by_name: dict[str, list[float]] = {}
+    for sp in spans:
+        by_name.setdefault(sp.name, []).append(sp.duration_s)
+    out: dict[str, dict[str, float]] = {}
+    for name, vals in sorted(by_name.items()):
+        vals.sort()
+        out[name] = {
+            "n": len(vals),
+            "total_s": round(sum(vals), 3),
+            "p50": round(_percentile(vals, 50), 3),
+            "p95": round(_percentile(vals, 95), 3),
+            "p99": round(_percentile(vals, 99), 3),
+            "max": round(vals[-1], 3),
+        }
+    return out
+
+
+def write_chrome_trace(spans: list[SpanRecord], fp, *, run_id: str = "") -> None:
+    """Dump spans as Chrome trace-event JSON (loads in Perfetto / chrome://tracing).
+
+    Every span becomes a complete ("X") event on its worker thread's track.
+    """
+    events: list[dict[str, Any]] = []
+    seen_threads: dict[int, str] = {}
+    for sp in spans:
+        seen_threads.setdefault(sp.thread_id, sp.thread_name)
+        args = {
+            k: v if isinstance(v, (int, float, str, bool)) else str(v)
+            for k, v in sp.attrs.items()
+        }
+        args["outcome"] = sp.outcome
+        events.append(
+            {
+                "name": sp.name,
+                "cat": sp.name.split("_", 1)[0],
+                "ph": "X",
+                "ts": round(sp.start_s * 1e6),
+                "dur": round(sp.duration_s * 1e6),
+                "pid": 1,
+                "tid": sp.thread_id,
+                "args": args,
+            }
+        )
+    for tid, tname in seen_threads.items():
+        events.append(
+            {
+                "name": "thread_name",
+                "ph": "M",
+                "pid": 1,
+                "tid": tid,
+                "args": {"name": tname},
+            }
+        )
+    events.append(
+        {
+            "name": "process_name",
+            "ph": "M",
+            "pid": 1,
+            "args": {"name": f"translation run {run_id}".strip()},
+        }
+    )
+    json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, fp)
+
+
 # ---------- collector ----------
 
 
@@ -230,10 +578,10 @@ class _PhaseTracker:
 class MetricsCollector:
     """Live, thread-safe metrics aggregator for one translation run.
 
-    Spawns two daemon threads on ``start()``:
-      - sampler: reads psutil ~sample_interval_s, appends to buffer
-      - flusher: every flush_interval_s (or when buffer >= batch_size)
-        swaps the buffer and pushes to the sink
+    ``start()`` registers with the process-wide ``_SamplerService``,
+    which feeds the buffer from its shared psutil readings (every
+    ~sample_interval_s) and pushes it to the sink every flush_interval_s
+    (or when buffer >= batch_size). ``stop_and_finalize`` unregisters.
 
     ``incr`` / ``set_phase`` / ``record`` / ``record_failed_chunk`` are
     safe to call from worker threads. The sampler/flusher never block on
@@ -249,31 +597,53 @@ class MetricsCollector:
         flush_interval_s: float = METRICS_FLUSH_INTERVAL_S,
         flush_batch_size: int = METRICS_FLUSH_BATCH_SIZE,
         max_buffer_rows: int = METRICS_MAX_BUFFER_ROWS,
+        max_chunk_stats: int = METRICS_MAX_CHUNK_STATS,
+        price_table: dict[str, dict[str, float]] | None = None,
+        max_spans: int = METRICS_MAX_SPANS,
+        trace_path: str | None = None,
     ) -> None:
         self.run_id = run_id or str(uuid.uuid4())
         self._sink = sink
+        self._live: LiveMetricsSink | None = sink if _is_live_sink(sink) else None
         self._sample_interval_s = sample_interval_s
         self._flush_interval_s = flush_interval_s
         self._flush_batch_size = flush_batch_size
         self._max_buffer_rows = max_buffer_rows
+        self._max_chunk_stats = max_chunk_stats
+        self._price_table = (
+            price_table if price_table is not None else GEMINI_PRICE_TABLE_USD_PER_1M
+        )
 
         self._counter_lock = threading.Lock()
         self._buffer_lock = threading.Lock()
         self._counters: dict[str, int] = {k: 0 for k in COUNTER_KEYS}
+        # (chunk_type, model_name) → [prompt, cached, output]; guarded by
+        # _counter_lock like the plain counters.
+        self._usage: dict[tuple[str, str], list[int]] = {}
         self._buffer: list[SampleRow] = []
         self._phase = _PhaseTracker()
+        # Finished ChunkStat rows (guarded by _buffer_lock) and the chunk
+        # currently being translated on each worker thread.
+        self._chunk_stats: list[ChunkStat] = []
+        self._tls = threading.local()
+        # Ring buffer of finished spans: the newest max_spans survive.
+        self._span_lock = threading.Lock()
+        self._spans: deque[SpanRecord] = deque(maxlen=max_spans)
+        self._trace_path = trace_path
+        # Span clock origin; re-based in start() so the trace lines up with
+        # the run. Spans recorded before start() (benchmark) use construction.
+        self._t0_mono = time.monotonic()
 
         self._started_at_wall: str = ""
         self._started_at_mono: float = 0.0
         self._run_handle: Any = None
         self._was_append_only = False
         self._run_meta: dict[str, Any] = {}
+        # stop_and_finalize runs once: a second call (the session's next run
+        # replacing this one, then the run's own finally) is a no-op.
+        self._finalize_lock = threading.Lock()
+        self._finalized = False
 
-        self._stop_evt = threading.Event()
-        self._flush_kick = threading.Event()
-        self._sampler: threading.Thread | None = None
-        self._flusher: threading.Thread | None = None
-        self._proc = None  # lazy psutil.Process — None means sampling disabled
         self._sample_peaks: dict[str, float | int | None] = {
             "peak_ram_mb": None,
             "peak_threads": None,
@@ -287,10 +657,12 @@ class MetricsCollector:
     def start(self, initial_phase: str = "") -> None:
         self._started_at_wall = _now_iso()
         self._started_at_mono = time.monotonic()
+        self._t0_mono = self._started_at_mono
         # Seed the phase tracker so the very first sample (which the sampler
         # may take immediately after the threads spin up) carries the right
         # phase label instead of an empty string.
         self._phase.transition(initial_phase, self._started_at_mono)
+        self._notify_live("on_run_start", self.run_id)
 
         run_row = self._snapshot_run_row(STATUS_RUNNING)
         try:
@@ -300,30 +672,35 @@ class MetricsCollector:
             self._run_handle = None
             self._was_append_only = True
 
-        self._proc = self._init_psutil()
-        self._sampler = threading.Thread(
-            target=self._sampler_loop, name="metrics-sampler", daemon=True
-        )
-        self._flusher = threading.Thread(
-            target=self._flusher_loop, name="metrics-flusher", daemon=True
-        )
-        self._sampler.start()
-        self._flusher.start()
+        _SAMPLER_SERVICE.register(self)
 
     def stop_and_finalize(
         self,
         status: str,
         error: BaseException | None = None,
     ) -> None:
+        with self._finalize_lock:
+            if self._finalized:
+                return
+            self._finalized = True
+        _forget_active_collector(self)
         now = time.monotonic()
         with self._buffer_lock:
             self._phase.close(now)
 
-        self._stop_evt.set()
-        self._flush_kick.set()
-        for t in (self._sampler, self._flusher):
-            if t is not None:
-                t.join(timeout=METRICS_THREAD_JOIN_TIMEOUT_S)
+        # After this no new samples arrive; a flush already in progress on
+        # the service thread may still deliver rows it swapped out.
+        _SAMPLER_SERVICE.unregister(self)
+
+        # Before the sink IO lock: live state must be released even when
+        # the Sheets side is hung and the run update gets skipped.
+        self._notify_live("on_run_end", self.run_id, status)
+
+        if self._trace_path:
+            try:
+                self.write_trace(self._trace_path)
+            except Exception:
+                log.exception("[metrics] trace export failed (%s)", self._trace_path)
 
         # Try to acquire sink IO lock with a hard cap so a hung flusher
         # doesn't block the user's page transition forever.
@@ -349,6 +726,15 @@ class MetricsCollector:
             except Exception:
                 log.exception("[metrics] final samples flush failed")
 
+            append_chunks = getattr(self._sink, "append_chunk_stats", None)
+            if append_chunks is not None:
+                try:
+                    stats = self.chunk_stats()
+                    if stats:
+                        append_chunks(stats)
+                except Exception:
+                    log.exception("[metrics] chunk stats export failed")
+
             row = self._snapshot_run_row(status, error=error)
             try:
                 if self._run_handle is None:
@@ -368,6 +754,148 @@ class MetricsCollector:
             return
         with self._counter_lock:
             self._counters[key] += n
+        if self._live is not None:
+            self._notify_live("on_counter", self.run_id, key, n)
+        if key in _API_CALL_KEYS or key == "n_model_escalations":
+            stat = getattr(self._tls, "chunk", None)
+            if stat is not None:
+                if key == "n_model_escalations":
+                    stat.n_escalations += n
+                else:
+                    stat.n_api_calls += n
+
+    def record_usage(
+        self,
+        chunk_type: str,
+        model_name: str,
+        *,
+        prompt_tokens: int = 0,
+        cached_tokens: int = 0,
+        output_tokens: int = 0,
+    ) -> None:
+        """Add one response's token usage to the run (and the current chunk)."""
+        with self._counter_lock:
+            acc = self._usage.setdefault((chunk_type, model_name), [0, 0, 0])
+            acc[0] += prompt_tokens
+            acc[1] += cached_tokens
+            acc[2] += output_tokens
+        # Only the owning worker thread touches its in-flight ChunkStat, so
+        # no lock is needed until track_chunk publishes it.
+        stat = getattr(self._tls, "chunk", None)
+        if stat is not None:
+            stat.model_name = model_name
+            stat.prompt_tokens += prompt_tokens
+            stat.cached_tokens += cached_tokens
+            stat.output_tokens += output_tokens
+
+    def usage_by_model(self) -> dict[str, tuple[int, int, int]]:
+        """``{model: (prompt, cached, output)}`` tokens so far, for pricing."""
+        with self._counter_lock:
+            usage = {k: tuple(v) for k, v in self._usage.items()}
+        by_model: dict[str, list[int]] = {}
+        for (_, model), vals in usage.items():
+            bucket = by_model.setdefault(model, [0, 0, 0])
+            for i, v in enumerate(vals):
+                bucket[i] += v
+        return {m: tuple(v) for m, v in by_model.items()}
+
+    @contextmanager
+    def track_chunk(self, index: int, chunk_type: str, n_items: int = 0):
+        """Attribute API calls / tokens on this thread to one chunk and time it.
+
+        The finished :class:`ChunkStat` is kept for finalize (bounded by
+        ``max_chunk_stats``) and exported via ``chunk_stats()``.
+        """
+        stat = ChunkStat(
+            run_id=self.run_id,
+            chunk_index=index,
+            chunk_type=chunk_type,
+            n_items=n_items,
+        )
+        prev = getattr(self._tls, "chunk", None)
+        self._tls.chunk = stat
+        t0 = time.monotonic()
+        try:
+            yield stat
+            stat.status = STATUS_OK
+        except TranslationCancelled:
+            stat.status = STATUS_CANCELLED
+            raise
+        except BaseException:
+            stat.status = STATUS_ERROR
+            raise
+        finally:
+            stat.latency_s = round(time.monotonic() - t0, 3)
+            self._tls.chunk = prev
+            with self._buffer_lock:
+                if len(self._chunk_stats) < self._max_chunk_stats:
+                    self._chunk_stats.append(stat)
+
+    def chunk_stats(self) -> list[ChunkStat]:
+        """Finished chunk stats in chunk-index order (copy)."""
+        with self._buffer_lock:
+            stats = list(self._chunk_stats)
+        return sorted(stats, key=lambda s: s.chunk_index)
+
+    @contextmanager
+    def span(self, name: str, **attrs: Any):
+        """Time the enclosed block as one :class:`SpanRecord`.
+
+        The yielded dict is the span's attrs — callers may add to it
+        before the block exits. Inside ``track_chunk`` the chunk index is
+        attached automatically so attempts/sleeps map back to their chunk.
+        """
+        stat = getattr(self._tls, "chunk", None)
+        if stat is not None:
+            attrs.setdefault("chunk", stat.chunk_index)
+        if self._live is not None:
+            self._notify_live("on_span_start", self.run_id, name)
+        outcome = "ok"
+        start = time.monotonic()
+        try:
+            yield attrs
+        except BaseException as e:
+            outcome = type(e).__name__
+            raise
+        finally:
+            self._append_span(name, start, time.monotonic(), outcome, attrs)
+
+    def record_span(self, name: str, start: float, end: float, **attrs: Any) -> None:
+        """Add a span timed elsewhere (``time.monotonic()`` start / end).
+
+        For intervals that do not enclose one block of code on one thread,
+        e.g. a task's wait in the scheduler queue (submitted on the run
+        thread, started on a worker). Only ``on_span_end`` is notified.
+        """
+        self._append_span(name, start, end, "ok", attrs)
+
+    def _append_span(
+        self, name: str, start: float, end: float, outcome: str, attrs: dict
+    ) -> None:
+        thread = threading.current_thread()
+        record = SpanRecord(
+            name=name,
+            start_s=round(start - self._t0_mono, 6),
+            duration_s=round(max(0.0, end - start), 6),
+            outcome=outcome,
+            thread_id=thread.ident or 0,
+            thread_name=thread.name,
+            attrs=attrs,
+        )
+        with self._span_lock:
+            self._spans.append(record)
+        if self._live is not None:
+            self._notify_live("on_span_end", self.run_id, record)
+
+    def spans(self) -> list[SpanRecord]:
+        """Spans still in the ring buffer, oldest first (copy)."""
+        with self._span_lock:
+            return list(self._spans)
+
+    def write_trace(self, path: str) -> None:
+        """Write the run timeline as Chrome-trace JSON to ``path``."""
+        with open(path, "w", encoding="utf-8") as f:
+            write_chrome_trace(self.spans(), f, run_id=self.run_id)
 
     def set_phase(self, phase: str) -> None:
         now = time.monotonic()
@@ -384,46 +912,38 @@ class MetricsCollector:
 
     # ----- internals -----
 
-    def _init_psutil(self):
+    def _notify_live(self, method: str, *args: Any) -> None:
+        if self._live is None:
+            return
         try:
-            import psutil  # noqa: F401 — local import so import failures don't kill the app
-
-            proc = psutil.Process()
-            proc.cpu_percent(interval=None)  # warm-up; first reading is 0/garbage
-            return proc
+            getattr(self._live, method)(*args)
         except Exception:
-            log.exception("[metrics] psutil unavailable — sampling disabled")
-            return None
+            log.exception("[metrics] live sink %s failed", method)
 
-    def _sampler_loop(self) -> None:
-        if self._proc is None:
-            return
-        while not self._stop_evt.is_set():
-            try:
-                self._take_sample()
-            except Exception:
-                log.exception("[metrics] sampler iteration failed")
-            self._stop_evt.wait(self._sample_interval_s)
+    def _ingest_sample(self, reading: _Reading) -> bool:
+        """Buffer one shared process reading for this run.
 
-    def _take_sample(self) -> None:
-        assert self._proc is not None
-        now_mono = time.monotonic()
-        mem = self._proc.memory_info().rss / (1024 * 1024)
-        cpu = self._proc.cpu_percent(interval=None)
-        threads = self._proc.num_threads()
-        sampled_at = _now_iso()
-        t_offset = max(0.0, now_mono - self._started_at_mono)
+        Called by the sampler service. Returns True once the buffer has
+        reached ``flush_batch_size`` so the service can kick a flush.
+        """
+        mem = reading.ram_mb
+        cpu = reading.cpu_pct
+        threads = reading.threads
+        t_offset = max(0.0, reading.mono - self._started_at_mono)
 
         with self._buffer_lock:
             phase = self._phase.current_phase or ""
             row = SampleRow(
                 run_id=self.run_id,
-                sampled_at=sampled_at,
+                sampled_at=reading.sampled_at,
                 t_offset_s=round(t_offset, 3),
                 ram_mb=round(mem, 2),
                 process_cpu_pct=round(cpu, 2),
                 process_threads=threads,
                 phase=phase,
+                n_active_runs=reading.n_active_runs,
+                mem_reserved_mb=round(reading.mem_reserved_mb, 2),
+                n_mem_waiting=reading.n_mem_waiting,
             )
             if len(self._buffer) >= self._max_buffer_rows:
                 # drop oldest, keep newest — analysis cares about the
@@ -454,23 +974,7 @@ class MetricsCollector:
             self._sample_peaks["cpu_sum"] += cpu
             self._sample_peaks["cpu_count"] += 1
 
-        if buf_len >= self._flush_batch_size:
-            self._flush_kick.set()
-
-    def _flusher_loop(self) -> None:
-        while not self._stop_evt.is_set():
-            triggered = self._flush_kick.wait(timeout=self._flush_interval_s)
-            self._flush_kick.clear()
-            if self._stop_evt.is_set():
-                return
-            try:
-                batch = self._swap_buffer()
-                if batch:
-                    self._sink.append_samples(batch)
-            except Exception:
-                log.exception(
-                    "[metrics] flusher iteration failed (triggered=%s)", triggered
-                )
+        return buf_len >= self._flush_batch_size
 
     def _swap_buffer(self) -> list[SampleRow]:
         with self._buffer_lock:
@@ -485,6 +989,22 @@ class MetricsCollector:
     ) -> RunRow:
         with self._counter_lock:
             counters = dict(self._counters)
+            usage = {k: tuple(v) for k, v in self._usage.items()}
+
+        by_type: dict[str, list[int]] = {}
+        by_model: dict[str, list[int]] = {}
+        for (chunk_type, model), vals in usage.items():
+            for bucket in (
+                by_type.setdefault(chunk_type, [0, 0, 0]),
+                by_model.setdefault(model, [0, 0, 0]),
+            ):
+                for i, v in enumerate(vals):
+                    bucket[i] += v
+        text_usage = by_type.get(CHUNK_TEXT, [0, 0, 0])
+        image_usage = by_type.get(CHUNK_FIGURE, [0, 0, 0])
+        cost = estimate_cost_usd(
+            {m: tuple(v) for m, v in by_model.items()}, self._price_table
+        )
 
         with self._buffer_lock:
             meta = dict(self._run_meta)
@@ -500,6 +1020,8 @@ class MetricsCollector:
         with self._peaks_lock:
             peaks = dict(self._sample_peaks)
 
+        span_summary = summarize_spans(self.spans())
+
         cpu_avg = None
         if peaks["cpu_count"]:
             cpu_avg = peaks["cpu_sum"] / peaks["cpu_count"]
@@ -558,7 +1080,198 @@ class MetricsCollector:
             app_version=str(meta.get("app_version") or resolve_app_version()),
             n_dropped_samples=counters["n_dropped_samples"],
             was_append_only=self._was_append_only,
+            n_prompt_tokens=sum(v[0] for v in by_model.values()),
+            n_cached_tokens=sum(v[1] for v in by_model.values()),
+            n_output_tokens=sum(v[2] for v in by_model.values()),
+            n_text_prompt_tokens=text_usage[0],
+            n_text_output_tokens=text_usage[2],
+            n_image_prompt_tokens=image_usage[0],
+            n_image_output_tokens=image_usage[2],
+            estimated_cost_usd=cost,
+            span_summary=json.dumps(span_summary, separators=(",", ":"))
+            if span_summary
+            else "",
+            n_figure_batches=counters["n_figure_batches"],
+            n_figure_batch_fallbacks=counters["n_figure_batch_fallbacks"],
+            n_figure_cache_hits=counters["n_figure_cache_hits"],
+            n_runaway_aborts=counters["n_runaway_aborts"],
+            n_model_escalations=counters["n_model_escalations"],
+            n_breaker_rejections=counters["n_breaker_rejections"],
+            quota_breaker_state=str(meta.get("quota_breaker_state", "")),
+            priority_class=str(meta.get("priority_class", "")),
+            n_reused_paragraphs=counters["n_reused_paragraphs"],
+            n_reused_figures=counters["n_reused_figures"],
+            n_qa_requeued=counters["n_qa_requeued"],
+            n_qa_flagged=counters["n_qa_flagged"],
+        )
+
+
+@dataclass(frozen=True)
+class _Reading:
+    """One psutil reading of the whole process, shared by all active runs."""
+
+    mono: float
+    sampled_at: str
+    ram_mb: float
+    cpu_pct: float
+    threads: int
+    n_active_runs: int
+    mem_reserved_mb: float = 0.0
+    n_mem_waiting: int = 0
+
+
+class _SamplerService:
+    """Process-wide sampler + flusher that started collectors register with.
+
+    - sampler thread: every ``min(sample_interval_s)`` of the registered
+      collectors, reads psutil ONCE and hands the reading to every active
+      collector (tagged with the active-run count). Never touches IO.
+    - flusher thread: every ``min(flush_interval_s)`` (or when a buffer
+      hits its batch size) swaps all collectors' buffers and sends one
+      ``append_samples`` per distinct sink.
+
+    Both threads exit when the last collector unregisters and are
+    restarted by the next ``register``. ``_lock`` guards the registry
+    only and is never held while calling into collectors or sinks.
+
+    The memory-budget columns come from ``memory_stats`` (``(bytes
+    reserved, tasks waiting)``), set by whoever owns the budget — see
+    :func:`set_memory_stats_provider`; without one they stay 0.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._collectors: list[MetricsCollector] = []
+        self._sampler: threading.Thread | None = None
+        self._flusher: threading.Thread | None = None
+        self._sample_wake = threading.Event()
+        self._flush_kick = threading.Event()
+        self._proc = None  # lazy psutil.Process — None means sampling disabled
+        self._psutil_checked = False
+        self.memory_stats: Callable[[], tuple[int, int]] | None = None
+
+    def register(self, collector: MetricsCollector) -> None:
+        with self._lock:
+            if collector not in self._collectors:
+                self._collectors.append(collector)
+            if not self._psutil_checked:
+                self._proc = self._init_psutil()
+                self._psutil_checked = True
+            if self._sampler is None and self._proc is not None:
+                self._sampler = threading.Thread(
+                    target=self._sampler_loop, name="metrics-sampler", daemon=True
+                )
+                self._sampler.start()
+            if self._flusher is None:
+                self._flusher = threading.Thread(
+                    target=self._flusher_loop, name="metrics-flusher", daemon=True
+                )
+                self._flusher.start()
+        # Sample right away so even a very short run gets one row.
+        self._sample_wake.set()
+
+    def unregister(self, collector: MetricsCollector) -> None:
+        with self._lock:
+            if collector in self._collectors:
+                self._collectors.remove(collector)
+
+    def active_count(self) -> int:
+        with self._lock:
+            return len(self._collectors)
+
+    def _snapshot(self, thread_attr: str) -> list[MetricsCollector] | None:
+        """Registered collectors, or None (and clear the thread slot) if idle."""
+        with self._lock:
+            if not self._collectors:
+                setattr(self, thread_attr, None)
+                return None
+            return list(self._collectors)
+
+    def _init_psutil(self):
+        try:
+            import psutil  # local import so import failures don't kill the app
+
+            proc = psutil.Process()
+            proc.cpu_percent(interval=None)  # warm-up; first reading is 0/garbage
+            return proc
+        except Exception:
+            log.exception("[metrics] psutil unavailable — sampling disabled")
+            return None
+
+    def _sampler_loop(self) -> None:
+        while True:
+            collectors = self._snapshot("_sampler")
+            if collectors is None:
+                return
+            try:
+                self._sample_once(collectors)
+            except Exception:
+                log.exception("[metrics] sampler iteration failed")
+            interval = min(c._sample_interval_s for c in collectors)
+            self._sample_wake.wait(interval)
+            self._sample_wake.clear()
+
+    def _sample_once(self, collectors: list[MetricsCollector]) -> None:
+        proc = self._proc
+        memory_stats = self.memory_stats
+        reserved, n_mem_waiting = memory_stats() if memory_stats else (0, 0)
+        reading = _Reading(
+            mono=time.monotonic(),
+            sampled_at=_now_iso(),
+            ram_mb=proc.memory_info().rss / (1024 * 1024),
+            cpu_pct=proc.cpu_percent(interval=None),
+            threads=proc.num_threads(),
+            n_active_runs=len(collectors),
+            mem_reserved_mb=reserved / (1024 * 1024),
+            n_mem_waiting=n_mem_waiting,
         )
+        kick = False
+        for c in collectors:
+            kick = c._ingest_sample(reading) or kick
+        if kick:
+            self._flush_kick.set()
+
+    def _flusher_loop(self) -> None:
+        while True:
+            collectors = self._snapshot("_flusher")
+            if collectors is None:
+                return
+            interval = min(c._flush_interval_s for c in collectors)
+            triggered = self._flush_kick.wait(timeout=interval)
+            self._flush_kick.clear()
+            try:
+                self._flush_once(collectors)
+            except Exception:
+                log.exception(
+                    "[metrics] flusher iteration failed (triggered=%s)", triggered
+                )
+
+    def _flush_once(self, collectors: list[MetricsCollector]) -> None:
+        by_sink: dict[int, tuple[MetricsSink, list[SampleRow]]] = {}
+        for c in collectors:
+            batch = c._swap_buffer()
+            if batch:
+                by_sink.setdefault(id(c._sink), (c._sink, []))[1].extend(batch)
+        for sink, rows in by_sink.values():
+            try:
+                sink.append_samples(rows)
+            except Exception:
+                log.exception("[metrics] samples flush failed (n=%d)", len(rows))
+
+
+_SAMPLER_SERVICE = _SamplerService()
+
+
+def set_memory_stats_provider(
+    provider: Callable[[], tuple[int, int]] | None,
+) -> None:
+    """Source of the samples' ``mem_reserved_mb`` / ``n_mem_waiting``.
+
+    :func:`utils.scheduler.get_scheduler` registers the process-wide
+    scheduler here when it creates it, so metrics never imports the
+    execution layer.
+    """
+    _SAMPLER_SERVICE.memory_stats = provider
 
 
 class NullMetricsCollector:
@@ -574,7 +1287,9 @@ class NullMetricsCollector:
 
     def stop_and_finalize(
         self, status: str, error: BaseException | None = None
-    ) -> None: ...
+    ) -> None:
+        # Registered per session like a real run, so it leaves the same way.
+        _forget_active_collector(self)
 
     def incr(self, key: str, n: int = 1) -> None: ...
 
@@ -584,18 +1299,56 @@ class NullMetricsCollector:
 
     def record_failed_chunk(self, n: int = 1) -> None: ...
 
+    def record_usage(
+        self,
+        chunk_type: str,
+        model_name: str,
+        *,
+        prompt_tokens: int = 0,
+        cached_tokens: int = 0,
+        output_tokens: int = 0,
+    ) -> None: ...
+
+    def usage_by_model(self) -> dict[str, tuple[int, int, int]]:
+        return {}
+
+    def track_chunk(self, index: int, chunk_type: str, n_items: int = 0):
+        return nullcontext()
 
-# ---------- module-level active collector (for Streamlit rerun handling) ----------
+    def chunk_stats(self) -> list[ChunkStat]:
+        return []
+
+    def span(self, name: str, **attrs: Any):
+        return nullcontext(attrs)
+
+    def record_span(
+        self, name: str, start: float, end: float, **attrs: Any
+    ) -> None: ...
+
+    def spans(self) -> list[SpanRecord]:
+        return []
+
+    def write_trace(self, path: str) -> None: ...
+
+
+# ---------- per-session active collector (for Streamlit rerun handling) ----------
 
 _active_lock = threading.Lock()
-_active_collector: MetricsCollector | NullMetricsCollector | None = None
+_active_collectors: dict[str, MetricsCollector | NullMetricsCollector] = {}
+
 
+def set_active_collector(
+    c: MetricsCollector | NullMetricsCollector, key: str = ""
+) -> None:
+    """Make ``c`` the running collector of session ``key``.
 
-def set_active_collector(c: MetricsCollector | NullMetricsCollector) -> None:
-    global _active_collector
+    A collector the same session left running (a run whose ``finally``
+    never ran) is finalized as an error. Runs of other sessions share the
+    process and are left alone.
+    """
     with _active_lock:
-        prev = _active_collector
-        _active_collector = c
+        prev = _active_collectors.get(key)
+        _active_collectors[key] = c
     if prev is not None and prev is not c and isinstance(prev, MetricsCollector):
         try:
             prev.stop_and_finalize(STATUS_ERROR, RuntimeError("replaced by new run"))
@@ -603,6 +1356,13 @@ def set_active_collector(c: MetricsCollector | NullMetricsCollector) -> None:
             log.exception("[metrics] failed to stop previous active collector")
 
 
-def get_active_collector() -> MetricsCollector | NullMetricsCollector:
+def _forget_active_collector(c: MetricsCollector | NullMetricsCollector) -> None:
+    # Finished runs leave the registry, so it holds running collectors only.
+    with _active_lock:
+        for key in [k for k, v in _active_collectors.items() if v is c]:
+            del _active_collectors[key]
+
+
+def get_active_collector(key: str = "") -> MetricsCollector | NullMetricsCollector:
     with _active_lock:
-        return _active_collector or NullMetricsCollector()
+        return _active_collectors.get(key) or NullMetricsCollector()
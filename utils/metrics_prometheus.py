@@ -0,0 +1,361 @@
+"""Prometheus / OpenMetrics exposition sink for :mod:`utils.metrics`.
+
+One process-wide :class:`PrometheusSink` aggregates every concurrent run
+(all Streamlit sessions share the process) into plain in-memory counters,
+gauges and histograms. Collectors feed it through the live hooks
+(``on_counter`` / ``on_span_start`` / ``on_span_end`` / ``on_run_*``), so the
+hot path is a dict update under a short lock — no network IO. Prometheus
+pulls the text exposition from a local ``/metrics`` endpoint served by a
+daemon ``ThreadingHTTPServer``.
+
+Dependency-free on purpose (no ``prometheus_client``): the exposition format
+is a handful of lines and this keeps the Streamlit Cloud image unchanged.
+Enable with env ``METRICS_PROMETHEUS_PORT``; see :func:`get_prometheus_sink`.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+
+from utils.config import (
+    METRICS_PROMETHEUS_HOST,
+    METRICS_PROMETHEUS_HOST_ENV_VAR,
+    METRICS_PROMETHEUS_LATENCY_BUCKETS_S,
+    METRICS_PROMETHEUS_PORT_ENV_VAR,
+    METRICS_PROMETHEUS_QUEUE_WAIT_BUCKETS_S,
+)
+from utils.metrics import ChunkStat, RunRow, SampleRow, SpanRecord
+
+log = logging.getLogger(__name__)
+
+_PREFIX = "translator"
+_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Span names that represent one unit of chunk work / one Gemini request.
+_CHUNK_SPANS = {
+    "text_chunk": "text",
+    "figure_chunk": "figure",
+    "figure_batch": "figure_batch",
+}
+_REQUEST_SPAN = "api_attempt"
+# Scheduler wait (submit → worker start), labelled by the run's priority class.
+_QUEUE_WAIT_SPAN = "queue_wait"
+
+
+class _Histogram:
+    """Cumulative-bucket histogram, one series per label value."""
+
+    def __init__(self, buckets: tuple[float, ...]) -> None:
+        self.buckets = tuple(sorted(buckets))
+        self.series: dict[str, list[float]] = {}  # label → [b0..bn, +Inf, sum]
+
+    def observe(self, label: str, value: float) -> None:
+        row = self.series.get(label)
+        if row is None:
+            row = self.series[label] = [0.0] * (len(self.buckets) + 2)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                row[i] += 1
+        row[-2] += 1  # +Inf == count
+        row[-1] += value
+
+
+def _fmt(v: float) -> str:
+    if v == int(v):
+        return str(int(v))
+    return repr(float(v))
+
+
+def _fmt_le(bound: float) -> str:
+    return repr(float(bound))
+
+
+class PrometheusSink:
+    """In-process aggregate of all runs, rendered on scrape.
+
+    ``append_run`` / ``update_run`` / ``append_samples`` only touch
+    memory, so it is safe both as the sole sink and as a ``TeeSink``
+    secondary next to ``SheetsSink``. Per-run queue / in-flight counts
+    are dropped on ``on_run_end`` so a failed run cannot leak gauges.
+    """
+
+    def __init__(
+        self,
+        latency_buckets_s: tuple[float, ...] = METRICS_PROMETHEUS_LATENCY_BUCKETS_S,
+        queue_wait_buckets_s: tuple[float, ...] = (
+            METRICS_PROMETHEUS_QUEUE_WAIT_BUCKETS_S
+        ),
+    ) -> None:
+        self._lock = threading.Lock()
+        self._counters: dict[str, float] = {}
+        self._runs_total: dict[str, float] = {}
+        self._queued: dict[str, int] = {}  # run_id → chunks waiting for a worker
+        self._chunks_in_flight: dict[str, int] = {}
+        self._requests_in_flight: dict[str, int] = {}
+        self._active_runs: set[str] = set()
+        self._last_ram_mb: float | None = None
+        self._chunk_latency = _Histogram(latency_buckets_s)
+        self._request_latency = _Histogram(latency_buckets_s)
+        self._queue_wait = _Histogram(queue_wait_buckets_s)
+        self._proc = None
+        try:
+            import psutil
+
+            self._proc = psutil.Process()
+        except Exception:
+            log.info("[metrics-prom] psutil unavailable; RSS from samples only")
+
+    # -- live hooks --
+
+    def on_run_start(self, run_id: str) -> None:
+        with self._lock:
+            self._active_runs.add(run_id)
+
+    def on_run_end(self, run_id: str, status: str) -> None:
+        with self._lock:
+            self._active_runs.discard(run_id)
+            self._queued.pop(run_id, None)
+            self._chunks_in_flight.pop(run_id, None)
+            self._requests_in_flight.pop(run_id, None)
+            self._runs_total[status] = self._runs_total.get(status, 0) + 1
+
+    def on_counter(self, run_id: str, key: str, n: int) -> None:
+        with self._lock:
+            if key == "n_chunks_submitted":
+                self._queued[run_id] = self._queued.get(run_id, 0) + n
+            self._counters[key] = self._counters.get(key, 0) + n
+
+    def on_span_start(self, run_id: str, name: str) -> None:
+        with self._lock:
+            if name in _CHUNK_SPANS:
+                self._queued[run_id] = max(0, self._queued.get(run_id, 0) - 1)
+                _bump(self._chunks_in_flight, run_id, 1)
+            elif name == _REQUEST_SPAN:
+                _bump(self._requests_in_flight, run_id, 1)
+
+    def on_span_end(self, run_id: str, record: SpanRecord) -> None:
+        with self._lock:
+            chunk_label = _CHUNK_SPANS.get(record.name)
+            if chunk_label is not None:
+                _bump(self._chunks_in_flight, run_id, -1)
+                self._chunk_latency.observe(chunk_label, record.duration_s)
+            elif record.name == _REQUEST_SPAN:
+                _bump(self._requests_in_flight, run_id, -1)
+                self._request_latency.observe(record.outcome, record.duration_s)
+            elif record.name == _QUEUE_WAIT_SPAN:
+                priority = str(record.attrs.get("priority", ""))
+                self._queue_wait.observe(priority, record.duration_s)
+
+    # -- MetricsSink interface --
+
+    def append_run(self, row: RunRow) -> Any:
+        return None
+
+    def update_run(self, handle: Any, row: RunRow) -> bool:
+        return True
+
+    def append_samples(self, rows: list[SampleRow]) -> None:
+        if rows:
+            with self._lock:
+                self._last_ram_mb = rows[-1].ram_mb
+
+    def append_chunk_stats(self, rows: list[ChunkStat]) -> None:
+        pass
+
+    # -- exposition --
+
+    def render(self) -> str:
+        """Prometheus text exposition (format 0.0.4) of the current state."""
+        ram_mb = self._live_ram_mb()
+        with self._lock:
+            counters = dict(self._counters)
+            runs_total = dict(self._runs_total)
+            queued = sum(self._queued.values())
+            chunks_in_flight = sum(self._chunks_in_flight.values())
+            requests_in_flight = sum(self._requests_in_flight.values())
+            active_runs = len(self._active_runs)
+            if ram_mb is None:
+                ram_mb = self._last_ram_mb
+            chunk_hist = {k: list(v) for k, v in self._chunk_latency.series.items()}
+            request_hist = {
+                k: list(v) for k, v in self._request_latency.series.items()
+            }
+            wait_hist = {k: list(v) for k, v in self._queue_wait.series.items()}
+
+        lines: list[str] = []
+
+        def gauge(name: str, help_text: str, value: float) -> None:
+            lines.append(f"# HELP {_PREFIX}_{name} {help_text}")
+            lines.append(f"# TYPE {_PREFIX}_{name} gauge")
+            lines.append(f"{_PREFIX}_{name} {_fmt(value)}")
+
+        gauge("active_runs", "Translation runs currently in progress.", active_runs)
+        gauge(
+            "queue_depth",
+            "Chunks submitted but not yet picked up by a worker.",
+            queued,
+        )
+        gauge(
+            "chunks_in_flight", "Chunks currently being translated.", chunks_in_flight
+        )
+        gauge(
+            "requests_in_flight",
+            "Gemini generate_content attempts currently executing.",
+            requests_in_flight,
+        )
+        if ram_mb is not None:
+            gauge(
+                "process_rss_bytes",
+                "Resident set size of the app process.",
+                round(ram_mb * 1024 * 1024),
+            )
+
+        for key in sorted(counters):
+            # n_429_errors → translator_429_errors_total; rate() it in PromQL.
+            name = f"{key.removeprefix('n_')}_total"
+            lines.append(f"# HELP {_PREFIX}_{name} MetricsCollector counter {key}.")
+            lines.append(f"# TYPE {_PREFIX}_{name} counter")
+            lines.append(f"{_PREFIX}_{name} {_fmt(counters[key])}")
+
+        lines.append(f"# HELP {_PREFIX}_runs_total Finished runs by final status.")
+        lines.append(f"# TYPE {_PREFIX}_runs_total counter")
+        for status in sorted(runs_total):
+            lines.append(
+                f'{_PREFIX}_runs_total{{status="{status}"}} {_fmt(runs_total[status])}'
+            )
+
+        self._render_histogram(
+            lines,
+            "chunk_latency_seconds",
+            "Wall time per chunk incl. retries and backoff.",
+            "chunk_type",
+            self._chunk_latency.buckets,
+            chunk_hist,
+        )
+        self._render_histogram(
+            lines,
+            "request_latency_seconds",
+            "Wall time per Gemini attempt by outcome.",
+            "outcome",
+            self._request_latency.buckets,
+            request_hist,
+        )
+        self._render_histogram(
+            lines,
+            "queue_wait_seconds",
+            "Time a task waited in the shared scheduler before a worker ran it.",
+            "priority",
+            self._queue_wait.buckets,
+            wait_hist,
+        )
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def _render_histogram(
+        lines: list[str],
+        name: str,
+        help_text: str,
+        label: str,
+        buckets: tuple[float, ...],
+        series: dict[str, list[float]],
+    ) -> None:
+        full = f"{_PREFIX}_{name}"
+        lines.append(f"# HELP {full} {help_text}")
+        lines.append(f"# TYPE {full} histogram")
+        for value in sorted(series):
+            row = series[value]
+            for i, bound in enumerate(buckets):
+                lines.append(
+                    f'{full}_bucket{{{label}="{value}",le="{_fmt_le(bound)}"}} '
+                    f"{_fmt(row[i])}"
+                )
+            lines.append(
+                f'{full}_bucket{{{label}="{value}",le="+Inf"}} {_fmt(row[-2])}'
+            )
+            lines.append(
+                f'{full}_sum{{{label}="{value}"}} {_fmt(round(row[-1], 6))}'
+            )
+            lines.append(f'{full}_count{{{label}="{value}"}} {_fmt(row[-2])}')
+
+    def _live_ram_mb(self) -> float | None:
+        if self._proc is None:
+            return None
+        try:
+            return self._proc.memory_info().rss / (1024 * 1024)
+        except Exception:
+            return None
+
+
+def _bump(d: dict[str, int], key: str, n: int) -> None:
+    d[key] = max(0, d.get(key, 0) + n)
+
+
+# ---------- HTTP endpoint ----------
+
+
+def start_metrics_server(
+    sink: PrometheusSink, port: int, host: str = METRICS_PROMETHEUS_HOST
+) -> ThreadingHTTPServer:
+    """Serve ``sink.render()`` on ``http://host:port/metrics`` from a daemon thread."""
+
+    class _Handler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:  # noqa: N802 — http.server naming
+            if self.path.split("?", 1)[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = sink.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", _CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format: str, *args: Any) -> None:
+            pass  # scrapes every 15s would flood the app log
+
+    server = ThreadingHTTPServer((host, port), _Handler)
+    server.daemon_threads = True
+    thread = threading.Thread(
+        target=server.serve_forever, name="metrics-prometheus", daemon=True
+    )
+    thread.start()
+    log.info("[metrics-prom] serving /metrics on %s:%d", host, server.server_port)
+    return server
+
+
+_sink_lock = threading.Lock()
+_sink: PrometheusSink | None = None
+_server: ThreadingHTTPServer | None = None
+
+
+def get_prometheus_sink() -> PrometheusSink | None:
+    """Process-wide sink + endpoint, started on first call. ``None`` if disabled.
+
+    Streamlit re-executes ``app.py`` on every rerun and per session, so
+    this is idempotent: the server binds once and every collector shares
+    the same aggregate. Bind failures are logged and disable the sink.
+    """
+    global _sink, _server
+    raw = os.environ.get(METRICS_PROMETHEUS_PORT_ENV_VAR, "").strip()
+    if not raw:
+        return None
+    with _sink_lock:
+        if _sink is not None:
+            return _sink
+        try:
+            port = int(raw)
+            host = (
+                os.environ.get(METRICS_PROMETHEUS_HOST_ENV_VAR)
+                or METRICS_PROMETHEUS_HOST
+            )
+            sink = PrometheusSink()
+            _server = start_metrics_server(sink, port, host)
+        except Exception:
+            log.exception("[metrics-prom] failed to start /metrics endpoint")
+            return None
+        _sink = sink
+        return _sink
@@ -9,22 +9,40 @@ and returns ``None`` on any failure — callers should fall back to
 All gspread calls are serialized through ``self.io_lock`` so the
 flusher's periodic flush, ``stop_and_finalize``'s final flush, and the
 ``runs`` row update never overlap on the same client.
+
+``BatchedSheetsSink`` is the process-wide alternative the app uses: every
+collector enqueues into it and one background thread coalesces the writes
+into a few batch calls per window, spooling to a local JSONL file while
+Sheets is slow or down (``get_batched_sheets_sink``).
 """
 
 from __future__ import annotations
 
+import atexit
+import json
 import logging
 import os
+import tempfile
 import threading
-from dataclasses import asdict
+import time
+from dataclasses import asdict, dataclass, field
 from typing import Any
 
-from utils.metrics import RunRow, SampleRow
+from utils.config import (
+    METRICS_SHEETS_BATCH_INTERVAL_S,
+    METRICS_SHEETS_DEGRADED_BACKOFF_S,
+    METRICS_SHEETS_SLOW_CALL_S,
+    METRICS_SPOOL_MAX_BYTES,
+    METRICS_SPOOL_PATH_ENV_VAR,
+    METRICS_THREAD_JOIN_TIMEOUT_S,
+)
+from utils.metrics import STATUS_RUNNING, ChunkStat, RunRow, SampleRow
 
 log = logging.getLogger(__name__)
 
 RUNS_TAB = "runs"
 SAMPLES_TAB = "samples"
+CHUNKS_TAB = "chunks"
 
 # Header order is the canonical column order in the sheet — keep
 # synchronized with `runs` / `samples` table in docs/PLAN_metrics_to_sheets.md.
@@ -66,6 +84,29 @@ _RUN_COLUMNS = [
     "app_version",
     "n_dropped_samples",
     "was_append_only",
+    # Appended after the original columns so existing sheets keep their
+    # layout; the header only gains cells on the right.
+    "n_prompt_tokens",
+    "n_cached_tokens",
+    "n_output_tokens",
+    "n_text_prompt_tokens",
+    "n_text_output_tokens",
+    "n_image_prompt_tokens",
+    "n_image_output_tokens",
+    "estimated_cost_usd",
+    "span_summary",
+    "n_figure_batches",
+    "n_figure_batch_fallbacks",
+    "n_figure_cache_hits",
+    "n_runaway_aborts",
+    "n_model_escalations",
+    "n_breaker_rejections",
+    "quota_breaker_state",
+    "priority_class",
+    "n_reused_paragraphs",
+    "n_reused_figures",
+    "n_qa_requeued",
+    "n_qa_flagged",
 ]
 
 _SAMPLE_COLUMNS = [
@@ -76,6 +117,24 @@ _SAMPLE_COLUMNS = [
     "process_cpu_pct",
     "process_threads",
     "phase",
+    "n_active_runs",
+    "mem_reserved_mb",
+    "n_mem_waiting",
+]
+
+_CHUNK_COLUMNS = [
+    "run_id",
+    "chunk_index",
+    "chunk_type",
+    "n_items",
+    "latency_s",
+    "n_api_calls",
+    "prompt_tokens",
+    "cached_tokens",
+    "output_tokens",
+    "status",
+    "model_name",
+    "n_escalations",
 ]
 
 
@@ -109,6 +168,7 @@ class SheetsSink:
         self.io_lock = threading.RLock()
         self._runs_ws = self._ensure_worksheet(RUNS_TAB, _RUN_COLUMNS)
         self._samples_ws = self._ensure_worksheet(SAMPLES_TAB, _SAMPLE_COLUMNS)
+        self._chunks_ws = self._ensure_worksheet(CHUNKS_TAB, _CHUNK_COLUMNS)
 
     # -- MetricsSink interface --
 
@@ -183,60 +243,443 @@ class SheetsSink:
                     "[metrics-sheets] append_samples failed (n=%d)", len(rows)
                 )
 
+    def append_chunk_stats(self, rows: list[ChunkStat]) -> None:
+        if not rows:
+            return
+        with self.io_lock:
+            try:
+                payload = [_row_values(asdict(r), _CHUNK_COLUMNS) for r in rows]
+                self._chunks_ws.append_rows(
+                    payload,
+                    value_input_option="USER_ENTERED",
+                    insert_data_option="INSERT_ROWS",
+                )
+            except Exception:
+                log.exception(
+                    "[metrics-sheets] append_chunk_stats failed (n=%d)", len(rows)
+                )
+
     # -- internals --
 
     def _ensure_worksheet(self, title: str, columns: list[str]):
+        return _ensure_worksheet(self._ss, title, columns)
+
+    def _parse_appended_row_index(self, resp) -> int | None:
+        """gspread returns the appended range like 'runs!A42:Z42' — pull the row."""
+        rows = _parse_appended_rows(resp)
+        return rows[1] if rows else None
+
+    def _lookup_run_row(self, run_id: str) -> int | None:
         try:
-            ws = self._ss.worksheet(title)
+            ids_column = self._runs_ws.col_values(1)
+            for i, value in enumerate(ids_column, start=1):
+                if value == run_id:
+                    return i
         except Exception:
-            log.info("[metrics-sheets] creating worksheet %s", title)
-            ws = self._ss.add_worksheet(
-                title=title, rows=1000, cols=max(len(columns), 8)
+            log.exception(
+                "[metrics-sheets] _lookup_run_row failed for %s", run_id
             )
-            ws.append_row(columns, value_input_option="USER_ENTERED")
-            return ws
+        return None
 
-        # Header sanity: if row 1 is empty, seed it.
+
+class BatchedSheetsSink:
+    """Process-wide, coalescing Sheets writer shared by every collector.
+
+    Sink calls only enqueue in memory (under a short ``_pending_lock``);
+    one daemon flusher turns each window into at most four Sheets calls —
+    ``values_append`` for new runs / samples / chunk stats and a single
+    ``batch_update`` for run-row updates — no matter how many runs are
+    live. Coalescing rules:
+
+    - ``append_run`` + ``update_run`` in the same window → one insert
+      carrying the latest row.
+    - repeated ``update_run`` for a run → only the latest row is sent.
+    - row numbers come from the append response and live in a local
+      ``run_id → row`` index, so updates never scan the sheet.
+
+    When a call fails or takes longer than ``slow_call_s``, the unsent part
+    of the window is written to an append-only JSONL spool and the sink
+    stays "degraded" (spool-only, no API calls) for ``degraded_backoff_s``.
+    The next healthy window replays the spool ahead of fresh rows.
+
+    No ``io_lock`` on purpose: network IO never happens under a lock the
+    collector's finalize would wait on.
+    """
+
+    def __init__(
+        self,
+        spreadsheet,
+        *,
+        spool_path: str,
+        flush_interval_s: float = METRICS_SHEETS_BATCH_INTERVAL_S,
+        slow_call_s: float = METRICS_SHEETS_SLOW_CALL_S,
+        degraded_backoff_s: float = METRICS_SHEETS_DEGRADED_BACKOFF_S,
+        spool_max_bytes: int = METRICS_SPOOL_MAX_BYTES,
+        start_thread: bool = True,
+    ) -> None:
+        self._ss = spreadsheet
+        self._spool_path = spool_path
+        self._flush_interval_s = flush_interval_s
+        self._slow_call_s = slow_call_s
+        self._degraded_backoff_s = degraded_backoff_s
+        self._spool_max_bytes = spool_max_bytes
+        self._runs_ws = _ensure_worksheet(spreadsheet, RUNS_TAB, _RUN_COLUMNS)
+        self._samples_ws = _ensure_worksheet(
+            spreadsheet, SAMPLES_TAB, _SAMPLE_COLUMNS
+        )
+        self._chunks_ws = _ensure_worksheet(spreadsheet, CHUNKS_TAB, _CHUNK_COLUMNS)
+
+        self._pending_lock = threading.Lock()
+        self._pending = _Batch()
+        self._row_index: dict[str, int] = {}
+        # Serializes flush() callers (flusher thread vs. close()/tests);
+        # never taken by the enqueue path.
+        self._flush_lock = threading.Lock()
+        self._degraded_until = 0.0
+
+        self._stop_evt = threading.Event()
+        self._thread: threading.Thread | None = None
+        if start_thread:
+            self._thread = threading.Thread(
+                target=self._flusher_loop, name="metrics-sheets-batcher", daemon=True
+            )
+            self._thread.start()
+
+    # -- MetricsSink interface (enqueue only) --
+
+    def append_run(self, row: RunRow) -> Any:
+        with self._pending_lock:
+            self._pending.inserts[row.run_id] = row
+        return row.run_id
+
+    def update_run(self, handle: Any, row: RunRow) -> bool:
+        with self._pending_lock:
+            if row.run_id in self._pending.inserts:
+                self._pending.inserts[row.run_id] = row
+            else:
+                self._pending.updates[row.run_id] = row
+        return True
+
+    def append_samples(self, rows: list[SampleRow]) -> None:
+        if rows:
+            with self._pending_lock:
+                self._pending.samples.extend(rows)
+
+    def append_chunk_stats(self, rows: list[ChunkStat]) -> None:
+        if rows:
+            with self._pending_lock:
+                self._pending.chunks.extend(rows)
+
+    # -- flushing --
+
+    def flush(self) -> None:
+        """Push (or spool) everything pending now. Safe to call from any thread."""
+        with self._flush_lock:
+            with self._pending_lock:
+                batch, self._pending = self._pending, _Batch()
+            if time.monotonic() < self._degraded_until:
+                self._spool(batch)
+                return
+            replay = self._take_spool()
+            if replay is not None:
+                batch = replay.merge(batch)
+            if batch.is_empty():
+                return
+            self._push(batch)
+
+    def close(self) -> None:
+        """Stop the flusher and flush once more (spooling if Sheets is down)."""
+        self._stop_evt.set()
+        if self._thread is not None:
+            self._thread.join(timeout=METRICS_THREAD_JOIN_TIMEOUT_S)
         try:
-            first_row = ws.row_values(1)
+            self.flush()
         except Exception:
-            first_row = []
-        if not first_row:
+            log.exception("[metrics-sheets] final batched flush failed")
+
+    def _flusher_loop(self) -> None:
+        while not self._stop_evt.wait(self._flush_interval_s):
+            try:
+                self.flush()
+            except Exception:
+                log.exception("[metrics-sheets] batched flush iteration failed")
+
+    def _push(self, batch: _Batch) -> None:
+        """Send ``batch`` step by step; spool whatever is left on failure."""
+        steps = (
+            ("inserts", self._push_inserts),
+            ("updates", self._push_updates),
+            ("samples", self._push_samples),
+            ("chunks", self._push_chunks),
+        )
+        for i, (name, push) in enumerate(steps):
+            if not getattr(batch, name):
+                continue
+            t0 = time.monotonic()
             try:
-                ws.append_row(columns, value_input_option="USER_ENTERED")
+                push(batch)
             except Exception:
                 log.exception(
-                    "[metrics-sheets] failed to seed header for %s", title
+                    "[metrics-sheets] batched %s push failed; spooling", name
                 )
-        return ws
+                self._enter_degraded()
+                self._spool(batch.only([n for n, _ in steps[i:]]))
+                return
+            elapsed = time.monotonic() - t0
+            if elapsed > self._slow_call_s:
+                log.warning(
+                    "[metrics-sheets] %s push took %.1fs; spooling for %.0fs",
+                    name,
+                    elapsed,
+                    self._degraded_backoff_s,
+                )
+                self._enter_degraded()
+                self._spool(batch.only([n for n, _ in steps[i + 1 :]]))
+                return
+
+    def _push_inserts(self, batch: _Batch) -> None:
+        run_ids = list(batch.inserts)
+        payload = [
+            _row_values(asdict(batch.inserts[r]), _RUN_COLUMNS) for r in run_ids
+        ]
+        resp = self._runs_ws.append_rows(
+            payload,
+            value_input_option="USER_ENTERED",
+            insert_data_option="INSERT_ROWS",
+        )
+        rows = _parse_appended_rows(resp)
+        if rows is None or rows[1] - rows[0] + 1 != len(run_ids):
+            log.warning(
+                "[metrics-sheets] could not map %d appended runs to rows; "
+                "later updates for them will append",
+                len(run_ids),
+            )
+            return
+        for offset, run_id in enumerate(run_ids):
+            if batch.inserts[run_id].status == STATUS_RUNNING:
+                self._row_index[run_id] = rows[0] + offset
+
+    def _push_updates(self, batch: _Batch) -> None:
+        end_col = _col_letter(len(_RUN_COLUMNS))
+        data = []
+        unmapped: list[RunRow] = []
+        for run_id, row in batch.updates.items():
+            row_idx = batch.update_rows.get(run_id) or self._row_index.get(run_id)
+            if row_idx is None:
+                unmapped.append(row)
+                continue
+            data.append(
+                {
+                    "range": f"A{row_idx}:{end_col}{row_idx}",
+                    "values": [_row_values(asdict(row), _RUN_COLUMNS)],
+                }
+            )
+        if data:
+            self._runs_ws.batch_update(data, value_input_option="USER_ENTERED")
+        if unmapped:
+            # No row known (e.g. spooled across a restart) — same fallback
+            # as SheetsSink.update_run: append the final row instead.
+            self._runs_ws.append_rows(
+                [_row_values(asdict(r), _RUN_COLUMNS) for r in unmapped],
+                value_input_option="USER_ENTERED",
+                insert_data_option="INSERT_ROWS",
+            )
+        for run_id, row in batch.updates.items():
+            if row.status != STATUS_RUNNING:
+                self._row_index.pop(run_id, None)
+
+    def _push_samples(self, batch: _Batch) -> None:
+        self._samples_ws.append_rows(
+            [_row_values(asdict(r), _SAMPLE_COLUMNS) for r in batch.samples],
+            value_input_option="USER_ENTERED",
+            insert_data_option="INSERT_ROWS",
+        )
 
-    def _parse_appended_row_index(self, resp) -> int | None:
-        """gspread returns the appended range like 'runs!A42:Z42' — pull the row."""
+    def _push_chunks(self, batch: _Batch) -> None:
+        self._chunks_ws.append_rows(
+            [_row_values(asdict(r), _CHUNK_COLUMNS) for r in batch.chunks],
+            value_input_option="USER_ENTERED",
+            insert_data_option="INSERT_ROWS",
+        )
+
+    def _enter_degraded(self) -> None:
+        self._degraded_until = time.monotonic() + self._degraded_backoff_s
+
+    # -- spool --
+
+    def _spool(self, batch: _Batch) -> None:
+        if batch.is_empty():
+            return
         try:
-            updates = resp.get("updates", {}) if isinstance(resp, dict) else {}
-            updated_range = updates.get("updatedRange", "")
-            if "!" in updated_range:
-                _, cells = updated_range.split("!", 1)
-            else:
-                cells = updated_range
-            # cells like A42:Z42 → take trailing number
-            tail = cells.split(":")[-1]
-            digits = "".join(ch for ch in tail if ch.isdigit())
-            return int(digits) if digits else None
+            size = os.path.getsize(self._spool_path)
+        except OSError:
+            size = 0
+        if size >= self._spool_max_bytes and (batch.samples or batch.chunks):
+            # Keep run rows (small, the point of the whole sheet); shed
+            # the bulky time series once the spool is at its cap.
+            log.warning(
+                "[metrics-sheets] spool over %d bytes; dropping %d samples / "
+                "%d chunk rows",
+                self._spool_max_bytes,
+                len(batch.samples),
+                len(batch.chunks),
+            )
+            batch = batch.only(["inserts", "updates"])
+        try:
+            with open(self._spool_path, "a", encoding="utf-8") as f:
+                for record in batch.to_records(self._row_index):
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
         except Exception:
-            log.exception("[metrics-sheets] could not parse appended row index")
+            log.exception("[metrics-sheets] spool write failed; batch dropped")
+
+    def _take_spool(self) -> _Batch | None:
+        """Move the spool aside and load it; the caller re-spools on failure."""
+        if not os.path.exists(self._spool_path):
             return None
+        replay_path = self._spool_path + ".replay"
+        try:
+            os.replace(self._spool_path, replay_path)
+            with open(replay_path, encoding="utf-8") as f:
+                batch = _Batch.from_records(
+                    json.loads(line) for line in f if line.strip()
+                )
+            os.remove(replay_path)
+        except Exception:
+            log.exception("[metrics-sheets] spool replay read failed")
+            return None
+        log.info(
+            "[metrics-sheets] replaying spool: %d runs, %d updates, %d samples",
+            len(batch.inserts),
+            len(batch.updates),
+            len(batch.samples),
+        )
+        return batch
+
+
+@dataclass
+class _Batch:
+    """One flush window's worth of pending writes (see BatchedSheetsSink)."""
+
+    inserts: dict[str, RunRow] = field(default_factory=dict)
+    updates: dict[str, RunRow] = field(default_factory=dict)
+    samples: list[SampleRow] = field(default_factory=list)
+    chunks: list[ChunkStat] = field(default_factory=list)
+    # Row numbers carried through the spool for updates whose run was
+    # inserted before the spool was written (index lost on restart otherwise).
+    update_rows: dict[str, int] = field(default_factory=dict)
+
+    def is_empty(self) -> bool:
+        return not (self.inserts or self.updates or self.samples or self.chunks)
+
+    def only(self, names: list[str]) -> _Batch:
+        out = _Batch(update_rows=dict(self.update_rows))
+        for name in names:
+            setattr(out, name, getattr(self, name))
+        return out
+
+    def merge(self, newer: _Batch) -> _Batch:
+        """Apply ``newer`` on top of self with the same coalescing rules."""
+        out = _Batch(
+            inserts=dict(self.inserts),
+            updates=dict(self.updates),
+            samples=self.samples + newer.samples,
+            chunks=self.chunks + newer.chunks,
+            update_rows={**self.update_rows, **newer.update_rows},
+        )
+        out.inserts.update(newer.inserts)
+        for run_id, row in newer.updates.items():
+            if run_id in out.inserts:
+                out.inserts[run_id] = row
+            else:
+                out.updates[run_id] = row
+        return out
+
+    def to_records(self, row_index: dict[str, int]):
+        for row in self.inserts.values():
+            yield {"kind": "insert", "row": asdict(row)}
+        for run_id, row in self.updates.items():
+            yield {
+                "kind": "update",
+                "row": asdict(row),
+                "row_index": self.update_rows.get(run_id) or row_index.get(run_id),
+            }
+        for r in self.samples:
+            yield {"kind": "sample", "row": asdict(r)}
+        for c in self.chunks:
+            yield {"kind": "chunk", "row": asdict(c)}
+
+    @classmethod
+    def from_records(cls, records) -> _Batch:
+        batch = cls()
+        for rec in records:
+            kind, row = rec.get("kind"), rec.get("row") or {}
+            try:
+                if kind == "insert":
+                    run = RunRow(**row)
+                    batch.inserts[run.run_id] = run
+                elif kind == "update":
+                    run = RunRow(**row)
+                    if run.run_id in batch.inserts:
+                        batch.inserts[run.run_id] = run
+                    else:
+                        batch.updates[run.run_id] = run
+                        if rec.get("row_index"):
+                            batch.update_rows[run.run_id] = int(rec["row_index"])
+                elif kind == "sample":
+                    batch.samples.append(SampleRow(**row))
+                elif kind == "chunk":
+                    batch.chunks.append(ChunkStat(**row))
+            except TypeError:
+                # Spool written by an older RunRow layout — skip the line
+                # rather than poisoning the whole replay.
+                log.warning("[metrics-sheets] skipping unreadable spool record")
+        return batch
+
+
+def _ensure_worksheet(spreadsheet, title: str, columns: list[str]):
+    try:
+        ws = spreadsheet.worksheet(title)
+    except Exception:
+        log.info("[metrics-sheets] creating worksheet %s", title)
+        ws = spreadsheet.add_worksheet(
+            title=title, rows=1000, cols=max(len(columns), 8)
+        )
+        ws.append_row(columns, value_input_option="USER_ENTERED")
+        return ws
 
-    def _lookup_run_row(self, run_id: str) -> int | None:
+    # Header sanity: if row 1 is empty, seed it.
+    try:
+        first_row = ws.row_values(1)
+    except Exception:
+        first_row = []
+    if not first_row:
         try:
-            ids_column = self._runs_ws.col_values(1)
-            for i, value in enumerate(ids_column, start=1):
-                if value == run_id:
-                    return i
+            ws.append_row(columns, value_input_option="USER_ENTERED")
         except Exception:
-            log.exception(
-                "[metrics-sheets] _lookup_run_row failed for %s", run_id
-            )
+            log.exception("[metrics-sheets] failed to seed header for %s", title)
+    return ws
+
+
+def _parse_appended_rows(resp) -> tuple[int, int] | None:
+    """(first, last) row of an append response's 'runs!A42:Z44' updatedRange."""
+    try:
+        updates = resp.get("updates", {}) if isinstance(resp, dict) else {}
+        updated_range = updates.get("updatedRange", "")
+        if "!" in updated_range:
+            _, cells = updated_range.split("!", 1)
+        else:
+            cells = updated_range
+        # cells like A42:Z44 (or a single A42) → leading/trailing numbers
+        parts = cells.split(":")
+        nums = []
+        for part in (parts[0], parts[-1]):
+            digits = "".join(ch for ch in part if ch.isdigit())
+            if not digits:
+                return None
+            nums.append(int(digits))
+        return nums[0], nums[1]
+    except Exception:
+        log.exception("[metrics-sheets] could not parse appended row index")
         return None
 
 
@@ -255,6 +698,48 @@ def build_sheets_sink_from_secrets() -> SheetsSink | None:
     Returns ``None`` if any required piece is missing or auth fails.
     Callers should fall back to :class:`utils.metrics.NullSink`.
     """
+    spreadsheet = _open_spreadsheet_from_secrets()
+    if spreadsheet is None:
+        return None
+    try:
+        return SheetsSink(spreadsheet)
+    except Exception:
+        log.exception("[metrics-sheets] failed to prepare worksheets")
+        return None
+
+
+_batched_lock = threading.Lock()
+_batched_sink: BatchedSheetsSink | None = None
+
+
+def get_batched_sheets_sink() -> BatchedSheetsSink | None:
+    """Process-wide :class:`BatchedSheetsSink`, opened on first success.
+
+    Every Streamlit session shares it, so concurrent runs coalesce into
+    the same flush windows. Spools to env ``METRICS_SPOOL_PATH`` (default:
+    a file in the temp dir). ``None`` when secrets/auth are unavailable —
+    the next call tries again. Flushed once more at interpreter exit.
+    """
+    global _batched_sink
+    with _batched_lock:
+        if _batched_sink is not None:
+            return _batched_sink
+        spreadsheet = _open_spreadsheet_from_secrets()
+        if spreadsheet is None:
+            return None
+        spool_path = os.environ.get(METRICS_SPOOL_PATH_ENV_VAR) or os.path.join(
+            tempfile.gettempdir(), "ko-jp-patent-translator-metrics.spool.jsonl"
+        )
+        try:
+            _batched_sink = BatchedSheetsSink(spreadsheet, spool_path=spool_path)
+        except Exception:
+            log.exception("[metrics-sheets] failed to prepare worksheets")
+            return None
+        atexit.register(_batched_sink.close)
+        return _batched_sink
+
+
+def _open_spreadsheet_from_secrets():
     try:
         import gspread
         from google.oauth2.service_account import Credentials
@@ -280,8 +765,7 @@ def build_sheets_sink_from_secrets() -> SheetsSink | None:
             service_account, scopes=scopes
         )
         client = gspread.authorize(creds)
-        spreadsheet = client.open_by_key(sheet_id)
-        return SheetsSink(spreadsheet)
+        return client.open_by_key(sheet_id)
     except Exception:
         log.exception("[metrics-sheets] failed to authorize/open spreadsheet")
         return None
@@ -0,0 +1,98 @@
+"""Pick a Gemini model tier per chunk from cheap local features.
+
+No API call is spent on routing: TEXT chunks are judged by length and by the
+section they sit in (the last 【…】 heading seen, carried across chunk
+boundaries so a chunk continuing the claims is still "claims"); figures by
+edge density on a thumbnail, which tracks how many labels are drawn in.
+Tiers are indices into ``GEMINI_MODEL_TIERS``; a chunk that keeps failing
+validation walks up from its tier (see :func:`model_chain`).
+"""
+
+from __future__ import annotations
+
+from PIL import Image, ImageFilter, ImageOps
+
+from utils.chunker import section_heading
+from utils.config import (
+    GEMINI_MODEL_TIERS,
+    MODEL_ROUTING_DENSE_PARAGRAPH_CHARS,
+    MODEL_ROUTING_FIGURE_LIGHT_EDGE_DENSITY,
+    MODEL_ROUTING_LIGHT_MAX_CHARS,
+    MODEL_ROUTING_LIGHT_SECTIONS,
+)
+
+TIER_LIGHT = 0
+TIER_STANDARD = 1
+
+# Thumbnail side for the edge scan and the FIND_EDGES response that counts
+# as an edge pixel.
+_EDGE_THUMBNAIL_PX = 256
+_EDGE_THRESHOLD = 64
+
+
+def is_light_section(heading: str | None) -> bool:
+    return heading is not None and heading.startswith(MODEL_ROUTING_LIGHT_SECTIONS)
+
+
+def figure_edge_density(image: Image.Image) -> float:
+    """Share of edge pixels in a small grayscale copy of ``image`` (0..1).
+
+    The image is shrunk before any per-pixel work: a JPEG that is not
+    decoded yet is drafted (decoded at 1/2..1/8 scale, in place — records
+    open a fresh image per access), anything else is box-reduced into a new
+    image. Only the thumbnail is converted and contrast-stretched.
+    """
+    size = (_EDGE_THUMBNAIL_PX, _EDGE_THUMBNAIL_PX)
+    image.draft("L", size)
+    factor = min(image.width // _EDGE_THUMBNAIL_PX, image.height // _EDGE_THUMBNAIL_PX)
+    small = image.reduce(factor) if factor > 1 else image.copy()
+    small.thumbnail(size)
+    gray = ImageOps.autocontrast(small.convert("L"))
+    edges = gray.filter(ImageFilter.FIND_EDGES)
+    histogram = edges.histogram()
+    n_pixels = edges.width * edges.height
+    return sum(histogram[_EDGE_THRESHOLD + 1 :]) / n_pixels if n_pixels else 0.0
+
+
+def classify_chunk(chunk: dict, section: str | None = None) -> int:
+    """Starting tier for one chunk; ``section`` is the heading in force."""
+    if chunk["type"] == "FIGURE":
+        density = figure_edge_density(chunk["content"])
+        if density < MODEL_ROUTING_FIGURE_LIGHT_EDGE_DENSITY:
+            return TIER_LIGHT
+        return TIER_STANDARD
+    paragraphs: list[str] = chunk["content"]
+    n_chars = sum(len(p) for p in paragraphs)
+    if n_chars <= MODEL_ROUTING_LIGHT_MAX_CHARS:
+        return TIER_LIGHT
+    body = [p for p in paragraphs if p.strip() and section_heading(p) is None]
+    avg_chars = sum(len(p) for p in body) / len(body) if body else 0.0
+    if avg_chars > MODEL_ROUTING_DENSE_PARAGRAPH_CHARS:
+        return TIER_STANDARD
+    headings = [h for h in map(section_heading, paragraphs) if h is not None]
+    # Light only if every section the chunk touches is light.
+    sections = ([section] if section is not None else []) + headings
+    if sections and all(is_light_section(s) for s in sections):
+        return TIER_LIGHT
+    return TIER_STANDARD
+
+
+def route_chunks(chunks: list[dict]) -> list[int]:
+    """Starting tier per chunk, in document order."""
+    tiers: list[int] = []
+    section: str | None = None
+    for chunk in chunks:
+        tiers.append(classify_chunk(chunk, section))
+        if chunk["type"] == "TEXT":
+            for paragraph in chunk["content"]:
+                heading = section_heading(paragraph)
+                if heading is not None:
+                    section = heading
+    return tiers
+
+
+def model_chain(tier: int, tiers: tuple[str, ...] | None = None) -> tuple[str, ...]:
+    """Models to try for a chunk starting at ``tier``: that one, then stronger."""
+    if tiers is None:
+        tiers = GEMINI_MODEL_TIERS
+    return tuple(tiers[min(tier, len(tiers) - 1) :])
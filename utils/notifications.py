@@ -4,18 +4,41 @@ Kept dependency-light and fully fail-safe: ``requests`` is imported lazily and
 every failure is swallowed + logged, so a missing webhook / network blip / bad
 URL can NEVER break the translation flow. Configure via
 ``st.secrets["discord_webhook_url"]`` or the ``DISCORD_WEBHOOK_URL`` env var.
+
+Failure alerts go through :class:`DiscordDispatcher`: the caller only enqueues,
+and one daemon thread posts over a pooled ``requests.Session``. During an
+outage every session fails the same way, so alerts are coalesced per failure
+*kind*: the first one is sent right away, the rest of the window becomes one
+"N more documents failed" summary.
 """
 
 from __future__ import annotations
 
+import atexit
 import logging
 import os
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
 from datetime import datetime, timezone
+from typing import Callable
+
+from utils.config import (
+    DISCORD_COALESCE_WINDOW_S,
+    DISCORD_HTTP_TIMEOUT_S,
+    DISCORD_MAX_RETRY_AFTER_S,
+    DISCORD_MAX_SEND_ATTEMPTS,
+    DISCORD_QUEUE_MAX,
+)
 
 log = logging.getLogger(__name__)
 
 # Discord rejects messages over 2000 chars; stay well under.
 _MAX_CONTENT = 1900
+_USERNAME = "한일 특허 번역기"
+# Documents named in a coalesced summary.
+_SUMMARY_MAX_DOCS = 10
 
 
 def _webhook_url() -> str | None:
@@ -30,9 +53,10 @@ def _webhook_url() -> str | None:
     return os.environ.get("DISCORD_WEBHOOK_URL") or None
 
 
-def notify_discord(content: str, *, username: str = "한일 특허 번역기") -> bool:
+def notify_discord(content: str, *, username: str = _USERNAME) -> bool:
     """POST ``content`` to the configured Discord webhook. Returns success.
 
+    Synchronous; failure alerts use :func:`notify_discord_failure` instead.
     No-op (returns ``False``) when no webhook is configured. Never raises.
     """
     url = _webhook_url()
@@ -45,7 +69,7 @@ def notify_discord(content: str, *, username: str = "한일 특허 번역기") -
         resp = requests.post(
             url,
             json={"content": content[:_MAX_CONTENT], "username": username},
-            timeout=5,
+            timeout=DISCORD_HTTP_TIMEOUT_S,
         )
         if resp.status_code >= 300:
             log.warning(
@@ -60,6 +84,241 @@ def notify_discord(content: str, *, username: str = "한일 특허 번역기") -
         return False
 
 
+def _timestamp() -> str:
+    return datetime.now(timezone.utc).astimezone().strftime("%Y-%m-%d %H:%M:%S %Z")
+
+
+@dataclass
+class FailureAlert:
+    url: str
+    kind: str
+    doc_name: str
+    reason: str
+    content: str
+
+
+@dataclass
+class _Window:
+    """Alerts of one (webhook, kind) folded after the first was sent."""
+
+    url: str
+    closes_at: float
+    started_at: float
+    reason: str = ""
+    count: int = 0
+    docs: list[str] = field(default_factory=list)
+
+
+class DiscordDispatcher:
+    """Background, coalescing sender for :class:`FailureAlert`.
+
+    ``submit`` never blocks: it drops the alert (and says so in the log) when
+    the bounded queue is full. The worker thread owns the HTTP session and
+    the coalescing windows, so neither needs a lock. Discord's webhook rate
+    limit is respected from the response: a 429 waits ``retry_after``, and a
+    drained bucket (``X-RateLimit-Remaining: 0``) delays the next post by
+    ``X-RateLimit-Reset-After``.
+    """
+
+    def __init__(
+        self,
+        *,
+        window_s: float = DISCORD_COALESCE_WINDOW_S,
+        max_queue: int = DISCORD_QUEUE_MAX,
+        timeout_s: float = DISCORD_HTTP_TIMEOUT_S,
+        max_attempts: int = DISCORD_MAX_SEND_ATTEMPTS,
+        max_retry_after_s: float = DISCORD_MAX_RETRY_AFTER_S,
+        session_factory: Callable[[], object] | None = None,
+        start_thread: bool = True,
+    ) -> None:
+        self._window_s = window_s
+        self._timeout_s = timeout_s
+        self._max_attempts = max_attempts
+        self._max_retry_after_s = max_retry_after_s
+        self._session_factory = session_factory
+        self._session = None
+        self._queue: queue.Queue[FailureAlert] = queue.Queue(maxsize=max_queue)
+        self._windows: dict[tuple[str, str], _Window] = {}
+        self._blocked_until = 0.0
+        self.n_dropped = 0
+
+        self._stop_evt = threading.Event()
+        self._thread: threading.Thread | None = None
+        if start_thread:
+            self._thread = threading.Thread(
+                target=self._worker_loop, name="discord-dispatcher", daemon=True
+            )
+            self._thread.start()
+
+    def submit(self, alert: FailureAlert) -> bool:
+        """Queue ``alert``; ``False`` if it had to be dropped."""
+        try:
+            self._queue.put_nowait(alert)
+        except queue.Full:
+            self.n_dropped += 1
+            log.warning("[discord] alert queue full; dropped %s alert", alert.kind)
+            return False
+        return True
+
+    def close(self) -> None:
+        """Stop the worker; queued alerts and open summaries are sent first."""
+        self._stop_evt.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self._timeout_s)
+        else:
+            self._drain()
+
+    # -- worker thread --
+
+    def _worker_loop(self) -> None:
+        while not self._stop_evt.is_set():
+            try:
+                alert = self._queue.get(timeout=self._poll_timeout())
+            except queue.Empty:
+                alert = None
+            try:
+                if alert is not None:
+                    self._accept(alert)
+                self._close_windows(time.monotonic())
+            except Exception:
+                log.exception("[discord] dispatcher iteration failed")
+        self._drain()
+
+    def _drain(self) -> None:
+        try:
+            while True:
+                self._accept(self._queue.get_nowait())
+        except queue.Empty:
+            pass
+        except Exception:
+            log.exception("[discord] draining alerts failed")
+        self._close_windows(float("inf"))
+
+    def _poll_timeout(self) -> float:
+        if not self._windows:
+            return 0.5
+        next_close = min(w.closes_at for w in self._windows.values())
+        return min(0.5, max(0.0, next_close - time.monotonic()))
+
+    def _accept(self, alert: FailureAlert) -> None:
+        key = (alert.url, alert.kind)
+        now = time.monotonic()
+        window = self._windows.get(key)
+        if window is not None and now < window.closes_at:
+            window.count += 1
+            window.reason = alert.reason
+            if alert.doc_name not in window.docs:
+                window.docs.append(alert.doc_name)
+            return
+        if window is not None:
+            self._send_summary(window)
+        self._windows[key] = _Window(
+            url=alert.url, closes_at=now + self._window_s, started_at=now
+        )
+        self._post(alert.url, alert.content)
+
+    def _close_windows(self, now: float) -> None:
+        for key, window in list(self._windows.items()):
+            if now >= window.closes_at:
+                del self._windows[key]
+                self._send_summary(window)
+
+    def _send_summary(self, window: _Window) -> None:
+        if not window.count:
+            return
+        elapsed = min(time.monotonic() - window.started_at, self._window_s)
+        minutes = max(1, round(elapsed / 60))
+        docs = ", ".join(f"`{d}`" for d in window.docs[:_SUMMARY_MAX_DOCS])
+        if len(window.docs) > _SUMMARY_MAX_DOCS:
+            docs += f" 외 {len(window.docs) - _SUMMARY_MAX_DOCS}건"
+        content = (
+            "🔁 **번역 실패 요약**\n"
+            f"• 최근 {minutes}분간 같은 사유로 "
+            f"**{window.count}건** 더 실패 "
+            f"(문서 {len(window.docs)}개)\n"
+            f"• 사유: {window.reason}\n"
+            f"• 문서: {docs}\n"
+            f"• 시각: {_timestamp()}"
+        )
+        self._post(window.url, content)
+
+    def _post(self, url: str, content: str) -> bool:
+        payload = {"content": content[:_MAX_CONTENT], "username": _USERNAME}
+        for attempt in range(1, self._max_attempts + 1):
+            wait = self._blocked_until - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+            try:
+                resp = self._http().post(url, json=payload, timeout=self._timeout_s)
+            except Exception:
+                log.warning("[discord] webhook post failed (attempt %d)", attempt)
+                self._blocked_until = time.monotonic() + attempt
+                continue
+            self._note_rate_limit(resp)
+            if resp.status_code == 429 or resp.status_code >= 500:
+                log.warning(
+                    "[discord] webhook returned %s (attempt %d)",
+                    resp.status_code,
+                    attempt,
+                )
+                continue
+            if resp.status_code >= 300:
+                log.warning(
+                    "[discord] webhook returned %s: %s",
+                    resp.status_code,
+                    resp.text[:200],
+                )
+                return False
+            return True
+        log.error("[discord] giving up on alert after %d attempts", self._max_attempts)
+        return False
+
+    def _note_rate_limit(self, resp) -> None:
+        delay = None
+        if resp.status_code == 429:
+            try:
+                delay = float(resp.json().get("retry_after"))
+            except Exception:
+                delay = _float_header(resp, "Retry-After")
+            delay = 1.0 if delay is None else delay
+        elif resp.headers.get("X-RateLimit-Remaining") == "0":
+            delay = _float_header(resp, "X-RateLimit-Reset-After")
+        if delay is not None:
+            delay = min(max(0.0, delay), self._max_retry_after_s)
+            self._blocked_until = max(self._blocked_until, time.monotonic() + delay)
+
+    def _http(self):
+        if self._session is None:
+            if self._session_factory is not None:
+                self._session = self._session_factory()
+            else:
+                import requests
+
+                self._session = requests.Session()
+        return self._session
+
+
+def _float_header(resp, name: str) -> float | None:
+    try:
+        return float(resp.headers.get(name))
+    except (TypeError, ValueError):
+        return None
+
+
+_dispatcher_lock = threading.Lock()
+_dispatcher: DiscordDispatcher | None = None
+
+
+def get_discord_dispatcher() -> DiscordDispatcher:
+    """Process-wide :class:`DiscordDispatcher`; drained at interpreter exit."""
+    global _dispatcher
+    with _dispatcher_lock:
+        if _dispatcher is None:
+            _dispatcher = DiscordDispatcher()
+            atexit.register(_dispatcher.close)
+        return _dispatcher
+
+
 def notify_discord_failure(
     *,
     doc_name: str,
@@ -67,15 +326,34 @@ def notify_discord_failure(
     reason: str,
     workers: int,
     model: str,
+    kind: str | None = None,
 ) -> bool:
-    """Send a formatted '번역 실패' alert. Never raises."""
-    ts = datetime.now(timezone.utc).astimezone().strftime("%Y-%m-%d %H:%M:%S %Z")
+    """Queue a formatted '번역 실패' alert. Never raises or blocks.
+
+    Alerts with the same ``kind`` (default: ``reason``) within the coalescing
+    window are folded into one summary. Returns whether it was queued.
+    """
+    url = _webhook_url()
+    if not url:
+        log.info("[discord] webhook not configured; skipping alert")
+        return False
     content = (
         "🔴 **번역 실패 알림**\n"
         f"• 문서: `{doc_name or '(이름 없음)'}`\n"
         f"• 연속 실패: **{consecutive_failures}회**\n"
         f"• 사유: {reason}\n"
         f"• 워커/모델: {workers} / {model}\n"
-        f"• 시각: {ts}"
+        f"• 시각: {_timestamp()}"
+    )
+    alert = FailureAlert(
+        url=url,
+        kind=kind or reason,
+        doc_name=doc_name or "(이름 없음)",
+        reason=reason,
+        content=content,
     )
-    return notify_discord(content)
+    try:
+        return get_discord_dispatcher().submit(alert)
+    except Exception:
+        log.exception("[discord] failed to queue alert")
+        return False
@@ -0,0 +1,123 @@
+"""In-memory store for translated .docx outputs.
+
+``run_translation`` used to save every result to a ``NamedTemporaryFile``
+that was re-read on each rerun and never removed. The document is now saved
+once into a bytes buffer and kept here; the session holds an
+:class:`OutputHandle` and the download button is fed the stored bytes
+directly.
+
+Outputs leave the store when
+
+* the session ends — the handle lives in ``st.session_state``, and once it
+  is garbage-collected its entry is dropped (``weakref.finalize``);
+* they are older than ``max_age_s``;
+* all outputs together exceed ``max_bytes`` — oldest first, never the
+  newest one.
+
+``get`` returns ``None`` for an evicted output so the caller can ask for a
+new translation.
+"""
+
+from __future__ import annotations
+
+import itertools
+import logging
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from typing import Callable
+
+from utils.config import OUTPUT_STORE_MAX_AGE_S, OUTPUT_STORE_MAX_BYTES
+
+log = logging.getLogger(__name__)
+
+
+class OutputHandle:
+    """Session-side reference to a stored output."""
+
+    __slots__ = ("key", "file_name", "size", "__weakref__")
+
+    def __init__(self, key: int, file_name: str, size: int) -> None:
+        self.key = key
+        self.file_name = file_name
+        self.size = size
+
+    def __repr__(self) -> str:
+        return f"OutputHandle({self.key}, {self.file_name!r}, {self.size} B)"
+
+
+class OutputStore:
+    def __init__(
+        self,
+        max_bytes: int = OUTPUT_STORE_MAX_BYTES,
+        max_age_s: float = OUTPUT_STORE_MAX_AGE_S,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.max_bytes = max_bytes
+        self.max_age_s = max_age_s
+        self._clock = clock
+        # Re-entrant: a handle's finalizer can run from a GC pass triggered
+        # while this thread already holds the lock.
+        self._lock = threading.RLock()
+        self._ids = itertools.count(1)
+        # key -> (created_at, data); insertion order is age order.
+        self._entries: OrderedDict[int, tuple[float, bytes]] = OrderedDict()
+        self._total_bytes = 0
+
+    def put(self, data: bytes, file_name: str) -> OutputHandle:
+        handle = OutputHandle(next(self._ids), file_name, len(data))
+        with self._lock:
+            self._entries[handle.key] = (self._clock(), data)
+            self._total_bytes += len(data)
+            self._evict_locked()
+        weakref.finalize(handle, self._drop, handle.key, "session ended")
+        return handle
+
+    def get(self, handle: OutputHandle | None) -> bytes | None:
+        if handle is None:
+            return None
+        with self._lock:
+            self._evict_locked()
+            entry = self._entries.get(handle.key)
+        return entry[1] if entry else None
+
+    def stats(self) -> tuple[int, int]:
+        """``(n_outputs, total_bytes)`` currently held."""
+        with self._lock:
+            return len(self._entries), self._total_bytes
+
+    def _drop(self, key: int, reason: str) -> None:
+        with self._lock:
+            self._pop_locked(key, reason)
+
+    def _pop_locked(self, key: int, reason: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._total_bytes -= len(entry[1])
+            log.debug("[output-store] dropped #%d (%s)", key, reason)
+
+    def _evict_locked(self) -> None:
+        cutoff = self._clock() - self.max_age_s
+        for key, (created_at, _) in list(self._entries.items()):
+            if created_at >= cutoff:
+                break
+            self._pop_locked(key, "expired")
+        # The newest output always stays, even if it alone is over budget.
+        for key in list(self._entries)[:-1]:
+            if self._total_bytes <= self.max_bytes:
+                break
+            self._pop_locked(key, "over budget")
+
+
+_store_lock = threading.Lock()
+_store: OutputStore | None = None
+
+
+def get_output_store() -> OutputStore:
+    """Process-wide :class:`OutputStore`, created on first call."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = OutputStore()
+        return _store
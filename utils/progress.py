@@ -0,0 +1,155 @@
+"""Weighted progress, in-flight / retry state and ETA for one translation run.
+
+The runners feed a :class:`ProgressTracker` from worker threads (task
+start / finish, streamed paragraphs, retries) and hand immutable
+:class:`ProgressSnapshot` objects to the UI thread. Work is measured in
+paragraph-equivalent units so one 30-paragraph chunk and one big drawing
+move the bar by what they actually cost, not by "one chunk" each.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from dataclasses import dataclass
+
+from utils.config import (
+    PROGRESS_ETA_MIN_ELAPSED_S,
+    PROGRESS_FIGURE_BYTES_PER_UNIT,
+    PROGRESS_FIGURE_MIN_UNITS,
+)
+
+
+@dataclass(frozen=True)
+class ProgressSnapshot:
+    """Point-in-time view of a run, safe to hand to another thread."""
+
+    fraction: float
+    chunks_done: int
+    chunks_total: int
+    paragraphs_done: int
+    paragraphs_total: int
+    figures_done: int
+    figures_total: int
+    in_flight: int
+    retrying: int
+    backing_off: int
+    elapsed_s: float
+    eta_s: float | None
+
+
+def figure_units(image) -> float:
+    """Paragraph-equivalent weight of a figure from its decoded size."""
+    width, height = image.size
+    n_bytes = width * height * len(image.getbands())
+    return max(
+        float(PROGRESS_FIGURE_MIN_UNITS), n_bytes / PROGRESS_FIGURE_BYTES_PER_UNIT
+    )
+
+
+class ProgressTracker:
+    """Thread-safe progress accounting for one runner call.
+
+    Paragraphs are keyed by ``(chunk index, paragraph index)`` so a retried
+    or split request that re-reports a paragraph counts once. Tasks are
+    keyed by their first chunk index.
+    """
+
+    def __init__(self, chunks: list[dict], clock=time.monotonic) -> None:
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._started_at = clock()
+        self._chunk_units: list[float] = []
+        self.paragraphs_total = 0
+        self.figures_total = 0
+        for chunk in chunks:
+            if chunk["type"] == "TEXT":
+                n = len(chunk["content"])
+                self.paragraphs_total += n
+                self._chunk_units.append(float(n))
+            else:
+                self.figures_total += 1
+                self._chunk_units.append(figure_units(chunk["content"]))
+        self.total_units = sum(self._chunk_units)
+        self._chunks_done: set[int] = set()
+        self._paragraphs_done: set[tuple[int, int]] = set()
+        self._figures_done = 0
+        self._done_units = 0.0
+        self._in_flight: set[int] = set()
+        self._retried: set[int] = set()
+        self._backoff_until: dict[int, float] = {}
+
+    # -- worker-side events --
+
+    def task_started(self, key: int) -> None:
+        with self._lock:
+            self._in_flight.add(key)
+
+    def task_finished(self, key: int) -> None:
+        """The task left the worker, successfully or not."""
+        with self._lock:
+            self._in_flight.discard(key)
+            self._retried.discard(key)
+            self._backoff_until.pop(key, None)
+
+    def retry(self, key: int, sleep_s: float) -> None:
+        """The task's request failed and will be re-sent after ``sleep_s``."""
+        with self._lock:
+            self._retried.add(key)
+            if sleep_s > 0:
+                self._backoff_until[key] = self._clock() + sleep_s
+
+    def paragraph_done(self, chunk_index: int, paragraph_index: int) -> None:
+        with self._lock:
+            if chunk_index in self._chunks_done:
+                return
+            key = (chunk_index, paragraph_index)
+            if key not in self._paragraphs_done:
+                self._paragraphs_done.add(key)
+                self._done_units += 1.0
+
+    def chunk_done(self, chunk: dict, chunk_index: int) -> None:
+        with self._lock:
+            if chunk_index in self._chunks_done:
+                return
+            self._chunks_done.add(chunk_index)
+            if chunk["type"] == "TEXT":
+                # Credit only the paragraphs not already streamed in.
+                for i in range(len(chunk["content"])):
+                    key = (chunk_index, i)
+                    if key not in self._paragraphs_done:
+                        self._paragraphs_done.add(key)
+                        self._done_units += 1.0
+            else:
+                self._figures_done += 1
+                self._done_units += self._chunk_units[chunk_index]
+
+    # -- reader side --
+
+    def snapshot(self) -> ProgressSnapshot:
+        now = self._clock()
+        with self._lock:
+            done_units = self._done_units
+            elapsed = now - self._started_at
+            fraction = done_units / self.total_units if self.total_units else 1.0
+            eta = None
+            if (
+                0 < done_units < self.total_units
+                and elapsed >= PROGRESS_ETA_MIN_ELAPSED_S
+            ):
+                rate = done_units / elapsed
+                eta = (self.total_units - done_units) / rate
+            return ProgressSnapshot(
+                fraction=min(1.0, fraction),
+                chunks_done=len(self._chunks_done),
+                chunks_total=len(self._chunk_units),
+                paragraphs_done=len(self._paragraphs_done),
+                paragraphs_total=self.paragraphs_total,
+                figures_done=self._figures_done,
+                figures_total=self.figures_total,
+                in_flight=len(self._in_flight),
+                retrying=len(self._retried & self._in_flight),
+                backing_off=sum(1 for t in self._backoff_until.values() if t > now),
+                elapsed_s=elapsed,
+                eta_s=eta,
+            )
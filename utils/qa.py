@@ -0,0 +1,231 @@
+"""Post-translation QA: numerals, reference signs, units and 【】 headings.
+
+A patent translation that drops "(110)" or turns "2.5 mm" into "25 mm" reads
+fine and is wrong. :func:`check_translation` compares every TEXT paragraph's
+source and target for the tokens that must survive translation unchanged:
+
+* ``numeral`` — numbers, thousands separators ignored (``1,000`` = ``1000``);
+* ``reference_sign`` — drawing labels such as ``S110``, ``10a``, ``200'``;
+* ``unit`` — SI / patent units written after a number (``mm``, ``°C``, ``%``);
+* ``heading`` — 【】 headings. The text inside is translated, so only the
+  number of headings is compared, except numeric ones (``【0001】``).
+
+The whole document is checked at once. All paragraphs of a side are joined
+into one string with a record separator, NFKC-normalised in one call (full-
+width ``１００`` and ``℃`` match ``100`` and ``°C``) and scanned with one
+``findall`` whose pattern also matches the separator, so paragraph ids are a
+cumulative sum over the matches. Each (paragraph, token) pair of a check
+becomes one int64 key, and the per-key counts of both sides are diffed with
+NumPy; only the few paragraphs that differ are turned back into Python
+objects for the report. A 10k-paragraph spec takes a few hundred
+milliseconds, nearly all of it in the regex scan and the normalisation
+(``scripts/benchmark_qa.py``).
+
+:func:`run_qa` checks a finished run and, when ``QA_REQUEUE_ENABLED``, sends
+only the flagged paragraphs (with context, through
+:func:`utils.revision.plan_retranslation`) to the model again.
+"""
+
+from __future__ import annotations
+
+import logging
+import re
+import unicodedata
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from utils.config import QA_REQUEUE_ENABLED
+from utils.metrics import MetricsCollector, NullMetricsCollector
+from utils.revision import plan_retranslation, run_plan
+
+log = logging.getLogger(__name__)
+
+# ASCII record separator between paragraphs; stripped from the text first.
+_SEP = "\x1e"
+_UNITS = (
+    "nm|μm|mm|cm|km|m|mL|ml|L|mg|kg|g|wt%|vol%|%|°C|K|Pa|kPa|MPa|GPa|"
+    "Hz|kHz|MHz|GHz|mV|kV|V|mA|A|mW|kW|W|ms|μs|ns|s|min|rpm|dB|ppm"
+)
+_NUMBER = r"\d+(?:,\d{3})*(?:\.\d+)?"
+# One scan per side: ``findall`` returns a tuple per match, one group per
+# column below. The leading lookahead lets the engine skip most characters
+# without trying the alternatives. A number with a unit is matched before
+# reference signs so "5m" is 5 metres, while "10a" is a reference sign.
+_TOKENS = re.compile(
+    rf"(?=[{_SEP}【0-9A-Z])(?:"
+    rf"({_SEP})"
+    r"|(【\d+】|【)"
+    rf"|({_NUMBER})\s?({_UNITS})(?![A-Za-z])"
+    r"|(?<![A-Za-z0-9])([A-Z]{1,2}\d+[a-z]?'*|\d+[a-z]'*|\d+'+)(?![A-Za-z0-9])"
+    rf"|({_NUMBER}))"
+)
+# Check name → columns of ``_TOKENS`` groups (0 is the separator).
+QA_CHECKS: dict[str, tuple[int, ...]] = {
+    "numeral": (2, 5),
+    "reference_sign": (4,),
+    "unit": (3,),
+    "heading": (1,),
+}
+
+
+@dataclass(frozen=True)
+class QAIssue:
+    """One check failing on one paragraph.
+
+    ``missing`` tokens are in the source but not the target, ``extra`` the
+    other way round (repeated as often as the counts differ).
+    """
+
+    chunk: int
+    paragraph: int
+    check: str
+    missing: tuple[str, ...]
+    extra: tuple[str, ...]
+    source: str
+    target: str
+
+
+@dataclass
+class QAReport:
+    n_paragraphs: int = 0
+    issues: list[QAIssue] = field(default_factory=list)
+    # Paragraphs :func:`run_qa` sent to the model again before this check.
+    n_requeued: int = 0
+
+    def flagged(self) -> dict[int, list[int]]:
+        """Failing paragraph positions per chunk index."""
+        out: dict[int, set[int]] = {}
+        for issue in self.issues:
+            out.setdefault(issue.chunk, set()).add(issue.paragraph)
+        return {chunk: sorted(positions) for chunk, positions in out.items()}
+
+    @property
+    def n_flagged(self) -> int:
+        return sum(len(p) for p in self.flagged().values())
+
+
+def extract_tokens(
+    paragraphs: list[str],
+) -> dict[str, tuple[np.ndarray, np.ndarray]]:
+    """Check name → ``(paragraph ids, tokens)`` over all ``paragraphs``."""
+    text = _SEP.join(paragraphs)
+    if text.count(_SEP) != max(len(paragraphs) - 1, 0):
+        text = _SEP.join(p.replace(_SEP, " ") for p in paragraphs)
+    found = _TOKENS.findall(unicodedata.normalize("NFKC", text))
+    # An object array skips sizing fixed-width string columns for every
+    # match; only the tokens a check keeps are converted to ``str`` dtype.
+    columns = np.array(found, dtype=object).reshape(-1, _TOKENS.groups).T
+    ids = np.cumsum(columns[0] != "")
+    out = {}
+    for check, groups in QA_CHECKS.items():
+        check_ids, tokens = [], []
+        for group in groups:
+            hit = columns[group] != ""
+            check_ids.append(ids[hit])
+            tokens.append(columns[group][hit].astype(str))
+        tokens = np.concatenate(tokens)
+        if check == "numeral" and len(tokens):
+            tokens = np.char.replace(tokens, ",", "")
+        out[check] = (np.concatenate(check_ids).astype(np.int64), tokens)
+    return out
+
+
+def _diff(
+    source: tuple[np.ndarray, np.ndarray], target: tuple[np.ndarray, np.ndarray]
+) -> list[tuple[int, int, str]]:
+    """``(paragraph id, source count - target count, token)`` where nonzero."""
+    (src_ids, src_tokens), (tgt_ids, tgt_tokens) = source, target
+    if not len(src_tokens) and not len(tgt_tokens):
+        return []
+    vocab, inverse = np.unique(
+        np.concatenate([src_tokens, tgt_tokens]), return_inverse=True
+    )
+    keys = np.concatenate([src_ids, tgt_ids]) * len(vocab) + inverse.ravel()
+    weights = np.concatenate(
+        [np.ones(len(src_ids), np.int64), -np.ones(len(tgt_ids), np.int64)]
+    )
+    unique_keys, key_index = np.unique(keys, return_inverse=True)
+    net = np.bincount(key_index.ravel(), weights, len(unique_keys)).astype(np.int64)
+    bad = np.flatnonzero(net)
+    return [
+        (int(key // len(vocab)), int(n), str(vocab[key % len(vocab)]))
+        for key, n in zip(unique_keys[bad], net[bad])
+    ]
+
+
+def check_translation(chunks) -> QAReport:
+    """Compare source and target of every translated TEXT paragraph."""
+    source: list[str] = []
+    target: list[str] = []
+    where: list[tuple[int, int]] = []
+    for i, chunk in enumerate(chunks):
+        translated = chunk.get("translated")
+        if chunk["type"] != "TEXT" or translated is None:
+            continue
+        source.extend(chunk["content"])
+        target.extend(translated)
+        where.extend((i, pos) for pos in range(len(translated)))
+    report = QAReport(n_paragraphs=len(where))
+
+    source_tokens = extract_tokens(source)
+    target_tokens = extract_tokens(target)
+    for check in QA_CHECKS:
+        per_paragraph: dict[int, tuple[list[str], list[str]]] = {}
+        for paragraph, n, token in _diff(source_tokens[check], target_tokens[check]):
+            missing, extra = per_paragraph.setdefault(paragraph, ([], []))
+            (missing if n > 0 else extra).extend([token] * abs(n))
+        for paragraph, (missing, extra) in sorted(per_paragraph.items()):
+            chunk, pos = where[paragraph]
+            report.issues.append(
+                QAIssue(
+                    chunk=chunk,
+                    paragraph=pos,
+                    check=check,
+                    missing=tuple(missing),
+                    extra=tuple(extra),
+                    source=source[paragraph],
+                    target=target[paragraph],
+                )
+            )
+    report.issues.sort(key=lambda issue: (issue.chunk, issue.paragraph))
+    return report
+
+
+def run_qa(
+    chunks,
+    requeue: bool | None = None,
+    context: int | None = None,
+    metrics_collector: MetricsCollector | NullMetricsCollector | None = None,
+    **runner_kwargs,
+) -> tuple[list, QAReport]:
+    """Check ``chunks``; optionally retranslate the flagged paragraphs once.
+
+    Returns the (possibly updated) chunks and the report of the final
+    check. ``context`` neighbours are sent with each flagged paragraph as in
+    :func:`~utils.revision.translate_revision`; ``runner_kwargs`` go to
+    :func:`~utils.translation_runner.translate_chunks_parallel` for the
+    requeued windows.
+    """
+    if requeue is None:
+        requeue = QA_REQUEUE_ENABLED
+    metrics = metrics_collector or NullMetricsCollector()
+    with metrics.span("qa_check"):
+        report = check_translation(chunks)
+    if report.issues and requeue:
+        n_requeued = report.n_flagged
+        log.info("[qa] %d paragraphs flagged; translating again", n_requeued)
+        metrics.incr("n_qa_requeued", n_requeued)
+        plan = plan_retranslation(chunks, report.flagged(), context)
+        chunks = run_plan(chunks, plan, metrics, **runner_kwargs)
+        with metrics.span("qa_check"):
+            report = check_translation(chunks)
+        report.n_requeued = n_requeued
+    metrics.incr("n_qa_flagged", report.n_flagged)
+    if report.issues:
+        log.info(
+            "[qa] %d of %d paragraphs flagged for review",
+            report.n_flagged,
+            report.n_paragraphs,
+        )
+    return chunks, report
@@ -0,0 +1,321 @@
+"""Incremental retranslation of a revised document.
+
+Patent drafts go through many revision rounds in which only a few paragraphs
+change. A finished run is summarised as an :class:`Alignment` — every TEXT
+paragraph's source next to its translation, plus figure translations keyed
+by a hash of the image bytes — which the app offers as a small JSON download
+next to the .docx. Given the alignment of the previous revision (and/or a
+:class:`~utils.segments.TranslationMemory` of related filings),
+:func:`translate_revision`
+
+1. diffs old and new source paragraphs with :class:`difflib.SequenceMatcher`
+   (whitespace-normalised, so re-flowed spacing is not an edit);
+2. reuses the stored translation of every paragraph in an ``equal`` block,
+   then of every other paragraph found in the memory, and of every figure
+   whose bytes did not change;
+3. sends each run of inserted / modified paragraphs, widened by up to
+   ``context`` neighbours on each side within its chunk, as one TEXT
+   request through :func:`~utils.translation_runner.translate_chunks_parallel`.
+   The neighbours' fresh translations are only context and are discarded,
+   so unchanged paragraphs read exactly as in the previous output.
+
+The result has the same shape as a full run (every chunk with
+``translated`` set), so ``build_doc_from_translated_chunks`` numbers the
+paragraphs from scratch and inserted or deleted paragraphs shift the
+【NNNN】 numbers like in a fresh translation.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+from dataclasses import dataclass, field
+from difflib import SequenceMatcher
+
+from utils.config import REVISION_CONTEXT_PARAGRAPHS
+from utils.elements import Chunk
+from utils.metrics import MetricsCollector, NullMetricsCollector
+from utils.segments import TranslationMemory
+from utils.translation import ImageTranslation
+from utils.translation_runner import translate_chunks_parallel
+
+log = logging.getLogger(__name__)
+
+ALIGNMENT_FORMAT = "ko-jp-patent-alignment"
+ALIGNMENT_VERSION = 1
+
+
+def figure_key(chunk) -> str:
+    """Hash of a FIGURE chunk's image: the stored bytes, or decoded pixels."""
+    blob = getattr(chunk, "blob", None)
+    if blob is None:
+        image = chunk["content"]
+        blob = f"{image.mode}{image.size}".encode() + image.tobytes()
+    return hashlib.sha1(blob).hexdigest()
+
+
+def _norm(paragraph: str) -> str:
+    return " ".join(paragraph.split())
+
+
+@dataclass
+class Alignment:
+    """Source ↔ translation pairs of one finished run."""
+
+    paragraphs: list[tuple[str, str]] = field(default_factory=list)
+    # figure hash → (original, translated, box_2d) per label
+    figures: dict[str, list[tuple[str, str, list[int]]]] = field(default_factory=dict)
+    model_name: str = ""
+
+    @classmethod
+    def from_chunks(cls, chunks, model_name: str = "") -> Alignment:
+        """Alignment of translated ``chunks`` (every one has ``translated``)."""
+        alignment = cls(model_name=model_name)
+        for chunk in chunks:
+            translated = chunk.get("translated")
+            if translated is None:
+                raise ValueError(f"{chunk!r} has no translation")
+            if chunk["type"] == "TEXT":
+                alignment.paragraphs.extend(zip(chunk["content"], translated))
+            elif chunk["type"] == "FIGURE":
+                alignment.figures[figure_key(chunk)] = [
+                    (item.original, item.translated, list(item.box_2d))
+                    for item in translated
+                ]
+        return alignment
+
+    def to_json(self) -> bytes:
+        payload = {
+            "format": ALIGNMENT_FORMAT,
+            "version": ALIGNMENT_VERSION,
+            "model_name": self.model_name,
+            "paragraphs": [list(pair) for pair in self.paragraphs],
+            "figures": {k: [list(i) for i in v] for k, v in self.figures.items()},
+        }
+        return json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode(
+            "utf-8"
+        )
+
+    @classmethod
+    def from_json(cls, data: bytes | str) -> Alignment:
+        """Parse :meth:`to_json` output; ``ValueError`` for anything else."""
+        try:
+            payload = json.loads(data)
+        except (UnicodeDecodeError, ValueError) as e:
+            raise ValueError("not an alignment file (invalid JSON)") from e
+        if not isinstance(payload, dict) or payload.get("format") != ALIGNMENT_FORMAT:
+            raise ValueError("not an alignment file")
+        if payload.get("version") != ALIGNMENT_VERSION:
+            raise ValueError(
+                f"unsupported alignment version {payload.get('version')!r}"
+            )
+        try:
+            paragraphs = [(str(s), str(t)) for s, t in payload["paragraphs"]]
+            # Files written before box_2d hold [original, translated] pairs.
+            figures = {
+                str(key): [
+                    (str(o), str(t), [int(v) for v in (box[0] if box else [])])
+                    for o, t, *box in items
+                ]
+                for key, items in payload.get("figures", {}).items()
+            }
+        except (AttributeError, KeyError, TypeError, ValueError) as e:
+            raise ValueError("malformed alignment file") from e
+        return cls(paragraphs, figures, str(payload.get("model_name", "")))
+
+
+@dataclass
+class RevisionPlan:
+    """What :func:`translate_revision` sends and what it reuses.
+
+    ``translated[i]`` is chunk ``i``'s reused translation — for TEXT a list
+    with ``None`` at every paragraph still to translate, for FIGURE the
+    stored items or ``None``. ``requests[k]`` fills ``targets[k]``:
+    ``(chunk index, start, stop)`` of a TEXT window, or ``(chunk index,
+    None, None)`` for a whole figure.
+    """
+
+    translated: list[list | None]
+    requests: list = field(default_factory=list)
+    targets: list[tuple[int, int | None, int | None]] = field(default_factory=list)
+    n_reused_paragraphs: int = 0
+    n_reused_figures: int = 0
+
+    @property
+    def n_changed_paragraphs(self) -> int:
+        return sum(t.count(None) for t in self.translated if t)
+
+
+def _text_window(chunk, start: int, stop: int):
+    if isinstance(chunk, Chunk):
+        return Chunk.text(chunk.table, chunk.start + start, chunk.start + stop)
+    return {"type": "TEXT", "content": chunk["content"][start:stop]}
+
+
+def _windows(dirty: list[int], n: int, context: int) -> list[tuple[int, int]]:
+    """Merge ``[pos - context, pos + context]`` ranges into ``(start, stop)``."""
+    windows: list[tuple[int, int]] = []
+    for pos in dirty:
+        start, stop = max(0, pos - context), min(n, pos + context + 1)
+        if windows and start <= windows[-1][1]:
+            windows[-1] = (windows[-1][0], max(windows[-1][1], stop))
+        else:
+            windows.append((start, stop))
+    return windows
+
+
+def plan_revision(
+    chunks,
+    alignment: Alignment | None,
+    context: int | None = None,
+    memory: TranslationMemory | None = None,
+) -> RevisionPlan:
+    """Diff ``chunks`` against ``alignment``; see the module docstring.
+
+    Paragraphs the diff leaves open are then looked up in ``memory``
+    (exact matches from a related filing's exported segments).
+    """
+    if context is None:
+        context = REVISION_CONTEXT_PARAGRAPHS
+    if alignment is None:
+        alignment = Alignment()
+    contents = [c["content"] if c["type"] == "TEXT" else None for c in chunks]
+    new_keys = [_norm(p) for content in contents if content for p in content]
+    old_keys = [_norm(source) for source, _ in alignment.paragraphs]
+
+    reused: list[str | None] = [None] * len(new_keys)
+    n_reused = 0
+    matcher = SequenceMatcher(None, old_keys, new_keys, autojunk=False)
+    for old_start, new_start, size in matcher.get_matching_blocks():
+        for k in range(size):
+            reused[new_start + k] = alignment.paragraphs[old_start + k][1]
+        n_reused += size
+    if memory is not None and len(memory):
+        for j, paragraph in enumerate(
+            p for content in contents if content for p in content
+        ):
+            if reused[j] is None and paragraph.strip():
+                reused[j] = memory.lookup(paragraph)
+                n_reused += reused[j] is not None
+
+    plan = RevisionPlan(translated=[None] * len(chunks), n_reused_paragraphs=n_reused)
+    offset = 0
+    for i, chunk in enumerate(chunks):
+        if chunk["type"] == "FIGURE":
+            items = alignment.figures.get(figure_key(chunk))
+            if items is not None:
+                plan.translated[i] = [
+                    ImageTranslation(original=o, translated=t, box_2d=box)
+                    for o, t, box in items
+                ]
+                plan.n_reused_figures += 1
+            else:
+                plan.requests.append(chunk)
+                plan.targets.append((i, None, None))
+            continue
+        content = contents[i]
+        translated = reused[offset : offset + len(content)]
+        offset += len(content)
+        # A blank source paragraph translates to a blank one.
+        for pos, paragraph in enumerate(content):
+            if translated[pos] is None and not paragraph.strip():
+                translated[pos] = ""
+        _plan_text_chunk(plan, i, chunk, translated, context)
+    return plan
+
+
+def _plan_text_chunk(
+    plan: RevisionPlan, i: int, chunk, translated: list, context: int
+) -> None:
+    """Queue a window request around every ``None`` in ``translated``."""
+    plan.translated[i] = translated
+    dirty = [pos for pos, t in enumerate(translated) if t is None]
+    for start, stop in _windows(dirty, len(translated), context):
+        plan.requests.append(_text_window(chunk, start, stop))
+        plan.targets.append((i, start, stop))
+
+
+def plan_retranslation(
+    chunks, flagged: dict[int, list[int]], context: int | None = None
+) -> RevisionPlan:
+    """Plan to translate only ``flagged`` paragraphs (chunk → positions) again.
+
+    Every other paragraph and figure keeps its current translation.
+    """
+    if context is None:
+        context = REVISION_CONTEXT_PARAGRAPHS
+    plan = RevisionPlan(translated=[c["translated"] for c in chunks])
+    for i, positions in sorted(flagged.items()):
+        translated = list(chunks[i]["translated"])
+        for pos in positions:
+            translated[pos] = None
+        _plan_text_chunk(plan, i, chunks[i], translated, context)
+    return plan
+
+
+def translate_revision(
+    chunks,
+    alignment: Alignment | None,
+    context: int | None = None,
+    metrics_collector: MetricsCollector | NullMetricsCollector | None = None,
+    memory: TranslationMemory | None = None,
+    chunk_callback=None,
+    **runner_kwargs,
+) -> list:
+    """Translate a revised document, reusing ``alignment`` where unchanged.
+
+    Returns copies of ``chunks`` with ``translated`` set, like
+    :func:`translate_chunks_parallel` (which gets ``runner_kwargs`` and
+    runs only the changed windows and figures); its failure, cancellation
+    and quota behaviour apply unchanged. ``chunk_callback`` fires for every
+    merged chunk, in order, once all requests are back.
+    """
+    metrics = metrics_collector or NullMetricsCollector()
+    plan = plan_revision(chunks, alignment, context, memory)
+    metrics.incr("n_reused_paragraphs", plan.n_reused_paragraphs)
+    metrics.incr("n_reused_figures", plan.n_reused_figures)
+    log.info(
+        "Revision: %d paragraphs / %d figures reused, %d paragraphs changed, "
+        "%d requests",
+        plan.n_reused_paragraphs,
+        plan.n_reused_figures,
+        plan.n_changed_paragraphs,
+        len(plan.requests),
+    )
+    return run_plan(chunks, plan, metrics, chunk_callback, **runner_kwargs)
+
+
+def run_plan(
+    chunks,
+    plan: RevisionPlan,
+    metrics_collector: MetricsCollector | NullMetricsCollector | None = None,
+    chunk_callback=None,
+    **runner_kwargs,
+) -> list:
+    """Send ``plan.requests`` and merge them into copies of ``chunks``."""
+    metrics = metrics_collector or NullMetricsCollector()
+    results = []
+    if plan.requests:
+        results = translate_chunks_parallel(
+            plan.requests, metrics_collector=metrics, **runner_kwargs
+        )
+
+    merged = plan.translated
+    for (i, start, _), result in zip(plan.targets, results):
+        if start is None:
+            merged[i] = result["translated"]
+            continue
+        for pos, paragraph in enumerate(result["translated"], start):
+            if merged[i][pos] is None:
+                merged[i][pos] = paragraph
+
+    out = []
+    for chunk, translated in zip(chunks, merged):
+        chunk = chunk.copy()
+        chunk["translated"] = translated
+        out.append(chunk)
+    if chunk_callback is not None:
+        for index, chunk in enumerate(out):
+            chunk_callback(index, chunk)
+    return out
@@ -0,0 +1,396 @@
+"""Process-wide task scheduler for translation requests.
+
+Every Streamlit session and every batch job lives in the same process, and
+each parallel run used to start its own ``ThreadPoolExecutor``. N concurrent
+runs meant N x ``max_workers`` requests in flight with nobody arbitrating:
+an overnight batch of large documents could fill the API quota and the
+machine while a user waited on a one-page upload.
+
+:class:`TaskScheduler` owns one pool of daemon worker threads. A run opens a
+:class:`RunQueue` in a priority class and submits tasks to it; each submit
+returns a regular :class:`concurrent.futures.Future`, so the runner's
+``wait()`` loop is unchanged. When a worker frees up it picks
+
+1. the priority class with the lowest virtual time — a class advances by
+   ``1 / weight`` per dispatched task, so with weights interactive 4 /
+   batch 1 interactive work gets four of every five free workers while both
+   have a backlog and batch work still gets the fifth;
+2. within that class, the document with the lowest virtual time — equal
+   shares, so one 300-chunk batch cannot starve the next document in line.
+
+A queue (or class) that goes idle and comes back is lifted to the lowest
+virtual time of its active peers, so idling never banks credit. Workers
+reserved for interactive work are never handed to other classes, and a
+queue's ``max_in_flight`` still caps that document alone.
+
+Worker count does not bound memory — a figure request holds its decoded
+pixels and payload, a text request next to nothing — so tasks also carry a
+``cost`` in bytes, reserved from a process-wide budget (``MEMORY_BUDGET_MB``)
+while they run. The first task found not to fit is held at the head of the
+line: no other task starts, in any queue, until it does, so a steady stream
+of small text tasks cannot keep a large figure waiting forever. Only tasks
+already running have to finish; each one that does wakes the idle workers
+to look again.
+"""
+
+from __future__ import annotations
+
+import itertools
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Any, Callable
+
+from utils.config import (
+    MEMORY_BUDGET_MB,
+    PRIORITY_INTERACTIVE,
+    SCHEDULER_CLASS_WEIGHTS,
+    SCHEDULER_DEFAULT_PRIORITY,
+    SCHEDULER_INTERACTIVE_RESERVED_WORKERS,
+    SCHEDULER_MAX_WORKERS,
+)
+from utils.metrics import set_memory_stats_provider
+
+log = logging.getLogger(__name__)
+
+
+class _Job:
+    __slots__ = ("fn", "args", "cost", "future", "submitted_at")
+
+    def __init__(
+        self, fn: Callable, args: tuple, cost: int, submitted_at: float
+    ) -> None:
+        self.fn = fn
+        self.args = args
+        self.cost = cost
+        self.future: Future = Future()
+        self.submitted_at = submitted_at
+
+
+class RunQueue:
+    """One run's tasks inside a :class:`TaskScheduler`.
+
+    ``on_start(submitted_at, started_at)`` is called on the worker thread
+    right before a task runs (monotonic seconds) — the runner turns it into
+    the ``queue_wait`` span. ``close()`` cancels whatever has not started
+    yet; running tasks finish on their own.
+    """
+
+    def __init__(
+        self,
+        scheduler: TaskScheduler,
+        name: str,
+        priority: str,
+        max_in_flight: int,
+        on_start: Callable[[float, float], None] | None,
+    ) -> None:
+        self.name = name
+        self.priority = priority
+        self.max_in_flight = max(1, max_in_flight)
+        self._scheduler = scheduler
+        self._on_start = on_start
+        self._pending: deque[_Job] = deque()
+        self._in_flight = 0
+        self._vtime = 0.0
+        self._closed = False
+
+    def submit(self, fn: Callable, *args: Any, cost: int = 0) -> Future:
+        """Queue ``fn(*args)``; ``cost`` bytes of the memory budget while it runs."""
+        return self._scheduler._submit(self, fn, args, cost)
+
+    def close(self) -> int:
+        """Stop accepting tasks and cancel the queued ones; returns how many."""
+        return self._scheduler._close(self)
+
+    def __enter__(self) -> RunQueue:
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+    def __repr__(self) -> str:
+        return (
+            f"RunQueue({self.name!r}, {self.priority}, "
+            f"pending={len(self._pending)}, in_flight={self._in_flight})"
+        )
+
+
+class TaskScheduler:
+    def __init__(
+        self,
+        max_workers: int = SCHEDULER_MAX_WORKERS,
+        class_weights: dict[str, float] = SCHEDULER_CLASS_WEIGHTS,
+        reserved_workers: int = SCHEDULER_INTERACTIVE_RESERVED_WORKERS,
+        memory_budget_mb: float | None = MEMORY_BUDGET_MB,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.max_workers = max(1, max_workers)
+        self.memory_budget = (
+            None if memory_budget_mb is None else int(memory_budget_mb * 1024 * 1024)
+        )
+        self._weights = dict(class_weights)
+        # Tasks of non-interactive classes running at once.
+        self._shared_limit = max(1, self.max_workers - reserved_workers)
+        self._clock = clock
+        self._cond = threading.Condition()
+        self._queues: dict[str, list[RunQueue]] = {c: [] for c in self._weights}
+        self._class_vtime = dict.fromkeys(self._weights, 0.0)
+        self._n_shared_running = 0
+        self._reserved = 0
+        # The task at the head of the line for memory, while it does not fit.
+        self._blocked: _Job | None = None
+        self._threads: list[threading.Thread] = []
+        self._idle = 0
+        self._stopped = False
+        self._ids = itertools.count(1)
+
+    def open_queue(
+        self,
+        name: str = "",
+        priority: str = SCHEDULER_DEFAULT_PRIORITY,
+        max_in_flight: int | None = None,
+        on_start: Callable[[float, float], None] | None = None,
+    ) -> RunQueue:
+        if priority not in self._weights:
+            raise ValueError(
+                f"unknown priority class {priority!r}; "
+                f"expected one of {sorted(self._weights)}"
+            )
+        queue = RunQueue(
+            self,
+            name or f"run-{next(self._ids)}",
+            priority,
+            self.max_workers if max_in_flight is None else max_in_flight,
+            on_start,
+        )
+        with self._cond:
+            if self._stopped:
+                raise RuntimeError("scheduler is shut down")
+            self._queues[priority].append(queue)
+        return queue
+
+    def stats(self) -> dict[str, tuple[int, int]]:
+        """Per priority class: ``(queued tasks, running tasks)``."""
+        with self._cond:
+            return {
+                cls: (
+                    sum(len(q._pending) for q in queues),
+                    sum(q._in_flight for q in queues),
+                )
+                for cls, queues in self._queues.items()
+            }
+
+    def memory_stats(self) -> tuple[int, int]:
+        """``(bytes reserved by running tasks, queued tasks that do not fit)``."""
+        with self._cond:
+            n_waiting = sum(
+                1
+                for queues in self._queues.values()
+                for q in queues
+                for job in q._pending
+                if not self._fits_locked(job.cost)
+            )
+            return self._reserved, n_waiting
+
+    def shutdown(self) -> None:
+        """Cancel every queued task and let the idle workers exit."""
+        with self._cond:
+            self._stopped = True
+            queues = [q for qs in self._queues.values() for q in qs]
+            self._cond.notify_all()
+        for queue in queues:
+            queue.close()
+
+    # -- RunQueue side --
+
+    def _submit(
+        self, queue: RunQueue, fn: Callable, args: tuple, cost: int
+    ) -> Future:
+        job = _Job(fn, args, max(0, cost), self._clock())
+        with self._cond:
+            if queue._closed or self._stopped:
+                raise RuntimeError(f"{queue.name}: queue is closed")
+            if not queue._pending:
+                self._activate_locked(queue)
+            queue._pending.append(job)
+            if self._idle:
+                self._idle -= 1
+                self._cond.notify()
+            elif len(self._threads) < self.max_workers:
+                self._spawn_locked()
+        return job.future
+
+    def _close(self, queue: RunQueue) -> int:
+        with self._cond:
+            queue._closed = True
+            jobs = list(queue._pending)
+            queue._pending.clear()
+            if self._blocked in jobs:
+                self._blocked = None
+                self._wake_idle_locked()
+            queues = self._queues[queue.priority]
+            if queue in queues:
+                queues.remove(queue)
+        for job in jobs:
+            job.future.cancel()
+        return len(jobs)
+
+    def _activate_locked(self, queue: RunQueue) -> None:
+        """Lift a queue (and its class) that was idle to its active peers."""
+        peers = self._queues[queue.priority]
+        active = [q._vtime for q in peers if q._pending]
+        if active:
+            queue._vtime = max(queue._vtime, min(active))
+        else:
+            others = [
+                self._class_vtime[cls]
+                for cls, qs in self._queues.items()
+                if cls != queue.priority and any(q._pending for q in qs)
+            ]
+            if others:
+                self._class_vtime[queue.priority] = max(
+                    self._class_vtime[queue.priority], min(others)
+                )
+
+    # -- worker side --
+
+    def _spawn_locked(self) -> None:
+        thread = threading.Thread(
+            target=self._worker_loop,
+            name=f"scheduler-worker-{len(self._threads) + 1}",
+            daemon=True,
+        )
+        self._threads.append(thread)
+        thread.start()
+
+    def _fits_locked(self, cost: int) -> bool:
+        # Alone, any task fits: one larger than the budget must still run.
+        return (
+            self.memory_budget is None
+            or not self._reserved
+            or self._reserved + cost <= self.memory_budget
+        )
+
+    def _admissible_locked(self, queue: RunQueue) -> bool:
+        """Whether the queue's next task may start now.
+
+        A task that does not fit becomes the blocked one; until it starts,
+        every other task is held behind it.
+        """
+        job = queue._pending[0]
+        if self._blocked is not None and job is not self._blocked:
+            return False
+        if self._fits_locked(job.cost):
+            return True
+        self._blocked = job
+        return False
+
+    def _wake_idle_locked(self) -> None:
+        if self._idle:
+            self._cond.notify(self._idle)
+            self._idle = 0
+
+    def _next_job_locked(self) -> tuple[RunQueue, _Job] | None:
+        best: RunQueue | None = None
+        for cls, queues in self._queues.items():
+            if cls != PRIORITY_INTERACTIVE and (
+                self._n_shared_running >= self._shared_limit
+            ):
+                continue
+            ready = [
+                q
+                for q in queues
+                if q._pending
+                and q._in_flight < q.max_in_flight
+                and self._admissible_locked(q)
+            ]
+            if not ready:
+                continue
+            candidate = min(ready, key=lambda q: q._vtime)
+            if best is None or self._class_vtime[cls] < self._class_vtime[
+                best.priority
+            ]:
+                best = candidate
+        if best is None:
+            return None
+        queue = best
+        job = queue._pending.popleft()
+        if job is self._blocked:
+            # The tasks held behind it may fit next to it.
+            self._blocked = None
+            self._wake_idle_locked()
+        queue._vtime += 1.0
+        self._class_vtime[queue.priority] += 1.0 / self._weights[queue.priority]
+        queue._in_flight += 1
+        if queue.priority != PRIORITY_INTERACTIVE:
+            self._n_shared_running += 1
+        self._reserved += job.cost
+        return queue, job
+
+    def _release_locked(self, queue: RunQueue, job: _Job) -> None:
+        queue._in_flight -= 1
+        if queue.priority != PRIORITY_INTERACTIVE:
+            self._n_shared_running -= 1
+        self._reserved -= job.cost
+
+    def _worker_loop(self) -> None:
+        while True:
+            with self._cond:
+                while True:
+                    picked = self._next_job_locked()
+                    if picked is None:
+                        if self._stopped:
+                            return
+                        self._idle += 1
+                        self._cond.wait()
+                        continue
+                    queue, job = picked
+                    if job.future.set_running_or_notify_cancel():
+                        break
+                    self._release_locked(queue, job)
+            self._run(queue, job)
+
+    def _run(self, queue: RunQueue, job: _Job) -> None:
+        try:
+            if queue._on_start is not None:
+                try:
+                    queue._on_start(job.submitted_at, self._clock())
+                except Exception:
+                    log.exception("[scheduler] %s: on_start hook failed", queue.name)
+            try:
+                result = job.fn(*job.args)
+            except BaseException as e:
+                job.future.set_exception(e)
+            else:
+                job.future.set_result(result)
+        finally:
+            with self._cond:
+                self._release_locked(queue, job)
+                # The freed slot may unblock a task this worker will not
+                # pick (it prefers another class), so hand it to an idler;
+                # freed memory may admit several waiting tasks at once.
+                if self._idle and any(
+                    q._pending for qs in self._queues.values() for q in qs
+                ):
+                    n = self._idle if job.cost else 1
+                    self._idle -= n
+                    self._cond.notify(n)
+
+
+_scheduler_lock = threading.Lock()
+_scheduler: TaskScheduler | None = None
+
+
+def get_scheduler() -> TaskScheduler:
+    """Process-wide :class:`TaskScheduler`, created on first call.
+
+    Its memory budget is what the metrics sample rows report.
+    """
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = TaskScheduler()
+            set_memory_stats_provider(_scheduler.memory_stats)
+        return _scheduler
@@ -0,0 +1,304 @@
+"""Aligned source/target segments: TMX 1.4, JSONL and Parquet export.
+
+A finished chunk holds ``content`` and ``translated`` aligned by index, which
+used to be thrown away once the .docx was built. :class:`SegmentWriter`
+writes them out as chunks complete (the runner's ``chunk_callback``), so a
+long run leaves a usable artifact even if it fails halfway:
+
+* TMX 1.4 — for import into a translation-memory tool;
+* JSONL — one segment per line, same fields as the Parquet columns;
+* Parquet — only when ``pyarrow`` is installed (not a requirement of the
+  app); rows are buffered into row groups of ``_PARQUET_ROW_GROUP``.
+
+Segments are sentences where the alignment is unambiguous — a paragraph
+whose Korean and Japanese sides split into the same number of sentences —
+and whole paragraphs otherwise. Figure labels are segments of their own.
+
+:class:`TranslationMemory` reads either file back for exact-match lookups,
+which :func:`utils.revision.translate_revision` uses to skip the API for
+paragraphs a related filing already translated.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import re
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from typing import IO, Iterator
+from xml.etree import ElementTree
+from xml.sax.saxutils import escape, quoteattr
+
+log = logging.getLogger(__name__)
+
+SOURCE_LANG = "ko-KR"
+TARGET_LANG = "ja-JP"
+_CREATION_TOOL = "ko-jp-patent-translator"
+_XML_LANG = "{http://www.w3.org/XML/1998/namespace}lang"
+# Characters XML 1.0 cannot carry, even escaped.
+_XML_INVALID = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f\ud800-\udfff\ufffe\uffff]")
+# Korean patent prose ends its sentences in "...다." — splitting only there
+# keeps "1. " numbering and "1.5 mm" intact.
+_KO_SENTENCE = re.compile(r"(?<=다\.)\s+|(?<=[?!])\s+")
+_JA_SENTENCE = re.compile(r"(?<=[。？！])")
+_PARQUET_ROW_GROUP = 5000
+
+
+@dataclass(frozen=True)
+class Segment:
+    tuid: str
+    chunk: int
+    paragraph: int
+    sentence: int  # -1: the whole paragraph
+    kind: str  # "text" | "figure"
+    source: str
+    target: str
+
+
+def split_sentences(text: str, lang: str) -> list[str]:
+    pattern = _KO_SENTENCE if lang.startswith("ko") else _JA_SENTENCE
+    return [s.strip() for s in pattern.split(text.strip()) if s.strip()]
+
+
+def iter_segments(index: int, chunk) -> Iterator[Segment]:
+    """Segments of one translated chunk (``index`` is its chunk position)."""
+    translated = chunk.get("translated") or []
+    if chunk["type"] == "FIGURE":
+        for i, item in enumerate(translated):
+            if item.original.strip() and item.translated.strip():
+                yield Segment(
+                    tuid=f"{index}-f{i}",
+                    chunk=index,
+                    paragraph=i,
+                    sentence=-1,
+                    kind="figure",
+                    source=item.original.strip(),
+                    target=item.translated.strip(),
+                )
+        return
+    for p, (source, target) in enumerate(zip(chunk["content"], translated)):
+        if not source.strip() or not target.strip():
+            continue
+        ko = split_sentences(source, SOURCE_LANG)
+        ja = split_sentences(target, TARGET_LANG)
+        if len(ko) > 1 and len(ko) == len(ja):
+            for s, (ko_s, ja_s) in enumerate(zip(ko, ja)):
+                yield Segment(f"{index}-{p}-{s}", index, p, s, "text", ko_s, ja_s)
+        else:
+            yield Segment(
+                f"{index}-{p}", index, p, -1, "text", source.strip(), target.strip()
+            )
+
+
+def _xml_text(text: str) -> str:
+    return escape(_XML_INVALID.sub("", text))
+
+
+def _open(target, mode: str) -> tuple[IO | None, bool]:
+    """``(file, owned)`` for a path, an open binary file, or ``None``."""
+    if target is None:
+        return None, False
+    if isinstance(target, (str, os.PathLike)):
+        return open(target, mode), True
+    return target, False
+
+
+class SegmentWriter:
+    """Streams segments of finished chunks to TMX / JSONL / Parquet.
+
+    Each target is a path, a binary file object (e.g. ``BytesIO``) or
+    ``None``. ``add_chunk`` may be called in completion order; ``tuid`` and
+    the ``chunk`` / ``paragraph`` / ``sentence`` columns restore document
+    order. ``close()`` finishes the TMX body and the Parquet file; files
+    the writer opened itself are closed, caller-supplied ones are not.
+    """
+
+    def __init__(
+        self,
+        tmx=None,
+        jsonl=None,
+        parquet=None,
+        *,
+        doc_name: str = "",
+        model_name: str = "",
+        tool_version: str = "",
+    ) -> None:
+        self.n_segments = 0
+        self._doc_name = doc_name
+        self._model_name = model_name
+        self._tmx, self._own_tmx = _open(tmx, "wb")
+        self._jsonl, self._own_jsonl = _open(jsonl, "wb")
+        self._parquet_target = parquet
+        self._parquet_writer = None
+        self._parquet_rows: list[dict] = []
+        self._closed = False
+        if self._tmx is not None:
+            created = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+            self._tmx.write(
+                (
+                    '<?xml version="1.0" encoding="UTF-8"?>\n'
+                    '<tmx version="1.4">\n'
+                    f"<header creationtool={quoteattr(_CREATION_TOOL)}"
+                    f" creationtoolversion={quoteattr(tool_version or 'dev')}"
+                    ' datatype="plaintext" segtype="sentence" adminlang="en-US"'
+                    f' srclang="{SOURCE_LANG}" o-tmf="{_CREATION_TOOL}"'
+                    f' creationdate="{created}"/>\n'
+                    "<body>\n"
+                ).encode("utf-8")
+            )
+
+    def add_chunk(self, index: int, chunk) -> int:
+        """Write the segments of one translated chunk; returns how many."""
+        segments = list(iter_segments(index, chunk))
+        if self._tmx is not None:
+            self._tmx.write("".join(map(self._tu, segments)).encode("utf-8"))
+        rows = [self._row(s) for s in segments]
+        if self._jsonl is not None:
+            self._jsonl.write(
+                "".join(
+                    json.dumps(row, ensure_ascii=False) + "\n" for row in rows
+                ).encode("utf-8")
+            )
+        if self._parquet_target is not None:
+            self._parquet_rows.extend(rows)
+            if len(self._parquet_rows) >= _PARQUET_ROW_GROUP:
+                self._flush_parquet()
+        self.n_segments += len(segments)
+        return len(segments)
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        if self._tmx is not None:
+            self._tmx.write(b"</body>\n</tmx>\n")
+            if self._own_tmx:
+                self._tmx.close()
+        if self._jsonl is not None and self._own_jsonl:
+            self._jsonl.close()
+        if self._parquet_target is not None:
+            self._flush_parquet()
+            if self._parquet_writer is not None:
+                self._parquet_writer.close()
+
+    def __enter__(self) -> SegmentWriter:
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+    def _row(self, segment: Segment) -> dict:
+        row = asdict(segment)
+        row["doc_name"] = self._doc_name
+        row["model_name"] = self._model_name
+        return row
+
+    def _tu(self, s: Segment) -> str:
+        segtype = "sentence" if s.sentence >= 0 else "paragraph"
+        props = "".join(
+            f'<prop type="x-{name}">{_xml_text(str(value))}</prop>'
+            for name, value in (
+                ("doc", self._doc_name),
+                ("model", self._model_name),
+                ("kind", s.kind),
+            )
+            if value
+        )
+        return (
+            f'<tu tuid="{s.tuid}" segtype="{segtype}">{props}'
+            f'<tuv xml:lang="{SOURCE_LANG}"><seg>{_xml_text(s.source)}</seg></tuv>'
+            f'<tuv xml:lang="{TARGET_LANG}"><seg>{_xml_text(s.target)}</seg></tuv>'
+            "</tu>\n"
+        )
+
+    def _flush_parquet(self) -> None:
+        if not self._parquet_rows:
+            return
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            log.info("[segments] pyarrow not installed; skipping Parquet export")
+            self._parquet_target = None
+            self._parquet_rows = []
+            return
+        table = pa.Table.from_pylist(self._parquet_rows)
+        if self._parquet_writer is None:
+            self._parquet_writer = pq.ParquetWriter(self._parquet_target, table.schema)
+        self._parquet_writer.write_table(table)
+        self._parquet_rows = []
+
+
+def _norm(text: str) -> str:
+    return " ".join(text.split())
+
+
+class TranslationMemory:
+    """Exact-match Korean → Japanese lookups from exported segments.
+
+    Keys are whitespace-normalised. ``lookup`` answers a paragraph either
+    from a paragraph segment or, when every one of its sentences is in
+    memory, by joining the sentence translations.
+    """
+
+    def __init__(self) -> None:
+        self._entries: dict[str, str] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add(self, source: str, target: str) -> None:
+        if source.strip() and target.strip():
+            self._entries[_norm(source)] = target.strip()
+
+    def lookup(self, paragraph: str) -> str | None:
+        hit = self._entries.get(_norm(paragraph))
+        if hit is not None:
+            return hit
+        sentences = split_sentences(paragraph, SOURCE_LANG)
+        if len(sentences) < 2:
+            return None
+        parts = [self._entries.get(_norm(s)) for s in sentences]
+        return None if None in parts else "".join(parts)
+
+    @classmethod
+    def from_tmx(cls, source) -> TranslationMemory:
+        """Load a TMX file (path or binary file); ``ValueError`` if invalid."""
+        memory = cls()
+        try:
+            for _, elem in ElementTree.iterparse(source):
+                if elem.tag != "tu":
+                    continue
+                texts = {}
+                for tuv in elem.iter("tuv"):
+                    lang = (tuv.get(_XML_LANG) or tuv.get("lang") or "").lower()
+                    seg = tuv.find("seg")
+                    if seg is not None:
+                        texts[lang[:2]] = "".join(seg.itertext())
+                if "ko" in texts and "ja" in texts:
+                    memory.add(texts["ko"], texts["ja"])
+                elem.clear()
+        except ElementTree.ParseError as e:
+            raise ValueError(f"invalid TMX: {e}") from e
+        return memory
+
+    @classmethod
+    def from_jsonl(cls, source) -> TranslationMemory:
+        """Load :class:`SegmentWriter` JSONL (path or binary file)."""
+        memory = cls()
+        stream, owned = _open(source, "rb")
+        try:
+            for n, line in enumerate(stream, 1):
+                if not line.strip():
+                    continue
+                try:
+                    row = json.loads(line)
+                    memory.add(row["source"], row["target"])
+                except (KeyError, TypeError, ValueError) as e:
+                    raise ValueError(f"invalid segment on line {n}") from e
+        finally:
+            if owned:
+                stream.close()
+        return memory
@@ -1,3 +1,7 @@
+from __future__ import annotations
+
+import hashlib
+import importlib.util
 import json
 import logging
 import os
@@ -5,17 +9,44 @@ import random
 import re
 import threading
 import time
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import TYPE_CHECKING
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 
-from google import genai
-from google.genai.errors import ClientError
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
+from utils.cancellation import CancellationToken, TranslationCancelled
+from utils.client_pool import ClientPool
 from utils.config import (
+    CLIENT_POOL_KEEPALIVE_CONNECTIONS,
+    CLIENT_POOL_KEEPALIVE_S,
+    CLIENT_POOL_PREWARM_CLIENTS,
     DEFAULT_GEMINI_MODEL_NAME,
+    FIGURE_BATCH_MAX_RETRIES,
+    IMAGE_BATCH_TRANSLATION_PROMPT,
+    IMAGE_BOX_PROMPT,
     IMAGE_TRANSLATION_PROMPT,
+    MODEL_ROUTING_RETRIES_PER_TIER,
+    QUOTA_BREAKER_BURST_COUNT,
+    QUOTA_BREAKER_BURST_WINDOW_S,
+    QUOTA_RESET_TIMEZONE,
+    TEXT_STREAM_CHAR_SLACK,
+    TEXT_STREAM_MAX_CHAR_RATIO,
     TEXT_TRANSLATION_PROMPT,
 )
-from utils.metrics import MetricsCollector, NullMetricsCollector
+from utils.figure_cache import FigureCache, FigureKey
+from utils.metrics import (
+    CHUNK_FIGURE,
+    CHUNK_TEXT,
+    MetricsCollector,
+    NullMetricsCollector,
+)
+
+if TYPE_CHECKING:
+    from google.genai.errors import ClientError
 
 # API key resolved once (main thread or first thread that needs it)
 _api_key = None
@@ -25,7 +56,7 @@ _api_key_lock = threading.Lock()
 _tls = threading.local()
 
 
-def _get_client():
+def _resolve_api_key() -> str:
     global _api_key
     with _api_key_lock:
         if _api_key is None:
@@ -39,15 +70,132 @@ def _get_client():
                 raise RuntimeError(
                     "GEMINI_API_KEY not found in st.secrets or GEMINI_API_KEY env"
                 )
-    if not getattr(_tls, "client", None):
-        _tls.client = genai.Client(api_key=_api_key)
-    return _tls.client
+        return _api_key
+
+
+def _client_error() -> type[ClientError]:
+    # The SDK (~0.4 s of imports) loads with the first client, not with the
+    # app; by the time an API error can be caught, it is imported anyway.
+    from google.genai.errors import ClientError
+
+    return ClientError
+
+
+def _new_client():
+    """Client whose idle connections outlive a run (httpx default: 5 s).
+
+    HTTP/2 when the optional ``h2`` package is installed.
+    """
+    import httpx
+    from google import genai
+    from google.genai import types
+
+    client_args = {
+        "limits": httpx.Limits(
+            max_keepalive_connections=CLIENT_POOL_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=CLIENT_POOL_KEEPALIVE_S,
+        ),
+        "http2": importlib.util.find_spec("h2") is not None,
+    }
+    return genai.Client(
+        api_key=_resolve_api_key(),
+        http_options=types.HttpOptions(client_args=client_args),
+    )
+
+
+# Pre-built clients (utils/client_pool.py): a thread's first request takes one
+# from here instead of building a client and connection on the spot.
+_client_pool = ClientPool(_new_client)
+
+
+def _get_client():
+    client = getattr(_tls, "client", None)
+    if client is None:
+        client = _tls.client = _client_pool.acquire()
+    return client
+
+
+def _warm_up(client) -> None:
+    # Model metadata: no tokens, but a full TLS handshake on the connection.
+    client.models.get(model=DEFAULT_GEMINI_MODEL_NAME)
+
+
+def prewarm_clients(
+    n: int = CLIENT_POOL_PREWARM_CLIENTS, background: bool = True
+) -> threading.Thread | int | None:
+    """Build and connect ``n`` clients before the first run needs them.
+
+    In the background by default (returns the thread, or ``None`` when ``n``
+    clients exist already); ``background=False`` waits and returns how many
+    clients were added. Without an API key nothing is built — the first run
+    will report that — and later calls return at once until a client has
+    been built (see :class:`~utils.client_pool.ClientPool`).
+    """
+    if background:
+        return _client_pool.start_prewarm(n, _warm_up)
+    return _client_pool.prewarm(n, _warm_up)
 
 
 # 구조화 모델
 class ImageTranslation(BaseModel):
     original: str
     translated: str
+    # [ymin, xmin, ymax, xmax] of the original text, 0-1000; empty if unknown
+    # (older cache entries / alignment files). Used by utils/figure_overlay.py.
+    box_2d: list[int] = Field(default_factory=list)
+
+
+class FigureTranslations(BaseModel):
+    """One figure's items in a batched figure response."""
+
+    figure_index: int
+    items: list[ImageTranslation]
+
+
+# Figure cache namespace: editing either figure prompt invalidates entries
+# translated under the old wording. Answers with boxes (overlay / legend
+# output) are kept apart from the cheaper ones without.
+_FIGURE_PROMPT_VERSION = hashlib.sha1(
+    (IMAGE_TRANSLATION_PROMPT + IMAGE_BATCH_TRANSLATION_PROMPT).encode("utf-8")
+).hexdigest()[:12]
+_FIGURE_BOX_PROMPT_VERSION = hashlib.sha1(
+    (
+        IMAGE_TRANSLATION_PROMPT + IMAGE_BATCH_TRANSLATION_PROMPT + IMAGE_BOX_PROMPT
+    ).encode("utf-8")
+).hexdigest()[:12]
+
+
+def _figure_cache_namespace(model_name: str, boxes: bool = False) -> str:
+    version = _FIGURE_BOX_PROMPT_VERSION if boxes else _FIGURE_PROMPT_VERSION
+    return f"{model_name}:{version}"
+
+
+def _figure_prompt(prompt: str, boxes: bool) -> str:
+    return prompt + IMAGE_BOX_PROMPT if boxes else prompt
+
+
+def _cached_figure(
+    cache: FigureCache,
+    pil_image,
+    namespace: str,
+    metrics: MetricsCollector | NullMetricsCollector,
+    key: FigureKey | None = None,
+) -> list[ImageTranslation] | None:
+    hit = cache.get(pil_image, namespace, key)
+    if hit is None:
+        return None
+    metrics.incr("n_figure_cache_hits")
+    return [ImageTranslation(**item) for item in hit]
+
+
+def _store_figure(
+    cache: FigureCache,
+    pil_image,
+    namespace: str,
+    items: list[ImageTranslation],
+    key: FigureKey | None = None,
+) -> None:
+    cache.put(pil_image, namespace, [item.model_dump() for item in items], key)
 
 
 # 로깅 설정
@@ -60,6 +208,22 @@ class ParagraphMismatchError(Exception):
     """Raised when the translated paragraph count doesn't match the source."""
 
 
+class FigureBatchMismatchError(ParagraphMismatchError):
+    """A batched figure response did not cover every figure index exactly once.
+
+    Subclass of ``ParagraphMismatchError`` so ``retry_with_delay`` retries it
+    (and counts it) like any other count mismatch.
+    """
+
+
+class RunawayOutputError(ParagraphMismatchError):
+    """A streamed response grew past the expected paragraphs or length budget.
+
+    Raised mid-stream so the request is abandoned early; retried like any
+    other count mismatch.
+    """
+
+
 class QuotaExhaustedError(RuntimeError):
     """A 429 RESOURCE_EXHAUSTED that could not be recovered within the run.
 
@@ -91,6 +255,19 @@ class RetriesExhaustedError(RuntimeError):
     """
 
 
+class QuotaCircuitOpenError(QuotaExhaustedError):
+    """Refused before calling the API: the process-wide quota breaker is open.
+
+    ``scope`` is ``"per_day"`` (that is what opens the breaker); ``reopens_at``
+    is the epoch time of the quota reset the breaker waits for.
+    """
+
+    def __init__(self, reopens_at: float, detail: str = ""):
+        self.reopens_at = reopens_at
+        until = datetime.fromtimestamp(reopens_at, timezone.utc).isoformat()
+        super().__init__("per_day", f"quota breaker open until {until}; {detail}")
+
+
 # Backoff ceiling for a single retry sleep (seconds).
 MAX_BACKOFF_S = 60
 
@@ -185,11 +362,216 @@ def _classify_quota_scope(exc: ClientError) -> str:
     return "unknown"
 
 
+def next_quota_reset(now: float | None = None) -> float:
+    """Epoch seconds of the next midnight in ``QUOTA_RESET_TIMEZONE`` (PT)."""
+    now = time.time() if now is None else now
+    try:
+        tz = ZoneInfo(QUOTA_RESET_TIMEZONE)
+    except ZoneInfoNotFoundError:
+        # No tz database (e.g. Windows without tzdata): assume PST.
+        tz = timezone(timedelta(hours=-8))
+    today = datetime.fromtimestamp(now, tz).date()
+    midnight = datetime(today.year, today.month, today.day, tzinfo=tz)
+    return (midnight + timedelta(days=1)).timestamp()
+
+
+BREAKER_CLOSED = "closed"
+BREAKER_OPEN = "open"
+BREAKER_HALF_OPEN = "half_open"
+
+
+@dataclass(frozen=True)
+class QuotaBreakerState:
+    state: str
+    reopens_at: float | None = None
+    detail: str = ""
+    n_rejections: int = 0
+
+
+class QuotaCircuitBreaker:
+    """Process-wide gate in front of every Gemini request.
+
+    - ``closed``: requests pass.
+    - ``open``: a per_day 429 was seen; every request (and every new run,
+      via :meth:`check`) fails with :class:`QuotaCircuitOpenError` until the
+      next quota reset, without touching the API.
+    - ``half_open``: a burst of per_minute 429s; one request at a time goes
+      out as a probe, the others wait for it. A success closes the breaker,
+      as does a full burst window without another 429.
+    """
+
+    def __init__(
+        self,
+        *,
+        burst_count: int = QUOTA_BREAKER_BURST_COUNT,
+        burst_window_s: float = QUOTA_BREAKER_BURST_WINDOW_S,
+        clock=time.time,
+    ) -> None:
+        self._burst_count = burst_count
+        self._burst_window_s = burst_window_s
+        self._clock = clock
+        self._cond = threading.Condition()
+        self._state = BREAKER_CLOSED
+        self._reopens_at = 0.0
+        self._detail = ""
+        self._minute_hits: deque[float] = deque()
+        self._probe_in_flight = False
+        self._n_rejections = 0
+
+    def snapshot(self) -> QuotaBreakerState:
+        with self._cond:
+            self._refresh_locked()
+            return QuotaBreakerState(
+                state=self._state,
+                reopens_at=self._reopens_at if self._state == BREAKER_OPEN else None,
+                detail=self._detail,
+                n_rejections=self._n_rejections,
+            )
+
+    def check(self) -> None:
+        """Raise :class:`QuotaCircuitOpenError` if open; used to refuse a run."""
+        with self._cond:
+            self._refresh_locked()
+            self._raise_if_open_locked()
+
+    @contextmanager
+    def attempt(self, cancel: CancellationToken | None = None):
+        """Wrap one API call: gate it, then learn from how it ended."""
+        probe = self._acquire(cancel)
+        succeeded = False
+        try:
+            yield
+            succeeded = True
+        except _client_error() as e:
+            if e.code == 429 and e.status == "RESOURCE_EXHAUSTED":
+                self.record_quota_error(_classify_quota_scope(e), _quota_detail(e))
+            raise
+        finally:
+            self._release(probe, succeeded)
+
+    def record_quota_error(self, scope: str, detail: str = "") -> None:
+        with self._cond:
+            now = self._clock()
+            if scope == "per_day":
+                if self._state != BREAKER_OPEN:
+                    self._reopens_at = next_quota_reset(now)
+                    logging.warning(
+                        "[quota-breaker] open until %s: %s",
+                        datetime.fromtimestamp(self._reopens_at).isoformat(),
+                        detail,
+                    )
+                self._state = BREAKER_OPEN
+                self._detail = detail
+                self._cond.notify_all()
+                return
+            self._minute_hits.append(now)
+            self._prune_locked(now)
+            if (
+                self._state == BREAKER_CLOSED
+                and len(self._minute_hits) >= self._burst_count
+            ):
+                self._state = BREAKER_HALF_OPEN
+                self._detail = detail
+                logging.warning(
+                    "[quota-breaker] half-open after %d per-minute 429s",
+                    len(self._minute_hits),
+                )
+
+    def reset(self) -> None:
+        with self._cond:
+            self._state = BREAKER_CLOSED
+            self._reopens_at = 0.0
+            self._detail = ""
+            self._minute_hits.clear()
+            self._probe_in_flight = False
+            self._n_rejections = 0
+            self._cond.notify_all()
+
+    def _acquire(self, cancel: CancellationToken | None) -> bool:
+        """``True`` if the caller is the half-open probe."""
+        with self._cond:
+            while True:
+                self._refresh_locked()
+                self._raise_if_open_locked()
+                if self._state == BREAKER_CLOSED:
+                    return False
+                if not self._probe_in_flight:
+                    self._probe_in_flight = True
+                    return True
+                self._cond.wait(0.5)
+                if cancel is not None:
+                    cancel.raise_if_cancelled()
+
+    def _release(self, probe: bool, succeeded: bool) -> None:
+        with self._cond:
+            if probe:
+                self._probe_in_flight = False
+            if succeeded and self._state == BREAKER_HALF_OPEN:
+                logging.info("[quota-breaker] closed after a successful request")
+                self._state = BREAKER_CLOSED
+                self._minute_hits.clear()
+            self._cond.notify_all()
+
+    def _raise_if_open_locked(self) -> None:
+        if self._state == BREAKER_OPEN:
+            self._n_rejections += 1
+            raise QuotaCircuitOpenError(self._reopens_at, self._detail)
+
+    def _prune_locked(self, now: float) -> None:
+        while self._minute_hits and now - self._minute_hits[0] > self._burst_window_s:
+            self._minute_hits.popleft()
+
+    def _refresh_locked(self) -> None:
+        now = self._clock()
+        self._prune_locked(now)
+        if self._state == BREAKER_OPEN and now >= self._reopens_at:
+            logging.info("[quota-breaker] quota reset reached; closed")
+            self._state = BREAKER_CLOSED
+        elif self._state == BREAKER_HALF_OPEN and not self._minute_hits:
+            self._state = BREAKER_CLOSED
+            self._cond.notify_all()
+
+
+_quota_breaker = QuotaCircuitBreaker()
+
+
+def get_quota_breaker() -> QuotaCircuitBreaker:
+    """The breaker shared by every run and session in this process."""
+    return _quota_breaker
+
+
+def _record_usage(
+    metrics: MetricsCollector | NullMetricsCollector,
+    chunk_type: str,
+    model_name: str,
+    response,
+) -> None:
+    """Feed ``response.usage_metadata`` into the collector, if present.
+
+    Recorded before any validation so a response rejected for a paragraph
+    mismatch still counts — those tokens were billed all the same.
+    Thinking tokens are billed as output, so they are folded into it.
+    """
+    usage = getattr(response, "usage_metadata", None)
+    if usage is None:
+        return
+    metrics.record_usage(
+        chunk_type,
+        model_name,
+        prompt_tokens=getattr(usage, "prompt_token_count", None) or 0,
+        cached_tokens=getattr(usage, "cached_content_token_count", None) or 0,
+        output_tokens=(getattr(usage, "candidates_token_count", None) or 0)
+        + (getattr(usage, "thoughts_token_count", None) or 0),
+    )
+
+
 def _translate_text_batch_with_retry(
     paragraphs: list[str],
     model_name: str,
     max_retries: int,
     metrics: MetricsCollector | NullMetricsCollector,
+    on_retry=None,
+    cancel: CancellationToken | None = None,
 ) -> list[str]:
     expected_len = len(paragraphs)
     input_json = json.dumps(paragraphs, ensure_ascii=False)
@@ -204,6 +586,7 @@ def _translate_text_batch_with_retry(
                 "response_schema": list[str],
             },
         )
+        _record_usage(metrics, CHUNK_TEXT, model_name, response)
         result: list[str] = response.parsed
         if len(result) != expected_len:
             raise ParagraphMismatchError(
@@ -211,7 +594,187 @@ def _translate_text_batch_with_retry(
             )
         return result
 
-    return retry_with_delay(call_gemini_api, max_retries=max_retries, metrics=metrics)
+    return retry_with_delay(
+        call_gemini_api,
+        max_retries=max_retries,
+        metrics=metrics,
+        on_retry=on_retry,
+        cancel=cancel,
+    )
+
+
+class _StreamingJsonArray:
+    """Incremental parser for a top-level JSON array of strings.
+
+    ``feed`` returns the elements completed by each piece of text. A string
+    is located by scanning for its unescaped closing quote (resuming where
+    the previous scan stopped) and then decoded with ``json.loads``, so the
+    cost stays linear in the response size. Anything but an array of
+    strings raises ``ValueError``.
+    """
+
+    def __init__(self) -> None:
+        self._buf = ""
+        self._pos = 0
+        self._str_start = -1  # opening quote of the element in progress
+        self._scan = 0
+        self.started = False
+        self.closed = False
+
+    @property
+    def pending_chars(self) -> int:
+        """Raw length of the element still streaming (0 between elements)."""
+        return 0 if self._str_start < 0 else len(self._buf) - self._str_start
+
+    def feed(self, text: str) -> list[str]:
+        self._buf += text
+        buf = self._buf
+        out: list[str] = []
+        while True:
+            if self._str_start >= 0:
+                end = self._string_end(buf)
+                if end < 0:
+                    break
+                out.append(json.loads(buf[self._str_start : end + 1]))
+                self._pos = end + 1
+                self._str_start = -1
+                continue
+            while self._pos < len(buf) and buf[self._pos] in " \t\r\n":
+                self._pos += 1
+            if self._pos >= len(buf):
+                break
+            ch = buf[self._pos]
+            if self.closed:
+                raise ValueError(f"unexpected {ch!r} after closing ']'")
+            if not self.started:
+                if ch != "[":
+                    raise ValueError(f"expected '[' but got {ch!r}")
+                self.started = True
+                self._pos += 1
+            elif ch == ",":
+                self._pos += 1
+            elif ch == "]":
+                self.closed = True
+                self._pos += 1
+            elif ch == '"':
+                self._str_start = self._pos
+                self._scan = self._pos + 1
+            else:
+                raise ValueError(f"unexpected {ch!r} in array of strings")
+        # Drop consumed text so the buffer holds at most one element.
+        start = self._str_start if self._str_start >= 0 else self._pos
+        if start:
+            self._buf = buf[start:]
+            self._pos -= start
+            if self._str_start >= 0:
+                self._str_start -= start
+                self._scan -= start
+        return out
+
+    def _string_end(self, buf: str) -> int:
+        i = self._scan
+        while True:
+            j = buf.find('"', i)
+            if j < 0:
+                self._scan = len(buf)
+                return -1
+            k = j - 1
+            while k > self._str_start and buf[k] == "\\":
+                k -= 1
+            if (j - 1 - k) % 2 == 0:
+                return j
+            i = j + 1
+
+
+def _max_output_chars(source: str) -> int:
+    return int(len(source) * TEXT_STREAM_MAX_CHAR_RATIO) + TEXT_STREAM_CHAR_SLACK
+
+
+def _translate_text_stream_with_retry(
+    paragraphs: list[str],
+    model_name: str,
+    max_retries: int,
+    metrics: MetricsCollector | NullMetricsCollector,
+    on_paragraph=None,
+    on_retry=None,
+    cancel: CancellationToken | None = None,
+) -> list[str]:
+    """Streaming twin of ``_translate_text_batch_with_retry``.
+
+    ``on_paragraph(i)`` fires as paragraph ``i`` arrives — again on a retry,
+    so consumers de-duplicate by index. Too many elements, or an element
+    (finished or still streaming) over its length budget, abort the stream
+    with :class:`RunawayOutputError`. A ``cancel`` token is checked between
+    pieces, so a cancelled run closes the stream at the next piece.
+    """
+    expected_len = len(paragraphs)
+    input_json = json.dumps(paragraphs, ensure_ascii=False)
+    limits = [_max_output_chars(p) for p in paragraphs]
+
+    def call_gemini_api_stream():
+        metrics.incr("n_text_api_calls")
+        stream = _get_client().models.generate_content_stream(
+            model=model_name,
+            contents=[TEXT_TRANSLATION_PROMPT, input_json],
+            config={
+                "response_mime_type": "application/json",
+                "response_schema": list[str],
+            },
+        )
+        parser = _StreamingJsonArray()
+        result: list[str] = []
+        last_with_usage = None
+        try:
+            for piece in stream:
+                if cancel is not None:
+                    cancel.raise_if_cancelled()
+                if getattr(piece, "usage_metadata", None) is not None:
+                    last_with_usage = piece
+                try:
+                    values = parser.feed(piece.text or "")
+                except ValueError as e:
+                    raise ParagraphMismatchError(f"Malformed streamed JSON: {e}") from e
+                for value in values:
+                    i = len(result)
+                    if i >= expected_len or len(value) > limits[i]:
+                        raise RunawayOutputError(
+                            f"Element {i + 1} exceeds expected output "
+                            f"({expected_len} paragraphs)"
+                        )
+                    result.append(value)
+                    if on_paragraph is not None:
+                        on_paragraph(i)
+                pending = parser.pending_chars
+                if pending and (
+                    len(result) >= expected_len or pending > limits[len(result)]
+                ):
+                    raise RunawayOutputError(
+                        f"Paragraph {len(result) + 1} still streaming at "
+                        f"{pending} chars; aborting"
+                    )
+        except RunawayOutputError:
+            metrics.incr("n_runaway_aborts")
+            raise
+        finally:
+            close = getattr(stream, "close", None)
+            if close is not None:
+                close()
+            # Usage of an aborted stream is whatever the last piece carried.
+            if last_with_usage is not None:
+                _record_usage(metrics, CHUNK_TEXT, model_name, last_with_usage)
+        if not parser.closed or len(result) != expected_len:
+            raise ParagraphMismatchError(
+                f"Expected {expected_len} paragraphs but got {len(result)}"
+            )
+        return result
+
+    return retry_with_delay(
+        call_gemini_api_stream,
+        max_retries=max_retries,
+        metrics=metrics,
+        on_retry=on_retry,
+        cancel=cancel,
+    )
 
 
 def retry_with_delay(
@@ -220,17 +783,35 @@ def retry_with_delay(
     metrics: MetricsCollector | NullMetricsCollector | None = None,
     max_retries=5,
     default_delay=10,
+    on_retry=None,
+    cancel: CancellationToken | None = None,
     **kwargs,
 ):
+    """Call ``func`` with mismatch / 429 retries (see the except branches).
+
+    ``on_retry(attempt, sleep_s)`` is told before each re-send — ``attempt``
+    is the 1-based attempt that failed, ``sleep_s`` the backoff about to be
+    slept (0 for an immediate mismatch retry) — so callers can surface
+    retry state while the worker waits.
+
+    With a ``cancel`` token, every attempt starts with a cancel check and
+    the backoff sleep wakes as soon as the token is set; either way
+    :class:`TranslationCancelled` propagates untouched.
+    """
     metrics = metrics or NullMetricsCollector()
     last_quota_error: ClientError | None = None
     for attempt in range(max_retries):
         is_last = attempt == max_retries - 1
+        if cancel is not None:
+            cancel.raise_if_cancelled()
         try:
             logging.info(
                 f"Attempt {attempt + 1}/{max_retries} for function {func.__name__}"
             )
-            return func(*args, **kwargs)
+            with metrics.span(
+                "api_attempt", fn=func.__name__, attempt=attempt + 1
+            ), _quota_breaker.attempt(cancel):
+                return func(*args, **kwargs)
         except ParagraphMismatchError as e:
             metrics.incr("n_mismatch_errors")
             logging.warning(
@@ -238,7 +819,9 @@ def retry_with_delay(
             )
             if not is_last:
                 metrics.incr("n_mismatch_retries")
-        except ClientError as e:
+                if on_retry is not None:
+                    on_retry(attempt + 1, 0.0)
+        except _client_error() as e:
             if e.code == 429 and e.status == "RESOURCE_EXHAUSTED":
                 last_quota_error = e
                 metrics.incr("n_429_errors")
@@ -266,11 +849,22 @@ def retry_with_delay(
                     cap = min(default_delay * (2**attempt), MAX_BACKOFF_S)
                     sleep_s = random.uniform(0, cap)
                 logging.warning(f"RESOURCE_EXHAUSTED. Retrying in {sleep_s:.1f}s...")
-                time.sleep(sleep_s)
+                if on_retry is not None:
+                    on_retry(attempt + 1, sleep_s)
+                with metrics.span("backoff_sleep", attempt=attempt + 1):
+                    if cancel is not None:
+                        cancel.sleep(sleep_s)
+                    else:
+                        time.sleep(sleep_s)
                 metrics.incr("n_429_retries")
             else:
                 logging.error(f"Unexpected ClientError: {e}")
                 raise e
+        except TranslationCancelled:
+            raise
+        except QuotaCircuitOpenError:
+            metrics.incr("n_breaker_rejections")
+            raise
         except Exception as e:
             logging.error(f"Unexpected error: {e}")
             raise e
@@ -286,28 +880,68 @@ def retry_with_delay(
     )
 
 
+def _log_escalation(n: int, what: str, model_name: str, escalate_to) -> None:
+    logging.warning(
+        "%d %s kept failing validation on %s; escalating to %s.",
+        n,
+        what,
+        model_name,
+        escalate_to[0],
+    )
+
+
 def translate_text_with_gemini(
     paragraphs: list[str],
     model_name: str = DEFAULT_GEMINI_MODEL_NAME,
     metrics: MetricsCollector | NullMetricsCollector | None = None,
+    stream: bool = False,
+    on_paragraph=None,
+    on_retry=None,
+    cancel: CancellationToken | None = None,
+    escalate_to: tuple[str, ...] = (),
 ) -> list[str]:
     """Translate a list of paragraphs, returning a list of the same length.
 
     If a large chunk keeps failing with paragraph-count mismatch, split it into
     smaller batches and retry recursively so one bad chunk does not stall the
     whole translation run for too long.
+
+    With ``stream`` the response is parsed as it arrives (runaway output is
+    aborted early) and ``on_paragraph(i)`` is called with the index of each
+    paragraph as it lands. It may be called again for the same index after
+    a retry. ``on_retry`` and ``cancel`` are forwarded to
+    :func:`retry_with_delay`; a cancel is never answered by splitting.
+
+    ``escalate_to`` lists stronger models (model tiering): once
+    ``MODEL_ROUTING_RETRIES_PER_TIER`` attempts fail validation on
+    ``model_name`` the whole batch moves to the next one, and only the last
+    model falls back to splitting.
     """
     if not paragraphs:
         return []
 
     metrics = metrics or NullMetricsCollector()
     max_retries = 3 if len(paragraphs) >= 80 else 5
+    if escalate_to:
+        max_retries = min(max_retries, MODEL_ROUTING_RETRIES_PER_TIER)
     try:
+        if stream:
+            return _translate_text_stream_with_retry(
+                paragraphs,
+                model_name=model_name,
+                max_retries=max_retries,
+                metrics=metrics,
+                on_paragraph=on_paragraph,
+                on_retry=on_retry,
+                cancel=cancel,
+            )
         return _translate_text_batch_with_retry(
             paragraphs,
             model_name=model_name,
             max_retries=max_retries,
             metrics=metrics,
+            on_retry=on_retry,
+            cancel=cancel,
         )
     except QuotaExhaustedError:
         # NEVER split on a quota/credit wall. Splitting recursively re-calls
@@ -315,7 +949,20 @@ def translate_text_with_gemini(
         # billed) requests against an already-empty quota — turning one doomed
         # 99-paragraph call into ~983 of them. Let it propagate immediately.
         raise
-    except RuntimeError:
+    except RuntimeError as e:
+        if escalate_to and isinstance(e, RetriesExhaustedError):
+            _log_escalation(len(paragraphs), "paragraphs", model_name, escalate_to)
+            metrics.incr("n_model_escalations")
+            return translate_text_with_gemini(
+                paragraphs,
+                model_name=escalate_to[0],
+                metrics=metrics,
+                stream=stream,
+                on_paragraph=on_paragraph,
+                on_retry=on_retry,
+                cancel=cancel,
+                escalate_to=escalate_to[1:],
+            )
         if len(paragraphs) <= 1:
             raise
         metrics.incr("n_split_fallbacks")
@@ -326,14 +973,31 @@ def translate_text_with_gemini(
             mid,
             len(paragraphs) - mid,
         )
+        right_on_paragraph = (
+            (lambda i: on_paragraph(mid + i)) if on_paragraph is not None else None
+        )
         # Recursive halves MUST receive the same metrics — otherwise all
         # downstream api_call / 429 / mismatch counts from the split would
         # be silently dropped.
         left = translate_text_with_gemini(
-            paragraphs[:mid], model_name=model_name, metrics=metrics
+            paragraphs[:mid],
+            model_name=model_name,
+            metrics=metrics,
+            stream=stream,
+            on_paragraph=on_paragraph,
+            on_retry=on_retry,
+            cancel=cancel,
+            escalate_to=escalate_to,
         )
         right = translate_text_with_gemini(
-            paragraphs[mid:], model_name=model_name, metrics=metrics
+            paragraphs[mid:],
+            model_name=model_name,
+            metrics=metrics,
+            stream=stream,
+            on_paragraph=right_on_paragraph,
+            on_retry=on_retry,
+            cancel=cancel,
+            escalate_to=escalate_to,
         )
         return left + right
 
@@ -342,19 +1006,220 @@ def translate_image_with_gemini(
     pil_image,
     model_name: str = DEFAULT_GEMINI_MODEL_NAME,
     metrics: MetricsCollector | NullMetricsCollector | None = None,
+    cache: FigureCache | None = None,
+    on_retry=None,
+    cancel: CancellationToken | None = None,
+    escalate_to: tuple[str, ...] = (),
+    boxes: bool = False,
 ) -> list[ImageTranslation]:
+    """Extract + translate the text of one figure.
+
+    With a ``cache``, a near-identical figure translated earlier (same model
+    and prompt version) is returned without calling the API, and fresh
+    results are stored for next time. A response that does not parse into
+    the schema is retried, then escalated along ``escalate_to`` like text.
+    ``boxes`` asks for each item's ``box_2d`` too (overlay / legend output).
+    """
     metrics = metrics or NullMetricsCollector()
+    namespace = _figure_cache_namespace(model_name, boxes)
+    key = None
+    if cache is not None:
+        # Hashed once: a miss reuses the key to store the answer.
+        key = cache.key(pil_image)
+        hit = _cached_figure(cache, pil_image, namespace, metrics, key)
+        if hit is not None:
+            return hit
 
     def call_gemini_api():
         metrics.incr("n_image_api_calls")
         response = _get_client().models.generate_content(
             model=model_name,
-            contents=[IMAGE_TRANSLATION_PROMPT, pil_image],
+            contents=[_figure_prompt(IMAGE_TRANSLATION_PROMPT, boxes), pil_image],
             config={
                 "response_mime_type": "application/json",
                 "response_schema": list[ImageTranslation],
             },
         )
+        _record_usage(metrics, CHUNK_FIGURE, model_name, response)
+        if response.parsed is None:
+            raise ParagraphMismatchError("Figure response did not match the schema")
         return response.parsed
 
-    return retry_with_delay(call_gemini_api, metrics=metrics)
+    try:
+        result = retry_with_delay(
+            call_gemini_api,
+            metrics=metrics,
+            max_retries=MODEL_ROUTING_RETRIES_PER_TIER if escalate_to else 5,
+            on_retry=on_retry,
+            cancel=cancel,
+        )
+    except RetriesExhaustedError:
+        if not escalate_to:
+            raise
+        _log_escalation(1, "figure", model_name, escalate_to)
+        metrics.incr("n_model_escalations")
+        result = translate_image_with_gemini(
+            pil_image,
+            escalate_to[0],
+            metrics=metrics,
+            cache=cache,
+            on_retry=on_retry,
+            cancel=cancel,
+            escalate_to=escalate_to[1:],
+            boxes=boxes,
+        )
+    # An escalated answer is also stored under the routed model's namespace,
+    # so the next run of this figure skips the tier that failed.
+    if cache is not None and result is not None:
+        _store_figure(cache, pil_image, namespace, result, key)
+    return result
+
+
+def _translate_image_batch_with_retry(
+    pil_images: list,
+    model_name: str,
+    max_retries: int,
+    metrics: MetricsCollector | NullMetricsCollector,
+    on_retry=None,
+    cancel: CancellationToken | None = None,
+    boxes: bool = False,
+) -> list[list[ImageTranslation]]:
+    expected = len(pil_images)
+    contents: list = [_figure_prompt(IMAGE_BATCH_TRANSLATION_PROMPT, boxes)]
+    for i, image in enumerate(pil_images):
+        contents.append(f"figure_index={i}")
+        contents.append(image)
+
+    def call_gemini_api():
+        metrics.incr("n_image_api_calls")
+        response = _get_client().models.generate_content(
+            model=model_name,
+            contents=contents,
+            config={
+                "response_mime_type": "application/json",
+                "response_schema": list[FigureTranslations],
+            },
+        )
+        _record_usage(metrics, CHUNK_FIGURE, model_name, response)
+        parsed: list[FigureTranslations] = response.parsed or []
+        by_index: dict[int, list[ImageTranslation]] = {}
+        for entry in parsed:
+            if entry.figure_index in by_index:
+                raise FigureBatchMismatchError(
+                    f"Duplicate figure_index {entry.figure_index} in batch of {expected}"
+                )
+            by_index[entry.figure_index] = list(entry.items)
+        if sorted(by_index) != list(range(expected)):
+            raise FigureBatchMismatchError(
+                f"Expected figure_index 0..{expected - 1} but got {sorted(by_index)}"
+            )
+        return [by_index[i] for i in range(expected)]
+
+    return retry_with_delay(
+        call_gemini_api,
+        max_retries=max_retries,
+        metrics=metrics,
+        on_retry=on_retry,
+        cancel=cancel,
+    )
+
+
+def translate_images_batch_with_gemini(
+    pil_images: list,
+    model_name: str = DEFAULT_GEMINI_MODEL_NAME,
+    metrics: MetricsCollector | NullMetricsCollector | None = None,
+    cache: FigureCache | None = None,
+    on_retry=None,
+    cancel: CancellationToken | None = None,
+    escalate_to: tuple[str, ...] = (),
+    boxes: bool = False,
+) -> list[list[ImageTranslation]]:
+    """Translate several small figures in one request; one list per image, in order.
+
+    Cache hits are answered locally and only the misses go out. If the
+    batched request keeps failing (index mismatch after
+    ``FIGURE_BATCH_MAX_RETRIES``, a rejected payload, ...), fall back to one
+    ``translate_image_with_gemini`` call per figure. Never on a quota wall —
+    same reasoning as the text split fallback. The per-figure fallback
+    escalates along ``escalate_to``.
+    """
+    metrics = metrics or NullMetricsCollector()
+    namespace = _figure_cache_namespace(model_name, boxes)
+    results: list[list[ImageTranslation] | None] = [None] * len(pil_images)
+    keys: list[FigureKey | None] = [None] * len(pil_images)
+    if cache is not None:
+        for i, image in enumerate(pil_images):
+            keys[i] = cache.key(image)
+            results[i] = _cached_figure(cache, image, namespace, metrics, keys[i])
+    missing = [i for i, r in enumerate(results) if r is None]
+    if missing:
+        translated = _translate_uncached_figures(
+            [pil_images[i] for i in missing],
+            model_name,
+            metrics,
+            on_retry,
+            cancel,
+            escalate_to,
+            boxes,
+        )
+        for i, items in zip(missing, translated):
+            results[i] = items
+            if cache is not None and items is not None:
+                _store_figure(cache, pil_images[i], namespace, items, keys[i])
+    return results
+
+
+def _translate_uncached_figures(
+    pil_images: list,
+    model_name: str,
+    metrics: MetricsCollector | NullMetricsCollector,
+    on_retry=None,
+    cancel: CancellationToken | None = None,
+    escalate_to: tuple[str, ...] = (),
+    boxes: bool = False,
+) -> list[list[ImageTranslation]]:
+    if len(pil_images) == 1:
+        return [
+            translate_image_with_gemini(
+                pil_images[0],
+                model_name,
+                metrics,
+                on_retry=on_retry,
+                cancel=cancel,
+                escalate_to=escalate_to,
+                boxes=boxes,
+            )
+        ]
+
+    metrics.incr("n_figure_batches")
+    try:
+        return _translate_image_batch_with_retry(
+            pil_images,
+            model_name=model_name,
+            max_retries=FIGURE_BATCH_MAX_RETRIES,
+            metrics=metrics,
+            on_retry=on_retry,
+            cancel=cancel,
+            boxes=boxes,
+        )
+    except (QuotaExhaustedError, TranslationCancelled):
+        raise
+    except Exception as e:
+        metrics.incr("n_figure_batch_fallbacks")
+        logging.warning(
+            "Figure batch of %d failed (%s); falling back to per-figure requests.",
+            len(pil_images),
+            e,
+        )
+        return [
+            translate_image_with_gemini(
+                image,
+                model_name,
+                metrics=metrics,
+                on_retry=on_retry,
+                cancel=cancel,
+                escalate_to=escalate_to,
+                boxes=boxes,
+            )
+            for image in pil_images
+        ]
@@ -1,29 +1,109 @@
 """Run translation over chunks: sequential (benchmark only) and parallel (app)."""
 
 import logging
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import time
+from concurrent.futures import FIRST_COMPLETED, wait
+from dataclasses import dataclass
 
-from utils.config import DEFAULT_GEMINI_MODEL_NAME
-from utils.metrics import MetricsCollector, NullMetricsCollector
-from utils.translation import translate_image_with_gemini, translate_text_with_gemini
+from utils.cancellation import CancellationToken, TranslationCancelled
+from utils.config import (
+    DEFAULT_GEMINI_MODEL_NAME,
+    FIGURE_BATCH_ENABLED,
+    FIGURE_BATCH_MAX_BYTES,
+    FIGURE_BATCH_MAX_FIGURES,
+    FIGURE_BATCH_MAX_PIXELS,
+    FIGURE_BATCH_SMALL_MAX_PIXELS,
+    FIGURE_OUTPUT_MODE,
+    FIGURE_OUTPUT_TEXT,
+    MEMORY_BUDGET_TEXT_TASK_MB,
+    MODEL_ROUTING_ENABLED,
+    PROGRESS_POLL_INTERVAL_S,
+    PROGRESS_UI_MIN_INTERVAL_S,
+    SCHEDULER_DEFAULT_PRIORITY,
+    TEXT_STREAMING_ENABLED,
+)
+from utils.figure_cache import FigureCache
+from utils.metrics import CHUNK_FIGURE, MetricsCollector, NullMetricsCollector
+from utils.model_routing import model_chain, route_chunks
+from utils.progress import ProgressTracker
+from utils.scheduler import RunQueue, TaskScheduler, get_scheduler
+from utils.translation import (
+    QuotaCircuitOpenError,
+    get_quota_breaker,
+    translate_image_with_gemini,
+    translate_images_batch_with_gemini,
+    translate_text_with_gemini,
+)
 
 log = logging.getLogger(__name__)
 
 
-def _translate_single_chunk(
-    chunk: dict,
-    model_name: str,
-    metrics: MetricsCollector | NullMetricsCollector,
-) -> dict:
+@dataclass
+class _RunContext:
+    """Per-run settings shared by every task of one runner call."""
+
+    model_name: str
+    metrics: MetricsCollector | NullMetricsCollector
+    progress: ProgressTracker
+    figure_cache: FigureCache | None = None
+    stream_text: bool = False
+    cancel: CancellationToken | None = None
+    # Starting tier per chunk index when model routing is on.
+    tiers: list[int] | None = None
+    # Ask for each figure item's box_2d (overlay / legend output).
+    figure_boxes: bool = False
+
+    def models_for(self, indices: list[int]) -> tuple[str, tuple[str, ...]]:
+        """(model to start with, stronger models to escalate to) for a task.
+
+        A figure group starts at the highest tier among its figures.
+        """
+        if self.tiers is None:
+            return self.model_name, ()
+        chain = model_chain(max(self.tiers[i] for i in indices))
+        return chain[0], chain[1:]
+
+    def on_retry(self, task_key: int):
+        """``retry_with_delay`` hook that marks ``task_key`` as retrying."""
+
+        def hook(attempt: int, sleep_s: float) -> None:
+            self.progress.retry(task_key, sleep_s)
+
+        return hook
+
+
+def _translate_single_chunk(chunk: dict, ctx: _RunContext, index: int = 0) -> dict:
     """Translate one chunk (sets chunk['translated']) and return it.
 
     TEXT chunks: content is list[str], translated becomes list[str] of same length.
     FIGURE chunks: content is PIL image, translated becomes list[ImageTranslation].
+    Tokens / latency land in the collector's per-chunk stats under ``index``.
     """
+    n_items = len(chunk["content"]) if chunk["type"] == "TEXT" else 1
+    span_name = f"{chunk['type'].lower()}_chunk"
+    with ctx.metrics.track_chunk(index, chunk["type"], n_items), ctx.metrics.span(
+        span_name, idx=index, n_items=n_items
+    ):
+        return _translate_chunk_content(chunk, ctx, index)
+
+
+def _translate_chunk_content(chunk: dict, ctx: _RunContext, index: int) -> dict:
+    model_name, escalate_to = ctx.models_for([index])
     if chunk["type"] == "TEXT":
         paragraphs: list[str] = chunk["content"]
+
+        def on_paragraph(i: int) -> None:
+            ctx.progress.paragraph_done(index, i)
+
         translated = translate_text_with_gemini(
-            paragraphs, model_name, metrics=metrics
+            paragraphs,
+            model_name,
+            metrics=ctx.metrics,
+            stream=ctx.stream_text,
+            on_paragraph=on_paragraph,
+            on_retry=ctx.on_retry(index),
+            cancel=ctx.cancel,
+            escalate_to=escalate_to,
         )
         log.info(
             "TEXT chunk translated: %d paragraphs in -> %d out",
@@ -33,23 +113,218 @@ def _translate_single_chunk(
         chunk["translated"] = translated
     elif chunk["type"] == "FIGURE":
         chunk["translated"] = translate_image_with_gemini(
-            chunk["content"], model_name, metrics=metrics
+            chunk["content"],
+            model_name,
+            metrics=ctx.metrics,
+            cache=ctx.figure_cache,
+            on_retry=ctx.on_retry(index),
+            cancel=ctx.cancel,
+            escalate_to=escalate_to,
+            boxes=ctx.figure_boxes,
         )
     return chunk
 
 
+def _figure_footprint(image) -> tuple[int, int]:
+    """(pixels, decoded bytes) of a PIL image — the batching budget inputs."""
+    width, height = image.size
+    pixels = width * height
+    return pixels, pixels * len(image.getbands())
+
+
+def task_memory_cost(chunks: list[dict], indices: list[int]) -> int:
+    """Bytes a task reserves from the scheduler's memory budget.
+
+    Per figure its decoded pixels plus the request payload: the encoded
+    image in base64 (the decoded size again for a plain-dict chunk, whose
+    encoded bytes are not kept). Per TEXT chunk ``MEMORY_BUDGET_TEXT_TASK_MB``.
+    """
+    cost = 0
+    for i in indices:
+        chunk = chunks[i]
+        if chunk["type"] != "FIGURE":
+            cost += int(MEMORY_BUDGET_TEXT_TASK_MB * 1024 * 1024)
+            continue
+        _, decoded = _figure_footprint(chunk["content"])
+        blob = getattr(chunk, "blob", None)
+        payload = -(-len(blob) // 3) * 4 if blob is not None else decoded
+        cost += decoded + payload
+    return cost
+
+
+def plan_translation_tasks(
+    chunks: list[dict], figure_batching: bool | None = None
+) -> list[list[int]]:
+    """Group chunk indices into units of work, one Gemini request path each.
+
+    Every TEXT chunk and every large figure is its own task. With
+    ``figure_batching`` (default ``FIGURE_BATCH_ENABLED``) small figures are
+    packed greedily in document order into groups that stay within the
+    ``FIGURE_BATCH_*`` count / pixel / byte budgets. Tasks are ordered by
+    their first index so submission still follows the document.
+    """
+    if figure_batching is None:
+        figure_batching = FIGURE_BATCH_ENABLED
+    tasks: list[list[int]] = []
+    group: list[int] = []
+    group_pixels = group_bytes = 0
+    for i, chunk in enumerate(chunks):
+        if not figure_batching or chunk["type"] != "FIGURE":
+            tasks.append([i])
+            continue
+        pixels, n_bytes = _figure_footprint(chunk["content"])
+        if pixels > FIGURE_BATCH_SMALL_MAX_PIXELS:
+            tasks.append([i])
+            continue
+        if group and (
+            len(group) >= FIGURE_BATCH_MAX_FIGURES
+            or group_pixels + pixels > FIGURE_BATCH_MAX_PIXELS
+            or group_bytes + n_bytes > FIGURE_BATCH_MAX_BYTES
+        ):
+            group = []
+        if not group:
+            # Placeholder keeps document order; filled in as figures arrive.
+            tasks.append(group)
+            group_pixels = group_bytes = 0
+        group.append(i)
+        group_pixels += pixels
+        group_bytes += n_bytes
+    return tasks
+
+
+def _route(chunks: list[dict], model_routing: bool | None) -> list[int] | None:
+    if model_routing is None:
+        model_routing = MODEL_ROUTING_ENABLED
+    return route_chunks(chunks) if model_routing else None
+
+
+def _translate_task(
+    chunks: list[dict], indices: list[int], ctx: _RunContext
+) -> list[tuple[int, dict]]:
+    """Translate one planned task; return ``(index, translated copy)`` pairs.
+
+    Checks the run's cancel token before starting and again after the
+    request returns, so a cancelled run neither starts new work nor hands
+    back a result that arrived after the cancel.
+    """
+    key = indices[0]
+    if ctx.cancel is not None:
+        ctx.cancel.raise_if_cancelled()
+    ctx.progress.task_started(key)
+    try:
+        if len(indices) == 1:
+            pairs = [(key, _translate_single_chunk(chunks[key].copy(), ctx, key))]
+        else:
+            pairs = _translate_figure_group(chunks, indices, ctx)
+        if ctx.cancel is not None:
+            ctx.cancel.raise_if_cancelled()
+    finally:
+        ctx.progress.task_finished(key)
+    for index, chunk in pairs:
+        ctx.progress.chunk_done(chunk, index)
+    return pairs
+
+
+def _translate_figure_group(
+    chunks: list[dict], indices: list[int], ctx: _RunContext
+) -> list[tuple[int, dict]]:
+    """Translate a batch of small FIGURE chunks with one request.
+
+    The batch is one unit in the per-chunk stats, keyed by its first index
+    with ``n_items`` = number of figures (fallback calls add up there too).
+    """
+    group = [chunks[i].copy() for i in indices]
+    model_name, escalate_to = ctx.models_for(indices)
+    with ctx.metrics.track_chunk(
+        indices[0], CHUNK_FIGURE, len(group)
+    ), ctx.metrics.span("figure_batch", idx=indices[0], n_items=len(group)):
+        translated = translate_images_batch_with_gemini(
+            [c["content"] for c in group],
+            model_name,
+            metrics=ctx.metrics,
+            cache=ctx.figure_cache,
+            on_retry=ctx.on_retry(indices[0]),
+            cancel=ctx.cancel,
+            escalate_to=escalate_to,
+            boxes=ctx.figure_boxes,
+        )
+    for chunk, items in zip(group, translated):
+        chunk["translated"] = items
+    log.info("FIGURE batch translated: %d figures in one request", len(group))
+    return list(zip(indices, group))
+
+
+def _figure_boxes(figure_boxes: bool | None) -> bool:
+    if figure_boxes is None:
+        return FIGURE_OUTPUT_MODE != FIGURE_OUTPUT_TEXT
+    return figure_boxes
+
+
+def _abandon(run_queue: RunQueue, cancel: CancellationToken, reason: str) -> None:
+    """Stop a run without waiting on its workers."""
+    cancel.cancel(reason)
+    run_queue.close()
+    log.info("Translation run abandoned (%s); workers released", cancel.reason)
+
+
+def _queue_wait_hook(metrics: MetricsCollector | NullMetricsCollector, priority: str):
+    """``RunQueue`` start hook recording each task's wait as a span."""
+
+    def on_start(submitted_at: float, started_at: float) -> None:
+        metrics.record_span("queue_wait", submitted_at, started_at, priority=priority)
+
+    return on_start
+
+
+def _check_quota_breaker(metrics: MetricsCollector | NullMetricsCollector) -> None:
+    """Refuse the whole run, before any API call, while the breaker is open."""
+    try:
+        get_quota_breaker().check()
+    except QuotaCircuitOpenError:
+        metrics.incr("n_breaker_rejections")
+        raise
+
+
 def translate_chunks_sequential(
     chunks: list[dict],
     model_name: str = DEFAULT_GEMINI_MODEL_NAME,
     progress_callback=None,
     metrics_collector: MetricsCollector | NullMetricsCollector | None = None,
+    figure_batching: bool | None = None,
+    figure_cache: FigureCache | None = None,
+    stream_text: bool | None = None,
+    status_callback=None,
+    cancel_token: CancellationToken | None = None,
+    model_routing: bool | None = None,
+    chunk_callback=None,
+    figure_boxes: bool | None = None,
 ) -> list[dict]:
     """Translate chunks one by one. Used by benchmark only."""
     metrics = metrics_collector or NullMetricsCollector()
-    for i, chunk in enumerate(chunks):
-        _translate_single_chunk(chunk, model_name, metrics)
+    _check_quota_breaker(metrics)
+    ctx = _RunContext(
+        model_name=model_name,
+        metrics=metrics,
+        progress=ProgressTracker(chunks),
+        figure_cache=figure_cache,
+        stream_text=TEXT_STREAMING_ENABLED if stream_text is None else stream_text,
+        cancel=cancel_token,
+        tiers=_route(chunks, model_routing),
+        figure_boxes=_figure_boxes(figure_boxes),
+    )
+    tasks = plan_translation_tasks(chunks, figure_batching)
+    completed = 0
+    ctx.metrics.incr("n_chunks_submitted", len(tasks))
+    for indices in tasks:
+        for index, translated_chunk in _translate_task(chunks, indices, ctx):
+            chunks[index] = translated_chunk
+            if chunk_callback is not None:
+                chunk_callback(index, translated_chunk)
+        completed += len(indices)
         if progress_callback is not None:
-            progress_callback(i + 1, len(chunks))
+            progress_callback(completed, len(chunks))
+        if status_callback is not None:
+            status_callback(ctx.progress.snapshot())
     return chunks
 
 
@@ -59,46 +334,153 @@ def translate_chunks_parallel(
     max_workers: int = 8,
     progress_callback=None,
     metrics_collector: MetricsCollector | NullMetricsCollector | None = None,
+    figure_batching: bool | None = None,
+    figure_cache: FigureCache | None = None,
+    stream_text: bool | None = None,
+    status_callback=None,
+    cancel_token: CancellationToken | None = None,
+    model_routing: bool | None = None,
+    priority: str | None = None,
+    scheduler: TaskScheduler | None = None,
+    chunk_callback=None,
+    figure_boxes: bool | None = None,
 ) -> list[dict]:
     """Translate chunks in parallel; return chunks in original order with 'translated' set.
 
+    ``figure_batching`` packs small figures into shared requests (see
+    :func:`plan_translation_tasks`); ``None`` uses ``FIGURE_BATCH_ENABLED``.
+    ``figure_cache`` answers previously seen figures without an API call.
+    ``figure_boxes`` asks for the position of each figure label, needed by
+    the overlay / legend figure output only; ``None`` asks exactly when
+    ``FIGURE_OUTPUT_MODE`` is not ``"text"``.
+    ``stream_text`` (default ``TEXT_STREAMING_ENABLED``) parses TEXT
+    responses as they stream, so progress moves paragraph by paragraph.
+    ``model_routing`` (default ``MODEL_ROUTING_ENABLED``) replaces
+    ``model_name`` with a per-chunk tier from ``GEMINI_MODEL_TIERS`` that
+    escalates on repeated validation failures (see utils/model_routing.py).
+
+    Tasks run on the process-wide :class:`~utils.scheduler.TaskScheduler`
+    (or ``scheduler``), shared with every other run: ``max_workers`` caps
+    this run, and ``priority`` (default ``SCHEDULER_DEFAULT_PRIORITY``;
+    ``"interactive"`` or ``"batch"``) sets its class in the weighted fair
+    share. Each task's wait for a worker is recorded as a ``queue_wait``
+    span. A task also waits while its :func:`task_memory_cost` does not fit
+    in the scheduler's memory budget (``MEMORY_BUDGET_MB``), and holds every
+    task behind it, of any run, until it does.
+
+    ``progress_callback(completed, total)`` fires per finished chunk, and
+    ``chunk_callback(index, translated_chunk)`` with the chunk itself, in
+    completion order (e.g. :class:`~utils.segments.SegmentWriter`).
+    ``status_callback(ProgressSnapshot)`` carries weighted progress,
+    in-flight / retry / backoff counts and the ETA; it is throttled to one
+    call per ``PROGRESS_UI_MIN_INTERVAL_S`` plus a final one. All run on
+    the calling thread (safe for Streamlit).
+
     Fail-fast: first chunk failure raises. Before re-raising we call
     ``record_failed_chunk()`` exactly once so the run metrics row records
-    a single failure. In-flight tasks drain naturally when the
-    ``ThreadPoolExecutor`` context exits; their results are discarded
-    and not counted as additional failures.
+    a single failure. In-flight tasks are drained before re-raising; their
+    results are discarded and not counted as additional failures.
+
+    Cancellation: setting ``cancel_token`` (one is created if omitted)
+    raises :class:`TranslationCancelled` here within one poll interval.
+    The same happens for any ``BaseException`` escaping a callback —
+    Streamlit's stop / rerun when the session closes or the user clicks
+    another widget. Either way the run is *abandoned*, not drained: the
+    token is set (backoff sleeps wake, streams close at the next piece),
+    queued tasks are dropped and the workers are released without waiting,
+    so chunk copies and images are freed as soon as in-flight requests
+    return and the shared workers move on to other runs.
+
+    While the process-wide quota breaker is open (a per_day 429 earlier in
+    any session) the run is refused up front with
+    :class:`~utils.translation.QuotaCircuitOpenError`.
     """
+    cancel = cancel_token or CancellationToken()
     metrics = metrics_collector or NullMetricsCollector()
+    _check_quota_breaker(metrics)
+    priority = priority or SCHEDULER_DEFAULT_PRIORITY
+    metrics.record(priority_class=priority)
+    ctx = _RunContext(
+        model_name=model_name,
+        metrics=metrics,
+        progress=ProgressTracker(chunks),
+        figure_cache=figure_cache,
+        stream_text=TEXT_STREAMING_ENABLED if stream_text is None else stream_text,
+        cancel=cancel,
+        tiers=_route(chunks, model_routing),
+        figure_boxes=_figure_boxes(figure_boxes),
+    )
     total = len(chunks)
     results: list[dict | None] = [None] * total
-
-    def task(index: int):
-        chunk = chunks[index]
-        return index, _translate_single_chunk(dict(chunk), model_name, metrics)
+    tasks = plan_translation_tasks(chunks, figure_batching)
 
     completed = 0
+    last_status_at = float("-inf")
     failure_recorded = False
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        futures = {executor.submit(task, i): i for i in range(total)}
-        try:
-            for future in as_completed(futures):
+    # Queue depth counts tasks (a figure batch is one unit of work).
+    metrics.incr("n_chunks_submitted", len(tasks))
+    run_queue = (scheduler or get_scheduler()).open_queue(
+        name=metrics.run_id,
+        priority=priority,
+        max_in_flight=max_workers,
+        on_start=_queue_wait_hook(metrics, priority),
+    )
+    futures = []
+    try:
+        futures = [
+            run_queue.submit(
+                _translate_task,
+                chunks,
+                indices,
+                ctx,
+                cost=task_memory_cost(chunks, indices),
+            )
+            for indices in tasks
+        ]
+        pending = set(futures)
+        while pending:
+            cancel.raise_if_cancelled()
+            done, pending = wait(
+                pending,
+                timeout=PROGRESS_POLL_INTERVAL_S,
+                return_when=FIRST_COMPLETED,
+            )
+            for future in done:
                 try:
-                    index, translated_chunk = future.result()
+                    pairs = future.result()
+                except TranslationCancelled:
+                    raise
                 except Exception:
                     if not failure_recorded:
                         metrics.record_failed_chunk()
                         failure_recorded = True
                     raise
-                results[index] = translated_chunk
-                completed += 1
+                for index, translated_chunk in pairs:
+                    results[index] = translated_chunk
+                    if chunk_callback is not None:
+                        chunk_callback(index, translated_chunk)
+                completed += len(pairs)
                 if progress_callback is not None:
                     progress_callback(completed, total)
-        except Exception:
-            # Best-effort cancel of not-yet-started tasks. Already-running
-            # ones will be awaited by the context manager but their
-            # results are dropped on the floor.
-            for f in futures:
-                f.cancel()
-            raise
+            now = time.monotonic()
+            if status_callback is not None and (
+                not pending or now - last_status_at >= PROGRESS_UI_MIN_INTERVAL_S
+            ):
+                last_status_at = now
+                status_callback(ctx.progress.snapshot())
+    except TranslationCancelled:
+        _abandon(run_queue, cancel, "cancelled")
+        raise
+    except Exception:
+        # Cancel not-yet-started tasks. Already-running ones are awaited
+        # but their results are dropped on the floor.
+        run_queue.close()
+        wait(futures)
+        raise
+    except BaseException as e:
+        # Streamlit StopException / RerunException, KeyboardInterrupt.
+        _abandon(run_queue, cancel, type(e).__name__)
+        raise
+    run_queue.close()
 
     return [c for c in results if c is not None]